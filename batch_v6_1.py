@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""Non-interactive v6.1 batch runner: a JSONL of prompts in, a JSONL of results out.
+
+Every task runs as a fresh single-turn ``V6_1`` session in its own working directory
+(``<work-root>/<task_id>``, optionally seeded from ``--seed-dir``), ``--concurrency`` tasks at a
+time. Each finished task is appended (and fsynced) to the results file, which doubles as the
+checkpoint: re-running the same command skips tasks already recorded as ``ok`` and retries the
+rest from a clean workspace, so a crash or ^C loses at most the tasks that were in flight.
+
+Input lines are JSON objects. The task id comes from ``id`` / ``task_id`` / ``request_id``
+(else the line number); the prompt from ``--prompt-field`` or the first of ``prompt`` / ``input``
+/ ``body`` (prefixed by ``title`` when both exist), so ``requests.jsonl`` works as-is::
+
+    python batch_v6_1.py tasks.jsonl --results logs/batch/results.jsonl --concurrency 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from cli_v6_1 import _persist_if_needed, _token_snapshot
+from core.client_factory import build_llm_client, build_model_router
+from core.config import load_config
+from core.logging_utils import close_session_logger, create_session_logger
+from core.mcp_client import MCPManager as MCPManagerV4
+from core.model_router import ModelRouter
+from core.rate_limiter import PRIORITY_BACKGROUND, llm_priority, llm_session
+from core.session_store_v6 import SessionStoreV6
+from core.short_memory_v6_1 import ShortMemoryConfig
+from core.tool_result_store import ToolResultGovernorConfig
+from core.types import LLMClient
+from loops.agent_loop_v6_1 import V6_1
+
+_UNSAFE_ID_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+@dataclass(frozen=True)
+class BatchTask:
+    task_id: str
+    prompt: str
+    line: int
+
+
+@dataclass(frozen=True)
+class BatchConfig:
+    model_name: str
+    work_root: str
+    results_path: str
+    sessions_dir: str | None = None
+    seed_dir: str | None = None
+    concurrency: int = 4
+    task_timeout_seconds: float = 0.0
+    retries: int = 0
+    retry_failed: bool = False
+    timeout_seconds: int = 60
+    max_tool_rounds: int = 50
+    skills_dir: str | None = None
+    skill_index_cache: bool = False
+    mcp_enabled: bool = False
+    short_memory_config: ShortMemoryConfig | None = None
+    tool_result_config: ToolResultGovernorConfig | None = None
+
+
+def _workspace_name(task_id: str) -> str:
+    return _UNSAFE_ID_CHARS.sub("_", task_id).strip("._") or "task"
+
+
+def load_tasks(path: str, *, prompt_field: str | None = None) -> List[BatchTask]:
+    tasks: List[BatchTask] = []
+    workspaces: Dict[str, str] = {}
+    for line_no, raw in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), start=1):
+        if not raw.strip():
+            continue
+        item = json.loads(raw)
+        if not isinstance(item, dict):
+            raise ValueError(f"{path}:{line_no}: expected a JSON object")
+        task_id = str(item.get("id") or item.get("task_id") or item.get("request_id") or f"line-{line_no}")
+        if prompt_field:
+            prompt = str(item.get(prompt_field, ""))
+        else:
+            prompt = str(item.get("prompt") or item.get("input") or item.get("body") or "")
+            title = str(item.get("title", "")).strip()
+            if title and "prompt" not in item and "input" not in item:
+                prompt = f"{title}\n\n{prompt}" if prompt else title
+        if not prompt.strip():
+            raise ValueError(f"{path}:{line_no}: task {task_id!r} has no prompt")
+        workspace = _workspace_name(task_id)
+        other = workspaces.get(workspace)
+        if other == task_id:
+            raise ValueError(f"{path}:{line_no}: duplicate task id {task_id!r}")
+        if other is not None:
+            raise ValueError(f"{path}:{line_no}: task id {task_id!r} collides with {other!r} (both map to workspace {workspace!r})")
+        workspaces[workspace] = task_id
+        tasks.append(BatchTask(task_id=task_id, prompt=prompt, line=line_no))
+    return tasks
+
+
+def load_checkpoint(results_path: str) -> Dict[str, Dict[str, object]]:
+    """Latest result per task id; a torn last line from a crash is ignored."""
+    done: Dict[str, Dict[str, object]] = {}
+    path = Path(results_path)
+    if not path.exists():
+        return done
+    for raw in path.read_text(encoding="utf-8").splitlines():
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            continue
+        if isinstance(item, dict) and "task_id" in item:
+            done[str(item["task_id"])] = item
+    return done
+
+
+def pending_tasks(tasks: List[BatchTask], checkpoint: Dict[str, Dict[str, object]], *, retry_failed: bool) -> List[BatchTask]:
+    keep: List[BatchTask] = []
+    for task in tasks:
+        status = (checkpoint.get(task.task_id) or {}).get("status")
+        if status == "ok" or (status is not None and not retry_failed):
+            continue
+        keep.append(task)
+    return keep
+
+
+class _ResultWriter:
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(path, "a", encoding="utf-8")  # noqa: SIM115
+        if self._fh.tell() > 0:
+            with open(path, "rb") as existing:
+                existing.seek(-1, os.SEEK_END)
+                torn = existing.read(1) != b"\n"
+            if torn:
+                # Terminate a line torn by a crash so the next result stays parseable.
+                self._fh.write("\n")
+
+    def write(self, result: Dict[str, object]) -> None:
+        self._fh.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def _prepare_workspace(config: BatchConfig, task: BatchTask) -> Path:
+    workspace = Path(config.work_root) / _workspace_name(task.task_id)
+    # A leftover directory means the task was interrupted; start it over from a clean copy.
+    if workspace.exists():
+        shutil.rmtree(workspace)
+    if config.seed_dir:
+        shutil.copytree(config.seed_dir, workspace)
+    else:
+        workspace.mkdir(parents=True)
+    return workspace
+
+
+async def run_task(
+    task: BatchTask,
+    *,
+    client: LLMClient,
+    config: BatchConfig,
+    store: SessionStoreV6 | None = None,
+    mcp_manager: MCPManagerV4 | None = None,
+    model_router: ModelRouter | None = None,
+) -> Dict[str, object]:
+    attempts = max(1, config.retries + 1)
+    result: Dict[str, object] = {}
+    for attempt in range(1, attempts + 1):
+        workspace = await asyncio.to_thread(_prepare_workspace, config, task)
+        loop = V6_1(
+            client=client,
+            model_name=config.model_name,
+            timeout_seconds=config.timeout_seconds,
+            max_tool_rounds=config.max_tool_rounds,
+            default_tool_cwd=str(workspace),
+            mcp_manager=mcp_manager,
+            mcp_enabled=config.mcp_enabled,
+            skills_dir=config.skills_dir,
+            skill_index_cache=config.skill_index_cache,
+            verbose=False,
+            short_memory_config=config.short_memory_config,
+            tool_result_config=config.tool_result_config,
+            model_router=model_router,
+        )
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        started = time.perf_counter()
+        status, text, error = "ok", "", ""
+        try:
+            with llm_priority(PRIORITY_BACKGROUND), llm_session(task.task_id):
+                turn = loop.run_turn(task.prompt)
+                timeout = config.task_timeout_seconds
+                text = await (asyncio.wait_for(turn, timeout) if timeout > 0 else turn)
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"exceeded {config.task_timeout_seconds:g}s"
+        except Exception as exc:  # noqa: BLE001
+            status, error = "error", f"{type(exc).__name__}: {exc}"
+        finally:
+            loop.close()
+        duration_ms = int((time.perf_counter() - started) * 1000)
+
+        messages = loop.get_raw_messages()
+        snap = _token_snapshot(loop)
+        session_id = None
+        if store is not None:
+            record = store.create(model_name=config.model_name, loop_version="v6.1", persist=False)
+            if await asyncio.to_thread(_persist_if_needed, store, record, messages, token_snapshot=snap):
+                session_id = record.session_id
+        result = {
+            "task_id": task.task_id,
+            "line": task.line,
+            "status": status,
+            "attempt": attempt,
+            "final_text": text,
+            "error": error,
+            "started_at": started_at,
+            "duration_ms": duration_ms,
+            "rounds": sum(1 for m in messages if m.get("role") == "assistant"),
+            "tool_calls": sum(1 for m in messages if m.get("role") == "tool"),
+            "prompt_tokens": int(snap.get("session_prompt_tokens", 0) or 0),
+            "completion_tokens": int(snap.get("session_completion_tokens", 0) or 0),
+            "total_tokens": int(snap.get("session_total_tokens", 0) or 0),
+            "cached_prompt_tokens": int(snap.get("session_cached_prompt_tokens", 0) or 0),
+            "usage_source": str(snap.get("last_usage_source", "none")),
+            "workspace": str(workspace),
+            "session_id": session_id,
+        }
+        if status == "ok":
+            break
+    return result
+
+
+async def run_batch(
+    tasks: List[BatchTask],
+    *,
+    client: LLMClient,
+    config: BatchConfig,
+    mcp_manager: MCPManagerV4 | None = None,
+    model_router: ModelRouter | None = None,
+    progress: bool = False,
+) -> List[Dict[str, object]]:
+    """Run the tasks not yet in the checkpoint; returns the results of this run only."""
+    todo = pending_tasks(tasks, load_checkpoint(config.results_path), retry_failed=config.retry_failed)
+    store = SessionStoreV6(config.sessions_dir) if config.sessions_dir else None
+    writer = _ResultWriter(config.results_path)
+    gate = asyncio.Semaphore(max(1, config.concurrency))
+    results: List[Dict[str, object]] = []
+    if progress:
+        print(f"[BATCH] {len(todo)}/{len(tasks)} tasks to run (concurrency={config.concurrency})", flush=True)
+
+    async def _one(task: BatchTask) -> None:
+        async with gate:
+            result = await run_task(
+                task,
+                client=client,
+                config=config,
+                store=store,
+                mcp_manager=mcp_manager,
+                model_router=model_router,
+            )
+        writer.write(result)
+        results.append(result)
+        if progress:
+            print(
+                f"[BATCH] {len(results)}/{len(todo)} {task.task_id} {result['status']} "
+                f"{result['duration_ms']}ms tokens={result['total_tokens']}",
+                flush=True,
+            )
+
+    try:
+        await asyncio.gather(*(_one(task) for task in todo))
+    finally:
+        writer.close()
+    return results
+
+
+def summarize(results: List[Dict[str, object]]) -> Dict[str, object]:
+    durations = sorted(int(r.get("duration_ms", 0)) for r in results)
+
+    def _pct(pct: float) -> int:
+        return durations[min(len(durations) - 1, int(round(pct / 100.0 * (len(durations) - 1))))] if durations else 0
+
+    by_status: Dict[str, int] = {}
+    for r in results:
+        by_status[str(r.get("status"))] = by_status.get(str(r.get("status")), 0) + 1
+    return {
+        "tasks": len(results),
+        "by_status": by_status,
+        "p50_ms": _pct(50),
+        "p95_ms": _pct(95),
+        "prompt_tokens": sum(int(r.get("prompt_tokens", 0)) for r in results),
+        "completion_tokens": sum(int(r.get("completion_tokens", 0)) for r in results),
+    }
+
+
+async def async_main() -> int:
+    parser = argparse.ArgumentParser(description="Run a JSONL of prompts through V6_1 without the interactive CLI")
+    parser.add_argument("tasks", help="JSONL file, one task object per line")
+    parser.add_argument("--config", default="./configs/default.json")
+    parser.add_argument("--results", default="./logs/batch/results.jsonl", help="Results JSONL (also the resume checkpoint)")
+    parser.add_argument("--work-root", default="./logs/batch/work", help="Per-task working directories")
+    parser.add_argument("--seed-dir", default=None, help="Copy this directory into every task workspace")
+    parser.add_argument("--sessions-dir", default="./logs/batch/sessions", help="Save each transcript as a v6 session ('' to skip)")
+    parser.add_argument("--prompt-field", default=None, help="Read the prompt from this field only")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--task-timeout", type=float, default=0.0, help="Seconds per attempt (0 = no limit)")
+    parser.add_argument("--retries", type=int, default=0, help="Extra attempts for failed tasks within this run")
+    parser.add_argument("--retry-failed", action="store_true", help="Also rerun tasks recorded as error/timeout")
+    parser.add_argument("--max-tool-rounds", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=0, help="Only consider the first N tasks")
+    parser.add_argument("--tool-result-max-tokens", type=int, default=4000)
+    parser.add_argument("--tool-results-dir", default="./logs/tool_results")
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--log-dir", default="./logs")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    logger, log_path = create_session_logger(log_dir=args.log_dir, debug=args.debug, background=True)
+    logger.info("startup batch=v6.1 model=%s tasks=%s log=%s", cfg.model_name, args.tasks, log_path)
+    workers = max(8, int(args.concurrency) * 2)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch"))
+
+    tasks = load_tasks(args.tasks, prompt_field=args.prompt_field)
+    if args.limit > 0:
+        tasks = tasks[: args.limit]
+    client = build_llm_client(cfg, debug=args.debug, logger=logger)
+    config = BatchConfig(
+        model_name=cfg.model_name,
+        work_root=args.work_root,
+        results_path=args.results,
+        sessions_dir=args.sessions_dir or None,
+        seed_dir=args.seed_dir,
+        concurrency=max(1, int(args.concurrency)),
+        task_timeout_seconds=float(args.task_timeout),
+        retries=max(0, int(args.retries)),
+        retry_failed=bool(args.retry_failed),
+        timeout_seconds=cfg.timeout_seconds,
+        max_tool_rounds=int(args.max_tool_rounds),
+        skills_dir=cfg.skills_dir,
+        skill_index_cache=True,
+        mcp_enabled=bool(cfg.mcp_servers),
+        tool_result_config=ToolResultGovernorConfig(
+            enabled=int(args.tool_result_max_tokens) > 0,
+            max_inline_tokens=max(1, int(args.tool_result_max_tokens)),
+            store_dir=args.tool_results_dir,
+        ),
+    )
+    mcp_manager = MCPManagerV4(cfg.mcp_servers or []) if cfg.mcp_servers else None
+    try:
+        results = await run_batch(
+            tasks,
+            client=client,
+            config=config,
+            mcp_manager=mcp_manager,
+            model_router=build_model_router(cfg),
+            progress=True,
+        )
+    finally:
+        close_session_logger(logger)
+    print(json.dumps(summarize(results), ensure_ascii=False))
+    return 0 if all(r.get("status") == "ok" for r in results) else 1
+
+
+def main() -> int:
+    try:
+        return asyncio.run(async_main())
+    except KeyboardInterrupt:
+        print("\nInterrupted; rerun the same command to resume.")
+        return 130
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -35,7 +35,7 @@ async def async_main() -> int:
     if loop_version not in {"v1", "v2", "v3", "v4", "v4.1", "v5"}:
         raise ValueError(f"Unsupported loop version: {loop_version}")
 
-    logger, log_path = create_session_logger(log_dir=args.log_dir, debug=args.debug)
+    logger, log_path = create_session_logger(log_dir=args.log_dir, debug=args.debug, background=True)
     logger.info("startup loop=%s model=%s provider=%s", loop_version, cfg.model_name, cfg.provider)
 
     client = OpenAICompatClient(
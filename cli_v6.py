@@ -568,7 +568,7 @@ async def async_main() -> int:
     args = parser.parse_args()
 
     cfg = load_config(args.config)
-    logger, log_path = create_session_logger(log_dir=args.log_dir, debug=args.debug)
+    logger, log_path = create_session_logger(log_dir=args.log_dir, debug=args.debug, background=True)
     logger.info("startup loop=v6 model=%s provider=%s", cfg.model_name, cfg.provider)
 
     client = OpenAICompatClient(
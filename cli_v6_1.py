@@ -7,17 +7,28 @@ import json
 from pathlib import Path
 import signal
 import shutil
+import sys
 import textwrap
+import threading
+import time
+import unicodedata
 from typing import Any, Dict, List
 
-from core.client import OpenAICompatClient
+from core.client_factory import build_llm_client, build_model_router
 from core.config import load_config
-from core.logging_utils import create_session_logger
+from core.fs_watcher import FileWatcher, start_file_watcher
+from core.logging_utils import close_session_logger, create_session_logger
 from core.mcp_client import MCPManager as MCPManagerV4
+from core.metrics import start_metrics_server
+from core.profiler import PROFILE_MODES, TurnProfiler
 from core.session_store_v6 import SessionRecord, SessionStoreV6
 from core.short_memory_v6_1 import ShortMemoryConfig
+from core.speculative_prefetch import PrefetchConfig, TransitionStats
+from core.tool_result_store import ToolResultGovernorConfig
+from core.trace import TraceSink
 from core.types import Message, TokenUsage
 from loops.agent_loop_v6_1 import V6_1
+from loops.subagents import SubagentConfig
 
 try:
     import readline
@@ -69,12 +80,38 @@ def _build_prompt_session(ui: "RefreshUI") -> Any | None:
     return PromptSession(key_bindings=kb)
 
 
+# Raw-line wrap results shared across dialogue entries; cleared wholesale when it grows past this.
+_LINE_WRAP_CACHE_SIZE = 4096
+
+
+def _fit_width(text: str, width: int) -> str:
+    # Clip by terminal columns (CJK = 2) so no frame row wraps; differential repaint relies on 1 row = 1 line.
+    if text.isascii():
+        return text[:width]
+    used = 0
+    for idx, ch in enumerate(text):
+        used += 2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1
+        if used > width:
+            return text[:idx]
+    return text
+
+
 class RefreshUI:
-    def __init__(self, *, enabled: bool, model_name: str, log_path: str, max_lines: int = 18) -> None:
+    def __init__(
+        self,
+        *,
+        enabled: bool,
+        model_name: str,
+        log_path: str,
+        max_lines: int = 18,
+        max_fps: float = 30.0,
+    ) -> None:
         self.enabled = enabled
         self.model_name = model_name
         self.log_path = log_path
         self.max_lines = max_lines
+        # Streamed deltas / status updates are coalesced to at most max_fps frames (<= 0: every update).
+        self.frame_interval = 1.0 / max_fps if max_fps > 0 else 0.0
         self.session_id = "-"
         self.session_file = "-"
         self.token_line = "[TOKENS] no LLM call yet"
@@ -87,6 +124,17 @@ class RefreshUI:
         self._last_dialogue_line_max = 0
         self.runtime_status = "等待输入"
         self._stream_assistant_index: int | None = None
+        self._wrap_cache: dict[tuple[str, str, int], tuple[str, ...]] = {}
+        self._line_wrap_cache: dict[tuple[str, int], tuple[str, ...]] = {}
+        self._screen: list[str] = []
+        self._screen_size: tuple[int, int] | None = None
+        self._render_lock = threading.RLock()
+        self._last_render_at = 0.0
+        self._dirty = False
+        self._flush_timer: threading.Timer | None = None
+        self.frames_rendered = 0
+        self.rows_written = 0
+        self.wrap_cache_misses = 0
 
     def set_session(self, session_id: str, session_file: str) -> None:
         self.session_id = session_id
@@ -142,7 +190,7 @@ class RefreshUI:
         role, content = self.dialogue[idx]
         self.dialogue[idx] = (role, f"{content}{delta}")
         if self.enabled:
-            self.render()
+            self.request_render()
 
     def close_assistant_stream(self) -> None:
         self._stream_assistant_index = None
@@ -210,43 +258,128 @@ class RefreshUI:
         if self.enabled:
             self.render()
 
+    def _wrapped_entry(self, role: str, content: str, body_width: int) -> tuple[str, ...]:
+        key = (role, content, body_width)
+        cached = self._wrap_cache.get(key)
+        if cached is not None:
+            return cached
+        self.wrap_cache_misses += 1
+        prefix = f"[{role}] "
+        indent = " " * len(prefix)
+        inner_width = max(10, body_width - len(prefix))
+        rows: list[str] = []
+        for raw in content.splitlines() or [""]:
+            # A streaming entry only ever changes its last raw line; earlier lines hit this cache.
+            parts = self._line_wrap_cache.get((raw, inner_width))
+            if parts is None:
+                parts = tuple(textwrap.wrap(raw, width=inner_width) or [""])
+                if len(self._line_wrap_cache) >= _LINE_WRAP_CACHE_SIZE:
+                    self._line_wrap_cache.clear()
+                self._line_wrap_cache[(raw, inner_width)] = parts
+            for part in parts:
+                rows.append(f"{indent if rows else prefix}{part}")
+        wrapped = tuple(rows)
+        self._wrap_cache[key] = wrapped
+        return wrapped
+
     def _render_dialogue_lines(self, width: int, height: int) -> list[str]:
         if height <= 0:
             return []
-        lines: list[str] = []
         body_width = max(20, width - 2)
-        for role, content in self.dialogue:
-            prefix = f"[{role}] "
-            raw_lines = content.splitlines() or [""]
-            first_line = True
-            for raw in raw_lines:
-                wrapped = textwrap.wrap(raw, width=max(10, body_width - len(prefix))) or [""]
-                for part in wrapped:
-                    lines.append(f"{prefix if first_line else ' ' * len(prefix)}{part}")
-                    first_line = False
-        if not lines:
+        entries = [self._wrapped_entry(role, content, body_width) for role, content in self.dialogue]
+        if len(self._wrap_cache) > len(entries) + 16:
+            live = {(role, content, body_width) for role, content in self.dialogue}
+            self._wrap_cache = {key: value for key, value in self._wrap_cache.items() if key in live}
+        total_lines = sum(len(rows) for rows in entries)
+        if not total_lines:
             self._last_dialogue_page_total = 1
             return [""] * height
 
         page_size = max(1, height)
-        total_pages = max(1, (len(lines) + page_size - 1) // page_size)
+        total_pages = max(1, (total_lines + page_size - 1) // page_size)
         self._last_dialogue_page_total = total_pages
         self.dialogue_page = min(self.dialogue_page, total_pages - 1)
-        self._last_dialogue_line_max = max(0, len(lines) - page_size)
+        self._last_dialogue_line_max = max(0, total_lines - page_size)
         self.dialogue_line_offset = min(self.dialogue_line_offset, self._last_dialogue_line_max)
 
         start_from_end = self.dialogue_page * page_size + self.dialogue_line_offset
-        end_idx = max(0, len(lines) - start_from_end)
+        end_idx = max(0, total_lines - start_from_end)
         start_idx = max(0, end_idx - page_size)
-        page_lines = lines[start_idx:end_idx]
+        page_lines: list[str] = []
+        offset = 0
+        for rows in entries:
+            next_offset = offset + len(rows)
+            if next_offset > start_idx and offset < end_idx:
+                page_lines.extend(rows[max(0, start_idx - offset) : end_idx - offset])
+            offset = next_offset
 
         if len(page_lines) < height:
             return page_lines + ([""] * (height - len(page_lines)))
         return page_lines
 
+    def request_render(self) -> None:
+        if not self.enabled:
+            return
+        with self._render_lock:
+            wait = self._last_render_at + self.frame_interval - time.monotonic()
+            if wait <= 0:
+                self.render()
+                return
+            self._dirty = True
+            if self._flush_timer is None:
+                # Trailing frame so the last coalesced update shows even if no further delta arrives.
+                timer = threading.Timer(wait, self._flush_pending_render)
+                timer.daemon = True
+                self._flush_timer = timer
+                timer.start()
+
+    def _flush_pending_render(self) -> None:
+        with self._render_lock:
+            self._flush_timer = None
+            if self._dirty:
+                self.render()
+
+    def invalidate_screen(self) -> None:
+        # Next frame repaints everything (e.g. after the prompt line scrolled the terminal).
+        with self._render_lock:
+            self._screen = []
+            self._screen_size = None
+
     def render(self) -> None:
         if not self.enabled:
             return
+        with self._render_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._dirty = False
+            self._last_render_at = time.monotonic()
+            self._render_frame()
+
+    def _write_frame(self, rows: list[str], size: tuple[int, int]) -> None:
+        previous = self._screen
+        out: list[str] = []
+        if self._screen_size != size or len(previous) != len(rows):
+            out.append("\033[2J\033[H")
+            out.append("\n".join(rows))
+            out.append("\n")
+            self.rows_written += len(rows)
+        else:
+            for idx, row in enumerate(rows):
+                if row != previous[idx]:
+                    out.append(f"\033[{idx + 1};1H{row}\033[K")
+                    self.rows_written += 1
+            if out:
+                # Park the cursor where a full repaint leaves it: the prompt row below the frame.
+                out.append(f"\033[{len(rows) + 1};1H")
+        self._screen = rows
+        self._screen_size = size
+        self.frames_rendered += 1
+        if out:
+            sys.stdout.write("".join(out))
+            sys.stdout.flush()
+
+    def _render_frame(self) -> None:
         size = shutil.get_terminal_size((120, 36))
         width = max(60, size.columns)
         total_rows = max(20, size.lines)
@@ -286,29 +419,34 @@ class RefreshUI:
                 head = head + ([""] * (remaining - len(head)))
             output_block.extend(head)
 
-        print("\033[2J\033[H", end="")
-        for row in header_lines:
-            print(row[:width])
-        print(sep)
-        print(
-            f"Dialogue: page {self.dialogue_page + 1}/{self._last_dialogue_page_total} "
-            f"| line_offset={self.dialogue_line_offset} "
-            "(Alt+K prev, Alt+J next, Alt+0 end, Alt+U line-up, Alt+D line-down)",
+        rows = [_fit_width(row, width) for row in header_lines]
+        rows.append(sep)
+        rows.append(
+            _fit_width(
+                f"Dialogue: page {self.dialogue_page + 1}/{self._last_dialogue_page_total} "
+                f"| line_offset={self.dialogue_line_offset} "
+                "(Alt+K prev, Alt+J next, Alt+0 end, Alt+U line-up, Alt+D line-down)",
+                width,
+            ),
         )
-        for line in dialogue_block:
-            print(line[:width])
+        rows.extend(_fit_width(line, width) for line in dialogue_block)
         if has_output:
-            print("." * width)
-            for line in output_block:
-                print(line[:width])
-        print(sep)
-        print(self.activity_status[:width])
-        print(sep)
+            rows.append("." * width)
+            rows.extend(_fit_width(line, width) for line in output_block)
+        rows.append(sep)
+        rows.append(_fit_width(self.activity_status, width))
+        rows.append(sep)
+        self._write_frame(rows, (width, total_rows))
 
     async def read_line(self, prompt: str) -> str:
         if self.enabled:
+            self.invalidate_screen()
             self.render()
-        return await _read_line(prompt)
+        try:
+            return await _read_line(prompt)
+        finally:
+            if self.enabled:
+                self.invalidate_screen()
 
 
 def _auto_title(messages: List[Message]) -> str:
@@ -348,13 +486,14 @@ def _persist_if_needed(
     messages: List[Message],
     *,
     memory_summary: str = "",
-    token_snapshot: dict[str, int | bool] | None = None,
+    token_snapshot: dict[str, int | float | bool | str] | None = None,
     short_memory_state: dict[str, object] | None = None,
 ) -> bool:
     if not _has_user_messages(messages):
         return False
     record.messages = list(messages)
-    record.title = _auto_title(record.messages)
+    if record.title_source != "model":
+        record.title = _auto_title(record.messages)
     record.summary = memory_summary.strip()
     snap = token_snapshot or {}
     record.session_prompt_tokens = int(snap.get("session_prompt_tokens", 0) or 0)
@@ -364,6 +503,8 @@ def _persist_if_needed(
     record.last_completion_tokens = int(snap.get("last_completion_tokens", 0) or 0)
     record.last_total_tokens = int(snap.get("last_total_tokens", 0) or 0)
     record.last_usage_source = str(snap.get("last_usage_source", "none") or "none")
+    record.session_cached_prompt_tokens = int(snap.get("session_cached_prompt_tokens", 0) or 0)
+    record.session_cache_write_tokens = int(snap.get("session_cache_write_tokens", 0) or 0)
     sm = short_memory_state or {}
     record.last_compaction_session_tokens = int(sm.get("last_compaction_session_tokens", 0) or 0)
     record.last_compaction_working_prompt_tokens = int(sm.get("last_compaction_working_prompt_tokens", 0) or 0)
@@ -430,7 +571,7 @@ def _restored_preview_lines(messages: List[Message], *, max_pairs: int = 4) -> l
     return lines
 
 
-def _token_snapshot(loop: V6_1) -> dict[str, int | bool]:
+def _token_snapshot(loop: V6_1) -> dict[str, int | float | bool | str]:
     return loop.get_token_usage_snapshot()
 
 
@@ -449,12 +590,49 @@ def _compute_cost(
     completion_tokens: int,
     input_per_million: float | None,
     output_per_million: float | None,
+    cached_prompt_tokens: int = 0,
+    cache_write_tokens: int = 0,
+    cache_read_per_million: float | None = None,
+    cache_write_per_million: float | None = None,
 ) -> float | None:
     if input_per_million is None or output_per_million is None:
         return None
     if input_per_million < 0 or output_per_million < 0:
         return None
-    return (prompt_tokens / 1_000_000.0) * input_per_million + (completion_tokens / 1_000_000.0) * output_per_million
+    # Cached/cache-write prompt tokens are billed at their own rate when configured, else at the input rate.
+    cached = max(0, min(cached_prompt_tokens, prompt_tokens)) if cache_read_per_million is not None else 0
+    written = max(0, min(cache_write_tokens, prompt_tokens - cached)) if cache_write_per_million is not None else 0
+    cost = ((prompt_tokens - cached - written) / 1_000_000.0) * input_per_million
+    cost += (completion_tokens / 1_000_000.0) * output_per_million
+    if cached:
+        cost += (cached / 1_000_000.0) * float(cache_read_per_million or 0.0)
+    if written:
+        cost += (written / 1_000_000.0) * float(cache_write_per_million or 0.0)
+    return cost
+
+
+def _billed_session_tokens(snap: dict[str, int | float | bool | str]) -> tuple[int, int, int, int]:
+    # Replays from the local response cache are counted in the session totals but cost nothing.
+    def _billed(kind: str) -> int:
+        return max(0, int(snap.get(f"session_{kind}_tokens", 0)) - int(snap.get(f"session_replayed_{kind}_tokens", 0)))
+
+    return _billed("prompt"), _billed("completion"), _billed("cached_prompt"), _billed("cache_write")
+
+
+def _prompt_cache_suffix(metrics: Dict[str, int | str]) -> str:
+    cached = int(metrics.get("cached_prompt_tokens", 0))
+    prompt = int(metrics.get("prompt_tokens", 0))
+    if cached <= 0 or prompt <= 0:
+        return ""
+    return f"; cached={cached} ({cached * 100 // prompt}%)"
+
+
+def _tool_cache_suffix(metrics: Dict[str, int | str]) -> str:
+    hits = int(metrics.get("tool_cache_hits", 0))
+    lookups = hits + int(metrics.get("tool_cache_misses", 0))
+    if lookups <= 0:
+        return ""
+    return f"; tool_cache={hits}/{lookups} ({hits * 100 // lookups}%)"
 
 
 def _restore_token_baseline(loop: V6_1) -> None:
@@ -473,6 +651,12 @@ def _restore_token_baseline(loop: V6_1) -> None:
     loop._session_prompt_tokens = working_prompt  # type: ignore[attr-defined]
     loop._session_completion_tokens = 0  # type: ignore[attr-defined]
     loop._session_total_tokens = working_prompt  # type: ignore[attr-defined]
+    loop._session_cached_prompt_tokens = 0  # type: ignore[attr-defined]
+    loop._session_cache_write_tokens = 0  # type: ignore[attr-defined]
+    loop._session_replayed_prompt_tokens = 0  # type: ignore[attr-defined]
+    loop._session_replayed_completion_tokens = 0  # type: ignore[attr-defined]
+    loop._session_replayed_cached_prompt_tokens = 0  # type: ignore[attr-defined]
+    loop._session_replayed_cache_write_tokens = 0  # type: ignore[attr-defined]
 
 
 def _restore_token_baseline_from_record(loop: V6_1, record: SessionRecord) -> None:
@@ -487,6 +671,12 @@ def _restore_token_baseline_from_record(loop: V6_1, record: SessionRecord) -> No
         loop._session_prompt_tokens = max(0, int(record.session_prompt_tokens))  # type: ignore[attr-defined]
         loop._session_completion_tokens = max(0, int(record.session_completion_tokens))  # type: ignore[attr-defined]
         loop._session_total_tokens = max(0, int(record.session_total_tokens))  # type: ignore[attr-defined]
+        loop._session_cached_prompt_tokens = max(0, int(record.session_cached_prompt_tokens))  # type: ignore[attr-defined]
+        loop._session_cache_write_tokens = max(0, int(record.session_cache_write_tokens))  # type: ignore[attr-defined]
+        loop._session_replayed_prompt_tokens = 0  # type: ignore[attr-defined]
+        loop._session_replayed_completion_tokens = 0  # type: ignore[attr-defined]
+        loop._session_replayed_cached_prompt_tokens = 0  # type: ignore[attr-defined]
+        loop._session_replayed_cache_write_tokens = 0  # type: ignore[attr-defined]
         return
     _restore_token_baseline(loop)
 
@@ -504,6 +694,32 @@ def _reset_token_baseline(loop: V6_1) -> None:
     loop._session_prompt_tokens = 0  # type: ignore[attr-defined]
     loop._session_completion_tokens = 0  # type: ignore[attr-defined]
     loop._session_total_tokens = 0  # type: ignore[attr-defined]
+    loop._session_cached_prompt_tokens = 0  # type: ignore[attr-defined]
+    loop._session_cache_write_tokens = 0  # type: ignore[attr-defined]
+    loop._session_replayed_prompt_tokens = 0  # type: ignore[attr-defined]
+    loop._session_replayed_completion_tokens = 0  # type: ignore[attr-defined]
+    loop._session_replayed_cached_prompt_tokens = 0  # type: ignore[attr-defined]
+    loop._session_replayed_cache_write_tokens = 0  # type: ignore[attr-defined]
+
+
+def _model_router_line(report: dict[str, object] | None, currency: str) -> str:
+    if not report:
+        return ""
+    symbol = _currency_symbol(currency)
+    parts = []
+    for model, stats in dict(report.get("models") or {}).items():
+        parts.append(
+            f"{model}(req={stats['requests']} avg={stats['avg_latency_ms']}ms "
+            f"p={stats['prompt_tokens']} c={stats['completion_tokens']} cost={symbol}{float(stats['cost']):.6f})"
+        )
+    escalations = dict(report.get("escalations") or {})
+    line = "Router: " + (" | ".join(parts) or "no requests yet")
+    if escalations:
+        line += " | escalations(" + ", ".join(f"{k}={v}" for k, v in sorted(escalations.items())) + ")"
+    savings = report.get("estimated_savings")
+    if savings is not None:
+        line += f" | saved≈{symbol}{float(savings):.6f}"
+    return line
 
 
 def _token_stats_line(
@@ -513,6 +729,8 @@ def _token_stats_line(
     pricing_input_per_million: float | None,
     pricing_output_per_million: float | None,
     pricing_currency: str,
+    pricing_cache_read_per_million: float | None = None,
+    pricing_cache_write_per_million: float | None = None,
 ) -> str:
     snap = _token_snapshot(loop)
     if not bool(snap.get("has_usage")):
@@ -524,17 +742,33 @@ def _token_stats_line(
     session_completion = int(snap.get("session_completion_tokens", 0))
     session_total = int(snap.get("session_total_tokens", 0))
     source = str(snap.get("last_usage_source", "unknown"))
+    window_cached = int(snap.get("last_cached_prompt_tokens", 0))
+    window_cache_write = int(snap.get("last_cache_write_tokens", 0))
+    session_cached = int(snap.get("session_cached_prompt_tokens", 0))
+    session_cache_write = int(snap.get("session_cache_write_tokens", 0))
+    cache_pricing = {
+        "cache_read_per_million": pricing_cache_read_per_million,
+        "cache_write_per_million": pricing_cache_write_per_million,
+    }
+    window_replayed = source == "cache"
+    billed_prompt, billed_completion, billed_cached, billed_cache_write = _billed_session_tokens(snap)
     window_cost = _compute_cost(
-        prompt_tokens=window_prompt,
-        completion_tokens=window_completion,
+        prompt_tokens=0 if window_replayed else window_prompt,
+        completion_tokens=0 if window_replayed else window_completion,
         input_per_million=pricing_input_per_million,
         output_per_million=pricing_output_per_million,
+        cached_prompt_tokens=window_cached,
+        cache_write_tokens=window_cache_write,
+        **cache_pricing,
     )
     session_cost = _compute_cost(
-        prompt_tokens=session_prompt,
-        completion_tokens=session_completion,
+        prompt_tokens=billed_prompt,
+        completion_tokens=billed_completion,
         input_per_million=pricing_input_per_million,
         output_per_million=pricing_output_per_million,
+        cached_prompt_tokens=billed_cached,
+        cache_write_tokens=billed_cache_write,
+        **cache_pricing,
     )
 
     line = (
@@ -543,6 +777,17 @@ def _token_stats_line(
         f"window(prompt={window_prompt}, completion={window_completion}, total={window_total}) | "
         f"session(prompt={session_prompt}, completion={session_completion}, total={session_total})"
     )
+    if session_cached > 0 or session_cache_write > 0:
+        hit_pct = (session_cached * 100 // session_prompt) if session_prompt > 0 else 0
+        line += (
+            " | "
+            f"prompt_cache(window_cached={window_cached}, window_uncached={max(0, window_prompt - window_cached)}, "
+            f"session_cached={session_cached}, session_uncached={max(0, session_prompt - session_cached)}, "
+            f"session_written={session_cache_write}, hit={hit_pct}%)"
+        )
+    gap_histogram = str(snap.get("session_stream_gap_histogram", ""))
+    if gap_histogram:
+        line += f" | stream_gaps_ms({gap_histogram})"
     if turn_delta is not None:
         line += (
             " | "
@@ -556,8 +801,8 @@ def _token_stats_line(
         )
         if turn_delta is not None:
             turn_cost = _compute_cost(
-                prompt_tokens=int(turn_delta["prompt"]),
-                completion_tokens=int(turn_delta["completion"]),
+                prompt_tokens=max(0, int(turn_delta["prompt"]) - int(turn_delta.get("replayed_prompt", 0))),
+                completion_tokens=max(0, int(turn_delta["completion"]) - int(turn_delta.get("replayed_completion", 0))),
                 input_per_million=pricing_input_per_million,
                 output_per_million=pricing_output_per_million,
             )
@@ -575,6 +820,8 @@ def _activity_status_line(
     pricing_input_per_million: float | None,
     pricing_output_per_million: float | None,
     pricing_currency: str,
+    pricing_cache_read_per_million: float | None = None,
+    pricing_cache_write_per_million: float | None = None,
 ) -> str:
     snap = _token_snapshot(loop)
     st = loop.get_short_memory_state()
@@ -596,11 +843,16 @@ def _activity_status_line(
     context_pct = int(round(context_ratio * 100))
     session_prompt = int(snap.get("session_prompt_tokens", 0))
     session_completion = int(snap.get("session_completion_tokens", 0))
+    billed_prompt, billed_completion, billed_cached, billed_cache_write = _billed_session_tokens(snap)
     session_cost = _compute_cost(
-        prompt_tokens=session_prompt,
-        completion_tokens=session_completion,
+        prompt_tokens=billed_prompt,
+        completion_tokens=billed_completion,
         input_per_million=pricing_input_per_million,
         output_per_million=pricing_output_per_million,
+        cached_prompt_tokens=billed_cached,
+        cache_write_tokens=billed_cache_write,
+        cache_read_per_million=pricing_cache_read_per_million,
+        cache_write_per_million=pricing_cache_write_per_million,
     )
     return (
         f"Activity: 状态={runtime_status} | "
@@ -611,6 +863,18 @@ def _activity_status_line(
             if session_cost is not None
             else ""
         )
+        + _stream_timing_suffix(snap)
+    )
+
+
+def _stream_timing_suffix(snap: dict[str, int | float | bool | str]) -> str:
+    if not bool(snap.get("has_stream_timings")):
+        return ""
+    return (
+        f" | stream(ttfb={int(snap.get('last_ttfb_ms', 0))}ms "
+        f"ttft={int(snap.get('last_ttft_ms', 0))}ms "
+        f"tps={float(snap.get('last_tokens_per_sec', 0.0)):.1f} "
+        f"max_gap={int(snap.get('last_max_gap_ms', 0))}ms)"
     )
 
 
@@ -815,6 +1079,12 @@ async def async_main() -> int:
         default=True,
         help="Enable fixed-area terminal refresh UI (default: on)",
     )
+    parser.add_argument(
+        "--ui-fps",
+        type=float,
+        default=30.0,
+        help="Max refresh-UI frames/sec while streaming (0 = repaint on every delta)",
+    )
     parser.add_argument(
         "--memory-compact-ratio",
         type=float,
@@ -851,25 +1121,123 @@ async def async_main() -> int:
         default=True,
         help="Enable automatic short-memory compaction",
     )
+    parser.add_argument(
+        "--tool-result-max-tokens",
+        type=int,
+        default=4000,
+        help="Tool outputs above this estimated token size are stored out of context (0 to disable)",
+    )
+    parser.add_argument(
+        "--tool-results-dir",
+        default="./logs/tool_results",
+        help="Content-addressed store for oversized tool outputs (paged via read_tool_result)",
+    )
+    parser.add_argument(
+        "--trace-file",
+        default=None,
+        help="Append one JSONL span per turn/LLM call/tool call/MCP request/compaction (see scripts/analyze_trace.py)",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=None,
+        help="Profile turns and write collapsed stacks / speedscope JSON / round timeline per turn into this dir",
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=PROFILE_MODES,
+        default="sample",
+        help="sample: stack sampler over all threads (low overhead); cprofile: deterministic, turn thread only",
+    )
+    parser.add_argument(
+        "--profile-interval-ms",
+        type=float,
+        default=5.0,
+        help="Sampling interval for --profile-mode sample",
+    )
+    parser.add_argument(
+        "--profile-turns",
+        type=int,
+        default=0,
+        help="Only profile the first N turns (0 = every turn)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus text metrics at http://<metrics-host>:<port>/metrics (0 picks a free port)",
+    )
+    parser.add_argument(
+        "--metrics-host",
+        default="127.0.0.1",
+        help="Bind address for --metrics-port",
+    )
+    parser.add_argument(
+        "--fs-watch",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Watch the tool cwd (inotify, polling fallback) to invalidate tool caches and skills on change",
+    )
+    parser.add_argument(
+        "--prefetch",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Speculatively read likely next files (ls/grep/find hits) into the tool cache while the model generates",
+    )
+    parser.add_argument(
+        "--prefetch-top-k",
+        type=int,
+        default=3,
+        help="Max files prefetched per round for --prefetch",
+    )
+    parser.add_argument(
+        "--subagents",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Offer the spawn_subagents tool: parallel child loops with their own tools and token budgets",
+    )
+    parser.add_argument(
+        "--subagent-concurrency",
+        type=int,
+        default=4,
+        help="Max subagents running at once for --subagents",
+    )
+    parser.add_argument(
+        "--subagent-token-budget",
+        type=int,
+        default=200_000,
+        help="Max tokens all subagents of one spawn_subagents call may spend together",
+    )
+    parser.add_argument(
+        "--prompt-cache",
+        choices=["off", "openai", "anthropic"],
+        default=None,
+        help="Provider prompt-cache hints (default: config prompt_cache_mode)",
+    )
+    parser.add_argument(
+        "--fs-watch-poll-interval",
+        type=float,
+        default=1.0,
+        help="Polling interval in seconds when inotify is unavailable",
+    )
     args = parser.parse_args()
 
     cfg = load_config(args.config)
-    logger, log_path = create_session_logger(log_dir=args.log_dir, debug=args.debug)
+    logger, log_path = create_session_logger(log_dir=args.log_dir, debug=args.debug, background=True)
     logger.info("startup loop=v6.1 model=%s provider=%s", cfg.model_name, cfg.provider)
 
-    client = OpenAICompatClient(
-        base_url=cfg.base_url,
-        api_key_env=cfg.api_key_env,
-        api_key=cfg.api_key,
-        debug=args.debug,
-        logger=logger,
-    )
+    client = build_llm_client(cfg, debug=args.debug, logger=logger, prompt_cache_mode=args.prompt_cache)
     mcp_manager = MCPManagerV4(cfg.mcp_servers or []) if cfg.mcp_servers else None
-    ui = RefreshUI(enabled=bool(args.ui_refresh), model_name=cfg.model_name, log_path=log_path)
+    ui = RefreshUI(
+        enabled=bool(args.ui_refresh),
+        model_name=cfg.model_name,
+        log_path=log_path,
+        max_fps=float(args.ui_fps),
+    )
     turn_stream_state = {"started": False}
     turn_runtime: Dict[str, asyncio.Task[str] | None] = {"task": None}
     turn_interrupt_state = {"cancelled": False}
     turn_output_state = {"accepting": False}
+    title_attempted: set[str] = set()
     compact_ratio = float(args.memory_compact_ratio) if args.memory_compact_ratio is not None else float(cfg.memory_compact_ratio)
     if compact_ratio <= 0:
         compact_ratio = 0.8
@@ -881,6 +1249,8 @@ async def async_main() -> int:
     pricing_input_per_million = cfg.pricing_input_per_million
     pricing_output_per_million = cfg.pricing_output_per_million
     pricing_currency = cfg.pricing_currency
+    pricing_cache_read_per_million = cfg.pricing_cache_read_per_million
+    pricing_cache_write_per_million = cfg.pricing_cache_write_per_million
 
     def _trace_to_ui(line: str) -> None:
         if not turn_output_state["accepting"]:
@@ -892,7 +1262,7 @@ async def async_main() -> int:
         if ui.enabled:
             ui.set_runtime_status(status)
             _refresh_activity_status()
-            ui.render()
+            ui.request_render()
 
     def _model_delta_to_ui(delta: str) -> None:
         if not turn_output_state["accepting"]:
@@ -907,11 +1277,14 @@ async def async_main() -> int:
             return
         if not ui.enabled:
             return
+        replayed = metrics.get("source") == "cache"
         round_cost = _compute_cost(
-            prompt_tokens=int(metrics.get("prompt_tokens", 0)),
-            completion_tokens=int(metrics.get("completion_tokens", 0)),
+            prompt_tokens=0 if replayed else int(metrics.get("prompt_tokens", 0)),
+            completion_tokens=0 if replayed else int(metrics.get("completion_tokens", 0)),
             input_per_million=pricing_input_per_million,
             output_per_million=pricing_output_per_million,
+            cached_prompt_tokens=int(metrics.get("cached_prompt_tokens", 0)),
+            cache_read_per_million=pricing_cache_read_per_million,
         )
         suffix = (
             f"(usage: in={int(metrics.get('prompt_tokens', 0))}, "
@@ -919,6 +1292,8 @@ async def async_main() -> int:
             f"total={int(metrics.get('total_tokens', 0))}; "
             f"latency={int(metrics.get('latency_ms', 0))}ms"
             + (f"; cost={_currency_symbol(pricing_currency)}{round_cost:.6f}" if round_cost is not None else "")
+            + _prompt_cache_suffix(metrics)
+            + _tool_cache_suffix(metrics)
             + ")"
         )
         if turn_stream_state["started"]:
@@ -933,6 +1308,30 @@ async def async_main() -> int:
         turn_stream_state["started"] = False
         _refresh_activity_status()
 
+    fs_watcher: FileWatcher | None = None
+    if args.fs_watch:
+        fs_watcher = start_file_watcher(".", poll_interval_seconds=float(args.fs_watch_poll_interval))
+        logger.info("fs watcher started backend=%s root=%s", fs_watcher.backend, fs_watcher.root)
+
+    trace_sink = TraceSink(args.trace_file) if args.trace_file else None
+    if trace_sink is not None:
+        logger.info("trace sink path=%s", trace_sink.path)
+
+    profiler: TurnProfiler | None = None
+    if args.profile_dir:
+        profiler = TurnProfiler(
+            args.profile_dir,
+            mode=str(args.profile_mode),
+            interval_ms=float(args.profile_interval_ms),
+            max_turns=int(args.profile_turns),
+        )
+        logger.info("turn profiler mode=%s dir=%s", profiler.mode, profiler.out_dir)
+
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = start_metrics_server(int(args.metrics_port), host=str(args.metrics_host))
+        logger.info("metrics endpoint http://%s:%s/metrics", *metrics_server.server_address[:2])
+
     loop = V6_1(
         client=client,
         model_name=cfg.model_name,
@@ -942,6 +1341,7 @@ async def async_main() -> int:
         mcp_manager=mcp_manager,
         mcp_enabled=bool(cfg.mcp_servers),
         skills_dir=cfg.skills_dir,
+        skill_index_cache=True,
         stream_text=bool(args.stream),
         verbose=not bool(args.ui_refresh),
         trace_callback=_trace_to_ui if bool(args.ui_refresh) else None,
@@ -956,6 +1356,26 @@ async def async_main() -> int:
             min_prefix_messages=max(4, int(args.memory_min_prefix_messages)),
             max_prefix_messages=max(20, int(args.memory_max_prefix_messages)),
         ),
+        tool_result_config=ToolResultGovernorConfig(
+            enabled=int(args.tool_result_max_tokens) > 0,
+            max_inline_tokens=max(1, int(args.tool_result_max_tokens)),
+            store_dir=args.tool_results_dir,
+        ),
+        fs_watcher=fs_watcher,
+        trace_sink=trace_sink,
+        profiler=profiler,
+        model_router=build_model_router(cfg),
+        prefetch_config=PrefetchConfig(top_k=max(1, int(args.prefetch_top_k))) if args.prefetch else None,
+        # Transition stats learned from past transcripts decide when and how to prefetch.
+        prefetch_stats=TransitionStats.from_sessions(args.sessions_dir) if args.prefetch else None,
+        subagent_config=(
+            SubagentConfig(
+                max_concurrency=max(1, int(args.subagent_concurrency)),
+                max_total_tokens=max(1, int(args.subagent_token_budget)),
+            )
+            if args.subagents
+            else None
+        ),
     )
 
     store = SessionStoreV6(args.sessions_dir)
@@ -988,6 +1408,8 @@ async def async_main() -> int:
                 pricing_input_per_million=pricing_input_per_million,
                 pricing_output_per_million=pricing_output_per_million,
                 pricing_currency=pricing_currency,
+                pricing_cache_read_per_million=pricing_cache_read_per_million,
+                pricing_cache_write_per_million=pricing_cache_write_per_million,
             ),
         )
 
@@ -1041,8 +1463,12 @@ async def async_main() -> int:
             try:
                 if prompt_session is not None:
                     if ui.enabled:
+                        ui.invalidate_screen()
                         ui.render()
-                    user_input = (await prompt_session.prompt_async("> ")).strip()
+                    try:
+                        user_input = (await prompt_session.prompt_async("> ")).strip()
+                    finally:
+                        ui.invalidate_screen()
                 else:
                     user_input = (await ui.read_line("> ")).strip()
             except KeyboardInterrupt:
@@ -1080,9 +1506,21 @@ async def async_main() -> int:
                     pricing_input_per_million=pricing_input_per_million,
                     pricing_output_per_million=pricing_output_per_million,
                     pricing_currency=pricing_currency,
+                    pricing_cache_read_per_million=pricing_cache_read_per_million,
+                    pricing_cache_write_per_million=pricing_cache_write_per_million,
                 )
                 ui.set_token_line(token_line)
                 ui.add(token_line)
+                router_line = _model_router_line(loop.get_model_router_report(), pricing_currency)
+                if router_line:
+                    ui.add(router_line)
+                prefetch = loop.get_prefetch_stats()
+                if prefetch is not None:
+                    ui.add(
+                        f"Prefetch: prefetched={prefetch['prefetched']} hits={prefetch['hits']} "
+                        f"wasted={prefetch['wasted']} hit_rate={float(prefetch['hit_rate']):.0%} "
+                        f"wasted_time={prefetch['wasted_seconds']}s"
+                    )
                 _refresh_activity_status()
                 continue
             if user_input.startswith("/page"):
@@ -1386,6 +1824,10 @@ async def async_main() -> int:
                 "prompt": int(after.get("session_prompt_tokens", 0)) - int(before.get("session_prompt_tokens", 0)),
                 "completion": int(after.get("session_completion_tokens", 0)) - int(before.get("session_completion_tokens", 0)),
                 "total": int(after.get("session_total_tokens", 0)) - int(before.get("session_total_tokens", 0)),
+                "replayed_prompt": int(after.get("session_replayed_prompt_tokens", 0))
+                - int(before.get("session_replayed_prompt_tokens", 0)),
+                "replayed_completion": int(after.get("session_replayed_completion_tokens", 0))
+                - int(before.get("session_replayed_completion_tokens", 0)),
             }
             token_line = _token_stats_line(
                 loop,
@@ -1393,6 +1835,8 @@ async def async_main() -> int:
                 pricing_input_per_million=pricing_input_per_million,
                 pricing_output_per_million=pricing_output_per_million,
                 pricing_currency=pricing_currency,
+                pricing_cache_read_per_million=pricing_cache_read_per_million,
+                pricing_cache_write_per_million=pricing_cache_write_per_million,
             )
             ui.set_token_line(token_line)
             _refresh_activity_status()
@@ -1414,6 +1858,12 @@ async def async_main() -> int:
                 ui.add_dialogue("MEMORY", "[summary]")
                 ui.add_dialogue("MEMORY", summary_text if summary_text else "(empty)")
                 _refresh_activity_status()
+            if record.title_source != "model" and record.session_id not in title_attempted:
+                # One attempt per session: a failed or unrouted title keeps the heuristic one.
+                title_attempted.add(record.session_id)
+                generated_title = await loop.generate_title()
+                if generated_title:
+                    record.title, record.title_source = generated_title, "model"
             saved = _persist_if_needed(
                 store,
                 record,
@@ -1432,6 +1882,15 @@ async def async_main() -> int:
                 pass
         if signal_handler_installed:
             signal.signal(signal.SIGINT, previous_sigint_handler)
+        loop.close()
+        if fs_watcher is not None:
+            fs_watcher.stop()
+        if trace_sink is not None:
+            trace_sink.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        close_session_logger(logger)
         # v4 MCP manager has no long-lived connections to close.
         pass
 
@@ -1,8 +1,8 @@
 from .client import OpenAICompatClient
 from .config import AppConfig, load_config
-from .logging_utils import create_session_logger
+from .logging_utils import LazyJSON, close_session_logger, create_session_logger
 from .mcp_client import MCPManager, MCPServerConfig
-from .skill_loader import SkillDefinition, SkillLoader
+from .skill_loader import SkillDefinition, SkillLoader, SkillMetadata
 from .tool_base import BaseTool, MetadataOnlyTool
 from .types import AssistantResponse, LLMClient, ToolCall, ToolSpec
 
@@ -11,14 +11,17 @@ __all__ = [
     "AssistantResponse",
     "BaseTool",
     "LLMClient",
+    "LazyJSON",
     "MCPManager",
     "MCPServerConfig",
     "MetadataOnlyTool",
     "OpenAICompatClient",
     "SkillDefinition",
     "SkillLoader",
+    "SkillMetadata",
     "ToolCall",
     "ToolSpec",
+    "close_session_logger",
     "create_session_logger",
     "load_config",
 ]
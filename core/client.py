@@ -1,15 +1,119 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
 import logging
 import os
 import re
-from dataclasses import dataclass
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from typing import Callable, Dict, List, Optional, Tuple
 from urllib import request
 
-from .types import AssistantResponse, LLMClient, Message, TokenUsage, ToolCall, ToolSpec
+from .logging_utils import LazyJSON
+from .message_encoder import MessageEncoder
+from .types import (
+    STREAM_GAP_BUCKETS_MS,
+    AssistantResponse,
+    LLMClient,
+    Message,
+    StreamTimings,
+    TokenUsage,
+    ToolCall,
+    ToolSpec,
+)
+
+# off: send nothing extra; openai: stable `prompt_cache_key` routing hint;
+# anthropic: `cache_control` breakpoints on the system prompt and the newest message.
+PROMPT_CACHE_MODES = ("off", "openai", "anthropic")
+
+# Distinct tool lists kept pre-encoded (base tools, base+MCP, subsets...).
+_TOOL_PAYLOAD_CACHE_SIZE = 8
+
+
+@dataclass(frozen=True)
+class _EncodedTools:
+    # Strong refs keep the ToolSpec ids in the cache key from being reused by new objects.
+    specs: Tuple[ToolSpec, ...]
+    payload: List[Dict[str, object]]
+    encoded: bytes
+
+
+def _encode_payload(payload: Dict[str, object], segments: Dict[str, List[bytes]]) -> bytes:
+    # Byte-identical to json.dumps(payload).encode() while splicing pre-encoded fragments for keys in `segments`;
+    # a single final join keeps large histories to one copy.
+    fragments: List[bytes] = [b"{"]
+    for key, value in payload.items():
+        if len(fragments) > 1:
+            fragments.append(b", ")
+        fragments.append(json.dumps(key).encode("utf-8") + b": ")
+        encoded = segments.get(key)
+        if encoded is None:
+            fragments.append(json.dumps(value).encode("utf-8"))
+        else:
+            fragments.extend(encoded)
+    fragments.append(b"}")
+    return b"".join(fragments)
+
+
+class _StreamTimer:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.ttfb: float | None = None
+        self.first_text: float | None = None
+        self.first_reasoning: float | None = None
+        self.first_tool_call: float | None = None
+        self.last_chunk: float | None = None
+        self.chunks = 0
+        self.max_gap = 0.0
+        self.gaps = [0] * (len(STREAM_GAP_BUCKETS_MS) + 1)
+
+    def _offset_ms(self, now: float) -> float:
+        return (now - self.started) * 1000.0
+
+    def mark_headers(self) -> None:
+        if self.ttfb is None:
+            self.ttfb = time.perf_counter()
+
+    def mark_chunk(self) -> None:
+        now = time.perf_counter()
+        if self.last_chunk is not None:
+            gap_ms = (now - self.last_chunk) * 1000.0
+            self.max_gap = max(self.max_gap, gap_ms)
+            self.gaps[bisect_left(STREAM_GAP_BUCKETS_MS, gap_ms)] += 1
+        self.last_chunk = now
+        self.chunks += 1
+
+    def mark_text(self) -> None:
+        if self.first_text is None:
+            self.first_text = time.perf_counter()
+
+    def mark_reasoning(self) -> None:
+        if self.first_reasoning is None:
+            self.first_reasoning = time.perf_counter()
+
+    def mark_tool_call(self) -> None:
+        if self.first_tool_call is None:
+            self.first_tool_call = time.perf_counter()
+
+    def finish(self) -> StreamTimings:
+        now = time.perf_counter()
+        firsts = [t for t in (self.first_text, self.first_reasoning, self.first_tool_call) if t is not None]
+        return StreamTimings(
+            ttfb_ms=self._offset_ms(self.ttfb) if self.ttfb is not None else None,
+            first_text_ms=self._offset_ms(self.first_text) if self.first_text is not None else None,
+            first_reasoning_ms=self._offset_ms(self.first_reasoning) if self.first_reasoning is not None else None,
+            first_tool_call_ms=self._offset_ms(self.first_tool_call) if self.first_tool_call is not None else None,
+            total_ms=self._offset_ms(now),
+            generation_ms=(now - min(firsts)) * 1000.0 if firsts else 0.0,
+            chunks=self.chunks,
+            max_gap_ms=self.max_gap,
+            gap_histogram=tuple(self.gaps),
+        )
 
 
 @dataclass(frozen=True)
@@ -19,6 +123,12 @@ class OpenAICompatClient(LLMClient):
     api_key: str | None = None
     debug: bool = False
     logger: logging.Logger | None = None
+    prompt_cache_mode: str = "off"
+    _tool_payloads: "OrderedDict[Tuple[int, ...], _EncodedTools]" = field(
+        default_factory=OrderedDict, init=False, repr=False, compare=False,
+    )
+    _tool_payloads_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    _message_encoder: MessageEncoder = field(default_factory=MessageEncoder, init=False, repr=False, compare=False)
 
     def resolve_api_key(self) -> str:
         if self.api_key and self.api_key.strip():
@@ -160,27 +270,24 @@ class OpenAICompatClient(LLMClient):
             "model": model_name,
             "messages": messages,
         }
+        segments: Dict[str, List[bytes]] = {}
         if tools:
-            payload["tools"] = [
-                {
-                    "type": "function",
-                    "function": {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "parameters": tool.parameters,
-                    },
-                }
-                for tool in tools
-            ]
+            encoded_tools = self._encoded_tools(tools)
+            payload["tools"] = encoded_tools.payload
+            segments["tools"] = [encoded_tools.encoded]
             payload["tool_choice"] = "auto"
         if stream:
             payload["stream"] = True
             payload["stream_options"] = {"include_usage": True}
+        self._apply_prompt_cache_hints(payload)
 
         if self.logger:
-            self.logger.debug("request payload: %s", json.dumps(payload, ensure_ascii=False, indent=2))
+            self.logger.debug("request payload: %s", LazyJSON(payload))
 
-        body = json.dumps(payload).encode("utf-8")
+        messages_payload = payload["messages"]
+        if isinstance(messages_payload, list):
+            segments["messages"] = self._message_encoder.encode_fragments(messages_payload)
+        body = _encode_payload(payload, segments)
         req = request.Request(
             url=f"{self.base_url.rstrip('/')}/chat/completions",
             data=body,
@@ -190,14 +297,17 @@ class OpenAICompatClient(LLMClient):
                 "Authorization": f"Bearer {api_key}",
             },
         )
+        timer = _StreamTimer()
         with request.urlopen(req, timeout=timeout_seconds) as resp:
+            timer.mark_headers()
             if not stream:
                 if should_abort is not None and should_abort():
                     raise InterruptedError("Generation aborted")
-                data = json.loads(resp.read().decode("utf-8"))
+                raw_body = resp.read()
+                data = json.loads(raw_body.decode("utf-8"))
                 choice = data["choices"][0]["message"]
                 if self.logger:
-                    self.logger.debug("raw response message: %s", json.dumps(choice, ensure_ascii=False, indent=2))
+                    self.logger.debug("raw response message: %s", LazyJSON(choice))
                 text, reasoning = self._extract_visible_and_reasoning_from_content(choice.get("content"))
                 if self.logger and reasoning:
                     self.logger.debug("model reasoning: %s", reasoning)
@@ -223,6 +333,9 @@ class OpenAICompatClient(LLMClient):
                     tool_calls=tool_calls,
                     usage=self._parse_usage(data.get("usage")),
                     reasoning=reasoning,
+                    request_bytes=len(body),
+                    response_bytes=len(raw_body),
+                    timings=timer.finish(),
                 )
 
             text_parts: List[str] = []
@@ -230,8 +343,10 @@ class OpenAICompatClient(LLMClient):
             # index -> {"id": str, "name": str, "arguments": str}
             tool_call_buffers: Dict[int, Dict[str, str]] = {}
             usage: TokenUsage | None = None
+            response_bytes = 0
 
             for raw_line in resp:
+                response_bytes += len(raw_line)
                 if should_abort is not None and should_abort():
                     raise InterruptedError("Generation aborted")
                 line = raw_line.decode("utf-8", errors="replace").strip()
@@ -244,6 +359,7 @@ class OpenAICompatClient(LLMClient):
                     chunk = json.loads(payload_line)
                 except json.JSONDecodeError:
                     continue
+                timer.mark_chunk()
                 if isinstance(chunk, dict):
                     chunk_usage = chunk.get("usage")
                     parsed_usage = self._parse_usage(chunk_usage)
@@ -258,14 +374,17 @@ class OpenAICompatClient(LLMClient):
 
                 visible_piece, reasoning_piece = self._extract_delta_visible_and_reasoning(delta)
                 if visible_piece:
+                    timer.mark_text()
                     text_parts.append(visible_piece)
                     if on_text_delta is not None:
                         on_text_delta(visible_piece)
                 if reasoning_piece:
+                    timer.mark_reasoning()
                     reasoning_parts.append(reasoning_piece)
 
                 raw_tool_calls = delta.get("tool_calls")
                 if isinstance(raw_tool_calls, list):
+                    timer.mark_tool_call()
                     for tc in raw_tool_calls:
                         if not isinstance(tc, dict):
                             continue
@@ -316,8 +435,76 @@ class OpenAICompatClient(LLMClient):
                 tool_calls=tool_calls,
                 usage=usage,
                 reasoning=reasoning_text,
+                request_bytes=len(body),
+                response_bytes=response_bytes,
+                timings=timer.finish(),
             )
 
+    def _encoded_tools(self, tools: List[ToolSpec]) -> _EncodedTools:
+        # ToolSpec is frozen and loops rebuild specs when tools change, so identity is the version.
+        key = tuple(id(tool) for tool in tools)
+        with self._tool_payloads_lock:
+            cached = self._tool_payloads.get(key)
+            if cached is not None:
+                self._tool_payloads.move_to_end(key)
+                return cached
+        tool_payload: List[Dict[str, object]] = [
+            {
+                "type": "function",
+                "function": {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": tool.parameters,
+                },
+            }
+            for tool in tools
+        ]
+        cached = _EncodedTools(
+            specs=tuple(tools),
+            payload=tool_payload,
+            encoded=json.dumps(tool_payload).encode("utf-8"),
+        )
+        with self._tool_payloads_lock:
+            self._tool_payloads[key] = cached
+            while len(self._tool_payloads) > _TOOL_PAYLOAD_CACHE_SIZE:
+                self._tool_payloads.popitem(last=False)
+        return cached
+
+    def _apply_prompt_cache_hints(self, payload: Dict[str, object]) -> None:
+        mode = self.prompt_cache_mode
+        messages = payload.get("messages")
+        if mode not in {"openai", "anthropic"} or not isinstance(messages, list) or not messages:
+            return
+        if mode == "openai":
+            # Same system prompt + tool set -> same key, so the provider routes rounds to a warm cache shard.
+            first = messages[0]
+            system_text = ""
+            if isinstance(first, dict) and first.get("role") == "system":
+                system_text = str(first.get("content", ""))
+            tool_names: List[str] = []
+            for item in payload.get("tools") or []:
+                function_part = item.get("function") if isinstance(item, dict) else None
+                if isinstance(function_part, dict):
+                    tool_names.append(str(function_part.get("name", "")))
+            digest = hashlib.sha256(
+                f"{payload.get('model')}\x00{system_text}\x00{','.join(tool_names)}".encode("utf-8"),
+            )
+            payload["prompt_cache_key"] = f"agent-loop-{digest.hexdigest()[:32]}"
+            return
+        # anthropic-style: copy (never mutate) the marked messages; everything up to a breakpoint is cacheable.
+        marked = list(messages)
+        for idx in sorted({0, len(marked) - 1}):
+            message = marked[idx]
+            if not isinstance(message, dict):
+                continue
+            content = message.get("content")
+            if isinstance(content, str) and content:
+                marked[idx] = {
+                    **message,
+                    "content": [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}],
+                }
+        payload["messages"] = marked
+
     @staticmethod
     def _parse_usage(raw_usage: object) -> TokenUsage | None:
         if not isinstance(raw_usage, dict):
@@ -329,6 +516,20 @@ class OpenAICompatClient(LLMClient):
             raw_usage.get("completion_tokens", raw_usage.get("completionTokens", raw_usage.get("output_tokens", 0)))
             or 0,
         )
+        cached = 0
+        details = raw_usage.get("prompt_tokens_details")
+        if isinstance(details, dict):
+            cached = int(details.get("cached_tokens", 0) or 0)
+        if not cached:
+            # DeepSeek-style counters; prompt_tokens already includes the hits.
+            cached = int(raw_usage.get("prompt_cache_hit_tokens", 0) or 0)
+        cache_write = int(raw_usage.get("cache_creation_input_tokens", 0) or 0)
+        cache_read = int(raw_usage.get("cache_read_input_tokens", 0) or 0)
+        if cache_read and not cached:
+            cached = cache_read
+        if (cache_read or cache_write) and "prompt_tokens" not in raw_usage and "promptTokens" not in raw_usage:
+            # Anthropic-style input_tokens excludes cache reads/writes; normalize to the total prompt size.
+            prompt += cache_read + cache_write
         total = int(raw_usage.get("total_tokens", raw_usage.get("totalTokens", 0)) or 0)
         if total <= 0:
             total = prompt + completion
@@ -337,4 +538,6 @@ class OpenAICompatClient(LLMClient):
             completion_tokens=max(0, completion),
             total_tokens=max(0, total),
             source="provider",
+            cached_prompt_tokens=max(0, min(cached, prompt)) if prompt else max(0, cached),
+            cache_write_tokens=max(0, cache_write),
         )
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import logging
+
+from .client import OpenAICompatClient
+from .config import AppConfig
+from .model_router import ModelRouter
+from .rate_limiter import LLMScheduler, RateLimitedClient
+from .resilience import ResilientClient
+from .response_cache import CachingClient
+from .routing_client import RoutingClient
+from .types import LLMClient
+
+
+def build_llm_client(
+    cfg: AppConfig,
+    *,
+    debug: bool = False,
+    logger: logging.Logger | None = None,
+    prompt_cache_mode: str | None = None,
+    scheduler: LLMScheduler | None = None,
+) -> LLMClient:
+    """Provider client for ``cfg`` plus the optional layers it enables; build once per process and share."""
+    mode = prompt_cache_mode or cfg.prompt_cache_mode
+    client: LLMClient
+    if cfg.endpoints:
+        routes = [
+            (
+                endpoint,
+                OpenAICompatClient(
+                    base_url=endpoint.base_url,
+                    api_key_env=endpoint.api_key_env,
+                    api_key=endpoint.api_key,
+                    debug=debug,
+                    logger=logger,
+                    prompt_cache_mode=mode,
+                ),
+            )
+            for endpoint in cfg.endpoints
+        ]
+        client = RoutingClient(routes, cfg.routing)
+    else:
+        client = OpenAICompatClient(
+            base_url=cfg.base_url,
+            api_key_env=cfg.api_key_env,
+            api_key=cfg.api_key,
+            debug=debug,
+            logger=logger,
+            prompt_cache_mode=mode,
+        )
+    if scheduler is None and cfg.rate_limit is not None:
+        scheduler = LLMScheduler(cfg.rate_limit)
+    if scheduler is not None:
+        client = RateLimitedClient(client, scheduler)
+    # Outermost, so every retry and hedge is admitted by the scheduler like a fresh request.
+    if cfg.resilience.max_attempts > 1 or cfg.resilience.hedge:
+        client = ResilientClient(client, cfg.resilience)
+    # Hits skip retries and the scheduler entirely: a replay costs no provider budget.
+    if cfg.response_cache is not None:
+        client = CachingClient(client, cfg.response_cache)
+    return client
+
+
+def build_model_router(cfg: AppConfig) -> ModelRouter | None:
+    """Router for ``cfg.model_router`` priced with the config's rates; None when no cheap model is configured."""
+    if cfg.model_router is None:
+        return None
+    return ModelRouter(
+        cfg.model_name,
+        cfg.model_router,
+        primary_input_per_million=cfg.pricing_input_per_million,
+        primary_output_per_million=cfg.pricing_output_per_million,
+    )
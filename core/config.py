@@ -1,12 +1,18 @@
 from __future__ import annotations
 
 import json
+import os
 import re
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List
 
 from .mcp_client import MCPServerConfig
+from .model_router import ROUTER_PURPOSES, ModelRouterConfig
+from .rate_limiter import RateLimitConfig
+from .resilience import ResilienceConfig
+from .response_cache import ResponseCacheConfig
+from .routing_client import ROUTING_POLICIES, EndpointConfig, RoutingConfig
 
 
 @dataclass(frozen=True)
@@ -27,6 +33,14 @@ class AppConfig:
     pricing_output_per_million: float | None = None
     pricing_cache_read_per_million: float | None = None
     pricing_cache_write_per_million: float | None = None
+    prompt_cache_mode: str = "off"
+    rate_limit: RateLimitConfig | None = None
+    resilience: ResilienceConfig = ResilienceConfig()
+    # When set, requests are balanced over these endpoints and base_url/api_key are not used.
+    endpoints: List[EndpointConfig] | None = None
+    routing: RoutingConfig = RoutingConfig()
+    response_cache: ResponseCacheConfig | None = None
+    model_router: ModelRouterConfig | None = None
 
 
 _ENV_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
@@ -160,6 +174,111 @@ def load_config(path: str) -> AppConfig:
     pricing_cache_read_per_million = _to_float_or_none(raw.get("pricing_cache_read_per_million"))
     pricing_cache_write_per_million = _to_float_or_none(raw.get("pricing_cache_write_per_million"))
 
+    prompt_cache_mode = str(raw.get("prompt_cache_mode", "off")).strip().lower() or "off"
+    if prompt_cache_mode not in {"off", "openai", "anthropic"}:
+        prompt_cache_mode = "off"
+
+    rate_limit: RateLimitConfig | None = None
+    rate_limit_raw = raw.get("rate_limit")
+    if isinstance(rate_limit_raw, dict):
+        candidate_limit = RateLimitConfig(
+            requests_per_minute=_to_float_or_none(rate_limit_raw.get("requests_per_minute")) or 0.0,
+            tokens_per_minute=_to_float_or_none(rate_limit_raw.get("tokens_per_minute")) or 0.0,
+            completion_tokens_estimate=int(rate_limit_raw.get("completion_tokens_estimate", 512) or 0),
+            throttle_pause_seconds=_to_float_or_none(rate_limit_raw.get("throttle_pause_seconds")) or 1.0,
+        )
+        rate_limit = candidate_limit if candidate_limit.enabled else None
+
+    resilience = ResilienceConfig()
+    resilience_raw = raw.get("resilience")
+    if isinstance(resilience_raw, dict):
+        defaults = ResilienceConfig()
+        resilience = ResilienceConfig(
+            max_attempts=max(1, int(resilience_raw.get("max_attempts", defaults.max_attempts))),
+            base_delay_seconds=_to_float_or_none(resilience_raw.get("base_delay_seconds")) or defaults.base_delay_seconds,
+            max_delay_seconds=_to_float_or_none(resilience_raw.get("max_delay_seconds")) or defaults.max_delay_seconds,
+            max_retry_after_seconds=_to_float_or_none(resilience_raw.get("max_retry_after_seconds")) or defaults.max_retry_after_seconds,
+            retry_timeouts=bool(resilience_raw.get("retry_timeouts", defaults.retry_timeouts)),
+            hedge=bool(resilience_raw.get("hedge", defaults.hedge)),
+            hedge_quantile=min(0.999, _to_float_or_none(resilience_raw.get("hedge_quantile")) or defaults.hedge_quantile),
+            hedge_min_delay_ms=_to_float_or_none(resilience_raw.get("hedge_min_delay_ms")) or defaults.hedge_min_delay_ms,
+            hedge_min_samples=max(1, int(resilience_raw.get("hedge_min_samples", defaults.hedge_min_samples))),
+        )
+    elif resilience_raw is False:
+        resilience = ResilienceConfig(max_attempts=1)
+
+    endpoints: List[EndpointConfig] = []
+    raw_endpoints = raw.get("endpoints", [])
+    for idx, item in enumerate(raw_endpoints if isinstance(raw_endpoints, list) else []):
+        if not isinstance(item, dict) or not str(item.get("base_url", "")).strip():
+            continue
+        endpoint_key_env = str(item.get("api_key_env", "") or "").strip() or None
+        endpoint_key = str(item.get("api_key", "") or "").strip() or None
+        endpoint_model = str(item.get("model_name", "") or "").strip() or None
+        endpoints.append(
+            EndpointConfig(
+                name=str(item.get("name") or f"endpoint-{idx}"),
+                base_url=str(item["base_url"]).strip(),
+                api_key_env=endpoint_key_env if endpoint_key_env and _is_env_var_name(endpoint_key_env) else api_key_env,
+                api_key=endpoint_key if endpoint_key or endpoint_key_env else api_key,
+                weight=_to_float_or_none(item.get("weight")) or 1.0,
+                model_name=endpoint_model,
+            ),
+        )
+    routing = RoutingConfig()
+    routing_raw = raw.get("routing")
+    if isinstance(routing_raw, dict):
+        policy = str(routing_raw.get("policy", routing.policy)).strip().lower()
+        routing = RoutingConfig(
+            policy=policy if policy in ROUTING_POLICIES else routing.policy,
+            failure_threshold=max(1, int(routing_raw.get("failure_threshold", routing.failure_threshold))),
+            cooldown_seconds=_to_float_or_none(routing_raw.get("cooldown_seconds")) or routing.cooldown_seconds,
+            max_cooldown_seconds=_to_float_or_none(routing_raw.get("max_cooldown_seconds")) or routing.max_cooldown_seconds,
+        )
+
+    response_cache: ResponseCacheConfig | None = None
+    response_cache_raw = raw.get("response_cache")
+    # LLM_RESPONSE_CACHE=<dir> (or 1) turns the cache on for an unmodified config, e.g. for regression reruns.
+    env_cache = os.environ.get("LLM_RESPONSE_CACHE", "").strip()
+    if response_cache_raw is None and env_cache and env_cache.lower() not in {"0", "false", "no", "off"}:
+        response_cache_raw = {} if env_cache.lower() in {"1", "true", "yes", "on"} else {"dir": env_cache}
+    if response_cache_raw is True:
+        response_cache_raw = {}
+    if isinstance(response_cache_raw, dict):
+        cache_defaults = ResponseCacheConfig()
+        max_mb = _to_float_or_none(response_cache_raw.get("max_mb"))
+        response_cache = ResponseCacheConfig(
+            directory=str(response_cache_raw.get("dir", "") or "").strip(),
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb else cache_defaults.max_bytes,
+            replay_chars_per_second=_to_float_or_none(response_cache_raw.get("replay_chars_per_second")) or 0.0,
+            replay_chunk_chars=max(1, int(response_cache_raw.get("replay_chunk_chars", cache_defaults.replay_chunk_chars))),
+        )
+
+    model_router: ModelRouterConfig | None = None
+    router_raw = raw.get("model_router")
+    if isinstance(router_raw, dict) and str(router_raw.get("cheap_model", "")).strip():
+        router_defaults = ModelRouterConfig(cheap_model="")
+        purposes_raw = router_raw.get("purposes")
+        purposes = router_defaults.purposes
+        if isinstance(purposes_raw, list):
+            purposes = tuple(str(item) for item in purposes_raw if str(item) in ROUTER_PURPOSES)
+        followup_raw = router_raw.get("followup_tools")
+        followup_tools = router_defaults.followup_tools
+        if isinstance(followup_raw, list):
+            followup_tools = tuple(str(item) for item in followup_raw if str(item).strip())
+        model_router = ModelRouterConfig(
+            cheap_model=str(router_raw["cheap_model"]).strip(),
+            purposes=purposes,
+            followup_tools=followup_tools,
+            followup_max_result_chars=max(
+                0, int(router_raw.get("followup_max_result_chars", router_defaults.followup_max_result_chars))
+            ),
+            escalate_on_error=bool(router_raw.get("escalate_on_error", router_defaults.escalate_on_error)),
+            escalate_final_answers=bool(router_raw.get("escalate_final_answers", router_defaults.escalate_final_answers)),
+            cheap_input_per_million=_to_float_or_none(router_raw.get("cheap_input_per_million")),
+            cheap_output_per_million=_to_float_or_none(router_raw.get("cheap_output_per_million")),
+        )
+
     return AppConfig(
         provider=str(raw["provider"]),
         model_name=str(raw["model_name"]),
@@ -177,4 +296,11 @@ def load_config(path: str) -> AppConfig:
         pricing_output_per_million=pricing_output_per_million,
         pricing_cache_read_per_million=pricing_cache_read_per_million,
         pricing_cache_write_per_million=pricing_cache_write_per_million,
+        prompt_cache_mode=prompt_cache_mode,
+        rate_limit=rate_limit,
+        resilience=resilience,
+        endpoints=endpoints or None,
+        routing=routing,
+        response_cache=response_cache,
+        model_router=model_router,
     )
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Tuple
+
+DEFAULT_IGNORED_DIRS = frozenset({".git", "node_modules", "__pycache__", ".venv", "venv", ".mypy_cache", ".pytest_cache"})
+
+
+@dataclass(frozen=True)
+class FileChangeEvent:
+    path: str
+    # created | modified | deleted | overflow (overflow: "something under path changed, rescan")
+    kind: str
+    is_dir: bool = False
+
+
+FileChangeListener = Callable[[FileChangeEvent], None]
+
+
+class FileWatcher:
+    backend = "none"
+
+    def __init__(self, root: str, *, ignored_dirs: Iterable[str] = DEFAULT_IGNORED_DIRS) -> None:
+        self.root = os.path.realpath(os.path.abspath(root))
+        self.ignored_dirs = frozenset(ignored_dirs)
+        self._listeners: List[FileChangeListener] = []
+        self._listeners_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self.events_published = 0
+
+    def subscribe(self, listener: FileChangeListener) -> None:
+        with self._listeners_lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def unsubscribe(self, listener: FileChangeListener) -> None:
+        with self._listeners_lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def covers(self, path: str) -> bool:
+        # True when changes to `path` are guaranteed to be reported promptly, so callers may skip their own stat checks.
+        # Backends without that guarantee (polling only notices on its next scan) still publish events, which callers
+        # can use as an extra invalidation signal.
+        return False
+
+    def _under_root(self, real: str) -> bool:
+        if real != self.root and not real.startswith(self.root + os.sep):
+            return False
+        rel_parts = os.path.relpath(real, self.root).split(os.sep)
+        return not any(part in self.ignored_dirs for part in rel_parts)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _publish(self, event: FileChangeEvent) -> None:
+        self.events_published += 1
+        with self._listeners_lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:  # noqa: BLE001
+                continue
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stopping.clear()
+        self._prepare()
+        self._thread = threading.Thread(target=self._run, name=f"fs-watch-{self.backend}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        self._cleanup()
+
+    def _walk_dirs(self) -> Iterable[str]:
+        for dirpath, dirnames, _ in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in self.ignored_dirs]
+            yield dirpath
+
+    def _prepare(self) -> None:
+        return None
+
+    def _cleanup(self) -> None:
+        return None
+
+    def _run(self) -> None:
+        raise NotImplementedError
+
+
+class PollingFileWatcher(FileWatcher):
+    backend = "polling"
+
+    def __init__(self, root: str, *, interval_seconds: float = 1.0, **kwargs: object) -> None:
+        super().__init__(root, **kwargs)  # type: ignore[arg-type]
+        self.interval_seconds = max(0.05, float(interval_seconds))
+        self._snapshot: Dict[str, Tuple[int, int, bool]] = {}
+
+    def _scan(self) -> Dict[str, Tuple[int, int, bool]]:
+        snapshot: Dict[str, Tuple[int, int, bool]] = {}
+        for dirpath in self._walk_dirs():
+            try:
+                entries = list(os.scandir(dirpath))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False) and entry.name in self.ignored_dirs:
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                snapshot[entry.path] = (st.st_mtime_ns, st.st_size, entry.is_dir(follow_symlinks=False))
+        return snapshot
+
+    def _prepare(self) -> None:
+        self._snapshot = self._scan()
+
+    def poll_once(self) -> int:
+        current = self._scan()
+        previous = self._snapshot
+        self._snapshot = current
+        changes = 0
+        for path, meta in current.items():
+            old = previous.get(path)
+            if old is None:
+                self._publish(FileChangeEvent(path=path, kind="created", is_dir=meta[2]))
+                changes += 1
+            elif old != meta and not meta[2]:
+                self._publish(FileChangeEvent(path=path, kind="modified"))
+                changes += 1
+        for path, meta in previous.items():
+            if path not in current:
+                self._publish(FileChangeEvent(path=path, kind="deleted", is_dir=meta[2]))
+                changes += 1
+        return changes
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval_seconds):
+            self.poll_once()
+
+
+# linux/inotify.h
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc() -> ctypes.CDLL | None:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        _ = (libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch)
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_add_watch.restype = ctypes.c_int
+    return libc
+
+
+class InotifyFileWatcher(FileWatcher):
+    backend = "inotify"
+
+    def __init__(self, root: str, **kwargs: object) -> None:
+        super().__init__(root, **kwargs)  # type: ignore[arg-type]
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        self._fd = -1
+        self._wd_to_dir: Dict[int, str] = {}
+        # Directories with a live watch, and ones whose watch could not be added; read by covers() from other threads.
+        self._watched: set[str] = set()
+        self._unwatched: set[str] = set()
+        self._watch_lock = threading.Lock()
+
+    def covers(self, path: str) -> bool:
+        if not self.is_running:
+            return False
+        real = os.path.realpath(path)
+        if not self._under_root(real):
+            return False
+        is_dir = os.path.isdir(real)
+        directory = real if is_dir else os.path.dirname(real)
+        with self._watch_lock:
+            if directory not in self._watched:
+                return False
+            if not is_dir:
+                return True
+            # A directory dep may be walked recursively: every subdirectory must be watched too.
+            prefix = real + os.sep
+            return not any(missed == real or missed.startswith(prefix) for missed in self._unwatched)
+
+    def _add_watch(self, directory: str) -> None:
+        assert self._libc is not None
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in {errno.ENOENT, errno.ENOTDIR, errno.EACCES}:
+                with self._watch_lock:
+                    self._unwatched.add(directory)
+                return
+            raise OSError(err, f"inotify_add_watch failed for {directory}: {os.strerror(err)}")
+        self._wd_to_dir[wd] = directory
+        with self._watch_lock:
+            self._watched.add(directory)
+            self._unwatched.discard(directory)
+
+    def _add_tree(self, directory: str) -> None:
+        for dirpath, dirnames, _ in os.walk(directory):
+            dirnames[:] = [d for d in dirnames if d not in self.ignored_dirs]
+            self._add_watch(dirpath)
+
+    def _prepare(self) -> None:
+        assert self._libc is not None
+        fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        self._fd = fd
+        self._wd_to_dir.clear()
+        with self._watch_lock:
+            self._watched.clear()
+            self._unwatched.clear()
+        try:
+            for dirpath in self._walk_dirs():
+                self._add_watch(dirpath)
+        except OSError:
+            self._cleanup()
+            raise
+
+    def _cleanup(self) -> None:
+        if self._fd >= 0:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+        self._fd = -1
+        self._wd_to_dir.clear()
+        with self._watch_lock:
+            self._watched.clear()
+            self._unwatched.clear()
+
+    def _handle_buffer(self, data: bytes) -> None:
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            raw_name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if mask & _IN_Q_OVERFLOW:
+                self._publish(FileChangeEvent(path=self.root, kind="overflow", is_dir=True))
+                continue
+            directory = self._wd_to_dir.get(wd)
+            if directory is None:
+                continue
+            if mask & _IN_IGNORED:
+                self._wd_to_dir.pop(wd, None)
+                with self._watch_lock:
+                    self._watched.discard(directory)
+                continue
+            path = os.path.join(directory, os.fsdecode(raw_name)) if raw_name else directory
+            is_dir = bool(mask & _IN_ISDIR)
+            if mask & (_IN_CREATE | _IN_MOVED_TO):
+                if is_dir and os.path.basename(path) not in self.ignored_dirs:
+                    try:
+                        self._add_tree(path)
+                    except OSError:
+                        self._publish(FileChangeEvent(path=self.root, kind="overflow", is_dir=True))
+                self._publish(FileChangeEvent(path=path, kind="created", is_dir=is_dir))
+            elif mask & (_IN_DELETE | _IN_MOVED_FROM | _IN_DELETE_SELF | _IN_MOVE_SELF):
+                self._publish(FileChangeEvent(path=path, kind="deleted", is_dir=is_dir))
+            else:
+                self._publish(FileChangeEvent(path=path, kind="modified", is_dir=is_dir))
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                ready, _, _ = select.select([self._fd], [], [], 0.25)
+            except (OSError, ValueError):
+                return
+            if not ready:
+                continue
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return
+            self._handle_buffer(data)
+
+
+def start_file_watcher(
+    root: str,
+    *,
+    poll_interval_seconds: float = 1.0,
+    prefer_inotify: bool = True,
+    ignored_dirs: Iterable[str] = DEFAULT_IGNORED_DIRS,
+) -> FileWatcher:
+    if prefer_inotify:
+        try:
+            watcher: FileWatcher = InotifyFileWatcher(root, ignored_dirs=ignored_dirs)
+            # start() can still fail (e.g. fs.inotify.max_user_watches exhausted) -> fall back to polling.
+            watcher.start()
+            return watcher
+        except OSError:
+            pass
+    watcher = PollingFileWatcher(root, interval_seconds=poll_interval_seconds, ignored_dirs=ignored_dirs)
+    watcher.start()
+    return watcher
@@ -1,12 +1,80 @@
 from __future__ import annotations
 
+import atexit
+import copy
+import json
 import logging
+import queue
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, Tuple
 
+# Upper bound for one lazily formatted JSON log argument; longer dumps keep head + tail.
+DEFAULT_LOG_JSON_MAX_CHARS = 64_000
 
-def create_session_logger(*, log_dir: str, debug: bool) -> Tuple[logging.Logger, str]:
+_LISTENERS: Dict[str, QueueListener] = {}
+_LISTENERS_LOCK = threading.Lock()
+
+
+class LazyJSON:
+    """Log argument that is only serialized when a handler formats the record."""
+
+    __slots__ = ("obj", "indent", "max_chars")
+
+    def __init__(self, obj: object, *, indent: int | None = 2, max_chars: int = DEFAULT_LOG_JSON_MAX_CHARS) -> None:
+        self.obj = obj
+        self.indent = indent
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        try:
+            text = json.dumps(self.obj, ensure_ascii=False, indent=self.indent, default=str)
+        except (TypeError, ValueError) as err:
+            return f"<unserializable {type(self.obj).__name__}: {err}>"
+        if self.max_chars <= 0 or len(text) <= self.max_chars:
+            return text
+        head = self.max_chars * 3 // 4
+        tail = self.max_chars - head
+        omitted = len(text) - head - tail
+        return f"{text[:head]}\n... [truncated {omitted} chars] ...\n{text[-tail:]}"
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # Stock QueueHandler.prepare() formats in the caller's thread; keep msg/args intact so
+    # LazyJSON and %-formatting run on the listener thread instead.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def close_session_logger(logger: logging.Logger) -> None:
+    with _LISTENERS_LOCK:
+        listener = _LISTENERS.pop(logger.name, None)
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers.clear()
+
+
+def _close_all_session_loggers() -> None:
+    with _LISTENERS_LOCK:
+        names = list(_LISTENERS.keys())
+    for name in names:
+        close_session_logger(logging.getLogger(name))
+
+
+atexit.register(_close_all_session_loggers)
+
+
+def create_session_logger(*, log_dir: str, debug: bool, background: bool = False) -> Tuple[logging.Logger, str]:
     directory = Path(log_dir)
     directory.mkdir(parents=True, exist_ok=True)
 
@@ -17,13 +85,20 @@ def create_session_logger(*, log_dir: str, debug: bool) -> Tuple[logging.Logger,
     logger = logging.getLogger(logger_name)
     logger.setLevel(logging.DEBUG)
     logger.propagate = False
-    for handler in logger.handlers:
-        handler.close()
-    logger.handlers.clear()
+    close_session_logger(logger)
 
     handler = logging.FileHandler(log_path, encoding="utf-8")
     handler.setLevel(logging.DEBUG)
     handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-    logger.addHandler(handler)
+    if background:
+        # File I/O and payload formatting happen on the listener thread; callers only enqueue records.
+        record_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        listener = QueueListener(record_queue, handler, respect_handler_level=True)
+        listener.start()
+        with _LISTENERS_LOCK:
+            _LISTENERS[logger_name] = listener
+        logger.addHandler(_DeferredQueueHandler(record_queue))
+    else:
+        logger.addHandler(handler)
 
     return logger, str(log_path)
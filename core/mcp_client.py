@@ -3,9 +3,15 @@ from __future__ import annotations
 import asyncio
 import json
 import os
+import time
 from dataclasses import dataclass, field
 from typing import Dict, List
 
+from .metrics import REGISTRY
+
+_MCP_REQUESTS = REGISTRY.counter("agent_mcp_requests_total", "MCP tools/call requests by outcome.", ("server", "outcome"))
+_MCP_REQUEST_DURATION = REGISTRY.histogram("agent_mcp_request_duration_seconds", "MCP tools/call wall time.", ("server",))
+
 
 @dataclass(frozen=True)
 class MCPServerConfig:
@@ -191,7 +197,15 @@ class MCPManager:
             raise MCPError(f"Unknown MCP tool: {external_name}")
         server_name, base_name, _, _ = self._tool_index[external_name]
         client = self.clients[server_name]
-        return await client.call_tool(base_name, arguments)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await client.call_tool(base_name, arguments)
+            outcome = "ok"
+            return result
+        finally:
+            _MCP_REQUESTS.inc(server=server_name, outcome=outcome)
+            _MCP_REQUEST_DURATION.observe(time.perf_counter() - started, server=server_name)
 
     def list_external_tool_names(self) -> List[str]:
         return sorted(self._tool_index.keys())
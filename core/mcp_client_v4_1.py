@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import time
 from typing import Dict, List
 
 from .mcp_transport_clients import HTTPMCPClient, MCPClient, StdioMCPClient
 from .mcp_types import MCPError, MCPServerConfig
+from .metrics import REGISTRY
+
+_MCP_REQUESTS = REGISTRY.counter("agent_mcp_requests_total", "MCP tools/call requests by outcome.", ("server", "outcome"))
+_MCP_REQUEST_DURATION = REGISTRY.histogram("agent_mcp_request_duration_seconds", "MCP tools/call wall time.", ("server",))
 
 
 def _to_v41_config(cfg: object) -> MCPServerConfig:
@@ -111,7 +116,15 @@ class MCPManager:
             raise MCPError(f"Unknown MCP tool: {external_name}")
         server_name, base_name, _, _ = self._tool_index[external_name]
         client = self.clients[server_name]
-        return await client.call_tool(base_name, arguments)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await client.call_tool(base_name, arguments)
+            outcome = "ok"
+            return result
+        finally:
+            _MCP_REQUESTS.inc(server=server_name, outcome=outcome)
+            _MCP_REQUEST_DURATION.observe(time.perf_counter() - started, server=server_name)
 
     async def refresh_resources(self) -> Dict[str, List[Dict[str, object]]]:
         self._resource_cache.clear()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+from .types import Message
+
+# The message's own (key, value) pairs; holding the values keeps their ids from being reused while the entry lives.
+Snapshot = Tuple[Tuple[str, object], ...]
+
+
+def _snapshot(message: Message) -> Snapshot:
+    return tuple(message.items())
+
+
+def _unchanged(snapshot: Snapshot, message: Message) -> bool:
+    # Shallow: catches added/removed/reassigned fields; nested in-place edits are not expected.
+    if len(snapshot) != len(message):
+        return False
+    return all(key in message and message[key] is value for key, value in snapshot)
+
+
+class MessageEncoder:
+    """Memoizes the JSON bytes of each message dict so a request body only encodes new messages.
+
+    Entries are keyed by ``id(message)`` and keep the message (and its field values) alive, so an id cannot be reused
+    while its entry exists. The cost is that messages the caller already dropped (compacted history, sessions evicted
+    from a server pool sharing one client) stay resident until LRU eviction. Message dicts and lists cannot be weakly
+    referenced, so the memo is instead bounded by the total encoded bytes as well as the entry count: retained memory
+    is roughly proportional to ``max_bytes`` no matter how many sessions share the client, at the price of re-encoding
+    older history once the budget is exceeded.
+    """
+
+    def __init__(self, *, max_entries: int = 4096, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        # id(message) -> (message, snapshot, bytes)
+        self._entries: "OrderedDict[int, Tuple[Message, Snapshot, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def encode_message(self, message: Message) -> bytes:
+        key = id(message)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is message and _unchanged(entry[1], message):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+        encoded = json.dumps(message).encode("utf-8")
+        with self._lock:
+            self.misses += 1
+            if len(encoded) > self.max_bytes:
+                return encoded
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[2])
+            self._entries[key] = (message, _snapshot(message), encoded)
+            self._bytes += len(encoded)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, dropped) = self._entries.popitem(last=False)
+                self._bytes -= len(dropped)
+        return encoded
+
+    def encode_fragments(self, messages: List[Message]) -> List[bytes]:
+        # Pieces of json.dumps(messages) ("[", msg, ", ", msg, ..., "]") so callers can splice them with a single join.
+        fragments: List[bytes] = [b"["]
+        missing: List[int] = []
+        with self._lock:
+            entries = self._entries
+            for message in messages:
+                if len(fragments) > 1:
+                    fragments.append(b", ")
+                entry = entries.get(id(message))
+                if entry is not None and entry[0] is message and _unchanged(entry[1], message):
+                    entries.move_to_end(id(message))
+                    fragments.append(entry[2])
+                else:
+                    missing.append(len(fragments))
+                    fragments.append(b"")
+            self.hits += len(messages) - len(missing)
+        for idx in missing:
+            fragments[idx] = self.encode_message(messages[(idx - 1) // 2])
+        fragments.append(b"]")
+        return fragments
+
+    def encode_messages(self, messages: List[Message]) -> bytes:
+        # Same bytes as json.dumps(messages).encode("utf-8") (default separators).
+        return b"".join(self.encode_fragments(messages))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+from .metrics import REGISTRY
+from .types import AssistantResponse, Message, TokenUsage
+
+ROUTER_PURPOSES = ("compaction", "title", "tool_followup")
+
+_ROUTED = REGISTRY.counter("llm_router_requests_total", "LLM requests by routing purpose and chosen model.", ("purpose", "model"))
+_ESCALATIONS = REGISTRY.counter("llm_router_escalations_total", "Cheap-model answers redone on the primary model.", ("purpose", "reason"))
+_COST = REGISTRY.counter("llm_router_cost_total", "Priced LLM spend per model (config currency).", ("model",))
+
+
+@dataclass(frozen=True)
+class ModelRouterConfig:
+    cheap_model: str
+    purposes: Tuple[str, ...] = ROUTER_PURPOSES
+    # A round counts as a mechanical follow-up only when the last tool calls were all of these tools.
+    followup_tools: Tuple[str, ...] = ("read", "ls", "grep", "find")
+    # ...and every result is at most this long; large results need the primary model to digest.
+    followup_max_result_chars: int = 4000
+    escalate_on_error: bool = True
+    # A text-only (user-facing) answer from the cheap model is redone on the primary model.
+    escalate_final_answers: bool = True
+    cheap_input_per_million: float | None = None
+    cheap_output_per_million: float | None = None
+
+
+@dataclass
+class _ModelStats:
+    requests: int = 0
+    seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+
+class ModelRouter:
+    """Chooses between the primary model and a cheaper one per request purpose, and keeps per-model spend."""
+
+    def __init__(
+        self,
+        primary_model: str,
+        config: ModelRouterConfig,
+        *,
+        primary_input_per_million: float | None = None,
+        primary_output_per_million: float | None = None,
+    ) -> None:
+        self.primary_model = primary_model
+        self.config = config
+        self._pricing: Dict[str, Tuple[float | None, float | None]] = {
+            primary_model: (primary_input_per_million, primary_output_per_million),
+            config.cheap_model: (config.cheap_input_per_million, config.cheap_output_per_million),
+        }
+        self._stats: Dict[str, _ModelStats] = {}
+        self.escalations: Dict[str, int] = {}
+        # Tokens served by the cheap model on accepted answers, for the savings estimate.
+        self._offloaded = _ModelStats()
+
+    def routes(self, purpose: str) -> bool:
+        return purpose in self.config.purposes and self.config.cheap_model != self.primary_model
+
+    def model_for(self, purpose: str) -> str:
+        return self.config.cheap_model if self.routes(purpose) else self.primary_model
+
+    def route_round(self, messages: List[Message], round_index: int) -> str:
+        """Model for a tool-loop round: cheap right after small results of read-only lookups, primary otherwise."""
+        if round_index == 0 or not self.routes("tool_followup"):
+            return self.primary_model
+        results: List[Message] = []
+        for message in reversed(messages):
+            if message.get("role") != "tool":
+                break
+            results.append(message)
+        if not results:
+            return self.primary_model
+        if any(len(str(m.get("content", ""))) > self.config.followup_max_result_chars for m in results):
+            return self.primary_model
+        if any(str(m.get("name", "")) not in self.config.followup_tools for m in results):
+            return self.primary_model
+        return self.config.cheap_model
+
+    def check_round(self, response: AssistantResponse, tool_names: Iterable[str]) -> str | None:
+        """Reason to distrust a cheap-model round (and redo it on the primary), or None to accept it."""
+        if not response.tool_calls:
+            if not response.text.strip():
+                return "empty"
+            return "final_answer" if self.config.escalate_final_answers else None
+        known = set(tool_names)
+        if any(call.name not in known for call in response.tool_calls):
+            return "unknown_tool"
+        return None
+
+    def record_escalation(self, purpose: str, reason: str) -> None:
+        self.escalations[reason] = self.escalations.get(reason, 0) + 1
+        _ESCALATIONS.inc(purpose=purpose, reason=reason)
+
+    def cost(self, model: str, usage: TokenUsage) -> float | None:
+        input_price, output_price = self._pricing.get(model, (None, None))
+        if input_price is None or output_price is None:
+            return None
+        return (usage.prompt_tokens / 1_000_000.0) * input_price + (usage.completion_tokens / 1_000_000.0) * output_price
+
+    def observe(self, purpose: str, model: str, usage: TokenUsage | None, seconds: float, *, accepted: bool = True) -> None:
+        _ROUTED.inc(purpose=purpose, model=model)
+        stats = self._stats.setdefault(model, _ModelStats())
+        stats.requests += 1
+        stats.seconds += seconds
+        if usage is None:
+            return
+        stats.prompt_tokens += int(usage.prompt_tokens)
+        stats.completion_tokens += int(usage.completion_tokens)
+        # Replays from the local response cache are not billed.
+        cost = self.cost(model, usage) if usage.source != "cache" else None
+        if cost is not None:
+            stats.cost += cost
+            _COST.inc(cost, model=model)
+        if model != self.primary_model and accepted:
+            self._offloaded.prompt_tokens += int(usage.prompt_tokens)
+            self._offloaded.completion_tokens += int(usage.completion_tokens)
+
+    def report(self) -> Dict[str, object]:
+        models = {
+            model: {
+                "requests": stats.requests,
+                "avg_latency_ms": round(stats.seconds * 1000 / stats.requests, 1) if stats.requests else 0.0,
+                "prompt_tokens": stats.prompt_tokens,
+                "completion_tokens": stats.completion_tokens,
+                "cost": round(stats.cost, 6),
+            }
+            for model, stats in self._stats.items()
+        }
+        savings = None
+        offloaded = TokenUsage(
+            prompt_tokens=self._offloaded.prompt_tokens,
+            completion_tokens=self._offloaded.completion_tokens,
+        )
+        primary_cost = self.cost(self.primary_model, offloaded)
+        cheap_stats = self._stats.get(self.config.cheap_model)
+        if primary_cost is not None and cheap_stats is not None and self.cost(self.config.cheap_model, offloaded) is not None:
+            # What the accepted cheap answers would have cost on the primary, minus everything the cheap model cost
+            # (escalated attempts included).
+            savings = round(primary_cost - cheap_stats.cost, 6)
+        return {"models": models, "escalations": dict(self.escalations), "estimated_savings": savings}
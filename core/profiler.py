@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Dict, Iterator, List, Tuple
+
+PROFILE_MODES = ("sample", "cprofile")
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# (file basename, function) of leaf frames that mean "this helper thread is parked", e.g. an idle
+# asyncio.to_thread worker or the log listener. The turn's own thread is always sampled.
+_IDLE_LEAVES = {
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+Stack = Tuple[CodeType, ...]
+
+
+@dataclass(frozen=True)
+class PhaseSpan:
+    label: str
+    start_ms: float
+    end_ms: float
+
+
+@dataclass
+class TurnProfile:
+    turn: int
+    mode: str
+    duration_ms: float = 0.0
+    samples: int = 0
+    phases: List[PhaseSpan] = field(default_factory=list)
+    files: List[str] = field(default_factory=list)
+
+
+def _frame_label(code: CodeType) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(leaf: CodeType) -> bool:
+    return (os.path.basename(leaf.co_filename), leaf.co_name) in _IDLE_LEAVES
+
+
+class _StackSampler:
+    """Background thread that snapshots every interpreter thread's stack at a fixed interval."""
+
+    def __init__(self, interval_seconds: float, target_thread: int, phase_of: "TurnProfiler") -> None:
+        self.interval_seconds = interval_seconds
+        self.target_thread = target_thread
+        self._profiler = phase_of
+        self._stop = threading.Event()
+        # (phase, thread name, root-first code stack) per tick and thread.
+        self.samples: List[Tuple[str, str, Stack]] = []
+        self._thread = threading.Thread(target=self._run, name="turn-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop.wait(self.interval_seconds):
+            phase = self._profiler.current_phase
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                if tid != self.target_thread and _is_idle(frame.f_code):
+                    continue
+                name = names.get(tid)
+                if name is None:
+                    names.update({t.ident: t.name for t in threading.enumerate() if t.ident is not None})
+                    name = names.get(tid, f"thread-{tid}")
+                self.samples.append((phase, name, self._stack(frame)))
+
+    @staticmethod
+    def _stack(frame: FrameType | None) -> Stack:
+        codes: List[CodeType] = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        return tuple(codes)
+
+
+class TurnProfiler:
+    """Opt-in per-turn profiler.
+
+    ``mode="sample"`` writes ``turn-NNNN.collapsed`` (flamegraph.pl / speedscope input) and
+    ``turn-NNNN.speedscope.json``; every stack is rooted at the loop phase (``round1/llm``,
+    ``round1/tool:read`` ...) that was active when it was taken. ``mode="cprofile"`` writes
+    ``turn-NNNN.pstats`` for the turn's thread only. Both write ``turn-NNNN.timeline.json``.
+    """
+
+    def __init__(self, out_dir: str, *, mode: str = "sample", interval_ms: float = 5.0, max_turns: int = 0) -> None:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unsupported profile mode: {mode}")
+        self.out_dir = Path(out_dir)
+        self.mode = mode
+        self.interval_seconds = max(0.5, float(interval_ms)) / 1000.0
+        self.max_turns = max(0, int(max_turns))
+        self.profiles: List[TurnProfile] = []
+        self.current_phase = "turn"
+        self._active: TurnProfile | None = None
+        self._started = 0.0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.max_turns > 0 and len(self.profiles) >= self.max_turns
+
+    @contextmanager
+    def turn(self) -> Iterator[TurnProfile | None]:
+        if self._active is not None or self.exhausted:
+            yield None
+            return
+        profile = TurnProfile(turn=len(self.profiles) + 1, mode=self.mode)
+        self.profiles.append(profile)
+        self._active = profile
+        self.current_phase = "turn"
+        sampler: _StackSampler | None = None
+        cprof: cProfile.Profile | None = None
+        if self.mode == "sample":
+            sampler = _StackSampler(self.interval_seconds, threading.get_ident(), self)
+            sampler.start()
+        else:
+            cprof = cProfile.Profile()
+        self._started = time.perf_counter()
+        if cprof is not None:
+            cprof.enable()
+        try:
+            yield profile
+        finally:
+            if cprof is not None:
+                cprof.disable()
+            if sampler is not None:
+                sampler.stop()
+            profile.duration_ms = (time.perf_counter() - self._started) * 1000.0
+            self._active = None
+            self.current_phase = "turn"
+            self._write(profile, sampler, cprof)
+
+    @contextmanager
+    def phase(self, label: str) -> Iterator[None]:
+        profile = self._active
+        if profile is None:
+            yield
+            return
+        previous = self.current_phase
+        self.current_phase = label
+        start_ms = (time.perf_counter() - self._started) * 1000.0
+        try:
+            yield
+        finally:
+            end_ms = (time.perf_counter() - self._started) * 1000.0
+            profile.phases.append(PhaseSpan(label=label, start_ms=round(start_ms, 3), end_ms=round(end_ms, 3)))
+            self.current_phase = previous
+
+    def _write(self, profile: TurnProfile, sampler: _StackSampler | None, cprof: cProfile.Profile | None) -> None:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.out_dir / f"turn-{profile.turn:04d}"
+        if sampler is not None:
+            profile.samples = len(sampler.samples)
+            collapsed = Path(f"{stem}.collapsed")
+            collapsed.write_text(render_collapsed(sampler.samples), encoding="utf-8")
+            speedscope = Path(f"{stem}.speedscope.json")
+            speedscope.write_text(
+                json.dumps(
+                    render_speedscope(sampler.samples, self.interval_seconds * 1000.0, f"turn {profile.turn}"),
+                    ensure_ascii=False,
+                ),
+                encoding="utf-8",
+            )
+            profile.files.extend([str(collapsed), str(speedscope)])
+        if cprof is not None:
+            pstats_path = Path(f"{stem}.pstats")
+            cprof.dump_stats(str(pstats_path))
+            profile.files.append(str(pstats_path))
+        timeline = Path(f"{stem}.timeline.json")
+        timeline.write_text(
+            json.dumps(
+                {
+                    "turn": profile.turn,
+                    "mode": profile.mode,
+                    "duration_ms": round(profile.duration_ms, 3),
+                    "samples": profile.samples,
+                    "phases": [
+                        {"label": p.label, "start_ms": p.start_ms, "end_ms": p.end_ms}
+                        for p in sorted(profile.phases, key=lambda p: p.start_ms)
+                    ],
+                },
+                ensure_ascii=False,
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        profile.files.append(str(timeline))
+
+
+def render_collapsed(samples: List[Tuple[str, str, Stack]]) -> str:
+    counts: Dict[Tuple[str, str, Stack], int] = {}
+    for sample in samples:
+        counts[sample] = counts.get(sample, 0) + 1
+    labels: Dict[CodeType, str] = {}
+    lines: List[str] = []
+    for (phase, thread_name, stack), count in counts.items():
+        frames = [phase, f"thread:{thread_name}"]
+        for code in stack:
+            label = labels.get(code)
+            if label is None:
+                label = _frame_label(code).replace(";", ":")
+                labels[code] = label
+            frames.append(label)
+        lines.append(f"{';'.join(frames)} {count}")
+    lines.sort()
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def render_speedscope(samples: List[Tuple[str, str, Stack]], interval_ms: float, name: str) -> Dict[str, object]:
+    frames: List[Dict[str, object]] = []
+    index: Dict[object, int] = {}
+
+    def _frame(key: object, entry: Dict[str, object]) -> int:
+        idx = index.get(key)
+        if idx is None:
+            idx = len(frames)
+            index[key] = idx
+            frames.append(entry)
+        return idx
+
+    stacks: List[List[int]] = []
+    weights: List[float] = []
+    for phase, thread_name, stack in samples:
+        row = [
+            _frame(("phase", phase), {"name": phase}),
+            _frame(("thread", thread_name), {"name": f"thread:{thread_name}"}),
+        ]
+        for code in stack:
+            row.append(
+                _frame(code, {"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno}),
+            )
+        if stacks and stacks[-1] == row:
+            weights[-1] += interval_ms
+            continue
+        stacks.append(row)
+        weights.append(interval_ms)
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": stacks,
+                "weights": weights,
+            },
+        ],
+        "name": name,
+        "activeProfileIndex": 0,
+        "exporter": "agent_loop.core.profiler",
+    }
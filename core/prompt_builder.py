@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    from .skill_loader import SkillLoader
+
+_SKILLS_PREAMBLE = (
+    "Skills are loaded with progressive disclosure.\n"
+    "First inspect available skill metadata, then call read_skill(name) only when needed.\n\n"
+)
+
+
+def render_available_skills_block(skill_loader: "SkillLoader") -> str:
+    lines = ["<available_skills>"]
+    for skill in skill_loader.list_skills():
+        lines.extend(
+            [
+                "  <skill>",
+                f"    <name>{skill.name}</name>",
+                f"    <description>{skill.description}</description>",
+                f"    <location>{skill.path}</location>",
+                "  </skill>",
+            ],
+        )
+    lines.append("</available_skills>")
+    return "\n".join(lines)
+
+
+class SystemPromptBuilder:
+    """Renders the skills-aware system prompt once per (skill set version, active skill)."""
+
+    def __init__(self, base_prompt: str, skill_loader: "SkillLoader") -> None:
+        self.base_prompt = base_prompt
+        self.skill_loader = skill_loader
+        self._prefix_key: Tuple[str, int] | None = None
+        self._prefix = ""
+        self._prefix_hash = ""
+        self._prompt_key: Tuple[str, int, str | None] | None = None
+        self._prompt = ""
+        self.renders = 0
+
+    def _ensure_prefix(self) -> str:
+        key = (self.base_prompt, self.skill_loader.version)
+        if key != self._prefix_key:
+            self._prefix = (
+                f"{self.base_prompt}\n\n"
+                f"{_SKILLS_PREAMBLE}"
+                f"{render_available_skills_block(self.skill_loader)}"
+            )
+            self._prefix_hash = hashlib.sha256(self._prefix.encode("utf-8")).hexdigest()[:16]
+            self._prefix_key = key
+            self.renders += 1
+        return self._prefix
+
+    @property
+    def prefix_hash(self) -> str:
+        # Everything before the per-session [Preferred Skill] tail; identical bytes => provider prefix-cache hit.
+        self._ensure_prefix()
+        return self._prefix_hash
+
+    def build(self, active_skill_name: str | None) -> str:
+        prefix = self._ensure_prefix()
+        key = (self.base_prompt, self.skill_loader.version, active_skill_name)
+        if key == self._prompt_key:
+            return self._prompt
+        preferred = ""
+        if active_skill_name:
+            preferred = (
+                "\n\n[Preferred Skill]\n"
+                f"- name: {active_skill_name}\n"
+                "Use read_skill to load it if relevant to the user's request."
+            )
+        self._prompt = f"{prefix}{preferred}"
+        self._prompt_key = key
+        return self._prompt
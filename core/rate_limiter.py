@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.error import HTTPError
+
+from .metrics import REGISTRY
+from .types import AssistantResponse, LLMClient, Message, ToolSpec
+
+# Lower value dispatches first; a waiting interactive turn is never queued behind background work.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_COMPACTION = 1
+PRIORITY_BACKGROUND = 2
+PRIORITY_NAMES: Dict[int, str] = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_COMPACTION: "compaction",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# Rough per-tool schema cost when estimating a request before it is encoded.
+_TOOL_SPEC_TOKENS = 64
+
+_QUEUE_WAIT = REGISTRY.histogram("llm_scheduler_queue_seconds", "Time LLM requests waited for RPM/TPM budget.", ("priority",))
+_QUEUE_DEPTH = REGISTRY.gauge("llm_scheduler_queue_depth", "LLM requests waiting for RPM/TPM budget.", ("priority",))
+_THROTTLED = REGISTRY.counter("llm_scheduler_throttled_total", "Provider 429 responses that paused the scheduler.")
+
+_PRIORITY: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+_SESSION: ContextVar[str] = ContextVar("llm_session", default="default")
+
+
+@contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    token = _PRIORITY.set(int(priority))
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+@contextmanager
+def llm_session(key: str) -> Iterator[None]:
+    token = _SESSION.set(str(key))
+    try:
+        yield
+    finally:
+        _SESSION.reset(token)
+
+
+def current_priority() -> int:
+    return _PRIORITY.get()
+
+
+def current_session() -> str:
+    return _SESSION.get()
+
+
+def priority_name(priority: int) -> str:
+    return PRIORITY_NAMES.get(priority, str(priority))
+
+
+@dataclass(frozen=True)
+class RateLimitConfig:
+    # 0 disables the corresponding bucket. Buckets hold one minute of budget, matching provider windows.
+    requests_per_minute: float = 0.0
+    tokens_per_minute: float = 0.0
+    # Reserved for the completion before a request is sent; reconciled with reported usage afterwards.
+    completion_tokens_estimate: int = 512
+    # Pause applied on a 429 without a usable Retry-After header.
+    throttle_pause_seconds: float = 1.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests_per_minute > 0 or self.tokens_per_minute > 0
+
+
+def estimate_request_tokens(messages: List[Message], tools: Optional[List[ToolSpec]] = None) -> int:
+    chars = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif content:
+            chars += len(json.dumps(content, ensure_ascii=False))
+        for call in message.get("tool_calls") or []:  # type: ignore[union-attr]
+            function = call.get("function") if isinstance(call, dict) else None
+            chars += len(str((function or {}).get("arguments", ""))) + 32
+    return chars // 4 + 4 * len(messages) + _TOOL_SPEC_TOKENS * len(tools or [])
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date) on an HTTPError."""
+    headers = getattr(exc, "headers", None)
+    raw = headers.get("Retry-After") if headers is not None else None
+    if not raw:
+        return None
+    raw = str(raw).strip()
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        # A request larger than the whole bucket waits for a full bucket instead of forever.
+        need = min(float(amount), self.capacity)
+        return 0.0 if self.tokens >= need else (need - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= float(amount)
+
+    def adjust(self, delta: float) -> None:
+        """Charge (positive) or refund (negative) tokens after the fact; the balance may go negative."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - float(delta))
+
+
+@dataclass
+class _Waiter:
+    tokens: int
+    future: "asyncio.Future[None]"
+    enqueued: float
+
+
+class LLMScheduler:
+    """Shared gate in front of LLM requests: strict priority between classes, round-robin between sessions."""
+
+    def __init__(self, config: RateLimitConfig, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.config = config
+        self._clock = clock
+        self.requests = TokenBucket(config.requests_per_minute, clock=clock) if config.requests_per_minute > 0 else None
+        self.tokens = TokenBucket(config.tokens_per_minute, clock=clock) if config.tokens_per_minute > 0 else None
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Waiter]]"] = {}
+        self._paused_until = 0.0
+        self._timer: asyncio.TimerHandle | None = None
+
+    def queued(self) -> int:
+        return sum(len(dq) for sessions in self._queues.values() for dq in sessions.values())
+
+    async def acquire(self, tokens: int, *, priority: int | None = None, session: str | None = None) -> float:
+        """Wait until one request and ``tokens`` fit the buckets; returns the seconds spent queued."""
+        prio = current_priority() if priority is None else int(priority)
+        key = current_session() if session is None else str(session)
+        label = priority_name(prio)
+        waiter = _Waiter(tokens=max(0, int(tokens)), future=asyncio.get_running_loop().create_future(), enqueued=self._clock())
+        self._queues.setdefault(prio, OrderedDict()).setdefault(key, deque()).append(waiter)
+        _QUEUE_DEPTH.inc(priority=label)
+        try:
+            self._pump()
+            await waiter.future
+        finally:
+            _QUEUE_DEPTH.dec(priority=label)
+        waited = self._clock() - waiter.enqueued
+        _QUEUE_WAIT.observe(waited, priority=label)
+        return waited
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        if self.tokens is None:
+            return
+        delta = int(actual_tokens) - int(estimated_tokens)
+        self.tokens.adjust(delta)
+        if delta < 0 and self.queued():
+            # A refund can admit queued requests now; don't leave them sleeping on the timer set before it.
+            self._pump()
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, self._clock() + max(0.0, float(seconds)))
+        _THROTTLED.inc()
+
+    def _head(self) -> Tuple[int, str, _Waiter] | None:
+        for prio in sorted(self._queues):
+            sessions = self._queues[prio]
+            while sessions:
+                key, dq = next(iter(sessions.items()))
+                while dq and dq[0].future.done():
+                    dq.popleft()  # cancelled while queued
+                if dq:
+                    return prio, key, dq[0]
+                del sessions[key]
+        return None
+
+    def _pump(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while True:
+            head = self._head()
+            if head is None:
+                return
+            prio, key, waiter = head
+            delay = self._paused_until - self._clock()
+            if self.requests is not None:
+                delay = max(delay, self.requests.wait_time(1))
+            if self.tokens is not None:
+                delay = max(delay, self.tokens.wait_time(waiter.tokens))
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+                return
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(waiter.tokens)
+            sessions = self._queues[prio]
+            sessions[key].popleft()
+            # Round-robin: the session just served goes behind every other waiting session of its class.
+            if sessions[key]:
+                sessions.move_to_end(key)
+            else:
+                del sessions[key]
+            waiter.future.set_result(None)
+
+
+class RateLimitedClient(LLMClient):
+    def __init__(self, inner: LLMClient, scheduler: LLMScheduler) -> None:
+        self.inner = inner
+        self.scheduler = scheduler
+
+    async def generate(
+        self,
+        *,
+        model_name: str,
+        messages: List[Message],
+        tools: Optional[List[ToolSpec]] = None,
+        timeout_seconds: int = 60,
+        stream: bool = False,
+        on_text_delta: Callable[[str], None] | None = None,
+        should_abort: Callable[[], bool] | None = None,
+    ) -> AssistantResponse:
+        estimated = estimate_request_tokens(messages, tools) + self.scheduler.config.completion_tokens_estimate
+        await self.scheduler.acquire(estimated)
+        try:
+            response = await self.inner.generate(
+                model_name=model_name,
+                messages=messages,
+                tools=tools,
+                timeout_seconds=timeout_seconds,
+                stream=stream,
+                on_text_delta=on_text_delta,
+                should_abort=should_abort,
+            )
+        except HTTPError as exc:
+            if exc.code == 429:
+                pause = retry_after_seconds(exc)
+                self.scheduler.pause(self.scheduler.config.throttle_pause_seconds if pause is None else pause)
+            raise
+        if response.usage is not None and response.usage.total_tokens > 0:
+            self.scheduler.settle(estimated, response.usage.total_tokens)
+        return response
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import asyncio
+import http.client
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+
+from .metrics import REGISTRY
+from .rate_limiter import retry_after_seconds
+from .types import AssistantResponse, LLMClient, Message, ToolSpec
+
+# Recent first-output latencies kept per mode (stream / non-stream) for the hedge delay.
+_LATENCY_WINDOW = 200
+
+_RETRIES = REGISTRY.counter("llm_retries_total", "LLM request retries by classified cause.", ("reason",))
+_HEDGES = REGISTRY.counter("llm_hedges_total", "Hedged LLM requests by outcome.", ("outcome",))
+
+
+@dataclass(frozen=True)
+class ResilienceConfig:
+    # Attempts per generate() call including the first; 1 disables retries.
+    max_attempts: int = 3
+    base_delay_seconds: float = 0.5
+    max_delay_seconds: float = 20.0
+    # Upper bound on an honored Retry-After, so a hostile header cannot park a turn for hours.
+    max_retry_after_seconds: float = 60.0
+    retry_statuses: Tuple[int, ...] = (408, 409, 429, 500, 502, 503, 504)
+    retry_timeouts: bool = True
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_delay_ms: float = 500.0
+    hedge_min_samples: int = 20
+
+
+def classify_error(exc: BaseException, config: ResilienceConfig) -> str | None:
+    """Retry reason for a transient failure, or None when the error must propagate."""
+    if isinstance(exc, (InterruptedError, asyncio.CancelledError)):
+        return None
+    if isinstance(exc, HTTPError):
+        return f"http_{exc.code}" if exc.code in config.retry_statuses else None
+    if isinstance(exc, URLError):
+        reason = exc.reason
+        if isinstance(reason, TimeoutError):
+            return "timeout" if config.retry_timeouts else None
+        return "connection" if isinstance(reason, OSError) else None
+    if isinstance(exc, TimeoutError):
+        return "timeout" if config.retry_timeouts else None
+    if isinstance(exc, (ConnectionError, http.client.IncompleteRead, http.client.BadStatusLine)):
+        return "connection"
+    return None
+
+
+def backoff_delay(config: ResilienceConfig, attempt: int, *, retry_after: float | None = None, rng: Callable[[], float] = random.random) -> float:
+    """Full-jitter exponential backoff after ``attempt`` failures; a Retry-After header takes precedence."""
+    if retry_after is not None:
+        return min(retry_after, config.max_retry_after_seconds)
+    ceiling = min(config.max_delay_seconds, config.base_delay_seconds * (2 ** max(0, attempt - 1)))
+    return ceiling * rng()
+
+
+class ResilientClient(LLMClient):
+    def __init__(
+        self,
+        inner: LLMClient,
+        config: ResilienceConfig | None = None,
+        *,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.inner = inner
+        self.config = config or ResilienceConfig()
+        self._sleep = sleep
+        self._rng = rng
+        self._latencies = {True: deque(maxlen=_LATENCY_WINDOW), False: deque(maxlen=_LATENCY_WINDOW)}
+
+    def hedge_delay(self, stream: bool) -> float | None:
+        """Seconds without output after which a duplicate is sent; None until enough samples exist."""
+        samples: Deque[float] = self._latencies[stream]
+        if not self.config.hedge or len(samples) < max(1, self.config.hedge_min_samples):
+            return None
+        ordered = sorted(samples)
+        value = ordered[min(len(ordered) - 1, int(self.config.hedge_quantile * len(ordered)))]
+        return max(value, self.config.hedge_min_delay_ms / 1000.0)
+
+    async def generate(
+        self,
+        *,
+        model_name: str,
+        messages: List[Message],
+        tools: Optional[List[ToolSpec]] = None,
+        timeout_seconds: int = 60,
+        stream: bool = False,
+        on_text_delta: Callable[[str], None] | None = None,
+        should_abort: Callable[[], bool] | None = None,
+    ) -> AssistantResponse:
+        attempt = 0
+        while True:
+            attempt += 1
+            delivered = {"text": False}
+
+            def _delta(text: str) -> None:
+                delivered["text"] = True
+                if on_text_delta is not None:
+                    on_text_delta(text)
+
+            try:
+                return await self._attempt(
+                    model_name=model_name,
+                    messages=messages,
+                    tools=tools,
+                    timeout_seconds=timeout_seconds,
+                    stream=stream,
+                    on_text_delta=_delta if on_text_delta is not None else None,
+                    should_abort=should_abort,
+                )
+            except Exception as exc:
+                reason = classify_error(exc, self.config)
+                # Text already shown to the user cannot be taken back, so a half-streamed reply is not retried.
+                if reason is None or attempt >= self.config.max_attempts or delivered["text"]:
+                    raise
+                if should_abort is not None and should_abort():
+                    raise
+                _RETRIES.inc(reason=reason)
+                await self._sleep(backoff_delay(self.config, attempt, retry_after=retry_after_seconds(exc), rng=self._rng))
+
+    async def _attempt(
+        self,
+        *,
+        model_name: str,
+        messages: List[Message],
+        tools: Optional[List[ToolSpec]],
+        timeout_seconds: int,
+        stream: bool,
+        on_text_delta: Callable[[str], None] | None,
+        should_abort: Callable[[], bool] | None,
+    ) -> AssistantResponse:
+        started = time.perf_counter()
+        state = {"first_output": None, "winner": None}
+
+        def _aborted(name: str) -> Callable[[], bool]:
+            def _check() -> bool:
+                if state["winner"] not in (None, name):
+                    return True
+                return should_abort is not None and should_abort()
+
+            return _check
+
+        def _primary_delta(text: str) -> None:
+            if state["winner"] == "hedge":
+                return
+            if state["first_output"] is None:
+                state["first_output"] = time.perf_counter() - started
+            if on_text_delta is not None:
+                on_text_delta(text)
+
+        primary = asyncio.ensure_future(
+            self.inner.generate(
+                model_name=model_name,
+                messages=messages,
+                tools=tools,
+                timeout_seconds=timeout_seconds,
+                stream=stream,
+                on_text_delta=_primary_delta,
+                should_abort=_aborted("primary"),
+            ),
+        )
+        delay = self.hedge_delay(stream)
+        if delay is not None:
+            try:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+            except asyncio.CancelledError:
+                primary.cancel()
+                raise
+            if not done and state["first_output"] is None:
+                backup = self.inner.generate(
+                    model_name=model_name,
+                    messages=messages,
+                    tools=tools,
+                    timeout_seconds=timeout_seconds,
+                    stream=False,
+                    should_abort=_aborted("hedge"),
+                )
+                return await self._race(primary, backup, state, started, stream=stream, on_text_delta=on_text_delta)
+        response = await primary
+        self._observe(stream, state["first_output"], started)
+        return response
+
+    async def _race(
+        self,
+        primary: "asyncio.Future[AssistantResponse]",
+        hedge: Awaitable[AssistantResponse],
+        state: dict,
+        started: float,
+        *,
+        stream: bool,
+        on_text_delta: Callable[[str], None] | None,
+    ) -> AssistantResponse:
+        _HEDGES.inc(outcome="launched")
+        backup = asyncio.ensure_future(hedge)
+        pending = {primary, backup}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled() or task.exception() is not None:
+                        error = error or (task.exception() if not task.cancelled() else asyncio.CancelledError())
+                        continue
+                    name = "primary" if task is primary else "hedge"
+                    # The primary may have started streaming while the hedge finished; its text is already out.
+                    if name == "hedge" and state["first_output"] is not None and primary in pending:
+                        continue
+                    state["winner"] = name
+                    response = task.result()
+                    _HEDGES.inc(outcome="won" if name == "hedge" else "lost")
+                    if name == "hedge" and on_text_delta is not None and response.text:
+                        on_text_delta(response.text)
+                    self._observe(stream, state["first_output"], started)
+                    return response
+        finally:
+            if state["winner"] is None:
+                state["winner"] = "abandoned"  # both failed or we were cancelled: abort whatever still runs
+            for task in (primary, backup):
+                # The loser keeps running in its worker thread until it notices the abort flag.
+                task.add_done_callback(_consume_result)
+        assert error is not None
+        raise error
+
+    def _observe(self, stream: bool, first_output: float | None, started: float) -> None:
+        self._latencies[stream].append(first_output if first_output is not None else time.perf_counter() - started)
+
+
+def _consume_result(task: "asyncio.Future[AssistantResponse]") -> None:
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .metrics import REGISTRY
+from .types import AssistantResponse, LLMClient, Message, TokenUsage, ToolCall, ToolSpec
+
+# Bumped whenever the key material or the entry layout changes; older entries simply stop matching.
+_CACHE_FORMAT_VERSION = 1
+
+_CACHE_REQUESTS = REGISTRY.counter("llm_response_cache_requests_total", "Response cache lookups by outcome.", ("outcome",))
+_CACHE_EVICTIONS = REGISTRY.counter("llm_response_cache_evictions_total", "Response cache entries evicted for size.")
+_CACHE_BYTES = REGISTRY.gauge("llm_response_cache_bytes", "Bytes held by the on-disk response cache.")
+
+
+def default_response_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return str(Path(cache_home) / "agent_loop" / "llm_responses")
+
+
+@dataclass(frozen=True)
+class ResponseCacheConfig:
+    directory: str = ""
+    max_bytes: int = 256 * 1024 * 1024
+    # Replay speed for cached streams; 0 replays instantly.
+    replay_chars_per_second: float = 0.0
+    replay_chunk_chars: int = 16
+
+
+def request_key(
+    *,
+    model_name: str,
+    messages: List[Message],
+    tools: Optional[List[ToolSpec]] = None,
+    params: Dict[str, object] | None = None,
+) -> str:
+    """Canonical hash of everything that determines the provider's answer (not transport options like stream)."""
+    material = {
+        "v": _CACHE_FORMAT_VERSION,
+        "model": model_name,
+        "messages": messages,
+        "tools": [{"name": t.name, "description": t.description, "parameters": t.parameters} for t in tools or []],
+        "params": {**({"tool_choice": "auto"} if tools else {}), **(params or {})},
+    }
+    payload = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _encode_response(response: AssistantResponse) -> bytes:
+    entry = {
+        "v": _CACHE_FORMAT_VERSION,
+        "text": response.text,
+        "reasoning": response.reasoning,
+        "tool_calls": [{"id": c.id, "name": c.name, "arguments": c.arguments} for c in response.tool_calls],
+        "usage": asdict(response.usage) if response.usage is not None else None,
+    }
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode_response(raw: bytes) -> AssistantResponse | None:
+    try:
+        entry = json.loads(raw.decode("utf-8"))
+        if entry.get("v") != _CACHE_FORMAT_VERSION:
+            return None
+        usage_raw = entry.get("usage")
+        usage = None
+        if isinstance(usage_raw, dict):
+            # Token counts are kept so budget/compaction decisions replay identically; the source says nothing was billed.
+            usage = TokenUsage(**{**usage_raw, "source": "cache"})
+        return AssistantResponse(
+            text=str(entry.get("text", "")),
+            reasoning=str(entry.get("reasoning", "")),
+            tool_calls=[ToolCall(id=str(c["id"]), name=str(c["name"]), arguments=dict(c["arguments"])) for c in entry.get("tool_calls", [])],
+            usage=usage,
+        )
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+
+class ResponseStore:
+    """Content-addressed files under ``directory``, evicted least-recently-used once ``max_bytes`` is exceeded."""
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max(0, max_bytes)
+        self._lock = threading.Lock()
+        # key -> (size, last use); built lazily from the directory so the first lookup pays the scan once.
+        self._index: Dict[str, Tuple[int, float]] | None = None
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _load_index(self) -> Dict[str, Tuple[int, float]]:
+        if self._index is None:
+            index: Dict[str, Tuple[int, float]] = {}
+            if self.directory.is_dir():
+                for path in self.directory.glob("*/*.json"):
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    index[path.stem] = (st.st_size, st.st_mtime)
+            self._index = index
+            _CACHE_BYTES.set(self.total_bytes())
+        return self._index
+
+    def total_bytes(self) -> int:
+        return sum(size for size, _ in (self._index or {}).values())
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            index = self._load_index()
+            path = self._path(key)
+            try:
+                raw = path.read_bytes()
+            except OSError:
+                index.pop(key, None)
+                return None
+            now = time.time()
+            index[key] = (len(raw), now)
+            try:
+                # mtime doubles as the LRU clock, so recency survives restarts.
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            return raw
+
+    def put(self, key: str, raw: bytes) -> None:
+        if len(raw) > self.max_bytes:
+            return
+        with self._lock:
+            index = self._load_index()
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(raw)
+            os.replace(tmp, path)
+            index[key] = (len(raw), time.time())
+            self._evict(index)
+            _CACHE_BYTES.set(self.total_bytes())
+
+    def _evict(self, index: Dict[str, Tuple[int, float]]) -> None:
+        total = sum(size for size, _ in index.values())
+        if total <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            index.pop(key, None)
+            total -= size
+            _CACHE_EVICTIONS.inc()
+
+
+class CachingClient(LLMClient):
+    """Exact-match response cache: identical requests are answered from disk instead of the provider."""
+
+    def __init__(
+        self,
+        inner: LLMClient,
+        config: ResponseCacheConfig | None = None,
+        *,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.inner = inner
+        self.config = config or ResponseCacheConfig()
+        self.store = ResponseStore(self.config.directory or default_response_cache_dir(), self.config.max_bytes)
+        self._sleep = sleep
+
+    async def generate(
+        self,
+        *,
+        model_name: str,
+        messages: List[Message],
+        tools: Optional[List[ToolSpec]] = None,
+        timeout_seconds: int = 60,
+        stream: bool = False,
+        on_text_delta: Callable[[str], None] | None = None,
+        should_abort: Callable[[], bool] | None = None,
+    ) -> AssistantResponse:
+        # The wrapped clients send no sampling parameters, so model, messages and tools determine the answer.
+        key = request_key(model_name=model_name, messages=messages, tools=tools)
+        raw = await asyncio.to_thread(self.store.get, key)
+        cached = _decode_response(raw) if raw is not None else None
+        if cached is not None:
+            _CACHE_REQUESTS.inc(outcome="hit")
+            if stream and on_text_delta is not None and cached.text:
+                await self._replay(cached.text, on_text_delta, should_abort)
+            return cached
+        _CACHE_REQUESTS.inc(outcome="miss")
+        response = await self.inner.generate(
+            model_name=model_name,
+            messages=messages,
+            tools=tools,
+            timeout_seconds=timeout_seconds,
+            stream=stream,
+            on_text_delta=on_text_delta,
+            should_abort=should_abort,
+        )
+        await asyncio.to_thread(self.store.put, key, _encode_response(response))
+        return response
+
+    async def _replay(self, text: str, on_text_delta: Callable[[str], None], should_abort: Callable[[], bool] | None) -> None:
+        size = max(1, self.config.replay_chunk_chars)
+        rate = self.config.replay_chars_per_second
+        for start in range(0, len(text), size):
+            if should_abort is not None and should_abort():
+                raise InterruptedError("Generation aborted")
+            chunk = text[start : start + size]
+            on_text_delta(chunk)
+            if rate > 0:
+                await self._sleep(len(chunk) / rate)
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+from .metrics import REGISTRY
+from .resilience import ResilienceConfig, classify_error
+from .types import AssistantResponse, LLMClient, Message, ToolSpec
+
+ROUTING_POLICIES = ("least_outstanding", "ewma")
+
+_ENDPOINT_REQUESTS = REGISTRY.counter("llm_endpoint_requests_total", "LLM requests per endpoint by outcome.", ("endpoint", "outcome"))
+_ENDPOINT_DURATION = REGISTRY.histogram("llm_endpoint_duration_seconds", "LLM request wall time per endpoint.", ("endpoint",))
+_ENDPOINT_OUTSTANDING = REGISTRY.gauge("llm_endpoint_outstanding", "In-flight LLM requests per endpoint.", ("endpoint",))
+_ENDPOINT_OPEN = REGISTRY.gauge("llm_endpoint_circuit_open", "1 while the endpoint's circuit breaker is open.", ("endpoint",))
+
+
+@dataclass(frozen=True)
+class EndpointConfig:
+    name: str
+    base_url: str
+    api_key_env: str | None = None
+    api_key: str | None = None
+    weight: float = 1.0
+    # Same model under a provider-specific name; None keeps the caller's model_name.
+    model_name: str | None = None
+
+
+@dataclass(frozen=True)
+class RoutingConfig:
+    policy: str = "least_outstanding"
+    # Consecutive transient failures that open an endpoint's circuit.
+    failure_threshold: int = 3
+    cooldown_seconds: float = 10.0
+    max_cooldown_seconds: float = 300.0
+    # Smoothing for the per-endpoint latency EWMA (weight of the newest sample).
+    ewma_alpha: float = 0.3
+
+
+class _EndpointState:
+    def __init__(self, config: EndpointConfig, client: LLMClient) -> None:
+        self.config = config
+        self.client = client
+        self.outstanding = 0
+        self.ewma_seconds: float | None = None
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.cooldown = 0.0
+        self.probing = False
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+
+class RoutingClient(LLMClient):
+    """Spreads requests over equivalent endpoints, failing over past broken ones without the caller noticing."""
+
+    def __init__(
+        self,
+        endpoints: Sequence[tuple[EndpointConfig, LLMClient]],
+        config: RoutingConfig | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        if not endpoints:
+            raise ValueError("RoutingClient needs at least one endpoint")
+        self.config = config or RoutingConfig()
+        if self.config.policy not in ROUTING_POLICIES:
+            raise ValueError(f"unknown routing policy {self.config.policy!r}; expected one of {ROUTING_POLICIES}")
+        self.endpoints = [_EndpointState(cfg, client) for cfg, client in endpoints]
+        self._clock = clock
+        self._rng = rng
+        # Failure classification shared with the retry layer; timeouts count against an endpoint too.
+        self._classify = ResilienceConfig()
+
+    def snapshot(self) -> List[dict]:
+        now = self._clock()
+        return [
+            {
+                "name": ep.name,
+                "outstanding": ep.outstanding,
+                "ewma_ms": round(ep.ewma_seconds * 1000, 1) if ep.ewma_seconds is not None else None,
+                "state": self._circuit_state(ep, now),
+                "consecutive_failures": ep.consecutive_failures,
+            }
+            for ep in self.endpoints
+        ]
+
+    def _circuit_state(self, ep: _EndpointState, now: float) -> str:
+        if ep.open_until <= 0:
+            return "closed"
+        return "open" if now < ep.open_until else "half_open"
+
+    def _available(self, ep: _EndpointState, now: float) -> bool:
+        state = self._circuit_state(ep, now)
+        # Half-open admits a single probe; everyone else keeps avoiding the endpoint until it answers.
+        return state == "closed" or (state == "half_open" and not ep.probing)
+
+    def _score(self, ep: _EndpointState) -> float:
+        load = (ep.outstanding + 1) / max(ep.config.weight, 1e-6)
+        if self.config.policy == "ewma":
+            # Unmeasured endpoints score 0 so each gets explored once.
+            return load * (ep.ewma_seconds if ep.ewma_seconds is not None else 0.0)
+        return load
+
+    def pick(self, exclude: Sequence[_EndpointState] = ()) -> _EndpointState:
+        now = self._clock()
+        candidates = [ep for ep in self.endpoints if ep not in exclude and self._available(ep, now)]
+        if not candidates:
+            # Everything is open: probe the endpoint that is due soonest rather than failing outright.
+            remaining = [ep for ep in self.endpoints if ep not in exclude] or self.endpoints
+            return min(remaining, key=lambda ep: ep.open_until)
+        best = min(self._score(ep) for ep in candidates)
+        tied = [ep for ep in candidates if self._score(ep) <= best * (1 + 1e-9)]
+        if len(tied) == 1:
+            return tied[0]
+        total = sum(max(ep.config.weight, 1e-6) for ep in tied)
+        mark = self._rng() * total
+        for ep in tied:
+            mark -= max(ep.config.weight, 1e-6)
+            if mark <= 0:
+                return ep
+        return tied[-1]
+
+    async def generate(
+        self,
+        *,
+        model_name: str,
+        messages: List[Message],
+        tools: Optional[List[ToolSpec]] = None,
+        timeout_seconds: int = 60,
+        stream: bool = False,
+        on_text_delta: Callable[[str], None] | None = None,
+        should_abort: Callable[[], bool] | None = None,
+    ) -> AssistantResponse:
+        tried: List[_EndpointState] = []
+        delivered = {"text": False}
+
+        def _delta(text: str) -> None:
+            delivered["text"] = True
+            if on_text_delta is not None:
+                on_text_delta(text)
+
+        while True:
+            ep = self.pick(tried)
+            tried.append(ep)
+            try:
+                return await self._call(
+                    ep,
+                    model_name=ep.config.model_name or model_name,
+                    messages=messages,
+                    tools=tools,
+                    timeout_seconds=timeout_seconds,
+                    stream=stream,
+                    on_text_delta=_delta if on_text_delta is not None else None,
+                    should_abort=should_abort,
+                )
+            except Exception as exc:
+                transient = classify_error(exc, self._classify) is not None
+                if not transient or delivered["text"] or len(tried) >= len(self.endpoints):
+                    raise
+                if should_abort is not None and should_abort():
+                    raise
+
+    async def _call(self, ep: _EndpointState, **kwargs: object) -> AssistantResponse:
+        now = self._clock()
+        probe = self._circuit_state(ep, now) != "closed"
+        if probe:
+            ep.probing = True
+        ep.outstanding += 1
+        _ENDPOINT_OUTSTANDING.set(ep.outstanding, endpoint=ep.name)
+        started = self._clock()
+        try:
+            response = await ep.client.generate(**kwargs)  # type: ignore[arg-type]
+        except Exception as exc:
+            if classify_error(exc, self._classify) is not None:
+                self._record_failure(ep)
+                _ENDPOINT_REQUESTS.inc(endpoint=ep.name, outcome="error")
+            else:
+                # The request itself was rejected (4xx, interrupt): says nothing about endpoint health.
+                _ENDPOINT_REQUESTS.inc(endpoint=ep.name, outcome="rejected")
+            raise
+        finally:
+            ep.outstanding -= 1
+            ep.probing = False if probe else ep.probing
+            _ENDPOINT_OUTSTANDING.set(ep.outstanding, endpoint=ep.name)
+        elapsed = self._clock() - started
+        self._record_success(ep, elapsed)
+        _ENDPOINT_REQUESTS.inc(endpoint=ep.name, outcome="ok")
+        _ENDPOINT_DURATION.observe(elapsed, endpoint=ep.name)
+        return response
+
+    def _record_success(self, ep: _EndpointState, elapsed: float) -> None:
+        alpha = self.config.ewma_alpha
+        ep.ewma_seconds = elapsed if ep.ewma_seconds is None else alpha * elapsed + (1 - alpha) * ep.ewma_seconds
+        ep.consecutive_failures = 0
+        if ep.open_until > 0:
+            ep.open_until = 0.0
+            ep.cooldown = 0.0
+            _ENDPOINT_OPEN.set(0, endpoint=ep.name)
+
+    def _record_failure(self, ep: _EndpointState) -> None:
+        ep.consecutive_failures += 1
+        now = self._clock()
+        if 0 < now < ep.open_until:
+            return  # a request sent before the circuit opened; the cooldown already covers it
+        half_open = ep.open_until > 0
+        if half_open or ep.consecutive_failures >= max(1, self.config.failure_threshold):
+            # A failed probe doubles the cooldown, so a dead endpoint is retried less and less often.
+            ep.cooldown = min(self.config.max_cooldown_seconds, ep.cooldown * 2 if half_open else self.config.cooldown_seconds)
+            ep.open_until = now + ep.cooldown
+            _ENDPOINT_OPEN.set(1, endpoint=ep.name)
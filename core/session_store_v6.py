@@ -1,15 +1,20 @@
 from __future__ import annotations
 
 import json
+import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import List
 from uuid import uuid4
 
+from .metrics import REGISTRY
 from .types import Message
 
 
+_SAVES = REGISTRY.counter("agent_session_saves_total", "Session save calls by outcome.", ("outcome",))
+_SAVE_DURATION = REGISTRY.histogram("agent_session_save_duration_seconds", "Session render + write time.")
+
 _SESSION_META_START = "<!-- AGENT_LOOP_V6_META"
 _SESSION_META_END = "-->"
 _MESSAGES_START = "<!-- AGENT_LOOP_V6_MESSAGES_START -->"
@@ -44,6 +49,10 @@ class SessionRecord:
     last_usage_source: str = "none"
     last_compaction_session_tokens: int = 0
     last_compaction_working_prompt_tokens: int = 0
+    session_cached_prompt_tokens: int = 0
+    session_cache_write_tokens: int = 0
+    # "auto" titles are re-derived from the first request on every save; "model" titles are kept.
+    title_source: str = "auto"
 
 
 class SessionStoreV6:
@@ -123,9 +132,23 @@ class SessionStoreV6:
             last_usage_source=str(meta.get("last_usage_source", "none") or "none"),
             last_compaction_session_tokens=int(meta.get("last_compaction_session_tokens", 0) or 0),
             last_compaction_working_prompt_tokens=int(meta.get("last_compaction_working_prompt_tokens", 0) or 0),
+            session_cached_prompt_tokens=int(meta.get("session_cached_prompt_tokens", 0) or 0),
+            session_cache_write_tokens=int(meta.get("session_cache_write_tokens", 0) or 0),
+            title_source=str(meta.get("title_source", "auto") or "auto"),
         )
 
     def save(self, record: SessionRecord) -> bool:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            saved = self._save(record)
+            outcome = "saved" if saved else "skipped"
+            return saved
+        finally:
+            _SAVES.inc(outcome=outcome)
+            _SAVE_DURATION.observe(time.perf_counter() - started)
+
+    def _save(self, record: SessionRecord) -> bool:
         if not self._has_meaningful_user_message(record.messages):
             # Enforce "no empty session files".
             try:
@@ -152,6 +175,9 @@ class SessionStoreV6:
             "last_usage_source": str(record.last_usage_source),
             "last_compaction_session_tokens": int(record.last_compaction_session_tokens),
             "last_compaction_working_prompt_tokens": int(record.last_compaction_working_prompt_tokens),
+            "session_cached_prompt_tokens": int(record.session_cached_prompt_tokens),
+            "session_cache_write_tokens": int(record.session_cache_write_tokens),
+            "title_source": str(record.title_source),
         }
         readable = self._render_readable(record.messages)
         content = (
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from .fs_watcher import FileChangeEvent
 
 
 @dataclass(frozen=True)
@@ -14,6 +22,27 @@ class SkillDefinition:
     license: str | None = None
 
 
+@dataclass(frozen=True)
+class SkillMetadata:
+    # Startup index entry: everything <available_skills> needs, without the skill body.
+    name: str
+    path: str
+    description: str
+    license: str | None = None
+    mtime_ns: int = 0
+    size: int = 0
+
+
+# Frontmatter + first description line comfortably fit in this; longer headers fall back to a full read.
+HEADER_READ_BYTES = 8 * 1024
+_INDEX_FORMAT_VERSION = 1
+
+
+def default_index_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return str(Path(cache_home) / "agent_loop" / "skill_index")
+
+
 def _strip_quotes(value: str) -> str:
     value = value.strip()
     if len(value) >= 2 and value[0] == value[-1] and value[0] in {'"', "'"}:
@@ -63,42 +92,244 @@ def _extract_description(name: str, content: str, metadata: dict[str, str]) -> s
     return f"Skill instructions for {name}."
 
 
+def _read_header(skill_md: Path, max_bytes: int) -> Tuple[str, bool]:
+    with skill_md.open("rb") as fh:
+        raw = fh.read(max_bytes + 1)
+    complete = len(raw) <= max_bytes
+    text = raw[:max_bytes].decode("utf-8", errors="ignore")
+    return text, complete
+
+
+def _parse_skill_metadata(skill_md: Path, *, header_bytes: int = HEADER_READ_BYTES) -> SkillMetadata | None:
+    name = skill_md.parent.name
+    try:
+        st = skill_md.stat()
+        header, complete = _read_header(skill_md, header_bytes)
+        header = header.strip()
+        metadata, body = _extract_frontmatter(header)
+        frontmatter_open = header.startswith("---") and not metadata
+        if not complete and (not header or frontmatter_open):
+            # Frontmatter (or the first content line) did not fit in the bounded read.
+            header = skill_md.read_text(encoding="utf-8").strip()
+            metadata, body = _extract_frontmatter(header)
+    except (OSError, UnicodeDecodeError):
+        return None
+    if not header:
+        return None
+    return SkillMetadata(
+        name=name,
+        path=str(skill_md),
+        description=_extract_description(name, body or header, metadata),
+        license=metadata.get("license"),
+        mtime_ns=st.st_mtime_ns,
+        size=st.st_size,
+    )
+
+
 class SkillLoader:
-    def __init__(self, skills_dir: str | None) -> None:
+    def __init__(
+        self,
+        skills_dir: str | None,
+        *,
+        body_cache_size: int = 16,
+        index_cache_dir: str | None = None,
+        use_index_cache: bool = False,
+    ) -> None:
         self.skills_dir = skills_dir
-        self._skills: Dict[str, SkillDefinition] = {}
+        self.body_cache_size = max(1, body_cache_size)
+        self.index_cache_dir = index_cache_dir or default_index_cache_dir()
+        self.use_index_cache = use_index_cache
+        self._skills: Dict[str, SkillMetadata] = {}
+        self._bodies: "OrderedDict[str, SkillDefinition]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped whenever the skill set changes so prompt builders can cache rendered blocks.
+        self.version = 0
+        self.body_loads = 0
+        self.index_cache_hit = False
+        self._base = str(Path(skills_dir).expanduser().resolve()) if skills_dir else None
         if skills_dir:
             self._skills = self._load(skills_dir)
 
+    def reload(self) -> None:
+        if not self.skills_dir:
+            return
+        skills = self._load(self.skills_dir)
+        with self._lock:
+            self._skills = skills
+            self._bodies.clear()
+            self.version += 1
+
+    def on_file_event(self, event: "FileChangeEvent") -> None:
+        # Fed by core.fs_watcher: only changes under skills_dir touch the index.
+        base = self._base
+        if base is None:
+            return
+        path = event.path
+        if path != base and not path.startswith(base + os.sep) and not base.startswith(path + os.sep):
+            return
+        if os.path.basename(path) == "SKILL.md":
+            self._reload_one(Path(path))
+            return
+        if event.is_dir or event.kind == "overflow":
+            self.reload()
+
+    def _reload_one(self, skill_md: Path) -> None:
+        skill = _parse_skill_metadata(skill_md)
+        with self._lock:
+            skills = dict(self._skills)
+            name = skill_md.parent.name
+            if skill is None:
+                skills.pop(name, None)
+            else:
+                skills[skill.name] = skill
+            self._bodies.pop(name, None)
+            self._skills = skills
+            self.version += 1
+
+    def _index_cache_path(self, base: Path) -> Path:
+        digest = hashlib.sha1(str(base).encode("utf-8")).hexdigest()[:16]
+        return Path(self.index_cache_dir) / f"skills_{digest}.json"
+
+    def _read_index_cache(self, base: Path) -> dict | None:
+        if not self.use_index_cache:
+            return None
+        try:
+            data = json.loads(self._index_cache_path(base).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != _INDEX_FORMAT_VERSION:
+            return None
+        if data.get("base") != str(base):
+            return None
+        return data
+
+    def _write_index_cache(self, base: Path, dir_mtimes: Dict[str, int], skills: List[SkillMetadata]) -> None:
+        if not self.use_index_cache:
+            return
+        target = self._index_cache_path(base)
+        payload = {
+            "version": _INDEX_FORMAT_VERSION,
+            "base": str(base),
+            "dirs": dir_mtimes,
+            "skills": [asdict(skill) for skill in skills],
+        }
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix(f".tmp{os.getpid()}")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, target)
+        except OSError:
+            return
+
     @staticmethod
-    def _load(skills_dir: str) -> Dict[str, SkillDefinition]:
+    def _dirs_unchanged(dir_mtimes: Dict[str, int]) -> bool:
+        # Directory mtime changes whenever an entry is added/removed/renamed, so an unchanged set of
+        # directory mtimes means the set of SKILL.md files is unchanged (no listdir needed).
+        for path, mtime_ns in dir_mtimes.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    @staticmethod
+    def _scan_tree(base: Path) -> Tuple[Dict[str, int], List[Path]]:
+        dir_mtimes: Dict[str, int] = {}
+        skill_files: List[Path] = []
+        for dirpath, _dirnames, filenames in os.walk(base):
+            try:
+                dir_mtimes[dirpath] = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                continue
+            if "SKILL.md" in filenames:
+                skill_files.append(Path(dirpath) / "SKILL.md")
+        return dir_mtimes, sorted(skill_files)
+
+    def _load(self, skills_dir: str) -> Dict[str, SkillMetadata]:
         base = Path(skills_dir).expanduser().resolve()
         if not base.exists() or not base.is_dir():
             return {}
 
-        found: Dict[str, SkillDefinition] = {}
-        for skill_md in sorted(base.rglob("SKILL.md")):
-            name = skill_md.parent.name
-            raw_text = skill_md.read_text(encoding="utf-8").strip()
-            if not raw_text:
+        cached = self._read_index_cache(base)
+        cached_by_path: Dict[str, SkillMetadata] = {}
+        if cached is not None:
+            for item in cached.get("skills", []):
+                try:
+                    meta = SkillMetadata(**item)
+                except TypeError:
+                    continue
+                cached_by_path[meta.path] = meta
+
+        cached_dirs = cached.get("dirs") if cached is not None else None
+        if isinstance(cached_dirs, dict) and cached_dirs and self._dirs_unchanged(cached_dirs):
+            dir_mtimes = {str(k): int(v) for k, v in cached_dirs.items()}
+            skill_files = sorted(Path(path) for path in cached_by_path)
+            self.index_cache_hit = True
+        else:
+            dir_mtimes, skill_files = self._scan_tree(base)
+            self.index_cache_hit = False
+
+        found: Dict[str, SkillMetadata] = {}
+        entries: List[SkillMetadata] = []
+        dirty = not self.index_cache_hit
+        for skill_md in skill_files:
+            previous = cached_by_path.get(str(skill_md))
+            try:
+                st = skill_md.stat()
+            except OSError:
+                dirty = True
+                continue
+            if previous is not None and previous.mtime_ns == st.st_mtime_ns and previous.size == st.st_size:
+                meta: SkillMetadata | None = previous
+            else:
+                meta = _parse_skill_metadata(skill_md)
+                dirty = True
+            if meta is None:
                 continue
-            metadata, body = _extract_frontmatter(raw_text)
-            description = _extract_description(name, body or raw_text, metadata)
-            license_value = metadata.get("license")
-            found[name] = SkillDefinition(
-                name=name,
-                path=str(skill_md),
-                content=raw_text,
-                description=description,
-                license=license_value,
-            )
+            entries.append(meta)
+            found[meta.name] = meta
+        if dirty:
+            self._write_index_cache(base, dir_mtimes, entries)
         return found
 
     def list_skill_names(self) -> List[str]:
         return sorted(self._skills.keys())
 
-    def list_skills(self) -> List[SkillDefinition]:
-        return [self._skills[name] for name in self.list_skill_names()]
+    def list_skills(self) -> List[SkillMetadata]:
+        skills = self._skills
+        return [skills[name] for name in sorted(skills.keys())]
 
-    def get(self, name: str) -> SkillDefinition | None:
+    def has(self, name: str) -> bool:
+        return name in self._skills
+
+    def get_metadata(self, name: str) -> SkillMetadata | None:
         return self._skills.get(name)
+
+    def get(self, name: str) -> SkillDefinition | None:
+        meta = self._skills.get(name)
+        if meta is None:
+            return None
+        with self._lock:
+            cached = self._bodies.get(name)
+            if cached is not None and cached.path == meta.path:
+                self._bodies.move_to_end(name)
+                return cached
+        try:
+            raw_text = Path(meta.path).read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        skill = SkillDefinition(
+            name=meta.name,
+            path=meta.path,
+            content=raw_text,
+            description=meta.description,
+            license=meta.license,
+        )
+        with self._lock:
+            self.body_loads += 1
+            self._bodies[name] = skill
+            self._bodies.move_to_end(name)
+            while len(self._bodies) > self.body_cache_size:
+                self._bodies.popitem(last=False)
+        return skill
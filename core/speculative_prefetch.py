@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from .metrics import REGISTRY
+from .session_store_v6 import SessionStoreV6
+from .tool_cache import ToolResultCache
+from .types import Message, ToolCall
+
+_PREFETCHES = REGISTRY.counter("agent_prefetch_total", "Speculative tool prefetches by outcome.", ("outcome",))
+_PREFETCH_WASTED = REGISTRY.counter("agent_prefetch_wasted_seconds_total", "Tool time spent on prefetches nobody used.")
+
+# Tools whose output names files the model tends to open next.
+_SOURCE_TOOLS = ("ls", "grep", "find", "read")
+_GREP_HIT = re.compile(r"^(?P<file>.+?):(?P<line>\d+): ")
+_READ_CONTINUE = re.compile(r"\[\d+ more lines in file\. Use offset=(?P<offset>\d+) to continue\.\]\s*$")
+
+# Read argument shapes: the whole file, or a window starting `before` lines above a grep hit.
+ReadShape = Tuple[str, int, int]
+_WHOLE: ReadShape = ("whole", 0, 0)
+
+
+@dataclass(frozen=True)
+class PrefetchConfig:
+    top_k: int = 3
+    # Skip prefetching after a tool whose learned P(next call is a read) is below this.
+    min_probability: float = 0.2
+    # Prior read probability for a source tool with no history, weighted as this many observations.
+    prior_probability: float = 0.6
+    prior_weight: float = 4.0
+
+
+@dataclass(frozen=True)
+class Prediction:
+    tool: str
+    args: Dict[str, object]
+    score: float
+    rule: str
+
+
+def _tool_calls(message: Message) -> List[ToolCall]:
+    calls: List[ToolCall] = []
+    for raw in message.get("tool_calls") or []:  # type: ignore[union-attr]
+        if not isinstance(raw, dict):
+            continue
+        function = raw.get("function") or {}
+        try:
+            args = json.loads(function.get("arguments") or "{}")
+        except (TypeError, ValueError):
+            continue
+        if isinstance(args, dict):
+            calls.append(ToolCall(id=str(raw.get("id", "")), name=str(function.get("name", "")), arguments=args))
+    return calls
+
+
+def _grep_hits(output: str) -> List[Tuple[str, int]]:
+    hits: List[Tuple[str, int]] = []
+    seen = set()
+    for line in output.splitlines():
+        match = _GREP_HIT.match(line)
+        if match is None or match.group("file") in seen:
+            continue
+        seen.add(match.group("file"))
+        hits.append((match.group("file"), int(match.group("line"))))
+    return hits
+
+
+def _listed_files(tool: str, output: str) -> List[str]:
+    if tool == "ls":
+        return [line for line in output.splitlines() if line and not line.endswith("/") and line != "(empty directory)"]
+    if tool == "find":
+        return [line for line in output.splitlines() if line and line != "No files found matching pattern"]
+    return []
+
+
+def _base_dir(tool: str, args: Dict[str, object]) -> Path:
+    cwd = args.get("cwd")
+    target = Path(str(args.get("path", ".")))
+    if not target.is_absolute():
+        target = Path(str(cwd) if cwd is not None else os.getcwd()) / target
+    if tool == "grep" and target.is_file():
+        return target.parent
+    return target
+
+
+def _read_shape(source_tool: str, source_output: str, read_args: Dict[str, object]) -> ReadShape:
+    offset, limit = read_args.get("offset"), read_args.get("limit")
+    if offset is None and limit is None:
+        return _WHOLE
+    if source_tool != "grep":
+        return ("other", 0, 0)
+    path = str(read_args.get("path", ""))
+    for file, line in _grep_hits(source_output):
+        if path.endswith(file):
+            try:
+                return ("window", line - int(offset or 1), int(limit or 0))
+            except (TypeError, ValueError):
+                break
+    return ("other", 0, 0)
+
+
+class TransitionStats:
+    """How often each tool is followed by a read, and which read argument shape follows it."""
+
+    def __init__(self) -> None:
+        self.followed: Dict[str, int] = defaultdict(int)
+        self.followed_by_read: Dict[str, int] = defaultdict(int)
+        self.read_shapes: Dict[str, Counter] = defaultdict(Counter)
+
+    def observe(self, source_tool: str, source_output: str, next_calls: Sequence[ToolCall]) -> None:
+        if source_tool not in _SOURCE_TOOLS:
+            return
+        self.followed[source_tool] += 1
+        reads = [call for call in next_calls if call.name == "read"]
+        if reads:
+            self.followed_by_read[source_tool] += 1
+        for call in reads:
+            shape = _read_shape(source_tool, source_output, call.arguments)
+            if shape[0] != "other":
+                self.read_shapes[source_tool][shape] += 1
+
+    def observe_messages(self, messages: Sequence[Message]) -> None:
+        """Learn from one transcript: each tool-call round against the round that follows its results."""
+        rounds: List[Tuple[List[ToolCall], Dict[str, str]]] = []
+        for message in messages:
+            role = message.get("role")
+            if role == "assistant":
+                rounds.append((_tool_calls(message), {}))
+            elif role == "tool" and rounds:
+                rounds[-1][1][str(message.get("tool_call_id", ""))] = str(message.get("content", ""))
+            elif role == "user":
+                rounds.append(([], {}))
+        for (calls, outputs), (next_calls, _) in zip(rounds, rounds[1:]):
+            for call in calls:
+                self.observe(call.name, outputs.get(call.id, ""), next_calls)
+
+    def read_probability(self, tool: str, config: PrefetchConfig) -> float:
+        prior = config.prior_probability * config.prior_weight
+        return (self.followed_by_read.get(tool, 0) + prior) / (self.followed.get(tool, 0) + config.prior_weight)
+
+    def preferred_shape(self, tool: str) -> ReadShape:
+        shapes = self.read_shapes.get(tool)
+        if not shapes:
+            return _WHOLE
+        return shapes.most_common(1)[0][0]
+
+    @classmethod
+    def from_sessions(cls, sessions_dir: str, *, max_sessions: int = 200) -> "TransitionStats":
+        stats = cls()
+        root = Path(sessions_dir)
+        if not root.is_dir():
+            return stats
+        store = SessionStoreV6(sessions_dir)
+        paths = sorted(root.glob("*.md"), key=lambda path: path.stat().st_mtime, reverse=True)[:max_sessions]
+        for path in paths:
+            try:
+                stats.observe_messages(store.load(path.stem).messages)
+            except Exception:  # noqa: BLE001
+                continue
+        return stats
+
+
+def predict_next_reads(
+    calls: Sequence[Tuple[ToolCall, str]],
+    stats: TransitionStats,
+    config: PrefetchConfig,
+) -> List[Prediction]:
+    """Top-K read calls likely to follow these (call with effective args, output) pairs."""
+    predictions: Dict[str, Prediction] = {}
+
+    def _add(args: Dict[str, object], score: float, rule: str) -> None:
+        key = ToolResultCache.make_key("read", args)
+        current = predictions.get(key)
+        if current is None or current.score < score:
+            predictions[key] = Prediction(tool="read", args=args, score=score, rule=rule)
+
+    for call, output in calls:
+        if call.name not in _SOURCE_TOOLS or output.startswith(("Tool execution error", "Tool not found")):
+            continue
+        probability = stats.read_probability(call.name, config)
+        if probability < config.min_probability:
+            continue
+        cwd = call.arguments.get("cwd")
+        extra = {"cwd": cwd} if cwd is not None else {}
+        if call.name == "read":
+            # A truncated read is usually continued with the same window size.
+            match = _READ_CONTINUE.search(output)
+            if match is not None:
+                args = {k: v for k, v in call.arguments.items() if k != "offset"}
+                _add({**args, "offset": int(match.group("offset"))}, probability, "read_continue")
+            continue
+        base = _base_dir(call.name, call.arguments)
+        if call.name == "grep":
+            shape = stats.preferred_shape("grep")
+            for rank, (file, line) in enumerate(_grep_hits(output)):
+                args: Dict[str, object] = {"path": str(base / file), **extra}
+                if shape[0] == "window":
+                    args.update({"offset": max(1, line - shape[1]), "limit": shape[2]} if shape[2] else {"offset": max(1, line - shape[1])})
+                _add(args, probability / (rank + 1), "grep_hit")
+        else:
+            for rank, file in enumerate(_listed_files(call.name, output)):
+                _add({"path": str(base / file), **extra}, probability / (rank + 1), f"{call.name}_entry")
+    ranked = sorted(predictions.values(), key=lambda p: p.score, reverse=True)
+    return ranked[: max(0, config.top_k)]
+
+
+@dataclass
+class _Inflight:
+    prediction: Prediction
+    started: float
+    task: "asyncio.Task[None] | None" = None
+    seconds: float = 0.0
+    ok: bool = False
+
+
+class SpeculativePrefetcher:
+    """Runs predicted read-only calls into the tool cache while the model thinks, then scores the guesses."""
+
+    def __init__(
+        self,
+        cache: ToolResultCache,
+        handlers: Dict[str, Callable[[Dict[str, object]], object]],
+        *,
+        stats: TransitionStats | None = None,
+        config: PrefetchConfig | None = None,
+    ) -> None:
+        self.cache = cache
+        self.handlers = handlers
+        self.stats = stats or TransitionStats()
+        self.config = config or PrefetchConfig()
+        self._inflight: Dict[str, _Inflight] = {}
+        self._last_calls: List[Tuple[ToolCall, str]] = []
+        self.prefetched = 0
+        self.hits = 0
+        self.wasted = 0
+        self.wasted_seconds = 0.0
+
+    def start(self, calls: Sequence[Tuple[ToolCall, str]]) -> List[Prediction]:
+        """Schedule prefetches for the round just executed; call before the next LLM request."""
+        self._last_calls = list(calls)
+        scheduled: List[Prediction] = []
+        for prediction in predict_next_reads(calls, self.stats, self.config):
+            handler = self.handlers.get(prediction.tool)
+            key = ToolResultCache.make_key(prediction.tool, prediction.args)
+            if handler is None or key in self._inflight or self.cache.peek(prediction.tool, prediction.args):
+                continue
+            inflight = _Inflight(prediction=prediction, started=time.perf_counter())
+            inflight.task = asyncio.create_task(self._run(handler, inflight))
+            self._inflight[key] = inflight
+            scheduled.append(prediction)
+        return scheduled
+
+    async def _run(self, handler: Callable[[Dict[str, object]], object], inflight: _Inflight) -> None:
+        prediction = inflight.prediction
+        deps = self.cache.capture_deps(prediction.tool, prediction.args)
+        try:
+            output = await asyncio.to_thread(handler, dict(prediction.args))
+        except Exception:  # noqa: BLE001
+            # The model may never ask for it; if it does, the real call reports the error itself.
+            _PREFETCHES.inc(outcome="error")
+            return
+        finally:
+            inflight.seconds = time.perf_counter() - inflight.started
+        if not self.cache.store(prediction.tool, prediction.args, str(output), deps=deps):
+            # The file changed while it was being read; the real call will read it again.
+            _PREFETCHES.inc(outcome="stale")
+            return
+        inflight.ok = True
+        self.prefetched += 1
+
+    async def settle(self, next_calls: Iterable[Tuple[str, Dict[str, object]]]) -> None:
+        """Score against the calls the model actually made; call before running any of them."""
+        wanted = {ToolResultCache.make_key(name, args) for name, args in next_calls}
+        for source, output in self._last_calls:
+            self.stats.observe(source.name, output, [ToolCall(id="", name=name, arguments=args) for name, args in next_calls])
+        self._last_calls = []
+        inflight, self._inflight = self._inflight, {}
+        for key, item in inflight.items():
+            assert item.task is not None
+            if key not in wanted:
+                self._discard(item)
+                continue
+            # Finish (rather than duplicate) a prefetch the model is about to ask for; it also lands before
+            # any write in this round, whose invalidation then applies to it as usual.
+            await asyncio.shield(item.task)
+            if item.ok:
+                self.hits += 1
+                _PREFETCHES.inc(outcome="hit")
+
+    def cancel(self) -> None:
+        """Drop everything still pending, e.g. when the turn ends or is interrupted."""
+        inflight, self._inflight = self._inflight, {}
+        self._last_calls = []
+        for item in inflight.values():
+            self._discard(item)
+
+    def _discard(self, item: _Inflight) -> None:
+        seconds = item.seconds
+        if item.task is not None and not item.task.done():
+            item.task.cancel()
+            seconds = time.perf_counter() - item.started
+            _PREFETCHES.inc(outcome="cancelled")
+        elif item.ok:
+            _PREFETCHES.inc(outcome="wasted")
+        self.wasted += 1
+        self.wasted_seconds += seconds
+        _PREFETCH_WASTED.inc(seconds)
+
+    def report(self) -> Dict[str, object]:
+        used = self.hits + self.wasted
+        return {
+            "prefetched": self.prefetched,
+            "hits": self.hits,
+            "wasted": self.wasted,
+            "hit_rate": round(self.hits / used, 3) if used else 0.0,
+            "wasted_seconds": round(self.wasted_seconds, 3),
+        }
@@ -26,12 +26,17 @@ class BaseTool(ABC):
     def handler(self, params: Dict[str, object]) -> ToolHandlerResult:
         raise NotImplementedError
 
+    @property
+    def read_only(self) -> bool:
+        return False
+
     def to_spec(self) -> ToolSpec:
         return ToolSpec(
             name=self.name,
             description=self.description,
             parameters=self.parameters,
             handler=self.handler,
+            read_only=self.read_only,
         )
 
 
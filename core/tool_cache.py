@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Deque, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .fs_watcher import FileChangeEvent, FileWatcher
+
+Fingerprint = Optional[Tuple[int, ...]]
+
+# tool name -> whether its `path` argument is scanned recursively (grep/find walk the tree, ls/read do not).
+_PATH_DEPENDENCY_RECURSIVE: Dict[str, bool] = {
+    "read": False,
+    "ls": False,
+    "grep": True,
+    "find": True,
+}
+
+
+@dataclass
+class _CacheEntry:
+    output: str
+    # resolved path -> (recursive, fingerprint at store time)
+    deps: Dict[str, Tuple[bool, Fingerprint]] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class CapturedDeps:
+    deps: Dict[str, Tuple[bool, Fingerprint]]
+    # Cache generation when the deps were captured; changes seen after it can veto the store.
+    generation: int
+
+
+def _resolve(path: str, cwd: str | None) -> str:
+    # Mirrors tools.local_ops.resolve_target without importing the tools package into core.
+    target = Path(path)
+    if not target.is_absolute():
+        target = Path(cwd or os.getcwd()) / target
+    return str(target.resolve())
+
+
+def _fingerprint(path: str, *, recursive: bool) -> Fingerprint:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not recursive or not os.path.isdir(path):
+        return (st.st_mtime_ns, st.st_size)
+    count = 0
+    newest = st.st_mtime_ns
+    total_size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in [*dirnames, *filenames]:
+            try:
+                child = os.stat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            count += 1
+            newest = max(newest, child.st_mtime_ns)
+            total_size += child.st_size
+    return (count, newest, total_size)
+
+
+def _is_same_or_ancestor(ancestor: str, path: str) -> bool:
+    if ancestor == path:
+        return True
+    prefix = ancestor if ancestor.endswith(os.sep) else ancestor + os.sep
+    return path.startswith(prefix)
+
+
+def _dep_affected(dep: str, recursive: bool, changed: str) -> bool:
+    if _is_same_or_ancestor(changed, dep):
+        return True
+    if recursive:
+        return _is_same_or_ancestor(dep, changed)
+    # Non-recursive directory listings only see their direct children.
+    return os.path.dirname(changed) == dep
+
+
+class ToolResultCache:
+    """Per-session memo of read-only tool outputs, validated by file fingerprints."""
+
+    def __init__(self, *, max_entries: int = 256) -> None:
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._watcher: "FileWatcher | None" = None
+        # Every invalidation bumps the generation and logs the changed path (None = everything), so a store can tell
+        # whether its deps changed while the tool ran: watched deps have no fingerprint to catch that later.
+        self._generation = 0
+        self._changes: Deque[Tuple[int, str | None]] = deque(maxlen=1024)
+
+    def attach_watcher(self, watcher: "FileWatcher") -> None:
+        # With a watcher, deps under its root are invalidated by change events instead of per-lookup stat calls.
+        self._watcher = watcher
+        watcher.subscribe(self.on_file_event)
+
+    def detach_watcher(self) -> None:
+        if self._watcher is not None:
+            self._watcher.unsubscribe(self.on_file_event)
+        self._watcher = None
+
+    def on_file_event(self, event: "FileChangeEvent") -> None:
+        self.invalidate_path(event.path)
+
+    @staticmethod
+    def make_key(tool_name: str, args: Dict[str, object]) -> str:
+        normalized = dict(args)
+        cwd_raw = normalized.pop("cwd", None)
+        cwd = _resolve(str(cwd_raw) if cwd_raw is not None else ".", None)
+        if "path" in normalized:
+            normalized["path"] = _resolve(str(normalized["path"]), cwd)
+        payload = json.dumps(normalized, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return f"{tool_name}\x00{payload}\x00{cwd}"
+
+    @staticmethod
+    def dependency_paths(tool_name: str, args: Dict[str, object]) -> Dict[str, bool]:
+        recursive = _PATH_DEPENDENCY_RECURSIVE.get(tool_name, False)
+        cwd_raw = args.get("cwd")
+        cwd = str(cwd_raw) if cwd_raw is not None else None
+        path_raw = args.get("path", "." if tool_name == "ls" else None)
+        if path_raw is None:
+            return {}
+        return {_resolve(str(path_raw), cwd): recursive}
+
+    def _is_fresh(self, entry: _CacheEntry) -> bool:
+        watcher = self._watcher
+        for path, (recursive, fingerprint) in entry.deps.items():
+            if watcher is not None and watcher.covers(path):
+                continue
+            if _fingerprint(path, recursive=recursive) != fingerprint:
+                return False
+        return True
+
+    def lookup(self, tool_name: str, args: Dict[str, object]) -> str | None:
+        key = self.make_key(tool_name, args)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and self._is_fresh(entry):
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+            return entry.output
+        with self._lock:
+            if entry is not None:
+                self._entries.pop(key, None)
+                self.invalidations += 1
+            self.misses += 1
+        return None
+
+    def peek(self, tool_name: str, args: Dict[str, object]) -> bool:
+        """Whether a fresh entry exists, without counting a hit or miss."""
+        with self._lock:
+            entry = self._entries.get(self.make_key(tool_name, args))
+        return entry is not None and self._is_fresh(entry)
+
+    def capture_deps(self, tool_name: str, args: Dict[str, object]) -> CapturedDeps:
+        with self._lock:
+            generation = self._generation
+        watcher = self._watcher
+        deps: Dict[str, Tuple[bool, Fingerprint]] = {}
+        for path, recursive in self.dependency_paths(tool_name, args).items():
+            if watcher is not None and watcher.covers(path):
+                # Watched paths skip the (possibly O(tree)) fingerprint walk entirely.
+                deps[path] = (recursive, None)
+            else:
+                deps[path] = (recursive, _fingerprint(path, recursive=recursive))
+        return CapturedDeps(deps=deps, generation=generation)
+
+    def _changed_since(self, captured: CapturedDeps) -> bool:
+        if captured.generation == self._generation:
+            return False
+        if not self._changes or self._changes[0][0] > captured.generation + 1:
+            return True  # the change log no longer reaches back that far
+        for generation, changed in self._changes:
+            if generation <= captured.generation:
+                continue
+            if changed is None:
+                return True
+            if any(_dep_affected(dep, recursive, changed) for dep, (recursive, _) in captured.deps.items()):
+                return True
+        return False
+
+    def store(
+        self,
+        tool_name: str,
+        args: Dict[str, object],
+        output: str,
+        *,
+        deps: CapturedDeps | None = None,
+    ) -> bool:
+        """Memoize ``output``; refused (False) when a dep changed after ``deps`` were captured.
+
+        Callers should capture deps *before* running the tool so a concurrent edit is never masked.
+        """
+        if deps is None:
+            deps = self.capture_deps(tool_name, args)
+        key = self.make_key(tool_name, args)
+        with self._lock:
+            if self._changed_since(deps):
+                return False
+            self._entries[key] = _CacheEntry(output=output, deps=deps.deps)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def invalidate_path(self, path: str | Path) -> int:
+        changed = _resolve(str(path), None)
+        with self._lock:
+            self._generation += 1
+            self._changes.append((self._generation, changed))
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if any(_dep_affected(dep, recursive, changed) for dep, (recursive, _) in entry.deps.items())
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._changes.append((self._generation, None))
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
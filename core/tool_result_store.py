@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+HANDLE_PREFIX = "tr_"
+_HANDLE_HEX_CHARS = 24
+
+
+@dataclass
+class ToolResultGovernorConfig:
+    enabled: bool = True
+    max_inline_tokens: int = 4000
+    preview_head_chars: int = 1200
+    preview_tail_chars: int = 400
+    store_dir: str | None = None
+
+
+def estimate_text_tokens(text: str) -> int:
+    # Same rough ratio as BaseAgentLoop._estimate_tokens_from_obj (~4 chars per token).
+    return max(1, int(math.ceil(len(text) / 4)))
+
+
+def default_store_dir() -> str:
+    return str(Path(tempfile.gettempdir()) / "agent_loop_tool_results")
+
+
+class ToolResultBlobStore:
+    """Content-addressed store for oversized tool outputs (one UTF-8 file per sha256)."""
+
+    def __init__(self, root_dir: str | None = None) -> None:
+        self.root = Path(root_dir or default_store_dir()).expanduser()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def handle_for(text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{HANDLE_PREFIX}{digest[:_HANDLE_HEX_CHARS]}"
+
+    @staticmethod
+    def is_valid_handle(handle: str) -> bool:
+        if not handle.startswith(HANDLE_PREFIX):
+            return False
+        digest = handle[len(HANDLE_PREFIX) :]
+        return len(digest) == _HANDLE_HEX_CHARS and all(ch in "0123456789abcdef" for ch in digest)
+
+    def path_for(self, handle: str) -> Path:
+        if not self.is_valid_handle(handle):
+            raise ValueError(f"Invalid tool result handle: {handle}")
+        return self.root / f"{handle}.txt"
+
+    def put(self, text: str) -> str:
+        handle = self.handle_for(text)
+        target = self.path_for(handle)
+        if target.exists():
+            # Same content -> same handle, nothing to rewrite.
+            return handle
+        tmp = target.with_suffix(f".tmp{os.getpid()}")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, target)
+        return handle
+
+    def exists(self, handle: str) -> bool:
+        try:
+            return self.path_for(handle).exists()
+        except ValueError:
+            return False
+
+
+class ToolResultGovernor:
+    def __init__(self, config: ToolResultGovernorConfig | None = None) -> None:
+        self.config = config or ToolResultGovernorConfig()
+        self._store: ToolResultBlobStore | None = None
+        self.spilled_count = 0
+        self.spilled_chars = 0
+
+    @property
+    def store(self) -> ToolResultBlobStore:
+        if self._store is None:
+            self._store = ToolResultBlobStore(self.config.store_dir)
+        return self._store
+
+    def should_spill(self, output: str) -> bool:
+        if not self.config.enabled:
+            return False
+        return estimate_text_tokens(output) > max(1, self.config.max_inline_tokens)
+
+    def govern(self, tool_name: str, output: str) -> str:
+        if not self.should_spill(output):
+            return output
+        handle = self.store.put(output)
+        self.spilled_count += 1
+        self.spilled_chars += len(output)
+        return self._render_preview(tool_name, output, handle)
+
+    def _render_preview(self, tool_name: str, output: str, handle: str) -> str:
+        lines = output.splitlines()
+        head = output[: max(0, self.config.preview_head_chars)]
+        tail_chars = max(0, self.config.preview_tail_chars)
+        tail = output[-tail_chars:] if tail_chars and len(output) > len(head) + tail_chars else ""
+        parts = [
+            f"[tool result stored: tool={tool_name} handle={handle} "
+            f"chars={len(output)} lines={len(lines)} ~tokens={estimate_text_tokens(output)}]",
+            head,
+        ]
+        if tail:
+            parts.extend(["[...]", tail])
+        parts.append(
+            f'[Output truncated. Use read_tool_result(handle="{handle}", offset=1, limit=200) '
+            "to page the full result.]",
+        )
+        return "\n".join(parts)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator
+
+# Span kinds written by the loops: turn, llm_call, tool_call, mcp_request, compaction.
+_CURRENT_SPAN: contextvars.ContextVar["TraceSpan | None"] = contextvars.ContextVar("agent_trace_span", default=None)
+
+
+@dataclass
+class TraceSpan:
+    kind: str
+    name: str
+    span_id: str
+    parent_id: str | None = None
+    turn_id: str | None = None
+    round: int | None = None
+    start: float = 0.0
+    end: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    attrs: Dict[str, object] = field(default_factory=dict)
+
+    def to_event(self) -> Dict[str, object]:
+        event: Dict[str, object] = {
+            "kind": self.kind,
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "turn_id": self.turn_id,
+            "round": self.round,
+            "start": round(self.start, 6),
+            "end": round(self.end, 6),
+            "duration_ms": round((self.end - self.start) * 1000.0, 3),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+        event.update(self.attrs)
+        return event
+
+
+class TraceSink:
+    """Append-only JSONL trace: one line per finished span, timestamps from time.monotonic()."""
+
+    def __init__(self, path: str, *, flush_every: int = 32) -> None:
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(path, "a", encoding="utf-8")  # noqa: SIM115
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # Distinguishes span ids across processes appending to the same file.
+        self._prefix = f"{os.getpid():x}"
+        self.flush_every = max(1, flush_every)
+        self._pending = 0
+        self.events_written = 0
+
+    def next_id(self) -> str:
+        return f"{self._prefix}-{next(self._ids)}"
+
+    def emit(self, event: Dict[str, object]) -> None:
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":"), default=str)
+        with self._lock:
+            if self._fh.closed:
+                return
+            self._fh.write(line + "\n")
+            self.events_written += 1
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._fh.flush()
+                self._pending = 0
+
+    @contextlib.contextmanager
+    def span(
+        self,
+        kind: str,
+        name: str,
+        *,
+        turn_id: str | None = None,
+        round: int | None = None,
+        **attrs: object,
+    ) -> Iterator[TraceSpan]:
+        parent = _CURRENT_SPAN.get()
+        span_id = self.next_id()
+        if turn_id is None:
+            # Root spans (a turn, or a manual /memory compress) start their own turn id.
+            turn_id = parent.turn_id if parent is not None else span_id
+        span = TraceSpan(
+            kind=kind,
+            name=name,
+            span_id=span_id,
+            parent_id=parent.span_id if parent is not None else None,
+            turn_id=turn_id,
+            round=round if round is not None else (parent.round if parent is not None else None),
+            attrs=dict(attrs),
+        )
+        token = _CURRENT_SPAN.set(span)
+        span.start = time.monotonic()
+        try:
+            yield span
+        except BaseException as err:
+            span.attrs["error"] = type(err).__name__
+            raise
+        finally:
+            span.end = time.monotonic()
+            _CURRENT_SPAN.reset(token)
+            self.emit(span.to_event())
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.close()
+
+
+def current_span() -> TraceSpan | None:
+    return _CURRENT_SPAN.get()
+
+
+def trace_span(sink: TraceSink | None, kind: str, name: str, **kwargs: object) -> "contextlib.AbstractContextManager[TraceSpan | None]":
+    # Loops call this unconditionally; without a sink it is a no-op yielding None.
+    if sink is None:
+        return contextlib.nullcontext()
+    return sink.span(kind, name, **kwargs)  # type: ignore[arg-type]
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from collections.abc import Awaitable
 from dataclasses import dataclass, field
-from typing import Callable, Dict, List, Optional, Protocol, Union
+from typing import Callable, Dict, List, Optional, Protocol, Tuple, Union
 
 
 Message = Dict[str, object]
@@ -15,12 +15,36 @@ class ToolCall:
     arguments: Dict[str, object]
 
 
+# Upper bounds (ms) of the inter-chunk gap histogram buckets; the last bucket is open-ended.
+STREAM_GAP_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500)
+
+
+@dataclass(frozen=True)
+class StreamTimings:
+    # All offsets are ms since the request was sent; None when the event never happened.
+    ttfb_ms: float | None = None
+    first_text_ms: float | None = None
+    first_reasoning_ms: float | None = None
+    first_tool_call_ms: float | None = None
+    total_ms: float = 0.0
+    # Time from the first output delta (text/reasoning/tool call) to the end of the stream.
+    generation_ms: float = 0.0
+    chunks: int = 0
+    max_gap_ms: float = 0.0
+    # Counts per STREAM_GAP_BUCKETS_MS bucket plus one overflow bucket.
+    gap_histogram: Tuple[int, ...] = ()
+
+
 @dataclass(frozen=True)
 class AssistantResponse:
     text: str
     tool_calls: List[ToolCall] = field(default_factory=list)
     usage: "TokenUsage | None" = None
     reasoning: str = ""
+    # Wire sizes of the HTTP request body / response body (0 when the client does not report them).
+    request_bytes: int = 0
+    response_bytes: int = 0
+    timings: StreamTimings | None = None
 
 
 @dataclass(frozen=True)
@@ -29,6 +53,9 @@ class TokenUsage:
     completion_tokens: int = 0
     total_tokens: int = 0
     source: str = "provider"
+    # Subset of prompt_tokens served from the provider prompt cache / written into it (0 when not reported).
+    cached_prompt_tokens: int = 0
+    cache_write_tokens: int = 0
 
 
 ToolHandlerResult = Union[str, Awaitable[str]]
@@ -41,6 +68,8 @@ class ToolSpec:
     description: str
     parameters: Dict[str, object]
     handler: ToolHandler
+    # Pure/read-only tools (same args + unchanged files -> same output) may be memoized by loops.
+    read_only: bool = False
 
 
 class LLMClient(Protocol):
@@ -85,7 +85,7 @@ class V5SkillToolsLoop(BaseAgentLoop):
         return self.skill_loader.list_skill_names()
 
     def use_skill(self, name: str) -> bool:
-        if self.skill_loader.get(name) is None:
+        if not self.skill_loader.has(name):
             return False
         self.active_skill_name = name
         return True
@@ -5,9 +5,16 @@ import inspect
 import json
 import re
 import time
-from typing import Awaitable, Callable, Dict, List, Set
+from contextlib import AbstractContextManager, nullcontext
+from typing import Awaitable, Callable, Dict, List, Sequence, Set
 
+from core.fs_watcher import FileWatcher
 from core.mcp_client import MCPManager
+from core.metrics import REGISTRY
+from core.model_router import ModelRouter
+from core.profiler import TurnProfiler
+from core.prompt_builder import SystemPromptBuilder, render_available_skills_block
+from core.rate_limiter import PRIORITY_BACKGROUND, PRIORITY_COMPACTION, current_priority, llm_priority
 from core.short_memory_v6_1 import (
     SUMMARY_TAG,
     ShortMemoryConfig,
@@ -17,11 +24,28 @@ from core.short_memory_v6_1 import (
     split_for_compaction,
 )
 from core.skill_loader import SkillLoader
-from core.types import Message, ToolSpec
+from core.speculative_prefetch import PrefetchConfig, SpeculativePrefetcher, TransitionStats
+from core.tool_cache import ToolResultCache
+from core.tool_result_store import ToolResultGovernor, ToolResultGovernorConfig
+from core.trace import trace_span
+from core.types import AssistantResponse, Message, TokenUsage, ToolCall, ToolSpec
 from tools.bash_tool import BashTool
+from tools.local_ops import DEFAULT_MAX_BYTES, DEFAULT_MAX_LINES, resolve_target, run_read
 from tools.registry import build_tool_registry, tool_specs_for_names
 
 from .base import BaseAgentLoop
+from .subagents import (
+    SPAWN_SUBAGENTS_PARAMETERS,
+    SubagentConfig,
+    SubagentResult,
+    SubagentScheduler,
+    SubagentSpec,
+    parse_subagent_specs,
+    render_subagent_results,
+)
+
+_TOOL_CALLS = REGISTRY.counter("agent_tool_calls_total", "Tool executions by outcome.", ("tool", "outcome"))
+_TOOL_DURATION = REGISTRY.histogram("agent_tool_duration_seconds", "Tool execution wall time.", ("tool",))
 
 
 class V6_1(BaseAgentLoop):
@@ -40,6 +64,17 @@ class V6_1(BaseAgentLoop):
         mcp_manager: MCPManager | None = None,
         mcp_enabled: bool = False,
         skills_dir: str | None = None,
+        skill_index_cache: bool = False,
+        tool_result_config: ToolResultGovernorConfig | None = None,
+        tool_cache_enabled: bool = True,
+        fs_watcher: FileWatcher | None = None,
+        profiler: TurnProfiler | None = None,
+        model_router: ModelRouter | None = None,
+        prefetch_config: PrefetchConfig | None = None,
+        prefetch_stats: TransitionStats | None = None,
+        subagent_config: SubagentConfig | None = None,
+        subagent_scheduler: SubagentScheduler | None = None,
+        tool_allowlist: Sequence[str] | None = None,
         **kwargs: object,
     ) -> None:
         super().__init__(**kwargs)
@@ -53,23 +88,71 @@ class V6_1(BaseAgentLoop):
         self.model_delta_callback = model_delta_callback
         self.model_round_callback = model_round_callback
         self.interrupt_check = interrupt_check
+        # An interrupt inside a tool normally becomes that tool's error result (keeping the transcript valid) and the
+        # turn ends at the next round's interrupt check, before any further LLM call. Throwaway loops (subagents) raise
+        # it straight out of the turn instead, skipping the round's remaining tool calls.
+        self.raise_tool_interrupts = False
         self.short_memory_config = short_memory_config or ShortMemoryConfig()
         self._last_compaction_summary = ""
         self._last_compaction_session_tokens = 0
         self._last_compaction_working_prompt_tokens = 0
         self.raw_messages: List[Message] = []
+        self.tool_result_governor = ToolResultGovernor(tool_result_config)
+        self.tool_cache: ToolResultCache | None = ToolResultCache() if tool_cache_enabled else None
 
         self.mcp_manager = mcp_manager
         self.mcp_enabled = mcp_enabled and mcp_manager is not None
         self._mcp_tools: List[ToolSpec] = []
 
         self._base_system_prompt = self.state.system_prompt
-        self.skill_loader = SkillLoader(skills_dir)
+        # The on-disk metadata index is opt-in (entry points enable it) so library users and tests never write to ~/.cache.
+        self.skill_loader = SkillLoader(skills_dir, use_index_cache=skill_index_cache)
+        self.prompt_builder = SystemPromptBuilder(self._base_system_prompt, self.skill_loader)
         self.active_skill_name: str | None = None
-        self._base_tools: List[ToolSpec] = [*core_tools, BashTool().to_spec(), self._build_read_skill_tool()]
-        self.tools: List[ToolSpec] = list(self._base_tools)
+        self.skills_dir = skills_dir
+        self._base_tools: List[ToolSpec] = [
+            *core_tools,
+            BashTool().to_spec(),
+            self._build_read_skill_tool(),
+            self._build_read_tool_result_tool(),
+        ]
+        self.subagent_scheduler: SubagentScheduler | None = None
+        if subagent_config is not None or subagent_scheduler is not None:
+            self.subagent_scheduler = subagent_scheduler or SubagentScheduler(subagent_config)
+            self._base_tools.append(self._build_spawn_subagents_tool())
+        self.tool_allowlist = frozenset(tool_allowlist) if tool_allowlist is not None else None
+        self.tools: List[ToolSpec] = self._allowed_tools(self._base_tools)
         self._tool_registry: Dict[str, ToolSpec] = build_tool_registry(self.tools)
 
+        # Optional watcher (owned by the caller, typically rooted at default_tool_cwd): change events
+        # invalidate the tool cache and skill index in O(changed files) instead of re-stat-ing the tree.
+        self.fs_watcher = fs_watcher
+        self.profiler = profiler
+        self.model_router = model_router
+        # Speculative reads land in the tool cache, so prefetching needs it (and a `read` tool the allowlist kept).
+        self.prefetcher: SpeculativePrefetcher | None = None
+        read_tool = self._tool_registry.get("read")
+        if prefetch_config is not None and self.tool_cache is not None and read_tool is not None:
+            read_handler = read_tool.handler
+            self.prefetcher = SpeculativePrefetcher(
+                self.tool_cache,
+                {"read": read_handler} if not inspect.iscoroutinefunction(read_handler) else {},
+                stats=prefetch_stats,
+                config=prefetch_config,
+            )
+        if fs_watcher is not None:
+            if self.tool_cache is not None:
+                self.tool_cache.attach_watcher(fs_watcher)
+            fs_watcher.subscribe(self.skill_loader.on_file_event)
+
+    def close(self) -> None:
+        if self.fs_watcher is None:
+            return
+        if self.tool_cache is not None:
+            self.tool_cache.detach_watcher()
+        self.fs_watcher.unsubscribe(self.skill_loader.on_file_event)
+        self.fs_watcher = None
+
     @staticmethod
     def _summarize_text(text: str, *, limit: int = 120) -> str:
         one_line = " ".join(text.split())
@@ -128,7 +211,7 @@ class V6_1(BaseAgentLoop):
         return self.skill_loader.list_skill_names()
 
     def use_skill(self, name: str) -> bool:
-        if self.skill_loader.get(name) is None:
+        if not self.skill_loader.has(name):
             return False
         self.active_skill_name = name
         return True
@@ -171,37 +254,117 @@ class V6_1(BaseAgentLoop):
             handler=_handler,
         )
 
-    def _build_available_skills_block(self) -> str:
-        lines = ["<available_skills>"]
-        for skill in self.skill_loader.list_skills():
-            lines.extend(
-                [
-                    "  <skill>",
-                    f"    <name>{skill.name}</name>",
-                    f"    <description>{skill.description}</description>",
-                    f"    <location>{skill.path}</location>",
-                    "  </skill>",
-                ],
+    def _build_read_tool_result_tool(self) -> ToolSpec:
+        def _handler(params: Dict[str, object]) -> str:
+            handle = str(params.get("handle", "")).strip()
+            if not handle:
+                return "Missing required parameter: handle"
+            store = self.tool_result_governor.store
+            if not store.exists(handle):
+                return f"Tool result not found: {handle}"
+            offset = int(params.get("offset", 1))
+            limit = int(params["limit"]) if params.get("limit") is not None else None
+            return run_read(
+                path=str(store.path_for(handle)),
+                offset=offset,
+                limit=limit,
+                max_lines=DEFAULT_MAX_LINES,
+                max_bytes=DEFAULT_MAX_BYTES,
             )
-        lines.append("</available_skills>")
-        return "\n".join(lines)
 
-    def _apply_skill_prompt(self) -> None:
-        available_skills = self._build_available_skills_block()
-        preferred = ""
-        if self.active_skill_name:
-            preferred = (
-                "\n\n[Preferred Skill]\n"
-                f"- name: {self.active_skill_name}\n"
-                "Use read_skill to load it if relevant to the user's request."
-            )
-        self.state.system_prompt = (
-            f"{self._base_system_prompt}\n\n"
-            "Skills are loaded with progressive disclosure.\n"
-            "First inspect available skill metadata, then call read_skill(name) only when needed.\n\n"
-            f"{available_skills}"
-            f"{preferred}"
+        return ToolSpec(
+            name="read_tool_result",
+            description=(
+                "Page through a large tool output that was stored out of context. "
+                "Use the handle from a '[tool result stored: ...]' preview; offset is 1-based line number."
+            ),
+            parameters={
+                "type": "object",
+                "properties": {
+                    "handle": {"type": "string", "description": "Handle from the stored-result preview (tr_...)."},
+                    "offset": {"type": "integer"},
+                    "limit": {"type": "integer"},
+                },
+                "required": ["handle"],
+                "additionalProperties": False,
+            },
+            handler=_handler,
+        )
+
+    def _build_spawn_subagents_tool(self) -> ToolSpec:
+        async def _handler(params: Dict[str, object]) -> str:
+            scheduler = self.subagent_scheduler
+            assert scheduler is not None
+            allowed = [tool.name for tool in self.tools if tool.name != "spawn_subagents"]
+            specs = parse_subagent_specs(params, scheduler.config, allowed)
+            self._emit_trace(f"[SUBAGENTS] spawning {len(specs)}: {', '.join(spec.name for spec in specs)}")
+            results = await scheduler.run(specs, self._build_subagent, parent_interrupted=self.interrupt_check)
+            self._add_subagent_usage(results)
+            for result in results:
+                self._emit_trace(f"[SUBAGENT] {result.name} status={result.status} tokens={result.tokens} {result.seconds:.1f}s")
+            return render_subagent_results(results)
+
+        return ToolSpec(
+            name="spawn_subagents",
+            description=(
+                "Run independent subtasks in parallel, each in a fresh subagent with its own tools and token budget. "
+                "Use for fan-out work (e.g. researching several topics); returns each subagent's final answer."
+            ),
+            parameters=SPAWN_SUBAGENTS_PARAMETERS,
+            handler=_handler,
+        )
+
+    def _build_subagent(self, spec: SubagentSpec, should_stop: Callable[[], bool]) -> "V6_1":
+        scheduler = self.subagent_scheduler
+        assert scheduler is not None
+        # Children get a clean conversation and never spawn further subagents; client, MCP manager and router are shared.
+        child = V6_1(
+            client=self.client,
+            model_name=self.model_name,
+            timeout_seconds=self.timeout_seconds,
+            system_prompt=self._base_system_prompt,
+            stream_text=False,
+            trace_sink=self.trace_sink,
+            max_tool_rounds=scheduler.config.max_tool_rounds,
+            default_tool_cwd=self.default_tool_cwd,
+            verbose=False,
+            interrupt_check=should_stop,
+            short_memory_config=ShortMemoryConfig(auto_enabled=False),
+            skills_dir=self.skills_dir,
+            skill_index_cache=self.skill_loader.use_index_cache,
+            tool_result_config=self.tool_result_governor.config,
+            tool_cache_enabled=self.tool_cache is not None,
+            model_router=self.model_router,
+            # Oversized outputs are spilled with a read_tool_result handle, so children can always page them.
+            tool_allowlist=(*spec.tools, "read_tool_result"),
         )
+        child.raise_tool_interrupts = True
+        mcp_tools = [tool for tool in self._mcp_tools if tool.name in spec.tools]
+        if mcp_tools:
+            child.mcp_manager = self.mcp_manager
+            child.mcp_enabled = True
+            child._mcp_tools = mcp_tools
+            child.tools = child._allowed_tools([*child._base_tools, *mcp_tools])
+            child._tool_registry = build_tool_registry(child.tools)
+        return child
+
+    def _add_subagent_usage(self, results: Sequence[SubagentResult]) -> None:
+        # Children's spend counts toward the session (and its cost) without replacing the last-call usage.
+        self._session_prompt_tokens += sum(r.prompt_tokens for r in results)
+        self._session_completion_tokens += sum(r.completion_tokens for r in results)
+        self._session_total_tokens += sum(r.tokens for r in results)
+
+    def _build_available_skills_block(self) -> str:
+        return render_available_skills_block(self.skill_loader)
+
+    def _apply_skill_prompt(self) -> None:
+        prompt = self.prompt_builder.build(self.active_skill_name)
+        # Builder returns the same str object while nothing changed; keep state (and the cached system message) stable.
+        if prompt is not self.state.system_prompt:
+            self.state.system_prompt = prompt
+
+    def get_prompt_prefix_hash(self) -> str:
+        return self.prompt_builder.prefix_hash
 
     async def _rebuild_tools(self, *, refresh_mcp: bool) -> None:
         mcp_tools: List[ToolSpec] = []
@@ -218,7 +381,12 @@ class V6_1(BaseAgentLoop):
 
                 async def _handler(params: Dict[str, object], ext_name: str = external_name) -> str:
                     self._print_mcp_call(ext_name, params)
-                    return await self.mcp_manager.call(ext_name, params)  # type: ignore[arg-type]
+                    with trace_span(self.trace_sink, "mcp_request", ext_name) as span:
+                        output = await self.mcp_manager.call(ext_name, params)  # type: ignore[arg-type]
+                        if span is not None:
+                            span.bytes_in = len(json.dumps(params, ensure_ascii=False).encode("utf-8"))
+                            span.bytes_out = len(str(output).encode("utf-8"))
+                    return output
 
                 mcp_tools.append(
                     ToolSpec(
@@ -230,9 +398,14 @@ class V6_1(BaseAgentLoop):
                 )
 
         self._mcp_tools = mcp_tools
-        self.tools = [*self._base_tools, *self._mcp_tools]
+        self.tools = self._allowed_tools([*self._base_tools, *self._mcp_tools])
         self._tool_registry = build_tool_registry(self.tools)
 
+    def _allowed_tools(self, tools: List[ToolSpec]) -> List[ToolSpec]:
+        if self.tool_allowlist is None:
+            return list(tools)
+        return [tool for tool in tools if tool.name in self.tool_allowlist]
+
     async def set_mcp_enabled(self, enabled: bool) -> None:
         self.mcp_enabled = enabled and self.mcp_manager is not None
         await self._rebuild_tools(refresh_mcp=self.mcp_enabled)
@@ -300,10 +473,7 @@ class V6_1(BaseAgentLoop):
         self.short_memory_config.usage_threshold_tokens = max(1000, threshold_tokens)
 
     def _estimate_current_working_prompt_tokens(self) -> int:
-        llm_messages: List[Message] = [
-            {"role": "system", "content": self.state.system_prompt},
-            *self.state.messages,
-        ]
+        llm_messages: List[Message] = [self._system_message(), *self.state.messages]
         return self._estimate_tokens_from_obj(llm_messages)
 
     @staticmethod
@@ -326,24 +496,27 @@ class V6_1(BaseAgentLoop):
         hit = sum(1 for k in required_markers if k in text)
         return hit >= 3
 
-    def _accumulate_usage_from_response(self, *, request_messages: List[Message], response_text: str, source_usage: object) -> None:
+    def _accumulate_usage_from_response(
+        self,
+        *,
+        request_messages: List[Message],
+        response_text: str,
+        source_usage: object,
+        model: str | None = None,
+        update_last: bool = True,
+    ) -> TokenUsage:
         usage = source_usage
         if usage is None:
             est_prompt = self._estimate_tokens_from_obj(request_messages)
             est_completion = self._estimate_tokens_from_obj({"text": response_text, "tool_calls": []})
-            from core.types import TokenUsage  # local import to avoid widening module imports
-
             usage = TokenUsage(
                 prompt_tokens=est_prompt,
                 completion_tokens=est_completion,
                 total_tokens=est_prompt + est_completion,
                 source="estimated",
             )
-        self._last_usage = usage  # type: ignore[assignment]
-        self._usage_seen = True
-        self._session_prompt_tokens += int(usage.prompt_tokens)
-        self._session_completion_tokens += int(usage.completion_tokens)
-        self._session_total_tokens += int(usage.total_tokens)
+        self._record_usage(usage, model=model, update_last=update_last)  # type: ignore[arg-type]
+        return usage  # type: ignore[return-value]
 
     async def _summarize_messages_for_compaction(self, messages: List[Dict[str, object]], reason: str) -> str:
         transcript = render_transcript(messages, max_chars=self.short_memory_config.max_transcript_chars)
@@ -374,27 +547,22 @@ class V6_1(BaseAgentLoop):
             },
             {"role": "user", "content": prompt},
         ]
-        try:
-            started = time.perf_counter()
-            response = await self._await_interruptible(
-                self.client.generate(
-                    model_name=self.model_name,
-                    messages=req_messages,
-                    tools=None,
-                    timeout_seconds=self.timeout_seconds,
-                    stream=False,
-                    should_abort=self._should_abort_llm,
-                ),
-            )
-            self._last_latency_ms = int((time.perf_counter() - started) * 1000)
-            self._accumulate_usage_from_response(
-                request_messages=req_messages,
-                response_text=str(getattr(response, "text", "")),
-                source_usage=getattr(response, "usage", None),
-            )
-            summary = self._clean_compaction_summary(str(getattr(response, "text", "")))
-        except Exception:
-            summary = ""
+        summary = ""
+        models = [self.model_name]
+        if self.model_router is not None and self.model_router.routes("compaction"):
+            models.insert(0, self.model_router.config.cheap_model)
+        for model in models:
+            try:
+                summary = await self._request_compaction_summary(req_messages, model)
+            except InterruptedError:
+                summary = ""
+                break
+            except Exception:
+                summary = ""
+            if model == self.model_name or (summary and self._looks_like_structured_summary(summary)):
+                break
+            assert self.model_router is not None
+            self.model_router.record_escalation("compaction", "unstructured" if summary else "error")
 
         if not summary:
             summary = fallback_summary(messages, max_chars=self.short_memory_config.max_summary_chars)
@@ -413,6 +581,120 @@ class V6_1(BaseAgentLoop):
             summary = summary[: self.short_memory_config.max_summary_chars]
         return summary
 
+    async def _request_compaction_summary(self, req_messages: List[Message], model: str) -> str:
+        # Compaction queues behind interactive rounds; background callers keep their lower class.
+        priority = max(current_priority(), PRIORITY_COMPACTION)
+        with trace_span(self.trace_sink, "llm_call", model, purpose="compaction") as span, llm_priority(priority):
+            started = time.perf_counter()
+            response = await self._await_interruptible(
+                self.client.generate(
+                    model_name=model,
+                    messages=req_messages,
+                    tools=None,
+                    timeout_seconds=self.timeout_seconds,
+                    stream=False,
+                    should_abort=self._should_abort_llm,
+                ),
+            )
+            elapsed = time.perf_counter() - started
+            self._last_latency_ms = int(elapsed * 1000)
+            if span is not None and isinstance(response, AssistantResponse):
+                self._annotate_llm_span(span, response, response.usage or TokenUsage(source="none"))
+        usage = self._accumulate_usage_from_response(
+            request_messages=req_messages,
+            response_text=str(getattr(response, "text", "")),
+            source_usage=getattr(response, "usage", None),
+            model=model,
+        )
+        summary = self._clean_compaction_summary(str(getattr(response, "text", "")))
+        if self.model_router is not None:
+            accepted = model == self.model_name or self._looks_like_structured_summary(summary)
+            self.model_router.observe("compaction", model, usage, elapsed, accepted=accepted)
+        return summary
+
+    async def generate_title(self, *, max_chars: int = 40) -> str | None:
+        """Short session title from the cheap model, or None when titles are not routed or the call fails."""
+        if self.model_router is None or not self.model_router.routes("title"):
+            return None
+        requests = [str(m.get("content", "")).strip() for m in self.raw_messages if m.get("role") == "user"]
+        requests = [text for text in requests if text and not text.startswith("/")]
+        if not requests:
+            return None
+        model = self.model_router.config.cheap_model
+        req_messages: List[Message] = [
+            {"role": "system", "content": "你为对话生成简短标题。只输出标题本身，不超过 20 个字，不要标点和引号。"},
+            {"role": "user", "content": "\n".join(requests[:3])[:1000]},
+        ]
+        # Titles are cosmetic: they never delay interactive rounds, and a failure just keeps the heuristic title.
+        try:
+            with llm_priority(max(current_priority(), PRIORITY_BACKGROUND)):
+                started = time.perf_counter()
+                response = await self.client.generate(
+                    model_name=model,
+                    messages=req_messages,
+                    tools=None,
+                    timeout_seconds=self.timeout_seconds,
+                    stream=False,
+                )
+        except (asyncio.CancelledError, InterruptedError):
+            raise
+        except Exception:
+            self.model_router.record_escalation("title", "error")
+            return None
+        usage = self._accumulate_usage_from_response(
+            request_messages=req_messages,
+            response_text=response.text,
+            source_usage=response.usage,
+            model=model,
+            update_last=False,
+        )
+        self.model_router.observe("title", model, usage, time.perf_counter() - started)
+        lines = [line for line in self._clean_compaction_summary(response.text).splitlines() if line.strip()]
+        title = lines[0].strip().strip("\"'“”《》「」#*` ") if lines else ""
+        if not title:
+            return None
+        return title[:max_chars] + ("..." if len(title) > max_chars else "")
+
+    async def _call_llm_routed(
+        self,
+        round_index: int,
+        *,
+        on_text_delta: Callable[[str], None],
+        should_abort: Callable[[], bool],
+    ) -> AssistantResponse:
+        router = self.model_router
+        model = router.route_round(self.state.messages, round_index) if router is not None else self.model_name
+        if router is None or model == self.model_name:
+            response = await self._call_llm(tools=self.tools, on_text_delta=on_text_delta, should_abort=should_abort)
+            if router is not None:
+                router.observe("round", self.model_name, self._last_usage, self._last_latency_ms / 1000.0)
+            return response
+
+        # Cheap output is held back until accepted, so an escalated round never shows the user two answers.
+        held: List[str] = []
+        try:
+            response = await self._call_llm(tools=self.tools, on_text_delta=held.append, should_abort=should_abort, model_name=model)
+        except (asyncio.CancelledError, InterruptedError):
+            raise
+        except Exception:
+            if not router.config.escalate_on_error:
+                raise
+            reason: str | None = "error"
+        else:
+            reason = router.check_round(response, self._tool_registry)
+            router.observe("tool_followup", model, self._last_usage, self._last_latency_ms / 1000.0, accepted=reason is None)
+            if reason is None:
+                if held:
+                    on_text_delta("".join(held))
+                return response
+        router.record_escalation("tool_followup", reason)
+        response = await self._call_llm(tools=self.tools, on_text_delta=on_text_delta, should_abort=should_abort)
+        router.observe("round", self.model_name, self._last_usage, self._last_latency_ms / 1000.0)
+        return response
+
+    def get_model_router_report(self) -> Dict[str, object] | None:
+        return self.model_router.report() if self.model_router is not None else None
+
     def _has_summary_message(self) -> bool:
         for msg in self.state.messages:
             if str(msg.get("role")) == "assistant" and str(msg.get("content", "")).startswith(SUMMARY_TAG):
@@ -429,7 +711,12 @@ class V6_1(BaseAgentLoop):
         if not prefix:
             return {"performed": False, "message": "not enough history to compact"}
 
-        summary_text = await self._summarize_messages_for_compaction(prefix, reason)
+        compaction_span = trace_span(self.trace_sink, "compaction", reason, prefix_messages=len(prefix))
+        with compaction_span as span, self._profile_phase(f"compaction:{reason}"):
+            summary_text = await self._summarize_messages_for_compaction(prefix, reason)
+            if span is not None:
+                span.bytes_in = len(json.dumps(prefix, ensure_ascii=False).encode("utf-8"))
+                span.bytes_out = len(summary_text.encode("utf-8"))
         result = compact_messages(
             self.state.messages,
             summary_text=summary_text,
@@ -468,7 +755,88 @@ class V6_1(BaseAgentLoop):
         self._last_compaction_working_prompt_tokens = current_working_prompt
         return None
 
+    async def _execute_tool_call(self, call: ToolCall) -> str:
+        tool = self._tool_registry.get(call.name)
+        if not tool:
+            self._print_tool_call(call.name, call.arguments)
+            # Model-invented names would explode label cardinality.
+            _TOOL_CALLS.inc(tool="<unknown>", outcome="not_found")
+            return f"Tool not found: {call.name}"
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            tool_output, outcome = await self._run_tool(tool, call)
+            return tool_output
+        finally:
+            _TOOL_CALLS.inc(tool=call.name, outcome=outcome)
+            _TOOL_DURATION.observe(time.perf_counter() - started, tool=call.name)
+
+    def _effective_tool_args(self, call: ToolCall) -> Dict[str, object]:
+        call_args = dict(call.arguments)
+        if call.name in self.tool_names and "cwd" not in call_args and self.default_tool_cwd:
+            call_args["cwd"] = self.default_tool_cwd
+        return call_args
+
+    async def _run_tool(self, tool: ToolSpec, call: ToolCall) -> tuple[str, str]:
+        call_args = self._effective_tool_args(call)
+        self._print_tool_call(call.name, call_args)
+        cache = self.tool_cache if tool.read_only else None
+        cache_deps = None
+        if cache is not None:
+            cached = cache.lookup(call.name, call_args)
+            if cached is not None:
+                return cached, "cache_hit"
+            cache_deps = cache.capture_deps(call.name, call_args)
+        try:
+            # Execute sync handlers in worker thread so Ctrl+C can cancel current turn promptly.
+            if inspect.iscoroutinefunction(tool.handler):
+                tool_output = await self._await_interruptible(tool.handler(call_args))  # type: ignore[arg-type]
+            else:
+                tool_output = await self._await_interruptible(
+                    asyncio.to_thread(tool.handler, call_args),
+                )
+            tool_output = str(tool_output)
+        except InterruptedError as err:
+            if self.raise_tool_interrupts:
+                raise
+            return f"Tool execution error: {err}", "error"
+        except Exception as err:  # noqa: BLE001
+            return f"Tool execution error: {err}", "error"
+        finally:
+            self._invalidate_tool_cache_after(call.name, call_args)
+        if cache is not None:
+            cache.store(call.name, call_args, tool_output, deps=cache_deps)
+        return tool_output, "ok"
+
+    def _invalidate_tool_cache_after(self, tool_name: str, call_args: Dict[str, object]) -> None:
+        if self.tool_cache is None:
+            return
+        if tool_name in {"write", "edit"} and call_args.get("path") is not None:
+            cwd = call_args.get("cwd")
+            target = resolve_target(str(call_args["path"]), str(cwd) if cwd is not None else None)
+            self.tool_cache.invalidate_path(target)
+        elif tool_name == "bash":
+            # Shell commands may touch arbitrary paths.
+            self.tool_cache.clear()
+
+    def get_prefetch_stats(self) -> Dict[str, object] | None:
+        return self.prefetcher.report() if self.prefetcher is not None else None
+
+    def get_tool_cache_stats(self) -> Dict[str, int]:
+        if self.tool_cache is None:
+            return {"hits": 0, "misses": 0, "invalidations": 0, "entries": 0}
+        return self.tool_cache.stats()
+
+    def _profile_phase(self, label: str) -> AbstractContextManager[None]:
+        profiler = self.profiler
+        return profiler.phase(label) if profiler is not None else nullcontext()
+
     async def run_turn(self, user_input: str) -> str:
+        profile_turn = self.profiler.turn() if self.profiler is not None else nullcontext()
+        with trace_span(self.trace_sink, "turn", self.model_name, input_chars=len(user_input)), profile_turn:
+            return await self._run_turn(user_input)
+
+    async def _run_turn(self, user_input: str) -> str:
         self._apply_skill_prompt()
         if self.mcp_enabled and not self._mcp_tools:
             await self._rebuild_tools(refresh_mcp=True)
@@ -484,6 +852,7 @@ class V6_1(BaseAgentLoop):
         self._emit_status("模型回复中")
         try:
             for round_index in range(self.max_tool_rounds):
+                self._trace_round = round_index + 1
                 if self.verbose:
                     print(f"\n[ROUND {round_index + 1}]")
                     print("[MODEL]")
@@ -499,15 +868,17 @@ class V6_1(BaseAgentLoop):
                     if self.model_delta_callback is not None:
                         self.model_delta_callback(delta)
 
-                response = await self._await_interruptible(
-                    self._call_llm(
-                        tools=self.tools,
-                        on_text_delta=_on_text_delta,
-                        should_abort=self._should_abort_llm,
-                    ),
-                )
+                with self._profile_phase(f"round{round_index + 1}/llm"):
+                    response = await self._await_interruptible(
+                        self._call_llm_routed(
+                            round_index,
+                            on_text_delta=_on_text_delta,
+                            should_abort=self._should_abort_llm,
+                        ),
+                    )
                 if self.model_round_callback is not None:
                     snap = self.get_token_usage_snapshot()
+                    cache_stats = self.get_tool_cache_stats()
                     self.model_round_callback(
                         response.text,
                         {
@@ -516,7 +887,10 @@ class V6_1(BaseAgentLoop):
                             "total_tokens": int(snap.get("last_total_tokens", 0)),
                             "latency_ms": int(snap.get("last_latency_ms", 0)),
                             "source": str(snap.get("last_usage_source", "none")),
+                            "cached_prompt_tokens": int(snap.get("last_cached_prompt_tokens", 0)),
                             "round": round_index + 1,
+                            "tool_cache_hits": cache_stats["hits"],
+                            "tool_cache_misses": cache_stats["misses"],
                         },
                     )
                 if self.verbose:
@@ -525,6 +899,9 @@ class V6_1(BaseAgentLoop):
                     elif response.text.strip():
                         print(response.text.strip())
 
+                if self.prefetcher is not None:
+                    await self.prefetcher.settle([(call.name, self._effective_tool_args(call)) for call in response.tool_calls])
+
                 assistant_message = {"role": "assistant", "content": response.text}
                 if response.tool_calls:
                     assistant_message["tool_calls"] = [
@@ -545,32 +922,26 @@ class V6_1(BaseAgentLoop):
                     hit_round_limit = False
                     break
 
+                executed: List[tuple[ToolCall, str]] = []
                 for call in response.tool_calls:
                     self._emit_status(f"工具调用中: {call.name}")
                     started = time.perf_counter()
-                    duration_ms: int | None = None
-                    tool = self._tool_registry.get(call.name)
-                    if not tool:
-                        tool_output = f"Tool not found: {call.name}"
-                        self._print_tool_call(call.name, call.arguments)
-                    else:
-                        call_args = dict(call.arguments)
-                        if call.name in self.tool_names and "cwd" not in call_args and self.default_tool_cwd:
-                            call_args["cwd"] = self.default_tool_cwd
-                        self._print_tool_call(call.name, call_args)
-                        try:
-                            # Execute sync handlers in worker thread so Ctrl+C can cancel current turn promptly.
-                            if inspect.iscoroutinefunction(tool.handler):
-                                tool_output = await self._await_interruptible(tool.handler(call_args))  # type: ignore[arg-type]
-                            else:
-                                tool_output = await self._await_interruptible(
-                                    asyncio.to_thread(tool.handler, call_args),
-                                )
-                            tool_output = str(tool_output)
-                        except Exception as err:  # noqa: BLE001
-                            tool_output = f"Tool execution error: {err}"
+                    with trace_span(
+                        self.trace_sink,
+                        "tool_call",
+                        call.name,
+                        round=round_index + 1,
+                    ) as span, self._profile_phase(f"round{round_index + 1}/tool:{call.name}"):
+                        tool_output = await self._execute_tool_call(call)
+                        if span is not None:
+                            span.bytes_in = len(json.dumps(call.arguments, ensure_ascii=False).encode("utf-8"))
+                            span.bytes_out = len(tool_output.encode("utf-8"))
                     duration_ms = int((time.perf_counter() - started) * 1000)
                     self._print_tool_result(call.name, tool_output, duration_ms=duration_ms)
+                    executed.append((ToolCall(id=call.id, name=call.name, arguments=self._effective_tool_args(call)), tool_output))
+                    if call.name != "read_tool_result":
+                        # Oversized outputs are spilled to the blob store; context only keeps a preview + handle.
+                        tool_output = self.tool_result_governor.govern(call.name, tool_output)
                     self._append_turn_message(
                         {
                             "role": "tool",
@@ -580,6 +951,9 @@ class V6_1(BaseAgentLoop):
                         },
                     )
                     self._emit_status("模型回复中")
+                if self.prefetcher is not None:
+                    # Runs while the next round is generated; settle() scores it once the real calls are known.
+                    self.prefetcher.start(executed)
 
             if hit_round_limit and not final_text:
                 final_text = (
@@ -595,4 +969,7 @@ class V6_1(BaseAgentLoop):
             raise
         finally:
             turn_cancelled = True
+            if self.prefetcher is not None:
+                self.prefetcher.cancel()
+            self._trace_round = None
             self._emit_status("等待输入")
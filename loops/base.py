@@ -7,7 +7,30 @@ import math
 import time
 from typing import Callable, List, Optional
 
-from core.types import AssistantResponse, LLMClient, Message, TokenUsage, ToolSpec
+from core.metrics import REGISTRY
+from core.trace import TraceSink, TraceSpan, trace_span
+from core.types import STREAM_GAP_BUCKETS_MS, AssistantResponse, LLMClient, Message, StreamTimings, TokenUsage, ToolSpec
+
+
+def _first_output_ms(timings: StreamTimings) -> float | None:
+    firsts = [t for t in (timings.first_text_ms, timings.first_reasoning_ms, timings.first_tool_call_ms) if t is not None]
+    return min(firsts) if firsts else None
+
+
+def _ms_or_zero(value: float | None) -> int:
+    return int(round(value)) if value is not None else 0
+
+
+def format_gap_histogram(counts: List[int]) -> str:
+    labels = [f"<={bound}" for bound in STREAM_GAP_BUCKETS_MS] + [f">{STREAM_GAP_BUCKETS_MS[-1]}"]
+    return " ".join(f"{label}:{count}" for label, count in zip(labels, counts) if count)
+
+
+_LLM_REQUESTS = REGISTRY.counter("agent_llm_requests_total", "LLM generate calls.", ("model", "outcome"))
+_LLM_DURATION = REGISTRY.histogram("agent_llm_request_duration_seconds", "LLM generate wall time.", ("model",))
+_LLM_TTFT = REGISTRY.histogram("agent_llm_ttft_seconds", "Time to first streamed output.", ("model",))
+_LLM_TOKENS = REGISTRY.counter("agent_llm_tokens_total", "Tokens reported (or estimated) per LLM call.", ("model", "kind"))
+_LLM_TOKENS_PER_SEC = REGISTRY.gauge("agent_llm_tokens_per_second", "Completion tokens/sec of the last streamed call.", ("model",))
 
 
 @dataclass
@@ -25,6 +48,7 @@ class BaseAgentLoop(ABC):
         timeout_seconds: int = 60,
         system_prompt: str = "You are a helpful assistant.",
         stream_text: bool = False,
+        trace_sink: TraceSink | None = None,
     ) -> None:
         self.client = client
         self.model_name = model_name
@@ -36,12 +60,27 @@ class BaseAgentLoop(ABC):
         self._session_prompt_tokens = 0
         self._session_completion_tokens = 0
         self._session_total_tokens = 0
+        self._session_cached_prompt_tokens = 0
+        self._session_cache_write_tokens = 0
+        # Tokens answered from the local response cache (usage source "cache"): counted, but never billed.
+        self._session_replayed_prompt_tokens = 0
+        self._session_replayed_completion_tokens = 0
+        self._session_replayed_cached_prompt_tokens = 0
+        self._session_replayed_cache_write_tokens = 0
         self._last_latency_ms = 0
+        self._last_timings: StreamTimings | None = None
+        self._last_tokens_per_sec = 0.0
+        self._session_gap_histogram: List[int] = [0] * (len(STREAM_GAP_BUCKETS_MS) + 1)
+        self._system_message_cache: Message | None = None
+        self.trace_sink = trace_sink
+        # Round index stamped on llm_call spans; loops with tool rounds update it.
+        self._trace_round: int | None = None
 
     def get_messages(self) -> List[Message]:
         return self.state.messages
 
-    def get_token_usage_snapshot(self) -> dict[str, int | bool]:
+    def get_token_usage_snapshot(self) -> dict[str, int | float | bool | str]:
+        timings = self._last_timings
         return {
             "has_usage": self._usage_seen,
             "last_prompt_tokens": self._last_usage.prompt_tokens if self._last_usage else 0,
@@ -51,37 +90,95 @@ class BaseAgentLoop(ABC):
             "session_prompt_tokens": self._session_prompt_tokens,
             "session_completion_tokens": self._session_completion_tokens,
             "session_total_tokens": self._session_total_tokens,
+            "last_cached_prompt_tokens": self._last_usage.cached_prompt_tokens if self._last_usage else 0,
+            "last_cache_write_tokens": self._last_usage.cache_write_tokens if self._last_usage else 0,
+            "session_cached_prompt_tokens": self._session_cached_prompt_tokens,
+            "session_cache_write_tokens": self._session_cache_write_tokens,
+            "session_replayed_prompt_tokens": self._session_replayed_prompt_tokens,
+            "session_replayed_completion_tokens": self._session_replayed_completion_tokens,
+            "session_replayed_cached_prompt_tokens": self._session_replayed_cached_prompt_tokens,
+            "session_replayed_cache_write_tokens": self._session_replayed_cache_write_tokens,
             "last_latency_ms": self._last_latency_ms,
+            "has_stream_timings": timings is not None and timings.chunks > 0,
+            "last_ttfb_ms": _ms_or_zero(timings.ttfb_ms) if timings else 0,
+            "last_ttft_ms": _ms_or_zero(_first_output_ms(timings)) if timings else 0,
+            "last_first_text_ms": _ms_or_zero(timings.first_text_ms) if timings else 0,
+            "last_first_reasoning_ms": _ms_or_zero(timings.first_reasoning_ms) if timings else 0,
+            "last_first_tool_call_ms": _ms_or_zero(timings.first_tool_call_ms) if timings else 0,
+            "last_max_gap_ms": _ms_or_zero(timings.max_gap_ms) if timings else 0,
+            "last_stream_chunks": timings.chunks if timings else 0,
+            "last_tokens_per_sec": round(self._last_tokens_per_sec, 1),
+            "session_stream_gap_histogram": format_gap_histogram(self._session_gap_histogram),
         }
 
+    def get_stream_timings(self) -> StreamTimings | None:
+        return self._last_timings
+
+    def _record_timings(self, timings: StreamTimings | None, usage: TokenUsage, *, model: str | None = None) -> None:
+        self._last_timings = timings
+        self._last_tokens_per_sec = 0.0
+        if timings is None:
+            return
+        first_output = _first_output_ms(timings)
+        if first_output is not None:
+            _LLM_TTFT.observe(first_output / 1000.0, model=model or self.model_name)
+        if timings.generation_ms > 0 and usage.completion_tokens > 0:
+            self._last_tokens_per_sec = usage.completion_tokens / (timings.generation_ms / 1000.0)
+            _LLM_TOKENS_PER_SEC.set(self._last_tokens_per_sec, model=model or self.model_name)
+        for idx, count in enumerate(timings.gap_histogram[: len(self._session_gap_histogram)]):
+            self._session_gap_histogram[idx] += count
+
     @staticmethod
     def _estimate_tokens_from_obj(obj: object) -> int:
         text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
         # Lightweight fallback: ~1 token per 4 chars (language-agnostic rough estimate).
         return max(1, int(math.ceil(len(text) / 4)))
 
+    def _system_message(self) -> Message:
+        # Reuse one dict per system prompt so every round sends (and encodes) the same leading message.
+        prompt = self.state.system_prompt
+        cached = self._system_message_cache
+        if cached is None or cached["content"] is not prompt:
+            cached = {"role": "system", "content": prompt}
+            self._system_message_cache = cached
+        return cached
+
     async def _call_llm(
         self,
         tools: Optional[List[ToolSpec]] = None,
         *,
         on_text_delta: Callable[[str], None] | None = None,
         should_abort: Callable[[], bool] | None = None,
+        model_name: str | None = None,
     ) -> AssistantResponse:
-        llm_messages: List[Message] = [
-            {"role": "system", "content": self.state.system_prompt},
-            *self.state.messages,
-        ]
-        started = time.perf_counter()
-        response = await self.client.generate(
-            model_name=self.model_name,
-            messages=llm_messages,
-            tools=tools,
-            timeout_seconds=self.timeout_seconds,
-            stream=self.stream_text,
-            on_text_delta=on_text_delta,
-            should_abort=should_abort,
-        )
-        self._last_latency_ms = int((time.perf_counter() - started) * 1000)
+        model = model_name or self.model_name
+        llm_messages: List[Message] = [self._system_message(), *self.state.messages]
+        with trace_span(self.trace_sink, "llm_call", model, round=self._trace_round) as span:
+            started = time.perf_counter()
+            try:
+                response = await self.client.generate(
+                    model_name=model,
+                    messages=llm_messages,
+                    tools=tools,
+                    timeout_seconds=self.timeout_seconds,
+                    stream=self.stream_text,
+                    on_text_delta=on_text_delta,
+                    should_abort=should_abort,
+                )
+            except BaseException:
+                _LLM_REQUESTS.inc(model=model, outcome="error")
+                raise
+            elapsed = time.perf_counter() - started
+            self._last_latency_ms = int(elapsed * 1000)
+            _LLM_REQUESTS.inc(model=model, outcome="ok")
+            _LLM_DURATION.observe(elapsed, model=model)
+            usage = self._usage_or_estimate(response, llm_messages)
+            self._annotate_llm_span(span, response, usage)
+        self._record_usage(usage, model=model)
+        self._record_timings(response.timings, usage, model=model)
+        return response
+
+    def _usage_or_estimate(self, response: AssistantResponse, llm_messages: List[Message]) -> TokenUsage:
         usage = response.usage
         if usage is None:
             est_prompt = self._estimate_tokens_from_obj(llm_messages)
@@ -100,12 +197,51 @@ class BaseAgentLoop(ABC):
                 total_tokens=est_prompt + est_completion,
                 source="estimated",
             )
-        self._last_usage = usage
-        self._usage_seen = True
-        self._session_prompt_tokens += usage.prompt_tokens
-        self._session_completion_tokens += usage.completion_tokens
-        self._session_total_tokens += usage.total_tokens
-        return response
+        return usage
+
+    @staticmethod
+    def _annotate_llm_span(span: TraceSpan | None, response: AssistantResponse, usage: TokenUsage) -> None:
+        if span is None:
+            return
+        span.bytes_in = response.request_bytes
+        span.bytes_out = response.response_bytes
+        span.attrs.update(
+            {
+                "usage_source": usage.source,
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "cached_prompt_tokens": usage.cached_prompt_tokens,
+                "tool_calls": len(response.tool_calls),
+            },
+        )
+        timings = response.timings
+        if timings is not None:
+            span.attrs["ttfb_ms"] = timings.ttfb_ms
+            span.attrs["ttft_ms"] = _first_output_ms(timings)
+            span.attrs["max_gap_ms"] = round(timings.max_gap_ms, 3)
+
+    def _record_usage(self, usage: TokenUsage, *, model: str | None = None, update_last: bool = True) -> None:
+        # update_last=False is for side calls (titles) that count toward the session but are not the conversation's window.
+        if update_last:
+            self._last_usage = usage
+            self._usage_seen = True
+        self._session_prompt_tokens += int(usage.prompt_tokens)
+        self._session_completion_tokens += int(usage.completion_tokens)
+        self._session_total_tokens += int(usage.total_tokens)
+        self._session_cached_prompt_tokens += int(usage.cached_prompt_tokens)
+        self._session_cache_write_tokens += int(usage.cache_write_tokens)
+        if usage.source == "cache":
+            self._session_replayed_prompt_tokens += int(usage.prompt_tokens)
+            self._session_replayed_completion_tokens += int(usage.completion_tokens)
+            self._session_replayed_cached_prompt_tokens += int(usage.cached_prompt_tokens)
+            self._session_replayed_cache_write_tokens += int(usage.cache_write_tokens)
+        model = model or self.model_name
+        _LLM_TOKENS.inc(int(usage.prompt_tokens), model=model, kind="prompt")
+        _LLM_TOKENS.inc(int(usage.completion_tokens), model=model, kind="completion")
+        if usage.cached_prompt_tokens:
+            _LLM_TOKENS.inc(int(usage.cached_prompt_tokens), model=model, kind="cached_prompt")
+        if usage.cache_write_tokens:
+            _LLM_TOKENS.inc(int(usage.cache_write_tokens), model=model, kind="cache_write")
 
     @abstractmethod
     async def run_turn(self, user_input: str) -> str:
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from core.metrics import REGISTRY
+from core.rate_limiter import current_session, llm_session
+
+from .base import BaseAgentLoop
+
+_SUBAGENT_RUNS = REGISTRY.counter("agent_subagent_runs_total", "Subagent runs by final status.", ("status",))
+_SUBAGENT_TOKENS = REGISTRY.counter("agent_subagent_tokens_total", "Tokens spent by subagents.")
+_SUBAGENT_ACTIVE = REGISTRY.gauge("agent_subagents_active", "Subagents currently running.")
+
+# Tools a child gets when the parent does not choose: read-only exploration only. read_tool_result is always added on
+# top, since a child's oversized tool outputs are spilled to the store like the parent's.
+DEFAULT_SUBAGENT_TOOLS = ("read", "grep", "find", "ls")
+
+SPAWN_SUBAGENTS_PARAMETERS: Dict[str, object] = {
+    "type": "object",
+    "properties": {
+        "tasks": {
+            "type": "array",
+            "description": "Independent subtasks; each runs in a fresh conversation that only sees its own task text.",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "description": "Short unique label for the result"},
+                    "task": {"type": "string", "description": "Self-contained instructions, including every needed detail"},
+                    "tools": {"type": "array", "items": {"type": "string"}, "description": "Tool names the subagent may use"},
+                    "max_tokens": {"type": "integer", "description": "Token budget for this subagent"},
+                },
+                "required": ["task"],
+            },
+        },
+    },
+    "required": ["tasks"],
+}
+
+
+@dataclass(frozen=True)
+class SubagentConfig:
+    max_concurrency: int = 4
+    # Cap on tokens spent by all subagents of one spawn call together.
+    max_total_tokens: int = 200_000
+    max_tokens_per_agent: int = 50_000
+    max_tasks: int = 16
+    max_tool_rounds: int = 8
+    # Each child's answer is cut to this many chars before it goes back into the parent's context.
+    result_max_chars: int = 2000
+    default_tools: Tuple[str, ...] = DEFAULT_SUBAGENT_TOOLS
+
+
+@dataclass(frozen=True)
+class SubagentSpec:
+    name: str
+    task: str
+    tools: Tuple[str, ...] = DEFAULT_SUBAGENT_TOOLS
+    max_tokens: int = 50_000
+
+
+@dataclass(frozen=True)
+class SubagentResult:
+    name: str
+    # ok | budget | error | skipped
+    status: str
+    text: str
+    tokens: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    seconds: float = 0.0
+
+
+# Builds a child loop for the spec; the loop must stop its turn (InterruptedError) once should_stop() is true. V6_1
+# polls it during every LLM call and tool, so a budget overrun never buys another LLM call.
+SubagentLoopFactory = Callable[[SubagentSpec, Callable[[], bool]], BaseAgentLoop]
+
+
+def parse_subagent_specs(params: Dict[str, object], config: SubagentConfig, allowed_tools: Sequence[str]) -> List[SubagentSpec]:
+    raw_tasks = params.get("tasks")
+    if not isinstance(raw_tasks, list) or not raw_tasks:
+        raise ValueError("tasks must be a non-empty array")
+    if len(raw_tasks) > config.max_tasks:
+        raise ValueError(f"at most {config.max_tasks} tasks per call, got {len(raw_tasks)}")
+    allowed = set(allowed_tools)
+    specs: List[SubagentSpec] = []
+    seen: set[str] = set()
+    for idx, item in enumerate(raw_tasks, start=1):
+        if not isinstance(item, dict) or not str(item.get("task", "")).strip():
+            raise ValueError(f"task #{idx} needs a non-empty 'task'")
+        name = str(item.get("name") or f"task-{idx}").strip()
+        base, suffix = name, idx
+        while name in seen:
+            name = f"{base}-{suffix}"
+            suffix += 1
+        seen.add(name)
+        tools_raw = item.get("tools")
+        tools = tuple(str(t) for t in tools_raw) if isinstance(tools_raw, list) else config.default_tools
+        unknown = [t for t in tools if t not in allowed]
+        if unknown:
+            raise ValueError(f"task {name!r} asks for unavailable tools: {', '.join(unknown)}")
+        try:
+            max_tokens = int(item.get("max_tokens") or config.max_tokens_per_agent)
+        except (TypeError, ValueError):
+            max_tokens = config.max_tokens_per_agent
+        specs.append(
+            SubagentSpec(
+                name=name,
+                task=str(item["task"]).strip(),
+                tools=tools,
+                max_tokens=max(1, min(max_tokens, config.max_tokens_per_agent)),
+            ),
+        )
+    return specs
+
+
+def _compact(text: str, limit: int) -> str:
+    text = text.strip()
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + f"\n[... {len(text) - limit} more chars truncated]"
+
+
+def _spent(loop: BaseAgentLoop) -> int:
+    return int(loop.get_token_usage_snapshot().get("session_total_tokens", 0) or 0)
+
+
+class SubagentScheduler:
+    """Runs child loops concurrently under one concurrency cap, stopping them when token budgets run out."""
+
+    def __init__(self, config: SubagentConfig | None = None) -> None:
+        self.config = config or SubagentConfig()
+        # Shared by every spawn call through this scheduler, so parallel fan-outs cannot exceed the cap together.
+        self._slots = asyncio.Semaphore(max(1, self.config.max_concurrency))
+        self.active = 0
+
+    async def run(
+        self,
+        specs: Sequence[SubagentSpec],
+        make_loop: SubagentLoopFactory,
+        *,
+        parent_interrupted: Callable[[], bool] | None = None,
+    ) -> List[SubagentResult]:
+        # Keyed by position: names from callers other than parse_subagent_specs need not be unique.
+        loops: Dict[int, BaseAgentLoop] = {}
+        finished_tokens = {"total": 0}
+        parent_session = current_session()
+
+        def _batch_spent() -> int:
+            return finished_tokens["total"] + sum(_spent(loop) for loop in loops.values())
+
+        async def _one(index: int, spec: SubagentSpec) -> SubagentResult:
+            async with self._slots:
+                if _batch_spent() >= self.config.max_total_tokens:
+                    _SUBAGENT_RUNS.inc(status="skipped")
+                    return SubagentResult(name=spec.name, status="skipped", text="token budget of this spawn call exhausted")
+                over_budget = {"hit": False}
+
+                def _should_stop() -> bool:
+                    loop = loops.get(index)
+                    if loop is not None and (_spent(loop) >= spec.max_tokens or _batch_spent() >= self.config.max_total_tokens):
+                        over_budget["hit"] = True
+                        return True
+                    return parent_interrupted is not None and parent_interrupted()
+
+                loop = make_loop(spec, _should_stop)
+                loops[index] = loop
+                self.active += 1
+                _SUBAGENT_ACTIVE.inc()
+                started = time.perf_counter()
+                status, text = "ok", ""
+                try:
+                    # Distinct scheduler sessions keep children round-robin fair against each other.
+                    with llm_session(f"{parent_session}/{spec.name}"):
+                        text = await loop.run_turn(spec.task)
+                except InterruptedError:
+                    if not over_budget["hit"]:
+                        raise
+                    status, text = "budget", "stopped after exhausting its token budget"
+                except Exception as exc:  # noqa: BLE001
+                    status, text = "error", f"{type(exc).__name__}: {exc}"
+                finally:
+                    self.active -= 1
+                    _SUBAGENT_ACTIVE.dec()
+                    snapshot = loops.pop(index).get_token_usage_snapshot()
+                    tokens = int(snapshot.get("session_total_tokens", 0) or 0)
+                    finished_tokens["total"] += tokens
+                    _SUBAGENT_TOKENS.inc(tokens)
+                    close = getattr(loop, "close", None)
+                    if callable(close):
+                        close()
+                _SUBAGENT_RUNS.inc(status=status)
+                return SubagentResult(
+                    name=spec.name,
+                    status=status,
+                    text=_compact(text, self.config.result_max_chars),
+                    tokens=tokens,
+                    prompt_tokens=int(snapshot.get("session_prompt_tokens", 0) or 0),
+                    completion_tokens=int(snapshot.get("session_completion_tokens", 0) or 0),
+                    seconds=round(time.perf_counter() - started, 3),
+                )
+
+        results = await asyncio.gather(*(_one(index, spec) for index, spec in enumerate(specs)), return_exceptions=True)
+        for result in results:
+            # An interrupt from the parent wins over partial results.
+            if isinstance(result, BaseException):
+                raise result
+        return list(results)  # type: ignore[arg-type]
+
+
+def render_subagent_results(results: Sequence[SubagentResult]) -> str:
+    """Compact tool output for the parent: one header line per child followed by its (truncated) answer."""
+    total = sum(r.tokens for r in results)
+    lines = [f"[subagents] {len(results)} finished, {total} tokens"]
+    for result in results:
+        lines.append(f"\n### {result.name} [{result.status}, {result.tokens} tokens, {result.seconds:.1f}s]")
+        lines.append(result.text or "(no answer)")
+    return "\n".join(lines)
+
@@ -2,4 +2,4 @@
 set -euo pipefail
 
 cd "$(dirname "$0")"
-python3 -m unittest -v tests/test_v1_v2.py tests/test_v3_tools.py tests/test_v4_1_mcp.py tests/test_logging.py
+python3 -m unittest -v tests/test_v1_v2.py tests/test_v3_tools.py tests/test_v4_1_mcp.py tests/test_logging.py tests/test_v6_1_tool_results.py tests/test_fs_watcher.py tests/test_skill_loader.py tests/test_client_payload.py tests/test_trace.py tests/test_metrics.py tests/test_profiler.py tests/test_mock_llm_server.py tests/test_session_replay.py tests/test_refresh_ui.py tests/test_server_v6_1.py tests/test_batch_v6_1.py tests/test_rate_limiter.py tests/test_resilience.py tests/test_routing_client.py tests/test_response_cache.py tests/test_model_router.py tests/test_speculative_prefetch.py tests/test_subagents.py
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    # Nearest-rank percentile.
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(math.ceil(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def load_events(paths: List[str]) -> List[Dict[str, object]]:
+    events: List[Dict[str, object]] = []
+    for path in paths:
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(event, dict) and "kind" in event:
+                events.append(event)
+    return events
+
+
+def summarize(events: List[Dict[str, object]], *, by_name: bool = False) -> List[Dict[str, object]]:
+    groups: Dict[Tuple[str, str], List[Dict[str, object]]] = defaultdict(list)
+    for event in events:
+        name = str(event.get("name", "")) if by_name else ""
+        groups[(str(event["kind"]), name)].append(event)
+
+    turn_total_ms = sum(float(e.get("duration_ms", 0.0)) for e in events if e.get("kind") == "turn")
+    rows: List[Dict[str, object]] = []
+    for (kind, name), items in sorted(groups.items()):
+        durations = sorted(float(e.get("duration_ms", 0.0)) for e in items)
+        total = sum(durations)
+        rows.append(
+            {
+                "stage": f"{kind}:{name}" if name else kind,
+                "count": len(items),
+                "p50_ms": _percentile(durations, 50),
+                "p95_ms": _percentile(durations, 95),
+                "p99_ms": _percentile(durations, 99),
+                "max_ms": durations[-1],
+                "total_ms": total,
+                "turn_share": (total / turn_total_ms) if turn_total_ms > 0 and kind != "turn" else None,
+                "bytes_in": sum(int(e.get("bytes_in", 0) or 0) for e in items),
+                "bytes_out": sum(int(e.get("bytes_out", 0) or 0) for e in items),
+                "errors": sum(1 for e in items if e.get("error")),
+            },
+        )
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-stage latency percentiles from a --trace-file JSONL")
+    parser.add_argument("trace_files", nargs="+")
+    parser.add_argument("--by-name", action="store_true", help="Split stages by span name (model, tool, MCP tool)")
+    parser.add_argument("--json", action="store_true", help="Print rows as JSON instead of a table")
+    args = parser.parse_args()
+
+    rows = summarize(load_events(args.trace_files), by_name=bool(args.by_name))
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return 0
+    if not rows:
+        print("no trace events")
+        return 1
+    header = f"{'stage':<36} {'count':>6} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'maxms':>9} {'share':>6} {'in KB':>9} {'out KB':>9} {'err':>4}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        share = row["turn_share"]
+        print(
+            f"{str(row['stage'])[:36]:<36} {row['count']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+            f"{row['p99_ms']:>9.1f} {row['max_ms']:>9.1f} "
+            f"{(f'{share * 100:.0f}%' if share is not None else '-'):>6} "
+            f"{int(row['bytes_in']) / 1024:>9.1f} {int(row['bytes_out']) / 1024:>9.1f} {row['errors']:>4}",
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
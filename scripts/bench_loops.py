@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""End-to-end loop benchmark against the deterministic mock LLM (or any OpenAI-compatible base URL).
+
+Each loop version runs ``--sessions`` independent conversations of ``--turns`` turns at a fixed
+``--concurrency``. Per round the report splits time into client-observed LLM time and everything
+else (loop bookkeeping, tool execution, message building), which is the overhead we can optimize.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from core.client import OpenAICompatClient  # noqa: E402
+from core.types import AssistantResponse, LLMClient  # noqa: E402
+from loops import V3, V4, V4_1, V5, V6, V6_1, BaseAgentLoop  # noqa: E402
+from mock_llm_server import MockLLMServer, add_latency_args, latency_from_args, load_script  # noqa: E402
+
+LOOP_FACTORIES: Dict[str, Callable[..., BaseAgentLoop]] = {
+    "v3": V3,
+    "v4": V4,
+    "v4.1": V4_1,
+    "v5": V5,
+    "v6": V6,
+    "v6.1": V6_1,
+}
+
+
+@dataclass(frozen=True)
+class LoopBenchResult:
+    loop: str
+    sessions: int
+    turns: int
+    rounds: int
+    wall_seconds: float
+    turns_per_sec: float
+    rounds_per_sec: float
+    mean_turn_ms: float
+    p95_turn_ms: float
+    llm_ms_per_round: float
+    overhead_ms_per_round: float
+    server_ms_per_round: float | None
+
+
+class _TimedClient(LLMClient):
+    def __init__(self, inner: LLMClient) -> None:
+        self.inner = inner
+        self.calls = 0
+        self.seconds = 0.0
+
+    async def generate(self, **kwargs: object) -> AssistantResponse:  # type: ignore[override]
+        started = time.perf_counter()
+        try:
+            return await self.inner.generate(**kwargs)  # type: ignore[arg-type]
+        finally:
+            self.calls += 1
+            self.seconds += time.perf_counter() - started
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _prepare_workspace(root: Path) -> None:
+    (root / "README.md").write_text("# bench workspace\n\n" + "lorem ipsum dolor sit amet\n" * 40, encoding="utf-8")
+    for idx in range(8):
+        (root / f"file_{idx}.txt").write_text(f"file {idx}\n" * 20, encoding="utf-8")
+
+
+async def run_loop_benchmark(
+    name: str,
+    *,
+    base_url: str,
+    workspace: str,
+    sessions: int,
+    concurrency: int,
+    turns: int,
+    stream: bool,
+    server: MockLLMServer | None = None,
+) -> LoopBenchResult:
+    factory = LOOP_FACTORIES[name]
+    inner = OpenAICompatClient(base_url=base_url, api_key="mock")
+    client = _TimedClient(inner)
+    gate = asyncio.Semaphore(max(1, concurrency))
+    turn_seconds: List[float] = []
+    server_before = (server.stats.requests, server.stats.service_seconds) if server is not None else None
+
+    async def _session(idx: int) -> None:
+        async with gate:
+            loop = factory(
+                client=client,
+                model_name="mock-model",
+                default_tool_cwd=workspace,
+                verbose=False,
+                stream_text=stream,
+            )
+            try:
+                for turn in range(turns):
+                    started = time.perf_counter()
+                    await loop.run_turn(f"session {idx} turn {turn}: inspect the workspace")
+                    turn_seconds.append(time.perf_counter() - started)
+            finally:
+                close = getattr(loop, "close", None)
+                if callable(close):
+                    close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_session(idx) for idx in range(sessions)))
+    wall = time.perf_counter() - started
+
+    rounds = max(1, client.calls)
+    server_ms_per_round: float | None = None
+    if server is not None and server_before is not None:
+        served = server.stats.requests - server_before[0]
+        if served:
+            server_ms_per_round = (server.stats.service_seconds - server_before[1]) / served * 1000.0
+    return LoopBenchResult(
+        loop=name,
+        sessions=sessions,
+        turns=len(turn_seconds),
+        rounds=client.calls,
+        wall_seconds=round(wall, 4),
+        turns_per_sec=round(len(turn_seconds) / wall, 2) if wall > 0 else 0.0,
+        rounds_per_sec=round(client.calls / wall, 2) if wall > 0 else 0.0,
+        mean_turn_ms=round(sum(turn_seconds) / len(turn_seconds) * 1000.0, 3) if turn_seconds else 0.0,
+        p95_turn_ms=round(_percentile(turn_seconds, 95) * 1000.0, 3),
+        llm_ms_per_round=round(client.seconds / rounds * 1000.0, 3),
+        overhead_ms_per_round=round((sum(turn_seconds) - client.seconds) / rounds * 1000.0, 3),
+        server_ms_per_round=round(server_ms_per_round, 3) if server_ms_per_round is not None else None,
+    )
+
+
+async def run_benchmark(
+    loops: List[str],
+    *,
+    base_url: str,
+    sessions: int,
+    concurrency: int,
+    turns: int,
+    stream: bool,
+    server: MockLLMServer | None = None,
+) -> List[LoopBenchResult]:
+    results: List[LoopBenchResult] = []
+    with tempfile.TemporaryDirectory(prefix="bench-loops-") as temp_dir:
+        _prepare_workspace(Path(temp_dir))
+        for name in loops:
+            results.append(
+                await run_loop_benchmark(
+                    name,
+                    base_url=base_url,
+                    workspace=temp_dir,
+                    sessions=sessions,
+                    concurrency=concurrency,
+                    turns=turns,
+                    stream=stream,
+                    server=server,
+                ),
+            )
+    return results
+
+
+def _print_table(results: List[LoopBenchResult]) -> None:
+    header = (
+        f"{'loop':<6} {'turns':>6} {'rounds':>7} {'wall_s':>8} {'turns/s':>8} {'rounds/s':>9} "
+        f"{'turn_ms':>9} {'p95_ms':>9} {'llm_ms/r':>9} {'ovh_ms/r':>9} {'srv_ms/r':>9}"
+    )
+    print(header)
+    for row in results:
+        server_ms = f"{row.server_ms_per_round:.2f}" if row.server_ms_per_round is not None else "-"
+        print(
+            f"{row.loop:<6} {row.turns:>6} {row.rounds:>7} {row.wall_seconds:>8.3f} {row.turns_per_sec:>8.2f} "
+            f"{row.rounds_per_sec:>9.2f} {row.mean_turn_ms:>9.2f} {row.p95_turn_ms:>9.2f} "
+            f"{row.llm_ms_per_round:>9.2f} {row.overhead_ms_per_round:>9.2f} {server_ms:>9}",
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark agent loops end-to-end against a mock LLM")
+    parser.add_argument("--loops", default=",".join(LOOP_FACTORIES), help="Comma-separated loop versions")
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=2, help="Turns per session")
+    parser.add_argument("--stream", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--base-url", default=None, help="Use an already running endpoint instead of the in-process mock")
+    parser.add_argument("--script", default=None, help="Mock response script (see scripts/mock_llm_server.py)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    add_latency_args(parser)
+    args = parser.parse_args()
+
+    loops = [part.strip() for part in args.loops.split(",") if part.strip()]
+    unknown = [name for name in loops if name not in LOOP_FACTORIES]
+    if unknown:
+        parser.error(f"unknown loop(s): {', '.join(unknown)}")
+
+    server: MockLLMServer | None = None
+    base_url = args.base_url
+    if not base_url:
+        server = MockLLMServer(load_script(args.script), latency=latency_from_args(args)).start()
+        base_url = server.base_url
+    try:
+        results = asyncio.run(
+            run_benchmark(
+                loops,
+                base_url=base_url,
+                sessions=max(1, args.sessions),
+                concurrency=max(1, args.concurrency),
+                turns=max(1, args.turns),
+                stream=bool(args.stream),
+                server=server,
+            ),
+        )
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.json:
+        print(json.dumps([asdict(row) for row in results], indent=2))
+    else:
+        _print_table(results)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.message_encoder import MessageEncoder  # noqa: E402
+
+
+def _make_message(idx: int, content_chars: int) -> Dict[str, object]:
+    role = ("user", "assistant", "tool")[idx % 3]
+    message: Dict[str, object] = {"role": role, "content": f"message {idx} " + "x" * content_chars}
+    if role == "tool":
+        message["tool_call_id"] = f"call_{idx}"
+    return message
+
+
+def _time_ms(fn, repeat: int) -> float:  # type: ignore[no-untyped-def]
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-round request encoding cost: full json.dumps vs MessageEncoder")
+    parser.add_argument("--lengths", default="10,50,100,200,500,1000,2000", help="Comma-separated history lengths")
+    parser.add_argument("--content-chars", type=int, default=2000, help="Characters per message body")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    lengths = [int(part) for part in args.lengths.split(",") if part.strip()]
+    print(f"{'messages':>8} {'json.dumps ms':>14} {'encoder ms':>11} {'speedup':>8}")
+    for length in lengths:
+        history: List[Dict[str, object]] = [_make_message(i, args.content_chars) for i in range(length)]
+        encoder = MessageEncoder(max_entries=max(4096, length * 2))
+        encoder.encode_messages(history[:-1])  # previous round already encoded everything but the newest message
+        assert encoder.encode_messages(history) == json.dumps(history).encode("utf-8")
+
+        full_ms = _time_ms(lambda: json.dumps(history).encode("utf-8"), args.repeat)
+        incremental_ms = _time_ms(lambda: encoder.encode_messages(history), args.repeat)
+        speedup = full_ms / incremental_ms if incremental_ms > 0 else float("inf")
+        print(f"{length:>8} {full_ms:>14.3f} {incremental_ms:>11.3f} {speedup:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Load test for the headless v6.1 server (server_v6_1.py).
+
+Drives ``--sessions`` sessions of ``--turns`` streamed turns each, ``--concurrency`` sessions at a
+time, over plain HTTP/SSE. Without ``--url`` an in-process agent server is started against the
+deterministic mock LLM (scripts/mock_llm_server.py), with per-session workspaces in a temp dir.
+
+Reports turn latency, time to first SSE event/delta, throughput, 409/5xx/error counts and the
+server's own active-turn peak.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from core.client import OpenAICompatClient  # noqa: E402
+from core.session_store_v6 import SessionStoreV6  # noqa: E402
+from mock_llm_server import MockLLMServer, add_latency_args, latency_from_args, load_script  # noqa: E402
+from server_v6_1 import AgentServer, ServerConfig, SessionPool  # noqa: E402
+
+
+@dataclass
+class TurnSample:
+    status: int
+    seconds: float
+    first_event_ms: float | None = None
+    first_delta_ms: float | None = None
+    events: Dict[str, int] = field(default_factory=dict)
+    outcome: str = "ok"
+
+
+@dataclass(frozen=True)
+class LoadTestReport:
+    sessions: int
+    turns: int
+    concurrency: int
+    wall_seconds: float
+    turns_ok: int
+    turns_busy: int
+    turns_failed: int
+    turns_per_sec: float
+    p50_turn_ms: float
+    p95_turn_ms: float
+    max_turn_ms: float
+    p50_first_delta_ms: float | None
+    p95_first_delta_ms: float | None
+    deltas: int
+    tool_events: int
+    peak_active_turns: int
+
+
+async def http_request(base_url: str, method: str, path: str, payload: Dict[str, object] | None = None) -> Tuple[int, bytes]:
+    status, body, _ = await _exchange(base_url, method, path, payload)
+    return status, body
+
+
+async def stream_turn(base_url: str, session_id: str, text: str) -> TurnSample:
+    started = time.perf_counter()
+    sample = TurnSample(status=0, seconds=0.0)
+
+    def _on_event(event: str) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if sample.first_event_ms is None:
+            sample.first_event_ms = elapsed_ms
+        if event == "delta" and sample.first_delta_ms is None:
+            sample.first_delta_ms = elapsed_ms
+        sample.events[event] = sample.events.get(event, 0) + 1
+
+    status, _, events = await _exchange(
+        base_url,
+        "POST",
+        f"/sessions/{session_id}/turns",
+        {"input": text, "stream": True},
+        on_event=_on_event,
+    )
+    sample.status = status
+    sample.seconds = time.perf_counter() - started
+    if status == 409:
+        sample.outcome = "busy"
+    elif status != 200 or not events or events[-1][0] != "done":
+        sample.outcome = "error"
+    return sample
+
+
+async def _exchange(
+    base_url: str,
+    method: str,
+    path: str,
+    payload: Dict[str, object] | None,
+    *,
+    on_event=None,  # type: ignore[no-untyped-def]
+) -> Tuple[int, bytes, List[Tuple[str, Dict[str, object]]]]:
+    parts = urlsplit(base_url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80, limit=1 << 20)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    head = (
+        f"{method} {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+    try:
+        raw_head = await reader.readuntil(b"\r\n\r\n")
+        status = int(raw_head.split(b" ", 2)[1])
+        if b"text/event-stream" not in raw_head.lower():
+            return status, await reader.read(), []
+        events: List[Tuple[str, Dict[str, object]]] = []
+        while True:
+            try:
+                block = await reader.readuntil(b"\n\n")
+            except asyncio.IncompleteReadError:
+                break
+            event, data = "message", {}
+            for line in block.decode("utf-8").splitlines():
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: "):
+                    data = json.loads(line[6:])
+            events.append((event, data))
+            if on_event is not None:
+                on_event(event)
+        return status, b"", events
+    finally:
+        writer.close()
+
+
+def _percentile(values: List[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def run_load_test(
+    base_url: str,
+    *,
+    sessions: int,
+    turns: int,
+    concurrency: int,
+    prompt: str = "list the workspace and summarize README.md",
+    pool: SessionPool | None = None,
+) -> LoadTestReport:
+    gate = asyncio.Semaphore(max(1, concurrency))
+    samples: List[TurnSample] = []
+    peak = {"active": 0}
+
+    async def _watch_peak() -> None:
+        while pool is not None:
+            peak["active"] = max(peak["active"], pool.active_turns)
+            await asyncio.sleep(0.002)
+
+    async def _session(idx: int) -> None:
+        async with gate:
+            status, body = await http_request(base_url, "POST", "/sessions")
+            if status != 201:
+                samples.append(TurnSample(status=status, seconds=0.0, outcome="error"))
+                return
+            session_id = str(json.loads(body)["session_id"])
+            for turn in range(turns):
+                samples.append(await stream_turn(base_url, session_id, f"{prompt} (session {idx}, turn {turn})"))
+
+    watcher = asyncio.create_task(_watch_peak())
+    started = time.perf_counter()
+    await asyncio.gather(*(_session(idx) for idx in range(sessions)))
+    wall = time.perf_counter() - started
+    watcher.cancel()
+
+    ok = [s for s in samples if s.outcome == "ok"]
+    turn_ms = [s.seconds * 1000 for s in ok]
+    first_delta = [s.first_delta_ms for s in ok if s.first_delta_ms is not None]
+    return LoadTestReport(
+        sessions=sessions,
+        turns=len(samples),
+        concurrency=concurrency,
+        wall_seconds=round(wall, 3),
+        turns_ok=len(ok),
+        turns_busy=sum(1 for s in samples if s.outcome == "busy"),
+        turns_failed=sum(1 for s in samples if s.outcome == "error"),
+        turns_per_sec=round(len(ok) / wall, 2) if wall > 0 else 0.0,
+        p50_turn_ms=round(_percentile(turn_ms, 50) or 0.0, 1),
+        p95_turn_ms=round(_percentile(turn_ms, 95) or 0.0, 1),
+        max_turn_ms=round(max(turn_ms, default=0.0), 1),
+        p50_first_delta_ms=_round_or_none(_percentile(first_delta, 50)),
+        p95_first_delta_ms=_round_or_none(_percentile(first_delta, 95)),
+        deltas=sum(s.events.get("delta", 0) for s in samples),
+        tool_events=sum(s.events.get("tool", 0) for s in samples),
+        peak_active_turns=peak["active"],
+    )
+
+
+def _round_or_none(value: float | None) -> float | None:
+    return round(value, 1) if value is not None else None
+
+
+async def _run_in_process(args: argparse.Namespace) -> LoadTestReport:
+    with tempfile.TemporaryDirectory(prefix="server-load-") as temp_dir, MockLLMServer(
+        load_script(args.script),
+        latency=latency_from_args(args),
+    ) as mock:
+        root = Path(temp_dir)
+        pool = SessionPool(
+            client=OpenAICompatClient(base_url=mock.base_url, api_key="mock"),
+            store=SessionStoreV6(str(root / "sessions")),
+            config=ServerConfig(
+                model_name="mock-model",
+                max_sessions=max(1, int(args.max_sessions)),
+                max_concurrent_turns=max(1, int(args.max_concurrent_turns)),
+                workspace_root=str(root / "workspaces"),
+            ),
+        )
+        server = await AgentServer(pool).start()
+        try:
+            return await run_load_test(
+                server.base_url,
+                sessions=max(1, args.sessions),
+                turns=max(1, args.turns),
+                concurrency=max(1, args.concurrency),
+                pool=pool,
+            )
+        finally:
+            await server.close()
+            pool.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the headless v6.1 agent server")
+    parser.add_argument("--url", default=None, help="Target a running server instead of an in-process one")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=2, help="Turns per session")
+    parser.add_argument("--concurrency", type=int, default=16, help="Sessions driven at once")
+    parser.add_argument("--max-sessions", type=int, default=64, help="In-process server pool size")
+    parser.add_argument("--max-concurrent-turns", type=int, default=8, help="In-process server turn slots")
+    parser.add_argument("--script", default=None, help="Mock response script (see scripts/mock_llm_server.py)")
+    parser.add_argument("--json", action="store_true")
+    add_latency_args(parser)
+    args = parser.parse_args()
+
+    if args.url:
+        report = asyncio.run(
+            run_load_test(args.url, sessions=max(1, args.sessions), turns=max(1, args.turns), concurrency=max(1, args.concurrency)),
+        )
+    else:
+        report = asyncio.run(_run_in_process(args))
+
+    if args.json:
+        print(json.dumps(asdict(report), indent=2))
+    else:
+        for key, value in asdict(report).items():
+            print(f"{key:>20}: {value}")
+    return 0 if report.turns_failed == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""Deterministic OpenAI-compatible mock for offline end-to-end runs and benchmarks.
+
+Serves ``POST <prefix>/chat/completions`` with and without SSE. Each conversation replays the
+script by position: the response index is the number of assistant messages after the last user
+message, so concurrent conversations stay independent and every turn restarts the script.
+
+Script file (JSON)::
+
+    {"responses": [
+        {"tool_calls": [{"name": "ls", "arguments": {"path": "."}}]},
+        {"reasoning": "optional", "text": "final answer"}
+    ]}
+
+Usage::
+
+    python scripts/mock_llm_server.py --port 8765 --ttft-ms 300 --tokens-per-sec 60
+    # then point base_url at http://127.0.0.1:8765/v1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+DEFAULT_SCRIPT: Dict[str, object] = {
+    "responses": [
+        {"tool_calls": [{"name": "ls", "arguments": {"path": "."}}]},
+        {"tool_calls": [{"name": "read", "arguments": {"path": "README.md"}}]},
+        {"text": "Mock summary: the directory was listed and README.md was read."},
+    ],
+}
+
+
+@dataclass(frozen=True)
+class MockLatency:
+    # Before response headers (queueing / prefill), then before the first token, then generation pace.
+    latency_ms: float = 0.0
+    ttft_ms: float = 0.0
+    tokens_per_sec: float = 0.0
+    chunk_tokens: int = 4
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    stream_requests: int = 0
+    service_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, *, stream: bool, seconds: float, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.stream_requests += int(stream)
+            self.service_seconds += seconds
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+
+def estimate_tokens(text: str) -> int:
+    # Same heuristic as BaseAgentLoop's fallback estimator, so drift stays comparable.
+    return max(1, int(math.ceil(len(text) / 4)))
+
+
+def pick_response(script: Dict[str, object], messages: List[Dict[str, object]]) -> Dict[str, object]:
+    responses = script.get("responses")
+    if not isinstance(responses, list) or not responses:
+        return {"text": "ok"}
+    round_index = 0
+    for message in reversed(messages):
+        role = message.get("role")
+        if role == "user":
+            break
+        if role == "assistant":
+            round_index += 1
+    item = responses[min(round_index, len(responses) - 1)]
+    return item if isinstance(item, dict) else {"text": str(item)}
+
+
+def _tool_calls_payload(item: Dict[str, object], round_index: int) -> List[Dict[str, object]]:
+    calls: List[Dict[str, object]] = []
+    raw_calls = item.get("tool_calls") or []
+    for idx, raw in enumerate(raw_calls if isinstance(raw_calls, list) else []):
+        if not isinstance(raw, dict):
+            continue
+        calls.append(
+            {
+                "id": str(raw.get("id") or f"call_{round_index}_{idx}"),
+                "type": "function",
+                "function": {
+                    "name": str(raw.get("name", "")),
+                    "arguments": json.dumps(raw.get("arguments") or {}, ensure_ascii=False),
+                },
+            },
+        )
+    return calls
+
+
+def _split_text(text: str, chunk_chars: int) -> List[str]:
+    return [text[i : i + chunk_chars] for i in range(0, len(text), chunk_chars)] if text else []
+
+
+def make_handler(script: Dict[str, object], latency: MockLatency, stats: MockStats) -> type:
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:  # noqa: N802
+            started = time.perf_counter()
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            raw = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+            try:
+                body = json.loads(raw.decode("utf-8"))
+            except ValueError:
+                self.send_error(400, "invalid JSON")
+                return
+            messages = body.get("messages") if isinstance(body.get("messages"), list) else []
+            item = pick_response(script, messages)
+            round_index = sum(1 for m in messages if isinstance(m, dict) and m.get("role") == "assistant")
+            text = str(item.get("text", ""))
+            reasoning = str(item.get("reasoning", ""))
+            tool_calls = _tool_calls_payload(item, round_index)
+            prompt_tokens = estimate_tokens(raw.decode("utf-8", errors="replace"))
+            completion_text = text + reasoning + (json.dumps(tool_calls) if tool_calls else "")
+            completion_tokens = estimate_tokens(completion_text) if completion_text else 0
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+            stream = bool(body.get("stream"))
+            self._sleep_ms(latency.latency_ms)
+            if stream:
+                include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+                self._stream(text, reasoning, tool_calls, usage if include_usage else None)
+            else:
+                self._sleep_ms(latency.ttft_ms)
+                self._sleep_tokens(completion_tokens)
+                message: Dict[str, object] = {"role": "assistant", "content": text}
+                if reasoning:
+                    message["reasoning_content"] = reasoning
+                if tool_calls:
+                    message["tool_calls"] = tool_calls
+                finish = "tool_calls" if tool_calls else "stop"
+                data = {
+                    "id": f"mock-{round_index}",
+                    "object": "chat.completion",
+                    "model": body.get("model", "mock"),
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+                    "usage": usage,
+                }
+                encoded = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+            stats.record(
+                stream=stream,
+                seconds=time.perf_counter() - started,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+            )
+
+        def _stream(
+            self,
+            text: str,
+            reasoning: str,
+            tool_calls: List[Dict[str, object]],
+            usage: Dict[str, int] | None,
+        ) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            self._sleep_ms(latency.ttft_ms)
+            chunk_chars = max(1, latency.chunk_tokens) * 4
+            for piece in _split_text(reasoning, chunk_chars):
+                self._send_chunk({"choices": [{"index": 0, "delta": {"reasoning_content": piece}}]})
+                self._sleep_tokens(estimate_tokens(piece))
+            for piece in _split_text(text, chunk_chars):
+                self._send_chunk({"choices": [{"index": 0, "delta": {"content": piece}}]})
+                self._sleep_tokens(estimate_tokens(piece))
+            for idx, call in enumerate(tool_calls):
+                function = call["function"]
+                name = function["name"]  # type: ignore[index]
+                head = {"index": idx, "id": call["id"], "type": "function", "function": {"name": name, "arguments": ""}}
+                self._send_chunk({"choices": [{"index": 0, "delta": {"tool_calls": [head]}}]})
+                for piece in _split_text(str(function["arguments"]), chunk_chars):  # type: ignore[index]
+                    part = {"index": idx, "function": {"arguments": piece}}
+                    self._send_chunk({"choices": [{"index": 0, "delta": {"tool_calls": [part]}}]})
+                    self._sleep_tokens(estimate_tokens(piece))
+            finish = "tool_calls" if tool_calls else "stop"
+            self._send_chunk({"choices": [{"index": 0, "delta": {}, "finish_reason": finish}]})
+            if usage is not None:
+                self._send_chunk({"choices": [], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def _send_chunk(self, chunk: Dict[str, object]) -> None:
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        @staticmethod
+        def _sleep_ms(ms: float) -> None:
+            if ms > 0:
+                time.sleep(ms / 1000.0)
+
+        @staticmethod
+        def _sleep_tokens(tokens: int) -> None:
+            if latency.tokens_per_sec > 0 and tokens > 0:
+                time.sleep(tokens / latency.tokens_per_sec)
+
+        def log_message(self, *_args: object) -> None:
+            return
+
+    return _Handler
+
+
+class MockLLMServer:
+    def __init__(
+        self,
+        script: Dict[str, object] | None = None,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: MockLatency | None = None,
+    ) -> None:
+        self.script = script or DEFAULT_SCRIPT
+        self.latency = latency or MockLatency()
+        self.stats = MockStats()
+        self._server = ThreadingHTTPServer((host, port), make_handler(self.script, self.latency, self.stats))
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *_exc: object) -> None:
+        self.stop()
+
+
+def load_script(path: str | None) -> Dict[str, object]:
+    if not path:
+        return DEFAULT_SCRIPT
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if isinstance(data, list):
+        data = {"responses": data}
+    if not isinstance(data, dict):
+        raise ValueError("script must be a JSON object with a 'responses' list")
+    return data
+
+
+def add_latency_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before response headers")
+    parser.add_argument("--ttft-ms", type=float, default=0.0, help="Delay between headers and first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Generation pace (0 = unthrottled)")
+    parser.add_argument("--chunk-tokens", type=int, default=4, help="Approximate tokens per SSE chunk")
+
+
+def latency_from_args(args: argparse.Namespace) -> MockLatency:
+    return MockLatency(
+        latency_ms=float(args.latency_ms),
+        ttft_ms=float(args.ttft_ms),
+        tokens_per_sec=float(args.tokens_per_sec),
+        chunk_tokens=int(args.chunk_tokens),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", default=None, help="JSON script file (default: ls -> read -> final text)")
+    add_latency_args(parser)
+    args = parser.parse_args()
+
+    server = MockLLMServer(load_script(args.script), host=args.host, port=args.port, latency=latency_from_args(args))
+    print(f"mock LLM listening on {server.base_url}", flush=True)
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        stats = server.stats
+        print(
+            f"requests={stats.requests} stream={stats.stream_requests} "
+            f"prompt_tokens={stats.prompt_tokens} completion_tokens={stats.completion_tokens}",
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""Replay saved v6 session files through V6_1 as a regression benchmark.
+
+The recorded raw history (``AGENT_LOOP_V6_MESSAGES`` block) is split into user turns. A recording
+LLM stub answers each round with the assistant message that was saved, and tool calls either get
+their recorded output back (``--tools stub``, default) or are really executed (``--tools execute``).
+After each turn the harness runs auto-compaction and persists the session like ``cli_v6_1`` does.
+
+The report covers loop overhead per round, compaction behavior, drift between the recorded
+(provider) token totals and the replay's estimates, and session persistence cost. Session files
+do not store per-call timings, so the stub uses a fixed ``--llm-latency-ms`` (0 by default).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.session_store_v6 import SessionRecord, SessionStoreV6  # noqa: E402
+from core.short_memory_v6_1 import ShortMemoryConfig, is_summary_message  # noqa: E402
+from core.tool_result_store import ToolResultGovernorConfig  # noqa: E402
+from core.types import AssistantResponse, LLMClient, Message, ToolCall  # noqa: E402
+from loops.agent_loop_v6_1 import V6_1  # noqa: E402
+
+TOOL_MODES = ("stub", "execute")
+
+
+@dataclass
+class RecordedTurn:
+    user: str
+    responses: List[AssistantResponse] = field(default_factory=list)
+    tool_outputs: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ReplayReport:
+    session_id: str
+    tool_mode: str
+    turns: int
+    rounds: int
+    stub_underflows: int
+    final_text_mismatches: int
+    raw_messages_match: bool
+    tool_output_changes: int
+    wall_ms: float
+    llm_ms: float
+    tool_ms: float
+    save_ms: float
+    overhead_ms_per_round: float
+    compactions: int
+    compaction_llm_calls: int
+    working_messages: int
+    raw_messages: int
+    recorded_prompt_tokens: int
+    recorded_completion_tokens: int
+    replay_prompt_tokens: int
+    replay_completion_tokens: int
+    prompt_drift_pct: float | None
+    completion_drift_pct: float | None
+    saves: int
+    save_ms_max: float
+    session_file_bytes: int
+
+
+def _parse_tool_call(raw: object) -> ToolCall | None:
+    if not isinstance(raw, dict):
+        return None
+    function = raw.get("function") if isinstance(raw.get("function"), dict) else {}
+    arguments = function.get("arguments", {})  # type: ignore[union-attr]
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments or "{}")
+        except ValueError:
+            arguments = {"_raw": arguments}
+    if not isinstance(arguments, dict):
+        arguments = {"_value": arguments}
+    return ToolCall(id=str(raw.get("id", "")), name=str(function.get("name", "")), arguments=arguments)  # type: ignore[union-attr]
+
+
+def extract_turns(messages: List[Message]) -> List[RecordedTurn]:
+    turns: List[RecordedTurn] = []
+    for message in messages:
+        role = str(message.get("role", ""))
+        if role == "system" or is_summary_message(message):
+            continue
+        if role == "user":
+            turns.append(RecordedTurn(user=str(message.get("content", ""))))
+            continue
+        if not turns:
+            continue
+        turn = turns[-1]
+        if role == "assistant":
+            calls = [call for call in map(_parse_tool_call, message.get("tool_calls") or []) if call is not None]
+            turn.responses.append(AssistantResponse(text=str(message.get("content", "") or ""), tool_calls=calls))
+        elif role == "tool":
+            turn.tool_outputs[str(message.get("tool_call_id", ""))] = str(message.get("content", ""))
+    return turns
+
+
+class RecordingStub(LLMClient):
+    """Answers with the recorded assistant messages of the current turn, in order."""
+
+    def __init__(self, *, compaction_summary: str = "", latency_ms: float = 0.0) -> None:
+        self.compaction_summary = compaction_summary
+        self.latency_ms = latency_ms
+        self._queue: Deque[AssistantResponse] = deque()
+        self.calls = 0
+        self.compaction_calls = 0
+        self.underflows = 0
+        self.seconds = 0.0
+
+    def load_turn(self, turn: RecordedTurn) -> None:
+        self._queue = deque(turn.responses)
+
+    async def generate(self, **kwargs: object) -> AssistantResponse:  # type: ignore[override]
+        started = time.perf_counter()
+        try:
+            if self.latency_ms > 0:
+                await asyncio.sleep(self.latency_ms / 1000.0)
+            if not kwargs.get("tools"):
+                # Only the compaction summarizer calls without tools.
+                self.compaction_calls += 1
+                return AssistantResponse(text=self.compaction_summary)
+            self.calls += 1
+            if not self._queue:
+                self.underflows += 1
+                return AssistantResponse(text="")
+            return self._queue.popleft()
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+class ReplayV6_1(V6_1):
+    def __init__(self, *, tool_mode: str = "stub", **kwargs: object) -> None:
+        super().__init__(**kwargs)
+        self.tool_mode = tool_mode
+        self.recorded_tool_outputs: Dict[str, str] = {}
+        self.tool_seconds = 0.0
+
+    async def _execute_tool_call(self, call: ToolCall) -> str:
+        started = time.perf_counter()
+        try:
+            if self.tool_mode == "stub" and call.id in self.recorded_tool_outputs:
+                self._print_tool_call(call.name, call.arguments)
+                return self.recorded_tool_outputs[call.id]
+            return await super()._execute_tool_call(call)
+        finally:
+            self.tool_seconds += time.perf_counter() - started
+
+
+def _comparable(messages: List[Message]) -> List[Tuple[str, str, Tuple[str, ...]]]:
+    # Tool contents are compared separately: re-executed or newly governed outputs legitimately differ.
+    rows = []
+    for message in messages:
+        if is_summary_message(message) or message.get("role") == "system":
+            continue
+        role = str(message.get("role", ""))
+        content = "" if role == "tool" else str(message.get("content", "") or "")
+        call_ids = tuple(str(call.get("id", "")) for call in message.get("tool_calls") or [] if isinstance(call, dict))
+        if role == "tool":
+            call_ids = (str(message.get("tool_call_id", "")),)
+        rows.append((role, content, call_ids))
+    return rows
+
+
+def _tool_output_changes(replayed: List[Message], recorded: List[Message]) -> int:
+    before = {str(m.get("tool_call_id", "")): str(m.get("content", "")) for m in recorded if m.get("role") == "tool"}
+    return sum(
+        1
+        for m in replayed
+        if m.get("role") == "tool" and before.get(str(m.get("tool_call_id", ""))) != str(m.get("content", ""))
+    )
+
+
+def _drift_pct(replayed: int, recorded: int) -> float | None:
+    if recorded <= 0:
+        return None
+    return round((replayed - recorded) / recorded * 100.0, 2)
+
+
+async def replay_record(
+    record: SessionRecord,
+    *,
+    tool_mode: str = "stub",
+    cwd: str = ".",
+    llm_latency_ms: float = 0.0,
+    short_memory_config: ShortMemoryConfig | None = None,
+    save_dir: str | None = None,
+) -> ReplayReport:
+    if tool_mode not in TOOL_MODES:
+        raise ValueError(f"Unsupported tool mode: {tool_mode}")
+    turns = extract_turns(record.messages)
+    stub = RecordingStub(compaction_summary=record.summary, latency_ms=llm_latency_ms)
+    with tempfile.TemporaryDirectory(prefix="replay-") as temp_dir:
+        loop = ReplayV6_1(
+            client=stub,
+            model_name=record.model_name or "replay",
+            default_tool_cwd=cwd,
+            verbose=False,
+            tool_mode=tool_mode,
+            # Recorded turns may be longer than the library default; never cut a replay short.
+            max_tool_rounds=max([len(turn.responses) for turn in turns] + [8]) + 1,
+            short_memory_config=short_memory_config or ShortMemoryConfig(),
+            tool_result_config=ToolResultGovernorConfig(store_dir=str(Path(temp_dir) / "tool_results")),
+        )
+        store = SessionStoreV6(save_dir or str(Path(temp_dir) / "sessions"))
+        target = store.create(model_name=record.model_name, loop_version=record.loop_version, persist=False)
+        target.title = record.title
+        save_times: List[float] = []
+        compactions = 0
+        mismatches = 0
+        started = time.perf_counter()
+        try:
+            for turn in turns:
+                stub.load_turn(turn)
+                loop.recorded_tool_outputs = turn.tool_outputs
+                final_text = await loop.run_turn(turn.user)
+                recorded_final = next((r.text for r in reversed(turn.responses) if not r.tool_calls), None)
+                if recorded_final is not None and final_text != recorded_final:
+                    mismatches += 1
+                auto = await loop.maybe_auto_compress_short_memory()
+                if auto and bool(auto.get("performed")):
+                    compactions += 1
+                target.messages = loop.get_raw_messages()
+                snap = loop.get_token_usage_snapshot()
+                target.session_prompt_tokens = int(snap["session_prompt_tokens"])
+                target.session_completion_tokens = int(snap["session_completion_tokens"])
+                target.session_total_tokens = int(snap["session_total_tokens"])
+                save_started = time.perf_counter()
+                store.save(target)
+                save_times.append(time.perf_counter() - save_started)
+        finally:
+            loop.close()
+        wall = time.perf_counter() - started
+        file_bytes = target.file_path.stat().st_size if target.file_path.exists() else 0
+
+    snap = loop.get_token_usage_snapshot()
+    rounds = stub.calls
+    save_seconds = sum(save_times)
+    overhead = wall - stub.seconds - loop.tool_seconds - save_seconds
+    return ReplayReport(
+        session_id=record.session_id,
+        tool_mode=tool_mode,
+        turns=len(turns),
+        rounds=rounds,
+        stub_underflows=stub.underflows,
+        final_text_mismatches=mismatches,
+        raw_messages_match=_comparable(loop.get_raw_messages()) == _comparable(record.messages),
+        tool_output_changes=_tool_output_changes(loop.get_raw_messages(), record.messages),
+        wall_ms=round(wall * 1000.0, 3),
+        llm_ms=round(stub.seconds * 1000.0, 3),
+        tool_ms=round(loop.tool_seconds * 1000.0, 3),
+        save_ms=round(save_seconds * 1000.0, 3),
+        overhead_ms_per_round=round(overhead / max(1, rounds) * 1000.0, 3),
+        compactions=compactions,
+        compaction_llm_calls=stub.compaction_calls,
+        working_messages=len(loop.state.messages),
+        raw_messages=len(loop.get_raw_messages()),
+        recorded_prompt_tokens=record.session_prompt_tokens,
+        recorded_completion_tokens=record.session_completion_tokens,
+        replay_prompt_tokens=int(snap["session_prompt_tokens"]),
+        replay_completion_tokens=int(snap["session_completion_tokens"]),
+        prompt_drift_pct=_drift_pct(int(snap["session_prompt_tokens"]), record.session_prompt_tokens),
+        completion_drift_pct=_drift_pct(int(snap["session_completion_tokens"]), record.session_completion_tokens),
+        saves=len(save_times),
+        save_ms_max=round(max(save_times, default=0.0) * 1000.0, 3),
+        session_file_bytes=file_bytes,
+    )
+
+
+def _resolve_records(target: str | None, sessions_dir: str, replay_all: bool) -> List[SessionRecord]:
+    if replay_all:
+        return SessionStoreV6(sessions_dir).list_sessions()
+    if not target:
+        raise SystemExit("pass a session id / file path, or --all")
+    path = Path(target)
+    if path.suffix == ".md" and path.exists():
+        return [SessionStoreV6(str(path.parent)).load(path.stem)]
+    return [SessionStoreV6(sessions_dir).load(target)]
+
+
+def _print_report(report: ReplayReport) -> None:
+    def _pct(value: float | None) -> str:
+        return f"{value:+.1f}%" if value is not None else "n/a"
+
+    print(
+        f"{report.session_id} [{report.tool_mode}] turns={report.turns} rounds={report.rounds} "
+        f"match={'yes' if report.raw_messages_match else 'NO'} underflows={report.stub_underflows} "
+        f"final_mismatch={report.final_text_mismatches} tool_output_changes={report.tool_output_changes}",
+    )
+    print(
+        f"  time wall={report.wall_ms:.1f}ms llm={report.llm_ms:.1f}ms tools={report.tool_ms:.1f}ms "
+        f"save={report.save_ms:.1f}ms (max {report.save_ms_max:.1f}ms x{report.saves}) "
+        f"overhead/round={report.overhead_ms_per_round:.3f}ms",
+    )
+    print(
+        f"  compaction performed={report.compactions} llm_calls={report.compaction_llm_calls} "
+        f"working_msgs={report.working_messages}/{report.raw_messages}",
+    )
+    print(
+        f"  tokens prompt {report.recorded_prompt_tokens}->{report.replay_prompt_tokens} ({_pct(report.prompt_drift_pct)}) "
+        f"completion {report.recorded_completion_tokens}->{report.replay_completion_tokens} "
+        f"({_pct(report.completion_drift_pct)}) file={report.session_file_bytes}B",
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay saved sessions through V6_1 and report loop/persistence cost")
+    parser.add_argument("session", nargs="?", default=None, help="Session id (in --sessions-dir) or path to a .md file")
+    parser.add_argument("--sessions-dir", default="./sessions")
+    parser.add_argument("--all", action="store_true", help="Replay every session in --sessions-dir")
+    parser.add_argument("--tools", choices=TOOL_MODES, default="stub", help="Return recorded tool outputs or re-run tools")
+    parser.add_argument("--cwd", default=".", help="Tool cwd for --tools execute")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Fixed stub latency per LLM call")
+    parser.add_argument("--memory-threshold", type=int, default=ShortMemoryConfig.usage_threshold_tokens)
+    parser.add_argument("--no-memory-auto", action="store_true", help="Disable auto-compaction during replay")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    reports: List[ReplayReport] = []
+    for record in _resolve_records(args.session, args.sessions_dir, args.all):
+        config = ShortMemoryConfig(auto_enabled=not args.no_memory_auto, usage_threshold_tokens=args.memory_threshold)
+        report = asyncio.run(
+            replay_record(
+                record,
+                tool_mode=args.tools,
+                cwd=args.cwd,
+                llm_latency_ms=args.llm_latency_ms,
+                short_memory_config=config,
+            ),
+        )
+        reports.append(report)
+        if not args.json:
+            _print_report(report)
+    if args.json:
+        print(json.dumps([asdict(report) for report in reports], indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
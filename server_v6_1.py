@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+"""Headless v6.1 agent server: many concurrent sessions over HTTP, turns streamed as SSE.
+
+One process keeps a pool of ``V6_1`` loops keyed by session id. All loops share one LLM client
+from ``build_llm_client`` (stateless, requests run on the default thread pool), one MCP manager
+and one tool-result store; every session persists through ``SessionStoreV6`` after each turn,
+so a session evicted from the pool (or from a restarted server) is restored on next use.
+
+Routes::
+
+    GET    /healthz
+    GET    /metrics                     Prometheus text (core.metrics.REGISTRY)
+    GET    /sessions                    saved sessions (+ resident flag)
+    POST   /sessions                    -> 201 {"session_id": ...}
+    GET    /sessions/{id}
+    DELETE /sessions/{id}               evict from the pool (the session file is kept)
+    POST   /sessions/{id}/turns         {"input": "...", "stream": true}
+
+A streamed turn answers ``text/event-stream`` with ``status``, ``delta``, ``tool`` and ``round``
+events, then exactly one ``done`` (final text + token usage) or ``error``. With
+``"stream": false`` the ``done`` payload is returned as plain JSON. A session runs one turn at a
+time (a second request gets 409); ``--max-concurrent-turns`` bounds turns across sessions.
+If the client disconnects mid-turn, the turn still completes and is persisted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import signal
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+from urllib.parse import urlsplit
+
+from cli_v6_1 import (
+    _persist_if_needed,
+    _reset_token_baseline,
+    _restore_short_memory_state_from_record,
+    _restore_token_baseline_from_record,
+    _session_brief_line,
+    _token_snapshot,
+)
+from core.client_factory import build_llm_client, build_model_router
+from core.config import load_config
+from core.logging_utils import close_session_logger, create_session_logger
+from core.mcp_client import MCPManager as MCPManagerV4
+from core.metrics import CONTENT_TYPE, REGISTRY
+from core.model_router import ModelRouter
+from core.rate_limiter import llm_session
+from core.session_store_v6 import SessionRecord, SessionStoreV6
+from core.short_memory_v6_1 import ShortMemoryConfig
+from core.tool_result_store import ToolResultGovernorConfig
+from core.trace import TraceSink
+from core.types import LLMClient
+from loops.agent_loop_v6_1 import V6_1
+
+# (event name, JSON payload); called from the event loop and from LLM worker threads.
+EventSink = Callable[[str, Dict[str, object]], None]
+
+MAX_BODY_BYTES = 1 << 20
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,80}$")
+
+_RESIDENT_SESSIONS = REGISTRY.gauge("agent_server_sessions", "Sessions resident in the server pool.")
+_ACTIVE_TURNS = REGISTRY.gauge("agent_server_active_turns", "Server turns currently holding a turn slot.")
+_TURNS = REGISTRY.counter("agent_server_turns_total", "Server turns by outcome.", ("outcome",))
+_TURN_DURATION = REGISTRY.histogram("agent_server_turn_seconds", "Server turn wall time including persistence.")
+_TURN_QUEUE_WAIT = REGISTRY.histogram("agent_server_turn_queue_seconds", "Time a turn waited for a global turn slot.")
+
+
+class SessionBusyError(RuntimeError):
+    pass
+
+
+class PoolFullError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    model_name: str
+    timeout_seconds: int = 60
+    max_sessions: int = 64
+    max_concurrent_turns: int = 8
+    max_tool_rounds: int = 50
+    stream_text: bool = True
+    # None: every session runs tools in the server cwd; otherwise <workspace_root>/<session_id>.
+    workspace_root: str | None = None
+    skills_dir: str | None = None
+    skill_index_cache: bool = False
+    mcp_enabled: bool = False
+    short_memory_config: ShortMemoryConfig = field(default_factory=ShortMemoryConfig)
+    tool_result_config: ToolResultGovernorConfig | None = None
+
+
+class _SessionSlot:
+    def __init__(self, record: SessionRecord) -> None:
+        self.record = record
+        self.loop: V6_1 | None = None
+        self.busy = False
+        self.turns = 0
+        self.title_attempted = False
+        self.last_used = time.monotonic()
+        self.sink: EventSink | None = None
+
+    def publish(self, event: str, data: Dict[str, object]) -> None:
+        sink = self.sink
+        if sink is not None:
+            sink(event, data)
+
+
+class SessionPool:
+    def __init__(
+        self,
+        *,
+        client: LLMClient,
+        store: SessionStoreV6,
+        config: ServerConfig,
+        mcp_manager: MCPManagerV4 | None = None,
+        trace_sink: TraceSink | None = None,
+        model_router: ModelRouter | None = None,
+    ) -> None:
+        self.client = client
+        self.store = store
+        self.config = config
+        self.mcp_manager = mcp_manager
+        self.trace_sink = trace_sink
+        self.model_router = model_router
+        self._slots: "OrderedDict[str, _SessionSlot]" = OrderedDict()
+        self._turn_slots = asyncio.Semaphore(max(1, config.max_concurrent_turns))
+        self.active_turns = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def is_resident(self, session_id: str) -> bool:
+        return session_id in self._slots
+
+    def create(self) -> _SessionSlot:
+        record = self.store.create(model_name=self.config.model_name, loop_version="v6.1", persist=False)
+        slot = self._admit(record)
+        _reset_token_baseline(slot.loop)  # type: ignore[arg-type]
+        return slot
+
+    def get(self, session_id: str) -> _SessionSlot:
+        slot = self._slots.get(session_id)
+        if slot is not None:
+            self._slots.move_to_end(session_id)
+            return slot
+        if not _SESSION_ID_RE.match(session_id) or not (self.store.root / f"{session_id}.md").exists():
+            raise KeyError(session_id)
+        record = self.store.load(session_id)
+        slot = self._admit(record)
+        loop = slot.loop
+        assert loop is not None
+        loop.state.messages = list(record.messages)
+        loop.set_raw_messages(list(record.messages))
+        loop.hydrate_short_memory_summary(record.summary)
+        _restore_short_memory_state_from_record(loop, record)
+        _restore_token_baseline_from_record(loop, record)
+        return slot
+
+    def evict(self, session_id: str) -> bool:
+        slot = self._slots.get(session_id)
+        if slot is None:
+            return False
+        if slot.busy:
+            raise SessionBusyError(session_id)
+        del self._slots[session_id]
+        if slot.loop is not None:
+            slot.loop.close()
+        _RESIDENT_SESSIONS.set(len(self._slots))
+        return True
+
+    def close(self) -> None:
+        for slot in self._slots.values():
+            if slot.loop is not None:
+                slot.loop.close()
+        self._slots.clear()
+        _RESIDENT_SESSIONS.set(0)
+
+    def begin_turn(self, session_id: str) -> _SessionSlot:
+        # Synchronous claim, so the busy check and the claim cannot interleave with another request.
+        slot = self.get(session_id)
+        if slot.busy:
+            raise SessionBusyError(session_id)
+        slot.busy = True
+        return slot
+
+    async def run_turn(self, slot: _SessionSlot, user_input: str, *, sink: EventSink | None = None) -> Dict[str, object]:
+        """Run one claimed turn (see ``begin_turn``), compact if due, persist; returns the ``done`` payload."""
+        loop = slot.loop
+        assert loop is not None and slot.busy
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self._turn_slots:
+                _TURN_QUEUE_WAIT.observe(time.perf_counter() - started)
+                self.active_turns += 1
+                _ACTIVE_TURNS.inc()
+                slot.sink = sink
+                try:
+                    with llm_session(slot.record.session_id):
+                        text = await loop.run_turn(user_input)
+                        compaction = await loop.maybe_auto_compress_short_memory()
+                        if slot.record.title_source != "model" and not slot.title_attempted:
+                            slot.title_attempted = True
+                            title = await loop.generate_title()
+                            if title:
+                                slot.record.title, slot.record.title_source = title, "model"
+                finally:
+                    slot.sink = None
+                    self.active_turns -= 1
+                    _ACTIVE_TURNS.dec()
+            messages = list(loop.get_raw_messages())
+            state = loop.get_short_memory_state()
+            snapshot = _token_snapshot(loop)
+            saved = await asyncio.to_thread(
+                _persist_if_needed,
+                self.store,
+                slot.record,
+                messages,
+                memory_summary=str(state.get("last_compaction_summary", "")),
+                token_snapshot=snapshot,
+                short_memory_state=state,
+            )
+            outcome = "ok"
+        finally:
+            slot.busy = False
+            slot.last_used = time.monotonic()
+            _TURNS.inc(outcome=outcome)
+            _TURN_DURATION.observe(time.perf_counter() - started)
+        slot.turns += 1
+        return {
+            "session_id": slot.record.session_id,
+            "text": text,
+            "saved": bool(saved),
+            "compacted": bool(compaction and compaction.get("performed")),
+            "duration_ms": int((time.perf_counter() - started) * 1000),
+            "usage": snapshot,
+        }
+
+    def describe(self, slot: _SessionSlot) -> Dict[str, object]:
+        record = slot.record
+        loop = slot.loop
+        return {
+            "session_id": record.session_id,
+            "title": record.title,
+            "created_at": record.created_at,
+            "updated_at": record.updated_at,
+            "messages": len(loop.get_raw_messages()) if loop is not None else len(record.messages),
+            "busy": slot.busy,
+            "turns": slot.turns,
+            "resident": True,
+            "usage": _token_snapshot(loop) if loop is not None else {},
+        }
+
+    def _admit(self, record: SessionRecord) -> _SessionSlot:
+        self._make_room()
+        slot = _SessionSlot(record)
+        slot.loop = self._build_loop(slot)
+        self._slots[record.session_id] = slot
+        _RESIDENT_SESSIONS.set(len(self._slots))
+        return slot
+
+    def _make_room(self) -> None:
+        limit = max(1, self.config.max_sessions)
+        while len(self._slots) >= limit:
+            # Idle sessions are already persisted after their last turn, so eviction only drops memory.
+            idle = next((sid for sid, slot in self._slots.items() if not slot.busy), None)
+            if idle is None:
+                raise PoolFullError(f"all {len(self._slots)} sessions are running a turn")
+            self.evict(idle)
+
+    def _build_loop(self, slot: _SessionSlot) -> V6_1:
+        cfg = self.config
+        cwd = "."
+        if cfg.workspace_root:
+            workspace = Path(cfg.workspace_root) / slot.record.session_id
+            workspace.mkdir(parents=True, exist_ok=True)
+            cwd = str(workspace)
+        return V6_1(
+            client=self.client,
+            model_name=cfg.model_name,
+            timeout_seconds=cfg.timeout_seconds,
+            max_tool_rounds=cfg.max_tool_rounds,
+            default_tool_cwd=cwd,
+            mcp_manager=self.mcp_manager,
+            mcp_enabled=cfg.mcp_enabled,
+            skills_dir=cfg.skills_dir,
+            skill_index_cache=cfg.skill_index_cache,
+            stream_text=cfg.stream_text,
+            verbose=False,
+            trace_callback=lambda line: slot.publish("tool", {"line": line}),
+            status_callback=lambda status: slot.publish("status", {"status": status}),
+            model_delta_callback=lambda delta: slot.publish("delta", {"text": delta}),
+            model_round_callback=lambda text, metrics: slot.publish("round", {"text": text, "metrics": dict(metrics)}),
+            short_memory_config=cfg.short_memory_config,
+            tool_result_config=cfg.tool_result_config,
+            trace_sink=self.trace_sink,
+            model_router=self.model_router,
+        )
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+_REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+def _response_head(status: int, content_type: str, *, length: int | None = None, extra: Dict[str, str] | None = None) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}", f"Content-Type: {content_type}", "Connection: close"]
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    for key, value in (extra or {}).items():
+        lines.append(f"{key}: {value}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def sse_event(event: str, data: Dict[str, object]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n".encode("utf-8")
+
+
+class AgentServer:
+    def __init__(self, pool: SessionPool, *, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.pool = pool
+        self.host = host
+        self.port = port
+        self._server: asyncio.base_events.Server | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "AgentServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_BODY_BYTES)
+        self.port = int(self._server.sockets[0].getsockname()[1])
+        return self
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, path, body = await self._read_request(reader)
+                await self._dispatch(method, path, body, writer)
+            except _HTTPError as exc:
+                await self._send_json(writer, exc.status, {"error": str(exc)})
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                await self._send_json(writer, 400, {"error": "malformed request"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _version = lines[0].split(" ", 2)
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            if line:
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0") or 0)
+        if length > MAX_BODY_BYTES:
+            raise _HTTPError(413, "request body too large")
+        body = await reader.readexactly(length) if length > 0 else b""
+        return method.upper(), urlsplit(target).path.rstrip("/") or "/", body
+
+    async def _dispatch(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        parts = [p for p in path.split("/") if p]
+        if parts == ["healthz"] and method == "GET":
+            payload = {"ok": True, "sessions": len(self.pool), "active_turns": self.pool.active_turns}
+            await self._send_json(writer, 200, payload)
+        elif parts == ["metrics"] and method == "GET":
+            await self._send_bytes(writer, 200, CONTENT_TYPE, REGISTRY.render().encode("utf-8"))
+        elif parts == ["sessions"] and method == "GET":
+            records = await asyncio.to_thread(self.pool.store.list_sessions)
+            items = [
+                {
+                    "session_id": r.session_id,
+                    "title": r.title,
+                    "updated_at": r.updated_at,
+                    "messages": len(r.messages),
+                    "resident": self.pool.is_resident(r.session_id),
+                    "brief": _session_brief_line(r),
+                }
+                for r in records
+            ]
+            await self._send_json(writer, 200, {"sessions": items})
+        elif parts == ["sessions"] and method == "POST":
+            slot = self._pool_call(self.pool.create)
+            await self._send_json(writer, 201, self.pool.describe(slot))
+        elif len(parts) == 2 and parts[0] == "sessions" and method == "GET":
+            slot = self._pool_call(self.pool.get, parts[1])
+            await self._send_json(writer, 200, self.pool.describe(slot))
+        elif len(parts) == 2 and parts[0] == "sessions" and method == "DELETE":
+            evicted = self._pool_call(self.pool.evict, parts[1])
+            await self._send_json(writer, 200, {"session_id": parts[1], "evicted": evicted})
+        elif len(parts) == 3 and parts[0] == "sessions" and parts[2] == "turns" and method == "POST":
+            await self._turn(parts[1], body, writer)
+        elif parts and parts[0] in {"healthz", "metrics", "sessions"}:
+            raise _HTTPError(405, f"{method} not allowed on {path}")
+        else:
+            raise _HTTPError(404, f"no route for {path}")
+
+    def _pool_call(self, fn: Callable[..., object], *args: object) -> object:
+        try:
+            return fn(*args)
+        except KeyError as exc:
+            raise _HTTPError(404, f"unknown session {exc.args[0]}") from exc
+        except SessionBusyError as exc:
+            raise _HTTPError(409, f"session {exc.args[0]} is running a turn") from exc
+        except PoolFullError as exc:
+            raise _HTTPError(503, str(exc)) from exc
+
+    async def _turn(self, session_id: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = json.loads(body.decode("utf-8")) if body else {}
+        except ValueError as exc:
+            raise _HTTPError(400, "body must be JSON") from exc
+        user_input = request.get("input") if isinstance(request, dict) else None
+        if not isinstance(user_input, str) or not user_input.strip():
+            raise _HTTPError(400, "'input' must be a non-empty string")
+        slot = self._pool_call(self.pool.begin_turn, session_id)
+        assert isinstance(slot, _SessionSlot)
+
+        if not bool(request.get("stream", True)):
+            try:
+                result = await self.pool.run_turn(slot, user_input)
+            except Exception as exc:  # noqa: BLE001
+                raise _HTTPError(500, f"{type(exc).__name__}: {exc}") from exc
+            await self._send_json(writer, 200, result)
+            return
+
+        events: "asyncio.Queue[Tuple[str, Dict[str, object]] | None]" = asyncio.Queue()
+        running_loop = asyncio.get_running_loop()
+
+        def _sink(event: str, data: Dict[str, object]) -> None:
+            running_loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+        task = asyncio.create_task(self.pool.run_turn(slot, user_input, sink=_sink))
+        # Queued after any events the turn published, since call_soon callbacks run in order.
+        task.add_done_callback(lambda _t: running_loop.call_soon(events.put_nowait, None))
+        connected = await self._write(writer, _response_head(200, "text/event-stream", extra={"Cache-Control": "no-cache"}))
+        while True:
+            item = await events.get()
+            if item is None:
+                break
+            if connected:
+                connected = await self._write(writer, sse_event(*item))
+        try:
+            final = ("done", task.result())
+        except Exception as exc:  # noqa: BLE001
+            final = ("error", {"session_id": session_id, "error": f"{type(exc).__name__}: {exc}"})
+        if connected:
+            await self._write(writer, sse_event(*final))
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, data: bytes) -> bool:
+        try:
+            writer.write(data)
+            await writer.drain()
+            return True
+        except ConnectionError:
+            return False
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, object]) -> None:
+        encoded = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        await self._send_bytes(writer, status, "application/json", encoded)
+
+    async def _send_bytes(self, writer: asyncio.StreamWriter, status: int, content_type: str, data: bytes) -> None:
+        await self._write(writer, _response_head(status, content_type, length=len(data)) + data)
+
+
+async def async_main() -> int:
+    parser = argparse.ArgumentParser(description="Headless v6.1 agent server (HTTP + SSE, concurrent sessions)")
+    parser.add_argument("--config", default="./configs/default.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--sessions-dir", default="./sessions", help="Session markdown directory")
+    parser.add_argument(
+        "--workspace-root",
+        default=None,
+        help="Give each session its own tool cwd <root>/<session_id> (default: all sessions share the server cwd)",
+    )
+    parser.add_argument("--max-sessions", type=int, default=64, help="Resident loops before idle LRU sessions are evicted")
+    parser.add_argument("--max-concurrent-turns", type=int, default=8, help="Turns running at once across all sessions")
+    parser.add_argument("--max-tool-rounds", type=int, default=50)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=32,
+        help="Threads for blocking LLM/MCP/tool calls (keep >= max concurrent turns)",
+    )
+    parser.add_argument("--stream", action=argparse.BooleanOptionalAction, default=True, help="Stream model output (SSE deltas)")
+    parser.add_argument("--memory-auto", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--memory-compact-ratio", type=float, default=None)
+    parser.add_argument("--memory-context-window", type=int, default=None)
+    parser.add_argument("--memory-keep-recent-turns", type=int, default=4)
+    parser.add_argument("--tool-result-max-tokens", type=int, default=4000)
+    parser.add_argument("--tool-results-dir", default="./logs/tool_results")
+    parser.add_argument("--trace-file", default=None)
+    parser.add_argument("--prompt-cache", choices=["off", "openai", "anthropic"], default=None)
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--log-dir", default="./logs")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    logger, log_path = create_session_logger(log_dir=args.log_dir, debug=args.debug, background=True)
+    logger.info("startup server=v6.1 model=%s provider=%s log=%s", cfg.model_name, cfg.provider, log_path)
+    running_loop = asyncio.get_running_loop()
+    running_loop.set_default_executor(ThreadPoolExecutor(max_workers=max(1, int(args.workers)), thread_name_prefix="agent"))
+
+    compact_ratio = float(args.memory_compact_ratio) if args.memory_compact_ratio is not None else float(cfg.memory_compact_ratio)
+    compact_ratio = 0.8 if compact_ratio <= 0 else min(1.0, compact_ratio)
+    context_window = int(args.memory_context_window) if args.memory_context_window is not None else int(cfg.memory_context_window_tokens)
+    context_window = max(1000, context_window)
+
+    client = build_llm_client(cfg, debug=args.debug, logger=logger, prompt_cache_mode=args.prompt_cache)
+    trace_sink = TraceSink(args.trace_file) if args.trace_file else None
+    pool = SessionPool(
+        client=client,
+        store=SessionStoreV6(args.sessions_dir),
+        mcp_manager=MCPManagerV4(cfg.mcp_servers or []) if cfg.mcp_servers else None,
+        trace_sink=trace_sink,
+        model_router=build_model_router(cfg),
+        config=ServerConfig(
+            model_name=cfg.model_name,
+            timeout_seconds=cfg.timeout_seconds,
+            max_sessions=int(args.max_sessions),
+            max_concurrent_turns=int(args.max_concurrent_turns),
+            max_tool_rounds=int(args.max_tool_rounds),
+            stream_text=bool(args.stream),
+            workspace_root=args.workspace_root,
+            skills_dir=cfg.skills_dir,
+            skill_index_cache=True,
+            mcp_enabled=bool(cfg.mcp_servers),
+            short_memory_config=ShortMemoryConfig(
+                auto_enabled=bool(args.memory_auto),
+                usage_threshold_tokens=max(1000, int(context_window * compact_ratio)),
+                keep_recent_user_turns=max(1, int(args.memory_keep_recent_turns)),
+            ),
+            tool_result_config=ToolResultGovernorConfig(
+                enabled=int(args.tool_result_max_tokens) > 0,
+                max_inline_tokens=max(1, int(args.tool_result_max_tokens)),
+                store_dir=args.tool_results_dir,
+            ),
+        ),
+    )
+    server = await AgentServer(pool, host=str(args.host), port=int(args.port)).start()
+    print(f"v6.1 agent server listening on {server.base_url}", flush=True)
+    logger.info("listening url=%s max_sessions=%s max_turns=%s", server.base_url, args.max_sessions, args.max_concurrent_turns)
+
+    serving = asyncio.ensure_future(server.serve_forever())
+    try:
+        running_loop.add_signal_handler(signal.SIGTERM, serving.cancel)
+    except (NotImplementedError, RuntimeError):
+        pass
+    try:
+        await serving
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await server.close()
+        pool.close()
+        if trace_sink is not None:
+            trace_sink.close()
+        close_session_logger(logger)
+    return 0
+
+
+def main() -> int:
+    try:
+        return asyncio.run(async_main())
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
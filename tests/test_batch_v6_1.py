@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import batch_v6_1 as batch
+from core.client import OpenAICompatClient
+from tests.support import load_script
+
+mock = load_script("mock_llm_server")
+
+SCRIPT = {
+    "responses": [
+        {"tool_calls": [{"name": "write", "arguments": {"path": "out.txt", "content": "done"}}]},
+        {"text": "Wrote out.txt."},
+    ],
+}
+
+
+class BatchRunnerTests(unittest.IsolatedAsyncioTestCase):
+    def _write_tasks(self, root: Path) -> str:
+        path = root / "tasks.jsonl"
+        lines = [
+            {"request_id": "r-1", "title": "First", "body": "write the file"},
+            {"id": "t/2", "prompt": "write it again"},
+            {"input": "and once more"},
+        ]
+        path.write_text("\n".join(json.dumps(item) for item in lines) + "\n", encoding="utf-8")
+        return str(path)
+
+    def test_load_tasks_accepts_common_shapes(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="batch-") as temp_dir:
+            tasks = batch.load_tasks(self._write_tasks(Path(temp_dir)))
+        self.assertEqual([t.task_id for t in tasks], ["r-1", "t/2", "line-3"])
+        self.assertEqual(tasks[0].prompt, "First\n\nwrite the file")
+        self.assertEqual(tasks[1].prompt, "write it again")
+
+    def test_load_tasks_rejects_ids_sharing_a_workspace(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="batch-") as temp_dir:
+            path = Path(temp_dir) / "tasks.jsonl"
+            lines = [{"id": "task 1", "prompt": "a"}, {"id": "task/1", "prompt": "b"}]
+            path.write_text("\n".join(json.dumps(item) for item in lines) + "\n", encoding="utf-8")
+            with self.assertRaisesRegex(ValueError, r"'task/1' collides with 'task 1'"):
+                batch.load_tasks(str(path))
+
+    async def test_runs_in_isolated_workspaces_and_resumes_from_checkpoint(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="batch-") as temp_dir, mock.MockLLMServer(SCRIPT) as server:
+            root = Path(temp_dir)
+            tasks = batch.load_tasks(self._write_tasks(root))
+            results_path = root / "results.jsonl"
+            # A previous run finished r-1 and crashed while writing the next line.
+            results_path.write_text(json.dumps({"task_id": "r-1", "status": "ok"}) + "\n{\"task_id\": \"t/", encoding="utf-8")
+            config = batch.BatchConfig(
+                model_name="mock-model",
+                work_root=str(root / "work"),
+                results_path=str(results_path),
+                sessions_dir=str(root / "sessions"),
+                concurrency=2,
+            )
+            client = OpenAICompatClient(base_url=server.base_url, api_key="mock")
+            results = await batch.run_batch(tasks, client=client, config=config)
+
+            self.assertEqual(sorted(r["task_id"] for r in results), ["line-3", "t/2"])
+            for result in results:
+                self.assertEqual(result["status"], "ok")
+                self.assertEqual(result["final_text"], "Wrote out.txt.")
+                self.assertEqual((result["rounds"], result["tool_calls"]), (2, 1))
+                self.assertGreater(int(result["total_tokens"]), 0)
+                self.assertEqual((Path(str(result["workspace"])) / "out.txt").read_text(encoding="utf-8"), "done")
+                self.assertTrue((root / "sessions" / f"{result['session_id']}.md").exists())
+            self.assertFalse((root / "work" / "r-1").exists())
+            self.assertEqual(len(set(r["workspace"] for r in results)), 2)
+
+            checkpoint = batch.load_checkpoint(str(results_path))
+            self.assertEqual(set(checkpoint), {"r-1", "t/2", "line-3"})
+            again = await batch.run_batch(tasks, client=client, config=config)
+            self.assertEqual(again, [])
+        self.assertEqual(batch.summarize(results)["by_status"], {"ok": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
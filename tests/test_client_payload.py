@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.client import OpenAICompatClient, _encode_payload
+from core.message_encoder import MessageEncoder
+from core.types import ToolSpec
+
+
+def _tool(name: str) -> ToolSpec:
+    return ToolSpec(
+        name=name,
+        description=f"{name} 工具",
+        parameters={"type": "object", "properties": {"path": {"type": "string"}}, "required": ["path"]},
+        handler=lambda _params: "",
+    )
+
+
+class PromptCacheUsageTests(unittest.TestCase):
+    def test_parse_usage_reads_cached_token_fields(self) -> None:
+        openai = OpenAICompatClient._parse_usage(
+            {"prompt_tokens": 1000, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 768}},
+        )
+        self.assertEqual((openai.prompt_tokens, openai.cached_prompt_tokens), (1000, 768))
+
+        deepseek = OpenAICompatClient._parse_usage(
+            {"prompt_tokens": 500, "completion_tokens": 5, "prompt_cache_hit_tokens": 320, "prompt_cache_miss_tokens": 180},
+        )
+        self.assertEqual(deepseek.cached_prompt_tokens, 320)
+
+        anthropic = OpenAICompatClient._parse_usage(
+            {"input_tokens": 50, "output_tokens": 7, "cache_read_input_tokens": 900, "cache_creation_input_tokens": 100},
+        )
+        self.assertEqual(anthropic.prompt_tokens, 1050)
+        self.assertEqual(anthropic.cached_prompt_tokens, 900)
+        self.assertEqual(anthropic.cache_write_tokens, 100)
+        self.assertEqual(anthropic.total_tokens, 1057)
+
+    def test_cache_hints_per_mode(self) -> None:
+        messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "hi"}]
+
+        payload = {"model": "m", "messages": messages}
+        OpenAICompatClient(base_url="http://x", prompt_cache_mode="off")._apply_prompt_cache_hints(payload)
+        self.assertNotIn("prompt_cache_key", payload)
+
+        first = {"model": "m", "messages": messages}
+        second = {"model": "m", "messages": [*messages, {"role": "assistant", "content": "yo"}]}
+        client = OpenAICompatClient(base_url="http://x", prompt_cache_mode="openai")
+        client._apply_prompt_cache_hints(first)
+        client._apply_prompt_cache_hints(second)
+        self.assertEqual(first["prompt_cache_key"], second["prompt_cache_key"])
+
+        payload = {"model": "m", "messages": messages}
+        OpenAICompatClient(base_url="http://x", prompt_cache_mode="anthropic")._apply_prompt_cache_hints(payload)
+        marked = payload["messages"]
+        self.assertEqual(marked[0]["content"][0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(marked[-1]["content"][0]["text"], "hi")
+        self.assertEqual(messages[0]["content"], "sys")
+
+
+class ToolPayloadCacheTests(unittest.TestCase):
+    def test_spliced_body_matches_json_dumps(self) -> None:
+        client = OpenAICompatClient(base_url="http://x")
+        tools = [_tool("read"), _tool("grep")]
+        encoded = client._encoded_tools(tools)
+        payload = {
+            "model": "m",
+            "messages": [{"role": "user", "content": "你好 \"quoted\""}],
+            "tools": encoded.payload,
+            "tool_choice": "auto",
+            "stream": True,
+        }
+        self.assertEqual(_encode_payload(payload, {"tools": [encoded.encoded]}), json.dumps(payload).encode("utf-8"))
+
+    def test_encoded_tools_reused_per_tool_list_identity(self) -> None:
+        client = OpenAICompatClient(base_url="http://x")
+        tools = [_tool("read"), _tool("grep")]
+        first = client._encoded_tools(tools)
+        self.assertIs(client._encoded_tools(list(tools)), first)
+        self.assertIsNot(client._encoded_tools([*tools, _tool("ls")]), first)
+        for _ in range(20):
+            client._encoded_tools([_tool("tmp")])
+        self.assertLessEqual(len(client._tool_payloads), 8)
+
+
+class MessageEncoderTests(unittest.TestCase):
+    def test_memoized_history_matches_json_dumps_and_detects_reassignment(self) -> None:
+        encoder = MessageEncoder()
+        history: list[dict[str, object]] = [
+            {"role": "system", "content": "sys"},
+            {"role": "user", "content": "读取 a.txt"},
+            {"role": "assistant", "content": "", "tool_calls": [{"id": "c1", "type": "function"}]},
+        ]
+        self.assertEqual(encoder.encode_messages(history), json.dumps(history).encode("utf-8"))
+        history.append({"role": "tool", "tool_call_id": "c1", "content": "ok"})
+        self.assertEqual(encoder.encode_messages(history), json.dumps(history).encode("utf-8"))
+        self.assertEqual(encoder.misses, 4)
+
+        history[1]["content"] = "changed"
+        self.assertEqual(encoder.encode_messages(history), json.dumps(history).encode("utf-8"))
+        self.assertEqual(encoder.misses, 5)
+        self.assertEqual(encoder.encode_messages([]), b"[]")
+
+    def test_memo_is_bounded_by_total_bytes(self) -> None:
+        encoder = MessageEncoder(max_bytes=200)
+        history = [{"role": "user", "content": "x" * 50} for _ in range(10)]
+        self.assertEqual(encoder.encode_messages(history), json.dumps(history).encode("utf-8"))
+        self.assertLessEqual(encoder.total_bytes, 200)
+        self.assertLess(len(encoder._entries), 10)
+        # Only the newest messages stay memoized.
+        encoder.encode_messages(history[-2:])
+        self.assertEqual(encoder.hits, 2)
+
+    def test_reassigned_value_with_reused_id_is_not_a_hit(self) -> None:
+        encoder = MessageEncoder()
+        message = {"role": "user", "content": "a" * 40}
+        encoder.encode_message(message)
+        # The old value is kept alive by the memo, so the new one cannot take its id.
+        message["content"] = "b" * 40
+        self.assertEqual(encoder.encode_message(message), json.dumps(message).encode("utf-8"))
+        self.assertEqual(encoder.misses, 2)
+
+    def test_payload_with_message_fragments_matches_json_dumps(self) -> None:
+        encoder = MessageEncoder()
+        messages = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "yo"}]
+        payload = {"model": "m", "messages": messages, "stream": True}
+        body = _encode_payload(payload, {"messages": encoder.encode_fragments(messages)})
+        self.assertEqual(body, json.dumps(payload).encode("utf-8"))
+
+
+class _SSEHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        chunks = [
+            {"choices": [{"delta": {"reasoning_content": "think"}}]},
+            {"choices": [{"delta": {"content": "Hel"}}]},
+            {"choices": [{"delta": {"content": "lo"}}]},
+            {"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 20}},
+        ]
+        for chunk in chunks:
+            time.sleep(0.03)
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *_args: object) -> None:
+        return
+
+
+class StreamTimingTests(unittest.IsolatedAsyncioTestCase):
+    async def test_stream_reports_first_delta_timings_and_gaps(self) -> None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _SSEHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            client = OpenAICompatClient(base_url=f"http://127.0.0.1:{server.server_port}/v1", api_key="k")
+            response = await client.generate(
+                model_name="m",
+                messages=[{"role": "user", "content": "hi"}],
+                stream=True,
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(response.text, "Hello")
+        timings = response.timings
+        self.assertIsNotNone(timings)
+        self.assertEqual(timings.chunks, 4)
+        self.assertLess(timings.first_reasoning_ms, timings.first_text_ms)
+        self.assertIsNone(timings.first_tool_call_ms)
+        self.assertEqual(sum(timings.gap_histogram), 3)
+        self.assertGreater(timings.generation_ms, 0)
+        self.assertGreater(response.response_bytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from core.fs_watcher import FileChangeEvent, InotifyFileWatcher, PollingFileWatcher, start_file_watcher
+from core.skill_loader import SkillLoader
+from core.tool_cache import ToolResultCache
+
+
+def _wait_until(predicate, timeout: float = 3.0) -> bool:  # type: ignore[no-untyped-def]
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+class FileWatcherTests(unittest.TestCase):
+    def test_polling_watcher_reports_create_modify_delete(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="fs-watch-poll-") as temp_dir:
+            root = Path(temp_dir).resolve()
+            target = root / "a.txt"
+            target.write_text("one", encoding="utf-8")
+            watcher = PollingFileWatcher(str(root), interval_seconds=60)
+            events: list[FileChangeEvent] = []
+            watcher.subscribe(events.append)
+            watcher._prepare()
+
+            (root / "b.txt").write_text("new", encoding="utf-8")
+            target.write_text("changed content", encoding="utf-8")
+            watcher.poll_once()
+            kinds = {(Path(e.path).name, e.kind) for e in events}
+            self.assertIn(("b.txt", "created"), kinds)
+            self.assertIn(("a.txt", "modified"), kinds)
+
+            events.clear()
+            target.unlink()
+            watcher.poll_once()
+            self.assertEqual([(Path(e.path).name, e.kind) for e in events], [("a.txt", "deleted")])
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux-only")
+    def test_inotify_watcher_invalidates_cache_without_stat(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="fs-watch-inotify-") as temp_dir:
+            root = Path(temp_dir).resolve()
+            (root / "sub").mkdir()
+            target = root / "sub" / "note.txt"
+            target.write_text("v1", encoding="utf-8")
+            try:
+                watcher = InotifyFileWatcher(str(root))
+                watcher.start()
+            except OSError as err:
+                self.skipTest(f"inotify unavailable: {err}")
+            try:
+                cache = ToolResultCache()
+                cache.attach_watcher(watcher)
+                args = {"path": "sub/note.txt", "cwd": str(root)}
+                cache.store("read", args, "v1", deps=cache.capture_deps("read", args))
+                self.assertEqual(cache.lookup("read", args), "v1")
+
+                seen = threading.Event()
+                watcher.subscribe(lambda event: seen.set() if event.path == str(target) else None)
+                target.write_text("v2", encoding="utf-8")
+                self.assertTrue(seen.wait(3.0))
+                self.assertIsNone(cache.lookup("read", args))
+
+                # Directories created after start are watched too.
+                (root / "late").mkdir()
+                self.assertTrue(_wait_until(lambda: watcher.covers(str(root / "late" / "x.txt"))))
+
+                # A directory whose watch could not be added is not covered, nor is any tree containing it.
+                watcher._unwatched.add(str(root / "sub"))
+                self.assertFalse(watcher.covers(str(root)))
+                self.assertFalse(watcher.covers(str(root / "sub")))
+            finally:
+                watcher.stop()
+
+    def test_polling_watcher_does_not_replace_fingerprint_checks(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="fs-watch-poll-cache-") as temp_dir:
+            root = Path(temp_dir).resolve()
+            target = root / "note.txt"
+            target.write_text("v1", encoding="utf-8")
+            watcher = PollingFileWatcher(str(root), interval_seconds=60)
+            watcher.start()
+            try:
+                self.assertFalse(watcher.covers(str(target)))
+                cache = ToolResultCache()
+                cache.attach_watcher(watcher)
+                args = {"path": "note.txt", "cwd": str(root)}
+                cache.store("read", args, "v1", deps=cache.capture_deps("read", args))
+                # Changed before the next poll: only the fingerprint can notice.
+                target.write_text("v2 longer", encoding="utf-8")
+                self.assertIsNone(cache.lookup("read", args))
+            finally:
+                watcher.stop()
+
+    def test_change_between_capture_and_store_refuses_the_store(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="fs-watch-race-") as temp_dir:
+            root = Path(temp_dir).resolve()
+            target = root / "note.txt"
+            target.write_text("v1", encoding="utf-8")
+            watcher = PollingFileWatcher(str(root), interval_seconds=60)
+            watcher.start()
+            try:
+                cache = ToolResultCache()
+                cache.attach_watcher(watcher)
+                args = {"path": "note.txt", "cwd": str(root)}
+                other = {"path": "other.txt", "cwd": str(root)}
+                deps = cache.capture_deps("read", args)
+                other_deps = cache.capture_deps("read", other)
+                # The edit lands while the tool is still running; there is no entry yet to invalidate.
+                cache.on_file_event(FileChangeEvent(path=str(target), kind="modified"))
+
+                self.assertFalse(cache.store("read", args, "v1", deps=deps))
+                self.assertIsNone(cache.lookup("read", args))
+                # Unrelated changes do not veto other stores.
+                self.assertTrue(cache.store("read", other, "o", deps=other_deps))
+                self.assertEqual(cache.lookup("read", other), "o")
+            finally:
+                watcher.stop()
+
+    def test_skill_loader_reloads_on_skill_events(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="fs-watch-skills-") as temp_dir:
+            root = Path(temp_dir).resolve()
+            skill_md = root / "demo" / "SKILL.md"
+            skill_md.parent.mkdir()
+            skill_md.write_text("---\ndescription: first\n---\nbody", encoding="utf-8")
+            loader = SkillLoader(str(root))
+            version = loader.version
+
+            skill_md.write_text("---\ndescription: second\n---\nbody", encoding="utf-8")
+            loader.on_file_event(FileChangeEvent(path=str(skill_md), kind="modified"))
+            self.assertEqual(loader.list_skills()[0].description, "second")
+            self.assertGreater(loader.version, version)
+
+            loader.on_file_event(FileChangeEvent(path=str(root.parent / "elsewhere.txt"), kind="modified"))
+            self.assertEqual(loader.list_skill_names(), ["demo"])
+
+    def test_start_file_watcher_falls_back_to_polling(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="fs-watch-start-") as temp_dir:
+            watcher = start_file_watcher(temp_dir, prefer_inotify=False, poll_interval_seconds=0.05)
+            try:
+                self.assertEqual(watcher.backend, "polling")
+                self.assertTrue(watcher.is_running)
+                # Polling only notices changes on its next scan, so it never vouches for a path.
+                self.assertFalse(watcher.covers(str(Path(temp_dir) / "x.txt")))
+            finally:
+                watcher.stop()
+            self.assertFalse(watcher.is_running)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,10 +2,11 @@ from __future__ import annotations
 
 import re
 import tempfile
+import threading
 import unittest
 from pathlib import Path
 
-from core.logging_utils import create_session_logger
+from core.logging_utils import LazyJSON, close_session_logger, create_session_logger
 
 
 class LoggingTests(unittest.TestCase):
@@ -29,6 +30,26 @@ class LoggingTests(unittest.TestCase):
             content = Path(log_path).read_text(encoding="utf-8")
             self.assertIn("request payload: sample", content)
 
+    def test_background_logger_formats_lazily_off_thread(self) -> None:
+        class _Probe:
+            formatted_on: list[str] = []
+
+            def __str__(self) -> str:
+                self.formatted_on.append(threading.current_thread().name)
+                return "probe-formatted"
+
+        with tempfile.TemporaryDirectory(prefix="agent-suite-logs-") as temp_dir:
+            logger, log_path = create_session_logger(log_dir=temp_dir, debug=False, background=True)
+            main_thread = threading.current_thread().name
+            logger.debug("request payload: %s", _Probe())
+            logger.debug("big: %s", LazyJSON({"messages": ["x" * 500] * 50}, max_chars=1000))
+            close_session_logger(logger)
+
+            content = Path(log_path).read_text(encoding="utf-8")
+            self.assertIn("request payload: probe-formatted", content)
+            self.assertIn("[truncated ", content)
+            self.assertNotIn(main_thread, _Probe.formatted_on)
+
 
 if __name__ == "__main__":
     unittest.main()
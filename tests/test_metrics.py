@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+import urllib.request
+from pathlib import Path
+
+from core.metrics import REGISTRY, MetricsRegistry, start_metrics_server
+from core.session_store_v6 import SessionStoreV6
+from core.types import AssistantResponse, TokenUsage, ToolCall
+from loops.agent_loop_v6_1 import V6_1
+
+
+class ScriptedClient:
+    def __init__(self, responses: list[AssistantResponse]) -> None:
+        self.responses = list(responses)
+
+    async def generate(self, **kwargs):  # type: ignore[no-untyped-def]
+        _ = kwargs
+        return self.responses.pop(0)
+
+
+class MetricsRegistryTests(unittest.TestCase):
+    def test_render_prometheus_text(self) -> None:
+        registry = MetricsRegistry()
+        calls = registry.counter("demo_calls_total", "Calls.", ("tool",))
+        latency = registry.histogram("demo_seconds", "Latency.", buckets=(0.1, 1.0))
+        calls.inc(tool='say "hi"')
+        calls.inc(2, tool='say "hi"')
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(3.0)
+
+        text = registry.render()
+        self.assertIn("# TYPE demo_calls_total counter", text)
+        self.assertIn('demo_calls_total{tool="say \\"hi\\""} 3', text)
+        self.assertIn('demo_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('demo_seconds_bucket{le="1"} 2', text)
+        self.assertIn('demo_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("demo_seconds_count 3", text)
+        self.assertIs(registry.counter("demo_calls_total", "Calls.", ("tool",)), calls)
+        with self.assertRaises(ValueError):
+            registry.gauge("demo_calls_total", "Calls.")
+        with self.assertRaises(ValueError):
+            calls.inc(other="x")
+
+    def test_http_endpoint(self) -> None:
+        registry = MetricsRegistry()
+        registry.gauge("demo_up", "Up.").set(1)
+        server = start_metrics_server(0, registry=registry)
+        try:
+            host, port = server.server_address[:2]
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as resp:
+                body = resp.read().decode("utf-8")
+                self.assertTrue(resp.headers["Content-Type"].startswith("text/plain"))
+            self.assertIn("demo_up 1", body)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class AgentMetricsTests(unittest.IsolatedAsyncioTestCase):
+    async def test_loop_feeds_llm_and_tool_metrics(self) -> None:
+        tokens = REGISTRY.get("agent_llm_tokens_total")
+        tool_calls = REGISTRY.get("agent_tool_calls_total")
+        llm_calls = REGISTRY.get("agent_llm_requests_total")
+        saves = REGISTRY.get("agent_session_saves_total")
+        before_prompt = tokens.value(model="metrics-model", kind="prompt")  # type: ignore[union-attr]
+        before_tool = tool_calls.value(tool="read", outcome="ok")  # type: ignore[union-attr]
+        before_llm = llm_calls.value(model="metrics-model", outcome="ok")  # type: ignore[union-attr]
+        before_saved = saves.value(outcome="saved")  # type: ignore[union-attr]
+
+        with tempfile.TemporaryDirectory(prefix="metrics-") as temp_dir:
+            root = Path(temp_dir)
+            (root / "a.txt").write_text("hello", encoding="utf-8")
+            client = ScriptedClient(
+                [
+                    AssistantResponse(
+                        text="",
+                        tool_calls=[ToolCall(id="c1", name="read", arguments={"path": "a.txt"})],
+                        usage=TokenUsage(prompt_tokens=10, completion_tokens=2, total_tokens=12),
+                    ),
+                    AssistantResponse(text="done", usage=TokenUsage(prompt_tokens=20, completion_tokens=1, total_tokens=21)),
+                ],
+            )
+            loop = V6_1(client=client, model_name="metrics-model", default_tool_cwd=str(root), verbose=False)
+            await loop.run_turn("read a.txt")
+            loop.close()
+
+            store = SessionStoreV6(str(root / "sessions"))
+            record = store.create(model_name="metrics-model", loop_version="v6.1")
+            record.messages = list(loop.get_messages())
+            self.assertTrue(store.save(record))
+
+        self.assertEqual(tokens.value(model="metrics-model", kind="prompt") - before_prompt, 30)  # type: ignore[union-attr]
+        self.assertEqual(tool_calls.value(tool="read", outcome="ok") - before_tool, 1)  # type: ignore[union-attr]
+        self.assertEqual(llm_calls.value(model="metrics-model", outcome="ok") - before_llm, 2)  # type: ignore[union-attr]
+        self.assertEqual(saves.value(outcome="saved") - before_saved, 1)  # type: ignore[union-attr]
+        self.assertIn('agent_tool_duration_seconds_count{tool="read"}', REGISTRY.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from core.client import OpenAICompatClient
+from loops.agent_loop_v6_1 import V6_1
+from tests.support import load_script
+
+mock = load_script("mock_llm_server")
+
+SCRIPT = {
+    "responses": [
+        {"reasoning": "look first", "tool_calls": [{"name": "read", "arguments": {"path": "a.txt"}}]},
+        {"text": "a.txt says hello"},
+    ],
+}
+
+
+class MockLLMServerTests(unittest.IsolatedAsyncioTestCase):
+    async def _run_turn(self, server, root: Path, *, stream: bool) -> V6_1:  # type: ignore[no-untyped-def]
+        loop = V6_1(
+            client=OpenAICompatClient(base_url=server.base_url, api_key="mock"),
+            model_name="mock-model",
+            default_tool_cwd=str(root),
+            verbose=False,
+            stream_text=stream,
+        )
+        text = await loop.run_turn("what is in a.txt?")
+        loop.close()
+        self.assertEqual(text, "a.txt says hello")
+        tool_messages = [m for m in loop.get_messages() if m.get("role") == "tool"]
+        self.assertEqual(len(tool_messages), 1)
+        self.assertIn("hello", str(tool_messages[0]["content"]))
+        return loop
+
+    async def test_replays_script_with_and_without_sse(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="mock-llm-") as temp_dir:
+            root = Path(temp_dir)
+            (root / "a.txt").write_text("hello", encoding="utf-8")
+            latency = mock.MockLatency(ttft_ms=20, tokens_per_sec=2000)
+            with mock.MockLLMServer(SCRIPT, latency=latency) as server:
+                plain = await self._run_turn(server, root, stream=False)
+                streamed = await self._run_turn(server, root, stream=True)
+            self.assertEqual(server.stats.requests, 4)
+            self.assertEqual(server.stats.stream_requests, 2)
+
+        for loop in (plain, streamed):
+            snap = loop.get_token_usage_snapshot()
+            self.assertEqual(snap["last_usage_source"], "provider")
+            self.assertGreater(int(snap["session_prompt_tokens"]), 0)
+        snap = streamed.get_token_usage_snapshot()
+        self.assertTrue(snap["has_stream_timings"])
+        self.assertGreaterEqual(int(snap["last_ttft_ms"]), 15)
+
+    async def test_concurrent_conversations_stay_on_script(self) -> None:
+        bench = load_script("bench_loops")
+        with mock.MockLLMServer() as server:
+            results = await bench.run_benchmark(
+                ["v3", "v6.1"],
+                base_url=server.base_url,
+                sessions=4,
+                concurrency=4,
+                turns=2,
+                stream=True,
+                server=server,
+            )
+        for row in results:
+            self.assertEqual(row.turns, 8)
+            # Default script: ls -> read -> final text, restarted every turn.
+            self.assertEqual(row.rounds, 24)
+            self.assertIsNotNone(row.server_ms_per_round)
+
+
+if __name__ == "__main__":
+    unittest.main()
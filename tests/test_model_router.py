@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List
+
+from core.client_factory import build_model_router
+from core.config import load_config
+from core.model_router import ModelRouter, ModelRouterConfig
+from core.session_store_v6 import SessionStoreV6
+from core.types import AssistantResponse, TokenUsage, ToolCall
+from loops.agent_loop_v6_1 import V6_1
+from server_v6_1 import ServerConfig, SessionPool
+
+
+class ModelScriptedClient:
+    """Replies from a per-model script and records which model served each request."""
+
+    def __init__(self, scripts: dict[str, list[AssistantResponse | Exception]]) -> None:
+        self.scripts = {model: list(items) for model, items in scripts.items()}
+        self.models: List[str] = []
+
+    async def generate(self, *, model_name, messages, tools=None, on_text_delta=None, **kwargs):  # type: ignore[no-untyped-def]
+        _ = (messages, tools, kwargs)
+        self.models.append(model_name)
+        item = self.scripts[model_name].pop(0)
+        if isinstance(item, Exception):
+            raise item
+        if on_text_delta is not None and item.text:
+            on_text_delta(item.text)
+        return item
+
+
+def _usage(prompt: int, completion: int) -> TokenUsage:
+    return TokenUsage(prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion)
+
+
+def _router(**overrides: object) -> ModelRouter:
+    config = ModelRouterConfig(cheap_model="small", cheap_input_per_million=1.0, cheap_output_per_million=2.0, **overrides)  # type: ignore[arg-type]
+    return ModelRouter("big", config, primary_input_per_million=10.0, primary_output_per_million=20.0)
+
+
+class ModelRouterTests(unittest.TestCase):
+    def test_route_round_only_offloads_small_read_only_followups(self) -> None:
+        router = _router(followup_max_result_chars=10)
+        read_result = [{"role": "assistant", "content": ""}, {"role": "tool", "name": "read", "content": "short"}]
+        self.assertEqual(router.route_round(read_result, 1), "small")
+        self.assertEqual(router.route_round(read_result, 0), "big")
+        self.assertEqual(router.route_round([{"role": "tool", "name": "bash", "content": "ok"}], 1), "big")
+        self.assertEqual(router.route_round([{"role": "tool", "name": "read", "content": "x" * 11}], 1), "big")
+        self.assertEqual(_router(purposes=("compaction",)).route_round(read_result, 1), "big")
+
+    def test_report_prices_models_and_estimates_savings(self) -> None:
+        router = _router()
+        router.observe("tool_followup", "small", _usage(1_000_000, 0), 0.2)
+        router.observe("tool_followup", "small", _usage(1_000_000, 0), 0.4, accepted=False)
+        router.observe("round", "big", _usage(0, 1_000_000), 1.0)
+        report = router.report()
+        models = report["models"]
+        assert isinstance(models, dict)
+        self.assertEqual(models["small"]["requests"], 2)
+        self.assertAlmostEqual(models["small"]["avg_latency_ms"], 300.0)
+        self.assertAlmostEqual(models["big"]["cost"], 20.0)
+        # One accepted million prompt tokens would have cost 10 on the primary; the cheap model spent 2 in total.
+        self.assertAlmostEqual(report["estimated_savings"], 8.0)
+
+
+class V6_1RoutingTests(unittest.IsolatedAsyncioTestCase):
+    async def test_followup_round_uses_cheap_model_and_escalates_final_answer(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="model-router-") as temp_dir:
+            (Path(temp_dir) / "a.txt").write_text("hello", encoding="utf-8")
+            client = ModelScriptedClient(
+                {
+                    "big": [
+                        AssistantResponse(text="", tool_calls=[ToolCall(id="c1", name="ls", arguments={"path": "."})]),
+                        AssistantResponse(text="a.txt says hello"),
+                    ],
+                    "small": [
+                        AssistantResponse(text="", tool_calls=[ToolCall(id="c2", name="read", arguments={"path": "a.txt"})]),
+                        AssistantResponse(text="probably hello"),
+                    ],
+                },
+            )
+            deltas: List[str] = []
+            router = _router()
+            loop = V6_1(
+                client=client,
+                model_name="big",
+                default_tool_cwd=temp_dir,
+                verbose=False,
+                stream_text=True,
+                model_delta_callback=deltas.append,
+                model_router=router,
+            )
+            text = await loop.run_turn("what is in a.txt?")
+        self.assertEqual(text, "a.txt says hello")
+        self.assertEqual(client.models, ["big", "small", "small", "big"])
+        self.assertEqual(deltas, ["a.txt says hello"])
+        self.assertEqual(router.escalations, {"final_answer": 1})
+
+    async def test_unstructured_cheap_summary_is_redone_on_primary(self) -> None:
+        summary = "[SHORT MEMORY SUMMARY]\n- 用户目标: x\n- 关键约束: y\n- 已完成: z\n- 未完成: w\n- 下一步: v"
+        client = ModelScriptedClient({"small": [AssistantResponse(text="sure, here is a summary")], "big": [AssistantResponse(text=summary)]})
+        router = _router()
+        loop = V6_1(client=client, model_name="big", verbose=False, model_router=router)
+        result = await loop._summarize_messages_for_compaction([{"role": "user", "content": "do x"}], "manual")
+        self.assertEqual(result, summary)
+        self.assertEqual(client.models, ["small", "big"])
+        self.assertEqual(router.escalations, {"unstructured": 1})
+
+    async def test_generate_title_uses_cheap_model(self) -> None:
+        client = ModelScriptedClient(
+            {
+                "big": [AssistantResponse(text="已修复", usage=_usage(500, 50))],
+                "small": [AssistantResponse(text="“修复登录错误”\n", usage=_usage(40, 6))],
+            }
+        )
+        loop = V6_1(client=client, model_name="big", verbose=False, model_router=_router())
+        await loop.run_turn("登录页面报 500，帮我修一下")
+        self.assertEqual(await loop.generate_title(), "修复登录错误")
+        # The title call is billed to the session but does not replace the conversation's last-call usage.
+        snap = loop.get_token_usage_snapshot()
+        self.assertEqual((snap["last_prompt_tokens"], snap["session_prompt_tokens"]), (500, 540))
+        self.assertEqual(snap["session_total_tokens"], 596)
+        plain = V6_1(client=client, model_name="big", verbose=False)
+        self.assertIsNone(await plain.generate_title())
+
+    async def test_server_tries_a_failed_title_only_once(self) -> None:
+        client = ModelScriptedClient(
+            {"big": [AssistantResponse(text="one"), AssistantResponse(text="two")], "small": [RuntimeError("down")]}
+        )
+        with tempfile.TemporaryDirectory(prefix="model-router-") as temp_dir:
+            pool = SessionPool(
+                client=client,
+                store=SessionStoreV6(temp_dir),
+                config=ServerConfig(model_name="big"),
+                model_router=_router(),
+            )
+            slot = pool.create()
+            await pool.run_turn(pool.begin_turn(slot.record.session_id), "first question")
+            await pool.run_turn(pool.begin_turn(slot.record.session_id), "second question")
+            pool.close()
+        self.assertEqual(client.models.count("small"), 1)
+        self.assertNotEqual(slot.record.title_source, "model")
+
+    def test_config_builds_router(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="model-router-") as temp_dir:
+            path = Path(temp_dir) / "cfg.json"
+            cfg = {
+                "provider": "p",
+                "model_name": "big",
+                "base_url": "http://127.0.0.1:1/v1",
+                "pricing_input_per_million": 4,
+                "pricing_output_per_million": 8,
+                "model_router": {"cheap_model": "small", "purposes": ["compaction", "bogus"], "cheap_input_per_million": 1},
+            }
+            path.write_text(json.dumps(cfg), encoding="utf-8")
+            router = build_model_router(load_config(str(path)))
+        assert router is not None
+        self.assertEqual(router.config.purposes, ("compaction",))
+        self.assertEqual(router.model_for("compaction"), "small")
+        self.assertEqual(router.model_for("title"), "big")
+        self.assertEqual(router.cost("big", _usage(1_000_000, 1_000_000)), 12.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
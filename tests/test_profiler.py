@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import pstats
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from core.profiler import TurnProfiler
+from core.types import AssistantResponse, ToolCall
+from loops.agent_loop_v6_1 import V6_1
+
+
+class SlowScriptedClient:
+    def __init__(self, responses: list[AssistantResponse]) -> None:
+        self.responses = list(responses)
+
+    async def generate(self, **kwargs):  # type: ignore[no-untyped-def]
+        _ = kwargs
+        await asyncio.to_thread(time.sleep, 0.05)
+        return self.responses.pop(0)
+
+
+def _responses() -> list[AssistantResponse]:
+    return [
+        AssistantResponse(text="", tool_calls=[ToolCall(id="c1", name="read", arguments={"path": "a.txt"})]),
+        AssistantResponse(text="done"),
+    ]
+
+
+class TurnProfilerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_sampler_writes_collapsed_speedscope_and_timeline(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="profile-") as temp_dir:
+            root = Path(temp_dir)
+            (root / "a.txt").write_text("hello", encoding="utf-8")
+            profiler = TurnProfiler(str(root / "prof"), interval_ms=2, max_turns=1)
+            loop = V6_1(
+                client=SlowScriptedClient([*_responses(), AssistantResponse(text="again")]),
+                model_name="test-model",
+                default_tool_cwd=str(root),
+                verbose=False,
+                profiler=profiler,
+            )
+            await loop.run_turn("read a.txt")
+            await loop.run_turn("second turn is not profiled")
+            loop.close()
+
+            self.assertEqual(len(profiler.profiles), 1)
+            profile = profiler.profiles[0]
+            self.assertGreater(profile.samples, 0)
+            collapsed = (root / "prof" / "turn-0001.collapsed").read_text(encoding="utf-8")
+            self.assertIn("round1/llm;thread:", collapsed)
+            speedscope = json.loads((root / "prof" / "turn-0001.speedscope.json").read_text(encoding="utf-8"))
+            sampled = speedscope["profiles"][0]
+            self.assertEqual(sampled["type"], "sampled")
+            self.assertEqual(len(sampled["samples"]), len(sampled["weights"]))
+            timeline = json.loads((root / "prof" / "turn-0001.timeline.json").read_text(encoding="utf-8"))
+            labels = [phase["label"] for phase in timeline["phases"]]
+            self.assertEqual(labels, ["round1/llm", "round1/tool:read", "round2/llm"])
+            self.assertFalse((root / "prof" / "turn-0002.collapsed").exists())
+
+    async def test_cprofile_mode_dumps_pstats(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="profile-") as temp_dir:
+            root = Path(temp_dir)
+            (root / "a.txt").write_text("hello", encoding="utf-8")
+            profiler = TurnProfiler(str(root / "prof"), mode="cprofile")
+            loop = V6_1(
+                client=SlowScriptedClient(_responses()),
+                model_name="test-model",
+                default_tool_cwd=str(root),
+                verbose=False,
+                profiler=profiler,
+            )
+            await loop.run_turn("read a.txt")
+            loop.close()
+
+            stats = pstats.Stats(str(root / "prof" / "turn-0001.pstats"))
+            self.assertGreater(stats.total_calls, 0)  # type: ignore[attr-defined]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import tempfile
+import time
+import unittest
+from email.message import Message as HeaderMessage
+from pathlib import Path
+from typing import List
+from urllib.error import HTTPError
+
+from core.client_factory import build_llm_client
+from core.config import load_config
+from core.metrics import REGISTRY
+from core.rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_COMPACTION,
+    PRIORITY_INTERACTIVE,
+    LLMScheduler,
+    RateLimitConfig,
+    RateLimitedClient,
+    TokenBucket,
+    current_priority,
+    current_session,
+    estimate_request_tokens,
+    llm_priority,
+    llm_session,
+    retry_after_seconds,
+)
+from core.types import AssistantResponse, TokenUsage
+from tests.support import FakeClock
+
+
+class _RecordingClient:
+    def __init__(self, *, usage_total: int = 0, error: Exception | None = None) -> None:
+        self.calls: List[tuple[int, str]] = []
+        self.usage_total = usage_total
+        self.error = error
+
+    async def generate(self, **_kwargs: object) -> AssistantResponse:
+        self.calls.append((current_priority(), current_session()))
+        if self.error is not None:
+            raise self.error
+        usage = TokenUsage(total_tokens=self.usage_total, source="provider") if self.usage_total else None
+        return AssistantResponse(text="ok", usage=usage)
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_refill_and_debt(self) -> None:
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock)
+        bucket.take(60)
+        self.assertAlmostEqual(bucket.wait_time(1), 1.0)
+        clock.now += 0.5
+        self.assertAlmostEqual(bucket.wait_time(1), 0.5)
+        # Requests above capacity wait for a full bucket rather than forever.
+        self.assertAlmostEqual(bucket.wait_time(1000), 59.5)
+        bucket.adjust(30)
+        self.assertAlmostEqual(bucket.tokens, -29.5)
+
+    def test_retry_after_and_estimate(self) -> None:
+        headers = HeaderMessage()
+        headers["Retry-After"] = "3"
+        exc = HTTPError("http://x", 429, "Too Many Requests", headers, io.BytesIO())
+        self.assertEqual(retry_after_seconds(exc), 3.0)
+        self.assertIsNone(retry_after_seconds(RuntimeError("x")))
+        self.assertEqual(estimate_request_tokens([{"role": "user", "content": "a" * 400}]), 104)
+
+
+class SchedulerTests(unittest.IsolatedAsyncioTestCase):
+    async def _drain_order(self, scheduler: LLMScheduler, jobs: List[tuple[str, int, str]]) -> List[str]:
+        order: List[str] = []
+
+        async def _job(name: str, priority: int, session: str) -> None:
+            await scheduler.acquire(1, priority=priority, session=session)
+            order.append(name)
+
+        tasks = [asyncio.create_task(_job(*job)) for job in jobs]
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.queued(), len(jobs))
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+        return order
+
+    async def test_priority_classes_dispatch_before_lower_ones(self) -> None:
+        scheduler = LLMScheduler(RateLimitConfig(requests_per_minute=600))
+        assert scheduler.requests is not None
+        scheduler.requests.tokens = 0
+        order = await self._drain_order(
+            scheduler,
+            [
+                ("bg", PRIORITY_BACKGROUND, "batch"),
+                ("compact", PRIORITY_COMPACTION, "s1"),
+                ("turn", PRIORITY_INTERACTIVE, "s2"),
+            ],
+        )
+        self.assertEqual(order, ["turn", "compact", "bg"])
+        self.assertGreater(REGISTRY.get("llm_scheduler_queue_seconds").count(priority="background"), 0)
+
+    async def test_sessions_are_served_round_robin(self) -> None:
+        scheduler = LLMScheduler(RateLimitConfig(requests_per_minute=1200))
+        assert scheduler.requests is not None
+        scheduler.requests.tokens = 0
+        jobs = [(f"a{i}", PRIORITY_INTERACTIVE, "a") for i in range(3)] + [("b0", PRIORITY_INTERACTIVE, "b")]
+        order = await self._drain_order(scheduler, jobs)
+        self.assertEqual(order, ["a0", "b0", "a1", "a2"])
+
+    async def test_cancelled_waiter_does_not_consume_budget(self) -> None:
+        scheduler = LLMScheduler(RateLimitConfig(requests_per_minute=600))
+        assert scheduler.requests is not None
+        scheduler.requests.tokens = 0
+        waiter = asyncio.create_task(scheduler.acquire(1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        started = time.perf_counter()
+        await asyncio.wait_for(scheduler.acquire(1), 5)
+        self.assertLess(time.perf_counter() - started, 0.3)
+        self.assertEqual(scheduler.queued(), 0)
+
+
+class RateLimitedClientTests(unittest.IsolatedAsyncioTestCase):
+    async def test_settles_estimate_and_propagates_context(self) -> None:
+        scheduler = LLMScheduler(RateLimitConfig(tokens_per_minute=10_000, completion_tokens_estimate=100))
+        inner = _RecordingClient(usage_total=150)
+        client = RateLimitedClient(inner, scheduler)
+        with llm_priority(PRIORITY_BACKGROUND), llm_session("task-7"):
+            await client.generate(model_name="m", messages=[{"role": "user", "content": "x" * 400}])
+        self.assertEqual(inner.calls, [(PRIORITY_BACKGROUND, "task-7")])
+        assert scheduler.tokens is not None
+        self.assertAlmostEqual(scheduler.tokens.tokens, 10_000 - 150, delta=1)
+
+    async def test_refund_wakes_queued_requests(self) -> None:
+        scheduler = LLMScheduler(RateLimitConfig(tokens_per_minute=600))
+        assert scheduler.tokens is not None
+        scheduler.tokens.tokens = 0
+        # Needs 300 tokens: about 30s of refill, unless the over-reservation below is refunded first.
+        waiter = asyncio.create_task(scheduler.acquire(300))
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.queued(), 1)
+        scheduler.settle(500, 100)
+        await asyncio.wait_for(waiter, 1)
+        self.assertEqual(scheduler.queued(), 0)
+
+    async def test_429_pauses_scheduler(self) -> None:
+        headers = HeaderMessage()
+        headers["Retry-After"] = "0.2"
+        error = HTTPError("http://x", 429, "Too Many Requests", headers, io.BytesIO())
+        scheduler = LLMScheduler(RateLimitConfig(requests_per_minute=6000))
+        client = RateLimitedClient(_RecordingClient(error=error), scheduler)
+        with self.assertRaises(HTTPError):
+            await client.generate(model_name="m", messages=[])
+        started = time.perf_counter()
+        await scheduler.acquire(1)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.15)
+
+    def test_config_enables_rate_limited_client(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="ratelimit-") as temp_dir:
+            path = Path(temp_dir) / "cfg.json"
+            base = {"provider": "p", "model_name": "m", "base_url": "http://127.0.0.1:1/v1"}
+            path.write_text(json.dumps({**base, "rate_limit": {"requests_per_minute": 60, "tokens_per_minute": 0}}))
+            limited = build_llm_client(load_config(str(path)))
+            path.write_text(json.dumps(base))
+            plain = build_llm_client(load_config(str(path)))
+        # Retries wrap the rate limiter, so each attempt is admitted separately.
+        self.assertIsInstance(getattr(limited, "inner", None), RateLimitedClient)
+        self.assertNotIsInstance(getattr(plain, "inner", None), RateLimitedClient)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import io
+import os
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from cli_v6_1 import RefreshUI
+
+
+class RefreshUITests(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.dict(os.environ, {"COLUMNS": "100", "LINES": "40"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _ui(self, max_fps: float) -> RefreshUI:
+        ui = RefreshUI(enabled=True, model_name="m", log_path="log", max_fps=max_fps)
+        for idx in range(40):
+            ui.dialogue.append(("USER" if idx % 2 == 0 else "ASSISTANT", f"entry {idx} " + "word " * 60))
+        return ui
+
+    def test_streamed_deltas_are_coalesced_and_flushed(self) -> None:
+        ui = self._ui(max_fps=20)
+        buf = io.StringIO()
+        with redirect_stdout(buf):
+            ui.render()
+            for _ in range(500):
+                ui.stream_assistant_delta("tok ")
+            self.assertLess(ui.frames_rendered, 5)
+            time.sleep(0.15)
+            ui.close_assistant_stream()
+        self.assertEqual(ui.dialogue[-1], ("ASSISTANT", "tok " * 500))
+        self.assertIn("tok tok", buf.getvalue().rsplit("\033[2J", 1)[-1])
+
+    def test_incremental_frames_only_rewrite_changed_rows(self) -> None:
+        ui = self._ui(max_fps=0)
+        buf = io.StringIO()
+        with redirect_stdout(buf):
+            ui.render()
+            full_rows = ui.rows_written
+            misses = ui.wrap_cache_misses
+            ui.stream_assistant_delta("hello")
+            ui.stream_assistant_delta(" world")
+        tail = buf.getvalue()[buf.getvalue().index("hello") - 40 :]
+        self.assertEqual(buf.getvalue().count("\033[2J"), 1)
+        self.assertNotIn("\033[2J", tail)
+        # Each delta touches the streaming row (and scrolled dialogue rows), never the header/footer.
+        self.assertLess(ui.rows_written - full_rows, full_rows)
+        # Only the streaming entry is re-wrapped; history entries come from the cache.
+        self.assertEqual(ui.wrap_cache_misses - misses, 2)
+
+    def test_invalidate_forces_full_repaint(self) -> None:
+        ui = self._ui(max_fps=0)
+        buf = io.StringIO()
+        with redirect_stdout(buf):
+            ui.render()
+            ui.render()
+            self.assertEqual(buf.getvalue().count("\033[2J"), 1)
+            ui.invalidate_screen()
+            ui.render()
+        self.assertEqual(buf.getvalue().count("\033[2J"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import unittest
+from email.message import Message as HeaderMessage
+from typing import List
+from urllib.error import HTTPError, URLError
+
+from core.metrics import REGISTRY
+from core.resilience import ResilienceConfig, ResilientClient, backoff_delay, classify_error
+from core.types import AssistantResponse
+
+
+def _http_error(code: int, retry_after: str | None = None) -> HTTPError:
+    headers = HeaderMessage()
+    if retry_after is not None:
+        headers["Retry-After"] = retry_after
+    return HTTPError("http://x", code, "err", headers, io.BytesIO())
+
+
+class _ScriptedClient:
+    """Each call pops the next step: an exception to raise, or (delay_seconds, text, deltas)."""
+
+    def __init__(self, steps: List[object]) -> None:
+        self.steps = list(steps)
+        self.calls: List[bool] = []
+
+    async def generate(self, *, stream: bool = False, on_text_delta=None, should_abort=None, **_kwargs: object) -> AssistantResponse:  # type: ignore[no-untyped-def]
+        self.calls.append(stream)
+        step = self.steps.pop(0)
+        if isinstance(step, BaseException):
+            raise step
+        delay, text, deltas = step  # type: ignore[misc]
+        for piece in deltas:
+            if on_text_delta is not None:
+                on_text_delta(piece)
+        waited = 0.0
+        while waited < delay:
+            if should_abort is not None and should_abort():
+                raise InterruptedError("aborted")
+            await asyncio.sleep(0.01)
+            waited += 0.01
+        return AssistantResponse(text=text)
+
+
+class ResilienceTests(unittest.IsolatedAsyncioTestCase):
+    def test_classification_and_backoff(self) -> None:
+        cfg = ResilienceConfig()
+        self.assertEqual(classify_error(_http_error(503), cfg), "http_503")
+        self.assertIsNone(classify_error(_http_error(400), cfg))
+        self.assertEqual(classify_error(URLError(ConnectionResetError()), cfg), "connection")
+        self.assertEqual(classify_error(TimeoutError(), cfg), "timeout")
+        self.assertIsNone(classify_error(InterruptedError(), cfg))
+        self.assertEqual(backoff_delay(cfg, 3, rng=lambda: 1.0), 2.0)
+        self.assertEqual(backoff_delay(cfg, 30, rng=lambda: 1.0), cfg.max_delay_seconds)
+        self.assertEqual(backoff_delay(cfg, 1, retry_after=500.0), cfg.max_retry_after_seconds)
+
+    async def test_retries_transient_errors_with_backoff_and_retry_after(self) -> None:
+        sleeps: List[float] = []
+
+        async def _sleep(seconds: float) -> None:
+            sleeps.append(seconds)
+
+        inner = _ScriptedClient([_http_error(429, retry_after="2"), URLError(ConnectionResetError()), (0, "ok", [])])
+        client = ResilientClient(inner, ResilienceConfig(max_attempts=3), sleep=_sleep, rng=lambda: 0.5)
+        before = REGISTRY.get("llm_retries_total").value(reason="http_429")
+        response = await client.generate(model_name="m", messages=[])
+        self.assertEqual(response.text, "ok")
+        self.assertEqual(sleeps, [2.0, 0.5])
+        self.assertEqual(REGISTRY.get("llm_retries_total").value(reason="http_429"), before + 1)
+
+        exhausted = ResilientClient(_ScriptedClient([_http_error(500), _http_error(500)]), ResilienceConfig(max_attempts=2), sleep=_sleep)
+        with self.assertRaises(HTTPError):
+            await exhausted.generate(model_name="m", messages=[])
+
+    async def test_half_streamed_reply_is_not_retried(self) -> None:
+        class _FailsMidStream(_ScriptedClient):
+            async def generate(self, *, on_text_delta=None, **kwargs: object) -> AssistantResponse:  # type: ignore[no-untyped-def,override]
+                if on_text_delta is not None:
+                    on_text_delta("partial ")
+                raise ConnectionResetError("reset")
+
+        deltas: List[str] = []
+        client = ResilientClient(_FailsMidStream([]), ResilienceConfig(max_attempts=3))
+        with self.assertRaises(ConnectionResetError):
+            await client.generate(model_name="m", messages=[], stream=True, on_text_delta=deltas.append)
+        self.assertEqual(deltas, ["partial "])
+
+    async def test_slow_stream_is_hedged_with_non_stream_duplicate(self) -> None:
+        cfg = ResilienceConfig(hedge=True, hedge_min_samples=5, hedge_min_delay_ms=50)
+        inner = _ScriptedClient([(5.0, "slow", []), (0.0, "fast hedge", [])])
+        client = ResilientClient(inner, cfg)
+        self.assertIsNone(client.hedge_delay(True))
+        for _ in range(5):
+            client._latencies[True].append(0.01)  # type: ignore[attr-defined]
+        self.assertAlmostEqual(client.hedge_delay(True) or 0, 0.05)
+
+        won_before = REGISTRY.get("llm_hedges_total").value(outcome="won")
+        deltas: List[str] = []
+        response = await asyncio.wait_for(
+            client.generate(model_name="m", messages=[], stream=True, on_text_delta=deltas.append),
+            2,
+        )
+        self.assertEqual(response.text, "fast hedge")
+        self.assertEqual(deltas, ["fast hedge"])
+        self.assertEqual(inner.calls, [True, False])
+        self.assertEqual(REGISTRY.get("llm_hedges_total").value(outcome="won"), won_before + 1)
+
+    async def test_no_hedge_once_primary_streams(self) -> None:
+        cfg = ResilienceConfig(hedge=True, hedge_min_samples=1, hedge_min_delay_ms=20)
+        inner = _ScriptedClient([(0.2, "primary", ["pri", "mary"])])
+        client = ResilientClient(inner, cfg)
+        client._latencies[True].append(0.01)  # type: ignore[attr-defined]
+        deltas: List[str] = []
+        response = await client.generate(model_name="m", messages=[], stream=True, on_text_delta=deltas.append)
+        self.assertEqual((response.text, deltas, inner.calls), ("primary", ["pri", "mary"], [True]))
+
+
+if __name__ == "__main__":
+    unittest.main()
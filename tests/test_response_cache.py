@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List
+from unittest import mock as unittest_mock
+
+from cli_v6_1 import _token_stats_line
+from core.client_factory import build_llm_client
+from core.config import load_config
+from core.metrics import REGISTRY
+from core.response_cache import CachingClient, ResponseCacheConfig, ResponseStore, request_key
+from core.types import AssistantResponse, TokenUsage, ToolCall, ToolSpec
+from loops.agent_loop_v6_1 import V6_1
+
+
+class _CountingClient:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def generate(self, *, on_text_delta=None, **_kwargs: object) -> AssistantResponse:  # type: ignore[no-untyped-def]
+        self.calls += 1
+        if on_text_delta is not None:
+            on_text_delta("hello world")
+        return AssistantResponse(
+            text="hello world",
+            tool_calls=[ToolCall(id="c1", name="read", arguments={"path": "a.txt"})],
+            usage=TokenUsage(prompt_tokens=10, completion_tokens=2, total_tokens=12),
+        )
+
+
+def _tool(description: str = "Read a file") -> ToolSpec:
+    return ToolSpec(name="read", description=description, parameters={"type": "object"}, handler=lambda _args: "")
+
+
+class RequestKeyTests(unittest.TestCase):
+    def test_key_is_canonical_and_covers_request_content(self) -> None:
+        messages = [{"role": "user", "content": "hi", "name": "u"}]
+        reordered = [{"name": "u", "content": "hi", "role": "user"}]
+        base = request_key(model_name="m", messages=messages, tools=[_tool()])
+        self.assertEqual(base, request_key(model_name="m", messages=reordered, tools=[_tool()]))
+        self.assertNotEqual(base, request_key(model_name="m2", messages=messages, tools=[_tool()]))
+        self.assertNotEqual(base, request_key(model_name="m", messages=messages, tools=[_tool("Read")]))
+        self.assertNotEqual(base, request_key(model_name="m", messages=messages, tools=[_tool()], params={"temperature": 0}))
+
+
+class ResponseStoreTests(unittest.TestCase):
+    def test_evicts_least_recently_used_past_max_bytes(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="respcache-") as temp_dir:
+            store = ResponseStore(temp_dir, max_bytes=250)
+            for key in ("aa1", "bb2"):
+                store.put(key, b"x" * 100)
+            # Touch the older entry so the newer one becomes the eviction victim.
+            os.utime(Path(temp_dir) / "bb" / "bb2.json", (1, 1))
+            store._index["bb2"] = (100, 1.0)  # type: ignore[index]
+            self.assertIsNotNone(store.get("aa1"))
+            store.put("cc3", b"y" * 100)
+            self.assertIsNone(store.get("bb2"))
+            self.assertIsNotNone(store.get("aa1"))
+            self.assertLessEqual(store.total_bytes(), 250)
+            # A fresh store rebuilds its index from disk.
+            self.assertEqual(ResponseStore(temp_dir, max_bytes=250).get("cc3"), b"y" * 100)
+
+
+class CachingClientTests(unittest.IsolatedAsyncioTestCase):
+    async def test_hit_replays_stream_and_marks_usage(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="respcache-") as temp_dir:
+            inner = _CountingClient()
+            sleeps: List[float] = []
+
+            async def _sleep(seconds: float) -> None:
+                sleeps.append(seconds)
+
+            config = ResponseCacheConfig(directory=temp_dir, replay_chars_per_second=4, replay_chunk_chars=4)
+            client = CachingClient(inner, config, sleep=_sleep)
+            messages = [{"role": "user", "content": "x"}]
+            first = await client.generate(model_name="m", messages=messages, stream=True, on_text_delta=lambda _t: None)
+            hits_before = REGISTRY.get("llm_response_cache_requests_total").value(outcome="hit")
+
+            deltas: List[str] = []
+            second = await client.generate(model_name="m", messages=messages, stream=True, on_text_delta=deltas.append)
+        self.assertEqual(inner.calls, 1)
+        self.assertEqual(deltas, ["hell", "o wo", "rld"])
+        self.assertEqual(sleeps, [1.0, 1.0, 0.75])
+        self.assertEqual(second.tool_calls, first.tool_calls)
+        assert second.usage is not None
+        self.assertEqual((second.usage.total_tokens, second.usage.source), (12, "cache"))
+        self.assertEqual(REGISTRY.get("llm_response_cache_requests_total").value(outcome="hit"), hits_before + 1)
+
+    async def test_replay_honors_abort(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="respcache-") as temp_dir:
+            client = CachingClient(_CountingClient(), ResponseCacheConfig(directory=temp_dir, replay_chunk_chars=1))
+            await client.generate(model_name="m", messages=[])
+            deltas: List[str] = []
+            with self.assertRaises(InterruptedError):
+                await client.generate(
+                    model_name="m",
+                    messages=[],
+                    stream=True,
+                    on_text_delta=deltas.append,
+                    should_abort=lambda: len(deltas) >= 3,
+                )
+        self.assertEqual(deltas, ["h", "e", "l"])
+
+    async def test_replayed_usage_is_counted_but_not_billed(self) -> None:
+        class _AnswerClient:
+            async def generate(self, **_kwargs: object) -> AssistantResponse:
+                usage = TokenUsage(prompt_tokens=1000, completion_tokens=100, total_tokens=1100, cached_prompt_tokens=400)
+                return AssistantResponse(text="done", usage=usage)
+
+        pricing = {
+            "pricing_input_per_million": 1.0,
+            "pricing_output_per_million": 2.0,
+            "pricing_currency": "USD",
+            "pricing_cache_read_per_million": 0.5,
+        }
+        with tempfile.TemporaryDirectory(prefix="respcache-") as temp_dir:
+            client = CachingClient(_AnswerClient(), ResponseCacheConfig(directory=temp_dir))
+            billed = V6_1(client=client, model_name="m", verbose=False)
+            await billed.run_turn("hi")
+            replayed = V6_1(client=client, model_name="m", verbose=False)
+            await replayed.run_turn("hi")
+            snap = replayed.get_token_usage_snapshot()
+            self.assertEqual((snap["session_total_tokens"], snap["session_replayed_prompt_tokens"]), (1100, 1000))
+            self.assertEqual(snap["session_replayed_cached_prompt_tokens"], 400)
+            self.assertIn("cost(window=$0.000000, session=$0.000000", _token_stats_line(replayed, **pricing))
+            # A fresh request after the replay: only its own cached tokens get the cache-read rate.
+            await replayed.run_turn("more")
+        # 600 uncached * $1 + 400 cached * $0.5 + 100 completion * $2 per million.
+        self.assertIn("session=$0.001000", _token_stats_line(billed, **pricing))
+        self.assertIn("session=$0.001000", _token_stats_line(replayed, **pricing))
+
+    def test_config_and_env_enable_cache(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="respcache-") as temp_dir:
+            path = Path(temp_dir) / "cfg.json"
+            base = {"provider": "p", "model_name": "m", "base_url": "http://127.0.0.1:1/v1"}
+            path.write_text(json.dumps({**base, "response_cache": {"dir": temp_dir, "max_mb": 1}}))
+            cfg = load_config(str(path))
+            assert cfg.response_cache is not None
+            self.assertEqual(cfg.response_cache.max_bytes, 1024 * 1024)
+            self.assertIsInstance(build_llm_client(cfg), CachingClient)
+
+            path.write_text(json.dumps(base))
+            with unittest_mock.patch.dict(os.environ, {"LLM_RESPONSE_CACHE": temp_dir}):
+                cfg = load_config(str(path))
+            assert cfg.response_cache is not None
+            self.assertEqual(cfg.response_cache.directory, temp_dir)
+            with unittest_mock.patch.dict(os.environ, {"LLM_RESPONSE_CACHE": "0"}):
+                self.assertIsNone(load_config(str(path)).response_cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List
+from urllib.error import URLError
+
+from core.client import OpenAICompatClient
+from core.client_factory import build_llm_client
+from core.config import load_config
+from core.routing_client import EndpointConfig, RoutingClient, RoutingConfig
+from core.types import AssistantResponse
+from tests.support import FakeClock, load_script
+
+mock = load_script("mock_llm_server")
+
+
+class _Endpoint:
+    def __init__(self, name: str, *, fail: bool = False, delay: float = 0.0) -> None:
+        self.name = name
+        self.fail = fail
+        self.delay = delay
+        self.models: List[str] = []
+
+    async def generate(self, *, model_name: str, **_kwargs: object) -> AssistantResponse:
+        self.models.append(model_name)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise URLError(ConnectionRefusedError(f"{self.name} down"))
+        return AssistantResponse(text=self.name)
+
+
+def _router(*clients: _Endpoint, clock: FakeClock, **config: object) -> RoutingClient:
+    routes = [(EndpointConfig(name=c.name, base_url=f"http://{c.name}"), c) for c in clients]
+    return RoutingClient(routes, RoutingConfig(**config), clock=clock, rng=lambda: 0.0)  # type: ignore[arg-type]
+
+
+class RoutingClientTests(unittest.IsolatedAsyncioTestCase):
+    async def test_fails_over_and_circuit_breaks_then_recovers(self) -> None:
+        clock = FakeClock(1000.0)
+        bad, good = _Endpoint("bad", fail=True), _Endpoint("good")
+        router = _router(bad, good, clock=clock, failure_threshold=2, cooldown_seconds=10)
+
+        for _ in range(2):
+            response = await router.generate(model_name="m", messages=[])
+            self.assertEqual(response.text, "good")
+        self.assertEqual(len(bad.models), 2)
+        self.assertEqual(router.snapshot()[0]["state"], "open")
+
+        # While open, traffic skips the bad endpoint entirely.
+        await router.generate(model_name="m", messages=[])
+        self.assertEqual(len(bad.models), 2)
+
+        # After the cooldown one probe goes through; a failed probe doubles the cooldown.
+        clock.now += 10
+        self.assertEqual(router.snapshot()[0]["state"], "half_open")
+        await router.generate(model_name="m", messages=[])
+        self.assertEqual(len(bad.models), 3)
+        self.assertEqual(router.endpoints[0].cooldown, 20)
+
+        bad.fail = False
+        clock.now += 20
+        response = await router.generate(model_name="m", messages=[])
+        self.assertEqual(response.text, "bad")
+        self.assertEqual(router.snapshot()[0]["state"], "closed")
+
+    async def test_all_endpoints_failing_raises_last_error(self) -> None:
+        router = _router(_Endpoint("a", fail=True), _Endpoint("b", fail=True), clock=FakeClock(1000.0))
+        with self.assertRaises(URLError):
+            await router.generate(model_name="m", messages=[])
+
+    async def test_least_outstanding_spreads_concurrent_requests(self) -> None:
+        a, b = _Endpoint("a", delay=0.05), _Endpoint("b", delay=0.05)
+        router = _router(a, b, clock=FakeClock(1000.0))
+        await asyncio.gather(*(router.generate(model_name="m", messages=[]) for _ in range(6)))
+        self.assertEqual((len(a.models), len(b.models)), (3, 3))
+
+    async def test_ewma_prefers_faster_endpoint(self) -> None:
+        clock = FakeClock(1000.0)
+        slow, fast = _Endpoint("slow"), _Endpoint("fast")
+        router = _router(slow, fast, clock=clock, policy="ewma")
+        router.endpoints[0].ewma_seconds = 2.0
+        router.endpoints[1].ewma_seconds = 0.2
+        for _ in range(3):
+            await router.generate(model_name="m", messages=[])
+        self.assertEqual((len(slow.models), len(fast.models)), (0, 3))
+
+    async def test_config_endpoints_route_to_live_mock(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="routing-") as temp_dir, mock.MockLLMServer({"responses": [{"text": "hi"}]}) as server:
+            path = Path(temp_dir) / "cfg.json"
+            cfg = {
+                "provider": "p",
+                "model_name": "m",
+                "base_url": "http://unused/v1",
+                "api_key": "k",
+                "resilience": False,
+                "endpoints": [
+                    {"name": "dead", "base_url": "http://127.0.0.1:9/v1", "weight": 5},
+                    {"name": "live", "base_url": server.base_url, "model_name": "m-alias"},
+                ],
+                "routing": {"policy": "ewma", "failure_threshold": 1},
+            }
+            path.write_text(json.dumps(cfg), encoding="utf-8")
+            client = build_llm_client(load_config(str(path)))
+            self.assertIsInstance(client, RoutingClient)
+            assert isinstance(client, RoutingClient)
+            self.assertIsInstance(client.endpoints[1].client, OpenAICompatClient)
+            # Both endpoints are unmeasured, so the first pick is a weighted draw; pin it to "dead" to exercise failover.
+            client._rng = lambda: 0.0
+            response = await client.generate(model_name="m", messages=[{"role": "user", "content": "x"}])
+        self.assertEqual(response.text, "hi")
+        self.assertEqual([s["state"] for s in client.snapshot()], ["open", "closed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
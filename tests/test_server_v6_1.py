@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from core.client import OpenAICompatClient
+from core.session_store_v6 import SessionStoreV6
+from server_v6_1 import AgentServer, ServerConfig, SessionPool
+from tests.support import load_script
+
+mock = load_script("mock_llm_server")
+load_test = load_script("load_test_server")
+
+SCRIPT = {
+    "responses": [
+        {"tool_calls": [{"name": "write", "arguments": {"path": "notes.txt", "content": "hi"}}]},
+        {"text": "Created notes.txt for you."},
+    ],
+}
+
+
+class AgentServerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        temp = tempfile.TemporaryDirectory(prefix="server-v6-1-")
+        self.addCleanup(temp.cleanup)
+        self.root = Path(temp.name)
+        self.mock = mock.MockLLMServer(SCRIPT, latency=mock.MockLatency(ttft_ms=150, tokens_per_sec=4000)).start()
+        self.addCleanup(self.mock.stop)
+        self.store = SessionStoreV6(str(self.root / "sessions"))
+        self.pool = SessionPool(
+            client=OpenAICompatClient(base_url=self.mock.base_url, api_key="mock"),
+            store=self.store,
+            config=ServerConfig(model_name="mock-model", max_sessions=2, workspace_root=str(self.root / "ws")),
+        )
+        self.server = await AgentServer(self.pool).start()
+        self.url = self.server.base_url
+
+    async def asyncTearDown(self) -> None:
+        await self.server.close()
+        self.pool.close()
+
+    async def _create_session(self) -> str:
+        status, body = await load_test.http_request(self.url, "POST", "/sessions")
+        self.assertEqual(status, 201)
+        return str(json.loads(body)["session_id"])
+
+    async def test_streamed_turn_emits_events_and_persists(self) -> None:
+        session_id = await self._create_session()
+        status, _, events = await load_test._exchange(self.url, "POST", f"/sessions/{session_id}/turns", {"input": "make notes"})
+        self.assertEqual(status, 200)
+        names = [name for name, _ in events]
+        self.assertIn("delta", names)
+        self.assertIn("round", names)
+        self.assertTrue(any(name == "tool" and "[TOOL CALL] write" in str(data["line"]) for name, data in events))
+        self.assertEqual(names[-1], "done")
+        self.assertEqual(events[-1][1]["text"], "Created notes.txt for you.")
+        self.assertTrue(events[-1][1]["saved"])
+        self.assertEqual((self.root / "ws" / session_id / "notes.txt").read_text(encoding="utf-8"), "hi")
+
+        record = self.store.load(session_id)
+        self.assertEqual(record.title, "make notes")
+        self.assertEqual(len(record.messages), 4)
+        self.assertGreater(record.session_prompt_tokens, 0)
+
+    async def test_second_turn_on_busy_session_is_rejected(self) -> None:
+        session_id = await self._create_session()
+        first = asyncio.create_task(load_test.stream_turn(self.url, session_id, "make notes"))
+        await asyncio.sleep(0.05)
+        status, body = await load_test.http_request(self.url, "POST", f"/sessions/{session_id}/turns", {"input": "again"})
+        self.assertEqual(status, 409)
+        self.assertIn("running a turn", json.loads(body)["error"])
+        sample = await first
+        self.assertEqual(sample.outcome, "ok")
+
+    async def test_evicted_session_is_restored_from_store(self) -> None:
+        session_id = await self._create_session()
+        status, body = await load_test.http_request(
+            self.url, "POST", f"/sessions/{session_id}/turns", {"input": "make notes", "stream": False}
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["text"], "Created notes.txt for you.")
+        # max_sessions=2: two more sessions push the idle one out of the pool.
+        await self._create_session()
+        await self._create_session()
+        self.assertFalse(self.pool.is_resident(session_id))
+
+        status, body = await load_test.http_request(self.url, "GET", f"/sessions/{session_id}")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["messages"], 4)
+        sample = await load_test.stream_turn(self.url, session_id, "once more")
+        self.assertEqual(sample.outcome, "ok")
+        self.assertEqual(len(self.store.load(session_id).messages), 8)
+
+        status, _ = await load_test.http_request(self.url, "GET", "/sessions/does-not-exist")
+        self.assertEqual(status, 404)
+
+    async def test_load_test_reports_concurrent_turns(self) -> None:
+        report = await load_test.run_load_test(self.url, sessions=4, turns=1, concurrency=2, pool=self.pool)
+        self.assertEqual((report.turns_ok, report.turns_failed, report.turns_busy), (4, 0, 0))
+        self.assertEqual(report.peak_active_turns, 2)
+        self.assertIsNotNone(report.p95_first_delta_ms)
+
+
+if __name__ == "__main__":
+    unittest.main()
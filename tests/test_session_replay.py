@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from core.session_store_v6 import SessionStoreV6
+from tests.support import load_script
+
+replay = load_script("replay_session")
+
+
+def _tool_call(call_id: str, name: str, arguments: dict) -> dict:
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+
+MESSAGES = [
+    {"role": "user", "content": "create notes.txt"},
+    {"role": "assistant", "content": "", "tool_calls": [_tool_call("c1", "write", {"path": "notes.txt", "content": "hi"})]},
+    {"role": "tool", "tool_call_id": "c1", "name": "write", "content": "Wrote 2 bytes to notes.txt"},
+    {"role": "assistant", "content": "Created notes.txt."},
+    {"role": "user", "content": "read a.txt"},
+    {"role": "assistant", "content": "", "tool_calls": [_tool_call("c2", "read", {"path": "a.txt"})]},
+    {"role": "tool", "tool_call_id": "c2", "name": "read", "content": "recorded contents"},
+    {"role": "assistant", "content": "It says hello."},
+]
+
+
+class SessionReplayTests(unittest.IsolatedAsyncioTestCase):
+    def _save_session(self, root: Path):  # type: ignore[no-untyped-def]
+        store = SessionStoreV6(str(root / "sessions"))
+        record = store.create(model_name="recorded-model", loop_version="v6.1", persist=False)
+        record.messages = [dict(m) for m in MESSAGES]
+        record.session_prompt_tokens = 400
+        record.session_completion_tokens = 40
+        store.save(record)
+        return store.load(record.session_id)
+
+    def test_extract_turns_groups_rounds_and_tool_outputs(self) -> None:
+        turns = replay.extract_turns(MESSAGES)
+        self.assertEqual([t.user for t in turns], ["create notes.txt", "read a.txt"])
+        self.assertEqual(len(turns[0].responses), 2)
+        self.assertEqual(turns[0].responses[0].tool_calls[0].arguments, {"path": "notes.txt", "content": "hi"})
+        self.assertEqual(turns[1].tool_outputs, {"c2": "recorded contents"})
+
+    async def test_stub_replay_reproduces_history_without_side_effects(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="replay-") as temp_dir:
+            root = Path(temp_dir)
+            record = self._save_session(root)
+            report = await replay.replay_record(record, cwd=str(root))
+            self.assertFalse((root / "notes.txt").exists())
+
+        self.assertEqual((report.turns, report.rounds), (2, 4))
+        self.assertTrue(report.raw_messages_match)
+        self.assertEqual(report.tool_output_changes, 0)
+        self.assertEqual((report.stub_underflows, report.final_text_mismatches), (0, 0))
+        self.assertEqual(report.saves, 2)
+        self.assertGreater(report.session_file_bytes, 0)
+        self.assertEqual(report.recorded_prompt_tokens, 400)
+        self.assertIsNotNone(report.prompt_drift_pct)
+
+    async def test_execute_mode_reruns_tools(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="replay-") as temp_dir:
+            root = Path(temp_dir)
+            (root / "a.txt").write_text("hello", encoding="utf-8")
+            record = self._save_session(root)
+            report = await replay.replay_record(record, tool_mode="execute", cwd=str(root))
+            self.assertEqual((root / "notes.txt").read_text(encoding="utf-8"), "hi")
+
+        self.assertTrue(report.raw_messages_match)
+        self.assertEqual(report.tool_output_changes, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from core.prompt_builder import SystemPromptBuilder
+from core.skill_loader import SkillLoader
+
+
+def _write_skill(root: Path, name: str, description: str, body: str = "body") -> Path:
+    skill_md = root / name / "SKILL.md"
+    skill_md.parent.mkdir(parents=True, exist_ok=True)
+    skill_md.write_text(f"---\ndescription: {description}\nlicense: MIT\n---\n{body}", encoding="utf-8")
+    return skill_md
+
+
+class SkillLoaderTests(unittest.TestCase):
+    def test_bodies_load_on_demand_with_lru(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="skills-lazy-") as temp_dir:
+            root = Path(temp_dir) / "skills"
+            for name in ("alpha", "beta", "gamma"):
+                _write_skill(root, name, f"{name} skill", body=f"# {name}\n" + "text\n" * 5000)
+            loader = SkillLoader(str(root), body_cache_size=2)
+
+            self.assertEqual(loader.list_skill_names(), ["alpha", "beta", "gamma"])
+            self.assertEqual(loader.get_metadata("alpha").description, "alpha skill")
+            self.assertEqual(loader.get_metadata("alpha").license, "MIT")
+            self.assertTrue(loader.has("beta"))
+            self.assertEqual(loader.body_loads, 0)
+
+            self.assertIn("# alpha", loader.get("alpha").content)
+            loader.get("alpha")
+            self.assertEqual(loader.body_loads, 1)
+            loader.get("beta")
+            loader.get("gamma")
+            loader.get("alpha")
+            self.assertEqual(loader.body_loads, 4)
+            self.assertIsNone(loader.get("missing"))
+
+    def test_long_frontmatter_falls_back_to_full_read(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="skills-header-") as temp_dir:
+            root = Path(temp_dir)
+            skill_md = root / "wide" / "SKILL.md"
+            skill_md.parent.mkdir()
+            padding = "\n".join(f"k{i}: {'v' * 60}" for i in range(300))
+            skill_md.write_text(f"---\n{padding}\ndescription: late key\n---\nbody", encoding="utf-8")
+            loader = SkillLoader(str(root))
+            self.assertEqual(loader.get_metadata("wide").description, "late key")
+
+    def test_index_cache_reuses_unchanged_metadata(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="skills-index-") as temp_dir:
+            root = Path(temp_dir) / "skills"
+            cache_dir = str(Path(temp_dir) / "cache")
+            first = _write_skill(root, "alpha", "first")
+            _write_skill(root, "beta", "beta skill")
+
+            loader = SkillLoader(str(root), index_cache_dir=cache_dir, use_index_cache=True)
+            self.assertFalse(loader.index_cache_hit)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            loader = SkillLoader(str(root), index_cache_dir=cache_dir, use_index_cache=True)
+            self.assertTrue(loader.index_cache_hit)
+            self.assertEqual(loader.list_skill_names(), ["alpha", "beta"])
+
+            first.write_text("---\ndescription: edited description\n---\nbody", encoding="utf-8")
+            loader = SkillLoader(str(root), index_cache_dir=cache_dir, use_index_cache=True)
+            self.assertEqual(loader.get_metadata("alpha").description, "edited description")
+
+            _write_skill(root, "gamma", "new skill")
+            loader = SkillLoader(str(root), index_cache_dir=cache_dir, use_index_cache=True)
+            self.assertFalse(loader.index_cache_hit)
+            self.assertEqual(loader.list_skill_names(), ["alpha", "beta", "gamma"])
+
+    def test_index_cache_is_opt_in(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="skills-index-off-") as temp_dir:
+            root = Path(temp_dir) / "skills"
+            cache_dir = Path(temp_dir) / "cache"
+            _write_skill(root, "alpha", "alpha skill")
+            loader = SkillLoader(str(root), index_cache_dir=str(cache_dir))
+            self.assertEqual(loader.list_skill_names(), ["alpha"])
+            self.assertFalse(cache_dir.exists())
+
+
+class SystemPromptBuilderTests(unittest.TestCase):
+    def test_prompt_is_cached_until_skills_or_active_skill_change(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="skills-prompt-") as temp_dir:
+            root = Path(temp_dir)
+            _write_skill(root, "alpha", "alpha skill")
+            loader = SkillLoader(str(root))
+            builder = SystemPromptBuilder("base prompt", loader)
+
+            first = builder.build(None)
+            self.assertIs(builder.build(None), first)
+            self.assertIn("<name>alpha</name>", first)
+            prefix_hash = builder.prefix_hash
+
+            preferred = builder.build("alpha")
+            self.assertIn("[Preferred Skill]", preferred)
+            self.assertTrue(preferred.startswith(first))
+            self.assertEqual(builder.prefix_hash, prefix_hash)
+            self.assertEqual(builder.renders, 1)
+
+            _write_skill(root, "beta", "beta skill")
+            loader.reload()
+            self.assertIn("<name>beta</name>", builder.build("alpha"))
+            self.assertNotEqual(builder.prefix_hash, prefix_hash)
+
+
+if __name__ == "__main__":
+    unittest.main()
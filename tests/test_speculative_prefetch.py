@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from core.session_store_v6 import SessionStoreV6
+from core.speculative_prefetch import PrefetchConfig, TransitionStats, predict_next_reads
+from core.types import AssistantResponse, ToolCall
+from loops.agent_loop_v6_1 import V6_1
+
+
+class SlowScriptedClient:
+    def __init__(self, responses: list[AssistantResponse], delay: float = 0.05) -> None:
+        self.responses = list(responses)
+        self.delay = delay
+
+    async def generate(self, **_kwargs: object) -> AssistantResponse:
+        # Model "thinking" time, during which prefetches run.
+        await asyncio.sleep(self.delay)
+        return self.responses.pop(0)
+
+
+def _assistant_call(call_id: str, name: str, args: dict[str, object]) -> dict[str, object]:
+    return {
+        "role": "assistant",
+        "content": "",
+        "tool_calls": [{"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}],
+    }
+
+
+class PredictionTests(unittest.TestCase):
+    def test_grep_hits_become_ranked_reads_with_learned_window(self) -> None:
+        grep = ToolCall(id="g", name="grep", arguments={"pattern": "x", "path": "src", "cwd": "/w"})
+        output = "a.py:10: x = 1\na.py:12: x += 1\nb.py:3: x"
+        stats = TransitionStats()
+        predictions = predict_next_reads([(grep, output)], stats, PrefetchConfig(top_k=5))
+        self.assertEqual([p.args["path"] for p in predictions], ["/w/src/a.py", "/w/src/b.py"])
+        self.assertEqual(predictions[0].args, {"path": "/w/src/a.py", "cwd": "/w"})
+
+        transcript = [
+            {"role": "user", "content": "find x"},
+            _assistant_call("c1", "grep", {"pattern": "x", "path": "src"}),
+            {"role": "tool", "tool_call_id": "c1", "name": "grep", "content": output},
+            _assistant_call("c2", "read", {"path": "src/b.py", "offset": 1, "limit": 40}),
+        ]
+        stats.observe_messages(transcript)
+        self.assertEqual(stats.preferred_shape("grep"), ("window", 2, 40))
+        windowed = predict_next_reads([(grep, output)], stats, PrefetchConfig(top_k=1))
+        self.assertEqual(windowed[0].args, {"path": "/w/src/a.py", "cwd": "/w", "offset": 8, "limit": 40})
+
+    def test_truncated_read_predicts_continuation_and_low_probability_tools_are_skipped(self) -> None:
+        read = ToolCall(id="r", name="read", arguments={"path": "big.txt", "limit": 50})
+        output = "...\n[120 more lines in file. Use offset=51 to continue.]"
+        predictions = predict_next_reads([(read, output)], TransitionStats(), PrefetchConfig())
+        self.assertEqual(predictions[0].args, {"path": "big.txt", "limit": 50, "offset": 51})
+
+        stats = TransitionStats()
+        ls = ToolCall(id="l", name="ls", arguments={"path": "."})
+        for _ in range(20):
+            stats.observe("ls", "a.txt", [ToolCall(id="", name="bash", arguments={})])
+        self.assertEqual(predict_next_reads([(ls, "a.txt")], stats, PrefetchConfig()), [])
+
+    def test_stats_learn_from_session_files(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="prefetch-sessions-") as temp_dir:
+            store = SessionStoreV6(temp_dir)
+            record = store.create(model_name="m", loop_version="v6.1", persist=False)
+            record.messages = [
+                {"role": "user", "content": "look around"},
+                _assistant_call("c1", "ls", {"path": "."}),
+                {"role": "tool", "tool_call_id": "c1", "name": "ls", "content": "a.txt"},
+                _assistant_call("c2", "read", {"path": "a.txt"}),
+                {"role": "tool", "tool_call_id": "c2", "name": "read", "content": "hi"},
+                {"role": "assistant", "content": "done"},
+            ]
+            store.save(record)
+            stats = TransitionStats.from_sessions(temp_dir)
+        self.assertEqual((stats.followed["ls"], stats.followed_by_read["ls"]), (1, 1))
+        self.assertEqual(stats.preferred_shape("ls"), ("whole", 0, 0))
+
+
+class V6_1PrefetchTests(unittest.IsolatedAsyncioTestCase):
+    async def test_grep_hit_is_prefetched_and_unused_guess_is_wasted(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="prefetch-loop-") as temp_dir:
+            root = Path(temp_dir)
+            (root / "a.txt").write_text("needle in a\n", encoding="utf-8")
+            (root / "b.txt").write_text("needle in b\n", encoding="utf-8")
+            client = SlowScriptedClient(
+                [
+                    AssistantResponse(text="", tool_calls=[ToolCall(id="c1", name="grep", arguments={"pattern": "needle", "path": "."})]),
+                    AssistantResponse(text="", tool_calls=[ToolCall(id="c2", name="read", arguments={"path": "a.txt"})]),
+                    AssistantResponse(text="done"),
+                ],
+            )
+            loop = V6_1(client=client, model_name="m", default_tool_cwd=temp_dir, verbose=False, prefetch_config=PrefetchConfig())
+            self.assertEqual(await loop.run_turn("where is the needle?"), "done")
+            read_result = [m for m in loop.get_messages() if m.get("role") == "tool"][1]
+        self.assertEqual(read_result["content"], "needle in a")
+        self.assertEqual(loop.get_prefetch_stats(), {"prefetched": 2, "hits": 1, "wasted": 1, "hit_rate": 0.5, "wasted_seconds": mock.ANY})
+        self.assertEqual(loop.get_tool_cache_stats()["hits"], 1)
+
+    async def test_write_in_same_round_invalidates_prefetched_read(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="prefetch-loop-") as temp_dir:
+            (Path(temp_dir) / "a.txt").write_text("old\n", encoding="utf-8")
+            client = SlowScriptedClient(
+                [
+                    AssistantResponse(text="", tool_calls=[ToolCall(id="c1", name="ls", arguments={"path": "."})]),
+                    AssistantResponse(
+                        text="",
+                        tool_calls=[
+                            ToolCall(id="c2", name="write", arguments={"path": "a.txt", "content": "new\n"}),
+                            ToolCall(id="c3", name="read", arguments={"path": "a.txt"}),
+                        ],
+                    ),
+                    AssistantResponse(text="done"),
+                ],
+            )
+            loop = V6_1(client=client, model_name="m", default_tool_cwd=temp_dir, verbose=False, prefetch_config=PrefetchConfig())
+            await loop.run_turn("rewrite a.txt")
+            read_result = [m for m in loop.get_messages() if m.get("role") == "tool"][-1]
+        self.assertEqual(read_result["content"], "new")
+
+    async def test_prefetch_is_disabled_when_allowlist_drops_read(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="prefetch-loop-") as temp_dir:
+            (Path(temp_dir) / "a.txt").write_text("needle\n", encoding="utf-8")
+            client = SlowScriptedClient(
+                [
+                    AssistantResponse(text="", tool_calls=[ToolCall(id="c1", name="grep", arguments={"pattern": "needle"})]),
+                    AssistantResponse(text="done"),
+                ],
+            )
+            loop = V6_1(
+                client=client,
+                model_name="m",
+                default_tool_cwd=temp_dir,
+                verbose=False,
+                prefetch_config=PrefetchConfig(),
+                tool_allowlist=["grep"],
+            )
+            self.assertIsNone(loop.prefetcher)
+            self.assertEqual(await loop.run_turn("where is the needle?"), "done")
+        self.assertIsNone(loop.get_prefetch_stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
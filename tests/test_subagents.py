@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+
+from core.types import AssistantResponse, TokenUsage, ToolCall
+from loops.agent_loop_v6_1 import V6_1
+from loops.subagents import SubagentConfig, SubagentScheduler, SubagentSpec, parse_subagent_specs
+
+
+def _first_user(messages: list[dict[str, object]]) -> str:
+    return next(str(m.get("content", "")) for m in messages if m.get("role") == "user")
+
+
+class FanOutClient:
+    """Answers each conversation by its first user message; children sleep so overlap is observable."""
+
+    def __init__(self, parent_script: list[AssistantResponse], child_tokens: int = 100, delay: float = 0.05) -> None:
+        self.parent_script = list(parent_script)
+        self.child_tokens = child_tokens
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self.child_tools: dict[str, list[str]] = {}
+        self.calls: dict[str, int] = {}
+
+    async def generate(self, *, messages, tools=None, **_kwargs):  # type: ignore[no-untyped-def]
+        task = _first_user(messages)
+        if task == "parent":
+            return self.parent_script.pop(0)
+        self.child_tools[task] = sorted(t.name for t in tools or [])
+        self.calls[task] = self.calls.get(task, 0) + 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        if task.startswith("loop"):
+            # Keeps calling tools, so only the budget can end it.
+            return AssistantResponse(
+                text="",
+                tool_calls=[ToolCall(id=f"c{len(messages)}", name="ls", arguments={"path": "."})],
+                usage=TokenUsage(prompt_tokens=self.child_tokens, completion_tokens=0, total_tokens=self.child_tokens),
+            )
+        usage = TokenUsage(prompt_tokens=self.child_tokens - 10, completion_tokens=10, total_tokens=self.child_tokens)
+        return AssistantResponse(text=f"answer for {task} ({len(messages)} msgs)", usage=usage)
+
+
+def _spawn(tasks: list[dict[str, object]]) -> AssistantResponse:
+    return AssistantResponse(text="", tool_calls=[ToolCall(id="spawn", name="spawn_subagents", arguments={"tasks": tasks})])
+
+
+class ParseSpecsTests(unittest.TestCase):
+    def test_defaults_caps_and_unknown_tools(self) -> None:
+        config = SubagentConfig(max_tokens_per_agent=1000, max_tasks=2)
+        specs = parse_subagent_specs(
+            {"tasks": [{"task": "a"}, {"name": "b", "task": "b", "tools": ["grep"], "max_tokens": 99999}]},
+            config,
+            ["read", "grep", "find", "ls"],
+        )
+        self.assertEqual([s.name for s in specs], ["task-1", "b"])
+        self.assertEqual(specs[0].tools, config.default_tools)
+        self.assertEqual((specs[1].tools, specs[1].max_tokens), (("grep",), 1000))
+        # A renamed duplicate must not land on a name that is already taken.
+        named = [{"name": name, "task": "x", "tools": ["read"]} for name in ("a-3", "a", "a")]
+        renamed = parse_subagent_specs({"tasks": named}, SubagentConfig(), ["read"])
+        self.assertEqual([s.name for s in renamed], ["a-3", "a", "a-4"])
+        with self.assertRaisesRegex(ValueError, "unavailable tools: bash"):
+            parse_subagent_specs({"tasks": [{"task": "a", "tools": ["bash"]}]}, config, ["read"])
+        with self.assertRaisesRegex(ValueError, "at most 2"):
+            parse_subagent_specs({"tasks": [{"task": "a"}] * 3}, config, ["read"])
+
+
+class SpawnSubagentsTests(unittest.IsolatedAsyncioTestCase):
+    async def test_children_run_in_parallel_under_the_cap_with_isolated_state(self) -> None:
+        tasks = [{"name": f"t{i}", "task": f"research {i}", "tools": ["read", "grep"]} for i in range(5)]
+        client = FanOutClient([_spawn(tasks), AssistantResponse(text="merged")])
+        loop = V6_1(client=client, model_name="m", verbose=False, subagent_config=SubagentConfig(max_concurrency=2))
+        self.assertIn("spawn_subagents", [t.name for t in loop.tools])
+
+        result = await loop.run_turn("parent")
+
+        self.assertEqual(result, "merged")
+        self.assertEqual(client.peak, 2)
+        # Each child saw a fresh conversation (system + its task) and only the tools it asked for.
+        self.assertEqual(client.child_tools["research 3"], ["grep", "read", "read_tool_result"])
+        tool_output = next(m for m in loop.state.messages if m.get("role") == "tool")["content"]
+        self.assertIn("[subagents] 5 finished, 500 tokens", tool_output)
+        self.assertIn("### t4 [ok, 100 tokens", tool_output)
+        self.assertIn("answer for research 0 (2 msgs)", tool_output)
+        # Children's spend is billed to the parent session on top of its own (estimated) usage.
+        self.assertGreaterEqual(loop.get_token_usage_snapshot()["session_total_tokens"], 500)
+        self.assertEqual(loop.subagent_scheduler.active, 0)
+
+    async def test_budget_stops_runaway_child_and_skips_the_rest(self) -> None:
+        client = FanOutClient([], child_tokens=300, delay=0.0)
+        parent = V6_1(client=client, model_name="m", verbose=False, subagent_config=SubagentConfig(max_concurrency=1))
+        scheduler = SubagentScheduler(SubagentConfig(max_concurrency=1, max_total_tokens=1000))
+        specs = [
+            SubagentSpec(name="runaway", task="loop forever", tools=("ls",), max_tokens=700),
+            SubagentSpec(name="late-1", task="late 1"),
+            SubagentSpec(name="late-2", task="late 2"),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            parent.default_tool_cwd = tmp
+            results = await scheduler.run(specs, parent._build_subagent)
+
+        self.assertEqual([r.status for r in results], ["budget", "ok", "skipped"])
+        # Stopped at the first check past its own 700-token budget rather than at max_tool_rounds.
+        self.assertEqual(results[0].tokens, 900)
+
+    async def test_children_with_the_same_name_are_tracked_separately(self) -> None:
+        client = FanOutClient([], delay=0.0)
+        parent = V6_1(client=client, model_name="m", verbose=False, subagent_config=SubagentConfig())
+        scheduler = parent.subagent_scheduler
+        assert scheduler is not None
+        specs = [SubagentSpec(name="dup", task="first"), SubagentSpec(name="dup", task="second")]
+        with tempfile.TemporaryDirectory() as tmp:
+            parent.default_tool_cwd = tmp
+            results = await scheduler.run(specs, parent._build_subagent)
+        self.assertEqual([(r.status, r.tokens) for r in results], [("ok", 100), ("ok", 100)])
+
+    async def test_budget_stop_during_a_tool_ends_the_child_without_another_llm_call(self) -> None:
+        # The first answer already exceeds the 50-token budget, so the stop lands while its ls call runs.
+        client = FanOutClient([], child_tokens=100, delay=0.0)
+        parent = V6_1(client=client, model_name="m", verbose=False, subagent_config=SubagentConfig())
+        scheduler = parent.subagent_scheduler
+        assert scheduler is not None
+        with tempfile.TemporaryDirectory() as tmp:
+            parent.default_tool_cwd = tmp
+            results = await scheduler.run([SubagentSpec(name="a", task="loop a", tools=("ls",), max_tokens=50)], parent._build_subagent)
+        self.assertEqual(results[0].status, "budget")
+        self.assertEqual(client.calls["loop a"], 1)
+
+    async def test_parent_interrupt_propagates_instead_of_returning_partial_results(self) -> None:
+        client = FanOutClient([], delay=0.05)
+        interrupted = {"flag": False}
+        parent = V6_1(client=client, model_name="m", verbose=False, subagent_config=SubagentConfig())
+        scheduler = parent.subagent_scheduler
+        assert scheduler is not None
+
+        async def _interrupt_soon() -> None:
+            await asyncio.sleep(0.01)
+            interrupted["flag"] = True
+
+        asyncio.get_running_loop().create_task(_interrupt_soon())
+        with self.assertRaises(InterruptedError):
+            await scheduler.run(
+                [SubagentSpec(name="a", task="loop a", tools=("ls",))],
+                parent._build_subagent,
+                parent_interrupted=lambda: interrupted["flag"],
+            )
+        self.assertEqual(scheduler.active, 0)
+
+    async def test_invalid_request_is_reported_to_the_model(self) -> None:
+        client = FanOutClient([_spawn([{"task": "x", "tools": ["spawn_subagents"]}]), AssistantResponse(text="ok")])
+        loop = V6_1(client=client, model_name="m", verbose=False, subagent_config=SubagentConfig())
+        await loop.run_turn("parent")
+        tool_output = next(m for m in loop.state.messages if m.get("role") == "tool")["content"]
+        self.assertIn("unavailable tools: spawn_subagents", tool_output)
+        self.assertEqual(client.child_tools, {})
+
+    def test_tool_allowlist_filters_tools(self) -> None:
+        loop = V6_1(client=FanOutClient([]), model_name="m", verbose=False, tool_allowlist=["read", "ls"])
+        self.assertEqual(sorted(t.name for t in loop.tools), ["ls", "read"])
+        self.assertEqual(sorted(loop._tool_registry), ["ls", "read"])
+
+
+if __name__ == "__main__":
+    unittest.main()
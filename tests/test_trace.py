@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from core.trace import TraceSink
+from core.types import AssistantResponse, TokenUsage, ToolCall
+from loops.agent_loop_v6_1 import V6_1
+from tests.support import load_script
+
+
+class ScriptedClient:
+    def __init__(self, responses: list[AssistantResponse]) -> None:
+        self.responses = list(responses)
+
+    async def generate(self, **kwargs):  # type: ignore[no-untyped-def]
+        _ = kwargs
+        return self.responses.pop(0)
+
+
+class TraceTests(unittest.IsolatedAsyncioTestCase):
+    async def test_turn_emits_nested_llm_and_tool_spans(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="trace-") as temp_dir:
+            root = Path(temp_dir)
+            (root / "a.txt").write_text("hello", encoding="utf-8")
+            sink = TraceSink(str(root / "trace.jsonl"))
+            client = ScriptedClient(
+                [
+                    AssistantResponse(
+                        text="",
+                        tool_calls=[ToolCall(id="c1", name="read", arguments={"path": "a.txt"})],
+                        usage=TokenUsage(prompt_tokens=10, completion_tokens=2, total_tokens=12),
+                        request_bytes=321,
+                        response_bytes=45,
+                    ),
+                    AssistantResponse(text="done"),
+                ],
+            )
+            loop = V6_1(
+                client=client,
+                model_name="test-model",
+                default_tool_cwd=str(root),
+                verbose=False,
+                trace_sink=sink,
+            )
+            await loop.run_turn("read a.txt")
+            sink.close()
+
+            events = [json.loads(line) for line in (root / "trace.jsonl").read_text(encoding="utf-8").splitlines()]
+            kinds = [e["kind"] for e in events]
+            self.assertEqual(kinds, ["llm_call", "tool_call", "llm_call", "turn"])
+            turn = events[-1]
+            self.assertTrue(all(e["turn_id"] == turn["span_id"] for e in events))
+            self.assertTrue(all(e["parent_id"] == turn["span_id"] for e in events[:-1]))
+            self.assertEqual([e["round"] for e in events[:-1]], [1, 1, 2])
+            self.assertEqual((events[0]["bytes_in"], events[0]["bytes_out"]), (321, 45))
+            self.assertEqual(events[0]["usage_source"], "provider")
+            self.assertEqual(events[2]["usage_source"], "estimated")
+            self.assertEqual(events[1]["bytes_out"], 5)
+            self.assertLessEqual(turn["start"], events[0]["start"])
+
+            rows = {row["stage"]: row for row in load_script("analyze_trace").summarize(events)}
+            self.assertEqual(rows["llm_call"]["count"], 2)
+            self.assertIsNone(rows["turn"]["turn_share"])
+
+
+if __name__ == "__main__":
+    unittest.main()
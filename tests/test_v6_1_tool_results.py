@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from core.tool_cache import ToolResultCache
+from core.tool_result_store import ToolResultBlobStore, ToolResultGovernorConfig
+from core.types import AssistantResponse, ToolCall
+from loops.agent_loop_v6_1 import V6_1
+
+
+class ScriptedClient:
+    def __init__(self, responses: list[AssistantResponse]) -> None:
+        self.responses = list(responses)
+        self.requests: list[list[dict[str, object]]] = []
+
+    async def generate(self, *, model_name, messages, tools=None, **kwargs):  # type: ignore[no-untyped-def]
+        _ = (model_name, tools, kwargs)
+        self.requests.append([dict(m) for m in messages])
+        return self.responses.pop(0)
+
+
+class ToolResultGovernorTests(unittest.IsolatedAsyncioTestCase):
+    async def test_large_tool_output_is_spilled_and_pageable(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="v6-1-tool-results-") as temp_dir:
+            root = Path(temp_dir)
+            big_file = root / "big.txt"
+            big_file.write_text("\n".join(f"line {i} " + "x" * 40 for i in range(1, 401)), encoding="utf-8")
+
+            client = ScriptedClient(
+                [
+                    AssistantResponse(text="", tool_calls=[ToolCall(id="c1", name="read", arguments={"path": "big.txt"})]),
+                    AssistantResponse(text="done"),
+                ],
+            )
+            loop = V6_1(
+                client=client,
+                model_name="test-model",
+                default_tool_cwd=str(root),
+                verbose=False,
+                tool_result_config=ToolResultGovernorConfig(
+                    max_inline_tokens=500,
+                    store_dir=str(root / "store"),
+                ),
+            )
+            text = await loop.run_turn("read big file")
+            self.assertEqual(text, "done")
+
+            tool_msg = [m for m in loop.get_messages() if m.get("role") == "tool"][0]
+            content = str(tool_msg["content"])
+            self.assertIn("[tool result stored: tool=read handle=tr_", content)
+            self.assertLess(len(content), 4000)
+            self.assertEqual(str(loop.get_raw_messages()[2]["content"]), content)
+
+            handle = content.split("handle=", 1)[1].split()[0]
+            handler = loop._tool_registry["read_tool_result"].handler
+            page = handler({"handle": handle, "offset": 10, "limit": 2})
+            self.assertTrue(page.startswith("line 10 "))
+            self.assertIn("Use offset=12 to continue", page)
+
+    def test_blob_store_is_content_addressed(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="v6-1-blob-") as temp_dir:
+            store = ToolResultBlobStore(temp_dir)
+            first = store.put("same payload")
+            second = store.put("same payload")
+            self.assertEqual(first, second)
+            self.assertNotEqual(first, store.put("other payload"))
+            self.assertFalse(store.exists("../etc/passwd"))
+            self.assertEqual(len(list(Path(temp_dir).iterdir())), 2)
+
+
+class ToolResultCacheTests(unittest.IsolatedAsyncioTestCase):
+    async def test_repeated_reads_hit_cache_until_write_invalidates(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="v6-1-tool-cache-") as temp_dir:
+            root = Path(temp_dir)
+            (root / "note.txt").write_text("v1", encoding="utf-8")
+            read_call = {"path": "note.txt"}
+            client = ScriptedClient(
+                [
+                    AssistantResponse(
+                        text="",
+                        tool_calls=[
+                            ToolCall(id="r1", name="read", arguments=read_call),
+                            ToolCall(id="r2", name="read", arguments={"path": str(root / "note.txt")}),
+                            ToolCall(id="w1", name="write", arguments={"path": "note.txt", "content": "v2"}),
+                            ToolCall(id="r3", name="read", arguments=read_call),
+                        ],
+                    ),
+                    AssistantResponse(text="done"),
+                ],
+            )
+            rounds: list[dict[str, object]] = []
+            loop = V6_1(
+                client=client,
+                model_name="test-model",
+                default_tool_cwd=str(root),
+                verbose=False,
+                model_round_callback=lambda _text, metrics: rounds.append(dict(metrics)),
+            )
+            await loop.run_turn("read twice then write")
+
+            outputs = [str(m["content"]) for m in loop.get_messages() if m.get("role") == "tool"]
+            self.assertEqual(outputs[0], "v1")
+            self.assertEqual(outputs[1], "v1")
+            self.assertEqual(outputs[3], "v2")
+            stats = loop.get_tool_cache_stats()
+            self.assertEqual(stats["hits"], 1)
+            self.assertEqual(stats["misses"], 2)
+            self.assertEqual(rounds[-1]["tool_cache_hits"], 1)
+
+    def test_cache_detects_out_of_band_modification(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="v6-1-tool-cache-mtime-") as temp_dir:
+            root = Path(temp_dir)
+            target = root / "a.txt"
+            target.write_text("old", encoding="utf-8")
+            cache = ToolResultCache()
+            args = {"path": "a.txt", "cwd": str(root)}
+            cache.store("read", args, "old")
+            self.assertEqual(cache.lookup("read", args), "old")
+            target.write_text("newer content", encoding="utf-8")
+            self.assertIsNone(cache.lookup("read", args))
+
+    def test_write_invalidates_parent_listing_but_not_siblings(self) -> None:
+        with tempfile.TemporaryDirectory(prefix="v6-1-tool-cache-inv-") as temp_dir:
+            root = Path(temp_dir)
+            (root / "a.txt").write_text("a", encoding="utf-8")
+            (root / "b.txt").write_text("b", encoding="utf-8")
+            cache = ToolResultCache()
+            cache.store("ls", {"path": ".", "cwd": str(root)}, "a.txt\nb.txt")
+            cache.store("read", {"path": "b.txt", "cwd": str(root)}, "b")
+            self.assertEqual(cache.invalidate_path(root / "a.txt"), 1)
+            self.assertEqual(cache.lookup("read", {"path": "b.txt", "cwd": str(root)}), "b")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,6 +19,10 @@ class FindTool(BaseTool):
             "Returns matching file paths to drive downstream read/grep/edit actions."
         )
 
+    @property
+    def read_only(self) -> bool:
+        return True
+
     @property
     def parameters(self) -> Dict[str, object]:
         return {
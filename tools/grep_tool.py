@@ -19,6 +19,10 @@ class GrepTool(BaseTool):
             "Returns file+line formatted matches, optional context lines, and limit-hit continuation hints."
         )
 
+    @property
+    def read_only(self) -> bool:
+        return True
+
     @property
     def parameters(self) -> Dict[str, object]:
         return {
@@ -19,6 +19,10 @@ class LsTool(BaseTool):
             "Directories are rendered with trailing slash for quick path disambiguation."
         )
 
+    @property
+    def read_only(self) -> bool:
+        return True
+
     @property
     def parameters(self) -> Dict[str, object]:
         return {
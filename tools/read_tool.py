@@ -20,6 +20,10 @@ class ReadTool(BaseTool):
             "max_lines/max_bytes. On truncation, response includes continuation hints with next offset."
         )
 
+    @property
+    def read_only(self) -> bool:
+        return True
+
     @property
     def parameters(self) -> Dict[str, object]:
         return {